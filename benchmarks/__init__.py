@@ -0,0 +1,5 @@
+"""Benchmarks of holodeck hot paths, run with `airspeed velocity` (asv).
+
+See `benchmarks/README.md` for usage.
+
+"""
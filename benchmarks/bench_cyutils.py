@@ -0,0 +1,55 @@
+"""Benchmarks of the compiled kernels in `holodeck.cyutils`.
+"""
+
+import numpy as np
+
+import holodeck as holo
+from holodeck import cyutils
+
+from . import common
+
+
+class Loudest_From_Sorted:
+    """`cyutils.loudest_hc_from_sorted`, the Poisson-realization kernel used by `ss_gws_redz`.
+    """
+
+    params = ['small', 'medium']
+    param_names = ['size']
+    number = 1
+    repeat = 5
+
+    def setup(self, size):
+        edges, redz_final, self.number = common.number_grid(size)
+        self.h2fdf = holo.gravwaves.char_strain_sq_from_bin_edges_redz(edges, redz_final)
+        shape = self.number.shape[:3]
+        indices = np.argsort(-self.h2fdf[..., 0].flatten())
+        self.msort, self.qsort, self.zsort = np.unravel_index(indices, shape)
+        self.nreals = common.NREALS[size]
+        common.seed()
+
+    def time_loudest_hc_from_sorted(self, size):
+        cyutils.loudest_hc_from_sorted(
+            self.number, self.h2fdf, self.nreals, common.NLOUDEST, self.msort, self.qsort, self.zsort
+        )
+
+    def peakmem_loudest_hc_from_sorted(self, size):
+        cyutils.loudest_hc_from_sorted(
+            self.number, self.h2fdf, self.nreals, common.NLOUDEST, self.msort, self.qsort, self.zsort
+        )
+
+
+class Interp_Hermite:
+    """`cyutils.interp_hermite`, cubic Hermite interpolation on the `holo.cosmo_interp` tables.
+    """
+
+    params = [1_000, 1_000_000]
+    param_names = ['num']
+
+    def setup(self, num):
+        common.seed()
+        self.table = holo.cosmo_interp.table('dcom', 'redz')
+        xx = self.table[0]
+        self.xnew = np.random.uniform(xx[0], xx[-1], num)
+
+    def time_interp_hermite(self, num):
+        cyutils.interp_hermite(self.xnew, *self.table)
@@ -0,0 +1,93 @@
+"""Benchmarks of PTA detection statistics in `holodeck.detstats`.
+
+These require the optional `hasasia` dependency (and those of `holodeck.detstats`), and are skipped
+when it is not available.
+
+"""
+
+import numpy as np
+
+from . import common
+
+NPSRS = 40
+SIGMA = 1.0e-7      # [s]
+NSKIES = 25
+
+
+def _import_detstats():
+    try:
+        from holodeck import detstats
+    except ImportError as err:
+        # asv skips benchmarks whose `setup` raises `NotImplementedError`
+        raise NotImplementedError(f"`holodeck.detstats` is unavailable: {err}")
+    return detstats
+
+
+class _Detect:
+
+    params = ['small', 'medium']
+    param_names = ['size']
+    number = 1
+    repeat = 3
+    timeout = 300
+
+    def setup(self, size):
+        self.detstats = _import_detstats()
+        self.hc_ss, self.hc_bg = common.strains(size)
+        self.fobs, _ = common.freqs(size)
+        dur = 1.0 / self.fobs[0]
+        cad = 1.0 / (2 * self.fobs[-1])
+        common.seed()
+        self.pulsars = self.detstats._build_pta(NPSRS, SIGMA, dur, cad)
+        nfreqs, _, nloudest = self.hc_ss.shape
+        self.skies = self.detstats._build_skies(nfreqs, NSKIES, nloudest)
+
+
+class Detect_BG_PTA(_Detect):
+    """`detstats.detect_bg_pta`.
+    """
+
+    def time_detect_bg_pta(self, size):
+        self.detstats.detect_bg_pta(self.pulsars, self.fobs, self.hc_bg, self.hc_ss)
+
+    def peakmem_detect_bg_pta(self, size):
+        self.detstats.detect_bg_pta(self.pulsars, self.fobs, self.hc_bg, self.hc_ss)
+
+
+class Detect_SS_PTA(_Detect):
+    """`detstats.detect_ss_pta` with fixed sky realizations.
+    """
+
+    def time_detect_ss_pta(self, size):
+        theta, phi, Phi0, iota, psi = self.skies
+        self.detstats.detect_ss_pta(
+            self.pulsars, self.fobs, self.hc_ss, self.hc_bg,
+            theta_ss=theta, phi_ss=phi, Phi0_ss=Phi0, iota_ss=iota, psi_ss=psi,
+        )
+
+    def peakmem_detect_ss_pta(self, size):
+        theta, phi, Phi0, iota, psi = self.skies
+        self.detstats.detect_ss_pta(
+            self.pulsars, self.fobs, self.hc_ss, self.hc_bg,
+            theta_ss=theta, phi_ss=phi, Phi0_ss=Phi0, iota_ss=iota, psi_ss=psi,
+        )
+
+
+
+class Detect_Batched(_Detect):
+    """`detstats.Batched_Detector` on a block of identical samples, with fixed sky realizations.
+    """
+
+    NSAMPS = 4
+
+    def setup(self, size):
+        super().setup(size)
+        self.detector = self.detstats.Batched_Detector(self.pulsars, self.fobs, self.skies)
+        self.hc_ss = np.repeat(self.hc_ss[np.newaxis], self.NSAMPS, axis=0)
+        self.hc_bg = np.repeat(self.hc_bg[np.newaxis], self.NSAMPS, axis=0)
+
+    def time_detect_bg(self, size):
+        self.detector.detect_bg(self.hc_bg)
+
+    def time_detect_ss(self, size):
+        self.detector.detect_ss(self.hc_ss, self.hc_bg)
@@ -0,0 +1,71 @@
+"""Benchmarks of discrete binary evolution, `holodeck.evolution.Evolution.evolve`.
+"""
+
+import holodeck as holo
+
+from . import common
+
+
+class Evolve:
+    """`Evolution.evolve` for an Illustris population, with a fixed-time and a physical hardening model.
+    """
+
+    params = [['fixed_time', 'composite'], [30, 100]]
+    param_names = ['hard', 'nsteps']
+    number = 1
+    repeat = 3
+    timeout = 300
+
+    def setup_cache(self):
+        # loading the Illustris population is I/O bound, and not part of the evolution itself
+        common.seed()
+        return holo.population.Pop_Illustris()
+
+    def setup(self, pop, hard, nsteps):
+        common.seed()
+        if hard == 'fixed_time':
+            hard = holo.hardening.Fixed_Time_2PL.from_pop(pop, common.HARD_TIME)
+        else:
+            hard = [
+                holo.hardening.Hard_GW(),
+                holo.hardening.Sesana_Scattering(),
+                holo.hardening.Dynamical_Friction_NFW(),
+            ]
+        self.evo = holo.evolution.Evolution(pop, hard, nsteps=nsteps)
+
+    def time_evolve(self, pop, hard, nsteps):
+        self.evo.evolve()
+
+    def peakmem_evolve(self, pop, hard, nsteps):
+        self.evo.evolve()
+
+
+class Discrete_Emit:
+    """`gravwaves.GW_Discrete.emit` for an evolved, eccentric Illustris population.
+    """
+
+    params = [['small', 'medium']]
+    param_names = ['size']
+    number = 1
+    repeat = 3
+    timeout = 300
+
+    def setup_cache(self):
+        common.seed()
+        ecc = holo.population.PM_Eccentricity()
+        pop = holo.population.Pop_Illustris(mods=ecc)
+        hard = holo.hardening.Fixed_Time_2PL.from_pop(pop, common.HARD_TIME)
+        evo = holo.evolution.Evolution(pop, hard, nsteps=30)
+        evo.evolve()
+        return evo
+
+    def setup(self, evo, size):
+        common.seed()
+        fobs, _ = common.freqs(size)
+        self.gws = holo.gravwaves.GW_Discrete(evo, fobs, nharms=30, nreals=common.NREALS[size])
+
+    def time_emit(self, evo, size):
+        self.gws.emit(progress=False)
+
+    def peakmem_emit(self, evo, size):
+        self.gws.emit(progress=False)
@@ -0,0 +1,48 @@
+"""Benchmarks of a full library-generation step, `holodeck.librarian.run_sam_at_pspace_num`.
+"""
+
+import argparse
+import logging
+import shutil
+import tempfile
+from pathlib import Path
+
+import holodeck as holo
+from holodeck import param_spaces
+from holodeck.constants import YR
+
+from . import common
+
+
+class Run_SAM_At_PSpace_Num:
+    """`librarian.run_sam_at_pspace_num`: model construction, number grid, loudest sources and GWB, and output.
+    """
+
+    params = ['small', 'medium']
+    param_names = ['size']
+    number = 1
+    repeat = 3
+    timeout = 300
+
+    def setup(self, size):
+        log = logging.getLogger("holodeck.benchmarks")
+        log.setLevel(logging.WARNING)
+        self._path = Path(tempfile.mkdtemp())
+        self.space = param_spaces.PS_Uniform_07A(log, 4, common.SHAPES[size], common.SEED)
+        self.args = argparse.Namespace(
+            log=log, output_sims=self._path, output_plots=self._path, recreate=True, plot=False,
+            pta_dur=common.PTA_DUR/YR, nfreqs=common.NFREQS[size], nreals=common.NREALS[size],
+            nloudest=common.NLOUDEST, ss_flag=True, gwb_flag=True, params_flag=True,
+        )
+        common.seed()
+
+    def teardown(self, size):
+        shutil.rmtree(self._path, ignore_errors=True)
+
+    def time_run_sam_at_pspace_num(self, size):
+        rv = holo.librarian.run_sam_at_pspace_num(self.args, self.space, 0)
+        assert rv
+
+    def peakmem_run_sam_at_pspace_num(self, size):
+        rv = holo.librarian.run_sam_at_pspace_num(self.args, self.space, 0)
+        assert rv
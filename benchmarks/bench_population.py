@@ -0,0 +1,34 @@
+"""Benchmarks of discrete population construction, `holodeck.population`.
+"""
+
+import copy
+
+import holodeck as holo
+
+from . import common
+
+
+class Resample:
+    """`PM_Resample.modify` for an Illustris population, including host properties.
+    """
+
+    params = [[10, 100]]
+    param_names = ['resample']
+    number = 1
+    repeat = 3
+    timeout = 300
+
+    def setup_cache(self):
+        common.seed()
+        return holo.population.Pop_Illustris()
+
+    def setup(self, pop, resample):
+        self.mod = holo.population.PM_Resample(resample, seed=common.SEED)
+
+    def time_resample(self, pop, resample):
+        # `modify` operates in-place, so use a shallow copy of the cached population
+        self.mod.modify(copy.copy(pop))
+
+    def peakmem_resample(self, pop, resample):
+        self.mod.modify(copy.copy(pop))
+
@@ -0,0 +1,147 @@
+"""Benchmarks of the semi-analytic model (SAM) pipeline stages.
+
+Each stage is benchmarked in isolation for the 'small' and 'medium' grid shapes defined in
+`benchmarks.common`: the static binary density, the 2-power-law hardening normalization, the dynamic
+binary number (including the integration over bins), the GWB realizations and their analytic
+statistics, and discrete sampling of the number grid.
+
+"""
+
+import holodeck as holo
+from holodeck import cosmo
+from holodeck.sams import cyutils as sam_cyutils
+
+from . import common
+
+
+class SAM_Density:
+    """`Semi_Analytic_Model.static_binary_density`.
+    """
+
+    params = ['small', 'medium']
+    param_names = ['size']
+    number = 1
+    repeat = 5
+
+    def setup(self, size):
+        common.seed()
+        # construct a new instance each repeat, the density is cached after the first call
+        self.sam = common.sam(size)
+
+    def time_static_binary_density(self, size):
+        self.sam._density = None
+        self.sam.static_binary_density
+
+    def peakmem_static_binary_density(self, size):
+        self.sam._density = None
+        self.sam.static_binary_density
+
+
+class Hardening_Norm:
+    """`hardening.Fixed_Time_2PL_SAM` construction, dominated by `sams.cyutils.find_2pwl_hardening_norm`.
+    """
+
+    params = ['small', 'medium']
+    param_names = ['size']
+    number = 1
+    repeat = 5
+
+    def setup(self, size):
+        common.seed()
+        self.sam = common.sam(size)
+
+    def time_fixed_time_2pl_sam(self, size):
+        holo.hardening.Fixed_Time_2PL_SAM(self.sam, common.HARD_TIME)
+
+    def peakmem_fixed_time_2pl_sam(self, size):
+        holo.hardening.Fixed_Time_2PL_SAM(self.sam, common.HARD_TIME)
+
+
+class Dynamic_Number:
+    """`sams.cyutils.dynamic_binary_number_at_fobs` and `integrate_differential_number_3dx1d`.
+    """
+
+    params = ['small', 'medium']
+    param_names = ['size']
+    number = 1
+    repeat = 5
+
+    def setup(self, size):
+        common.seed()
+        self.sam, self.hard = common.sam_and_hard(size)
+        self.sam.static_binary_density
+        fobs_cents, fobs_edges = common.freqs(size)
+        self.fobs_orb_cents = fobs_cents / 2.0
+        self.edges = [self.sam.mtot, self.sam.mrat, self.sam.redz, fobs_edges / 2.0]
+        _, self.diff_num = sam_cyutils.dynamic_binary_number_at_fobs(self.fobs_orb_cents, self.sam, self.hard, cosmo)
+
+    def time_dynamic_binary_number_at_fobs(self, size):
+        sam_cyutils.dynamic_binary_number_at_fobs(self.fobs_orb_cents, self.sam, self.hard, cosmo)
+
+    def peakmem_dynamic_binary_number_at_fobs(self, size):
+        sam_cyutils.dynamic_binary_number_at_fobs(self.fobs_orb_cents, self.sam, self.hard, cosmo)
+
+    def time_integrate_differential_number(self, size):
+        sam_cyutils.integrate_differential_number_3dx1d(self.edges, self.diff_num)
+
+
+class GWB_Realizations:
+    """`gravwaves._gws_from_number_grid_integrated_redz`, `gravwaves._gws_from_number_grid_streamed`, and the
+    analytic alternative `gravwaves.gwb_poisson_stats`.
+    """
+
+    params = ['small', 'medium']
+    param_names = ['size']
+    number = 1
+    repeat = 5
+
+    def setup(self, size):
+        self.edges, self.redz_final, self.number = common.number_grid(size)
+        self.nreals = common.NREALS[size]
+        common.seed()
+
+    def time_gws_from_number_grid(self, size):
+        holo.gravwaves._gws_from_number_grid_integrated_redz(self.edges, self.redz_final, self.number, self.nreals)
+
+    def peakmem_gws_from_number_grid(self, size):
+        holo.gravwaves._gws_from_number_grid_integrated_redz(self.edges, self.redz_final, self.number, self.nreals)
+
+    def time_gws_from_number_grid_streamed(self, size):
+        holo.gravwaves._gws_from_number_grid_streamed(
+            self.edges, self.number, self.nreals, redz=self.redz_final, loudest=common.NLOUDEST
+        )
+
+    def peakmem_gws_from_number_grid_streamed(self, size):
+        holo.gravwaves._gws_from_number_grid_streamed(
+            self.edges, self.number, self.nreals, redz=self.redz_final, loudest=common.NLOUDEST
+        )
+
+    def time_gwb_poisson_stats(self, size):
+        holo.gravwaves.gwb_poisson_stats(self.edges, self.number, redz=self.redz_final, quantiles=[0.16, 0.5, 0.84])
+
+    def peakmem_gwb_poisson_stats(self, size):
+        holo.gravwaves.gwb_poisson_stats(self.edges, self.number, redz=self.redz_final, quantiles=[0.16, 0.5, 0.84])
+
+
+class Grid_Sampling:
+    """`sams.sam.Grid_Sampler` alias-table construction and discrete realizations of a SAM number grid.
+    """
+
+    params = ['small', 'medium']
+    param_names = ['size']
+    number = 1
+    repeat = 5
+
+    def setup(self, size):
+        self.edges, _, self.number = common.number_grid(size)
+        self.sampler = holo.sams.sam.Grid_Sampler(self.edges, self.number, threshold=1e2)
+        common.seed()
+
+    def time_grid_sampler(self, size):
+        holo.sams.sam.Grid_Sampler(self.edges, self.number, threshold=1e2)
+
+    def time_realize(self, size):
+        self.sampler.realize(common.SEED)
+
+    def peakmem_realize(self, size):
+        self.sampler.realize(common.SEED)
@@ -0,0 +1,31 @@
+"""Benchmarks of the loudest single-source calculations in `holodeck.single_sources`.
+"""
+
+import holodeck as holo
+
+from . import common
+
+
+class SS_GWs_Redz:
+    """`single_sources.ss_gws_redz`, with and without binary parameters.
+    """
+
+    params = [['small', 'medium'], [False, True]]
+    param_names = ['size', 'params']
+    number = 1
+    repeat = 5
+
+    def setup(self, size, params):
+        self.edges, self.redz_final, self.number = common.number_grid(size)
+        self.nreals = common.NREALS[size]
+        common.seed()
+
+    def time_ss_gws_redz(self, size, params):
+        holo.single_sources.ss_gws_redz(
+            self.edges, self.redz_final, self.number, realize=self.nreals, loudest=common.NLOUDEST, params=params
+        )
+
+    def peakmem_ss_gws_redz(self, size, params):
+        holo.single_sources.ss_gws_redz(
+            self.edges, self.redz_final, self.number, realize=self.nreals, loudest=common.NLOUDEST, params=params
+        )
@@ -0,0 +1,107 @@
+"""Shared, seeded inputs for the holodeck benchmarks.
+
+All inputs are constructed deterministically from `SEED`, and are cached at the module level so that
+repeated `setup` calls (asv calls `setup` before every repeat) do not re-run expensive stages that are
+not being benchmarked.
+
+"""
+
+import numpy as np
+
+import holodeck as holo
+from holodeck import cosmo
+from holodeck.constants import GYR, YR
+from holodeck.sams import cyutils as sam_cyutils
+
+SEED = 12345
+
+#: Grid shapes (number of mtot, mrat, redz bins) used for each benchmark 'size'
+SHAPES = dict(small=(20, 21, 22), medium=(30, 31, 32))
+#: Number of frequency bins used for each benchmark 'size'
+NFREQS = dict(small=10, medium=20)
+#: Number of realizations used for each benchmark 'size'
+NREALS = dict(small=10, medium=30)
+NLOUDEST = 5
+PTA_DUR = 16.03 * YR
+HARD_TIME = 3.0 * GYR
+
+_CACHE = {}
+
+
+def seed():
+    """Reset the global numpy random-state to the benchmark seed.
+    """
+    np.random.seed(SEED)
+    return
+
+
+def freqs(size):
+    """Observer-frame GW frequency bin centers and edges for the given benchmark `size`.
+
+    Returns
+    -------
+    fobs_cents : (F,) ndarray
+    fobs_edges : (F+1,) ndarray
+
+    """
+    return holo.utils.pta_freqs(PTA_DUR, NFREQS[size])
+
+
+def sam(size):
+    """Construct a new default `Semi_Analytic_Model` with the grid shape of the given `size`.
+    """
+    return holo.sams.Semi_Analytic_Model(shape=SHAPES[size])
+
+
+def sam_and_hard(size):
+    """Construct a new (`Semi_Analytic_Model`, `Fixed_Time_2PL_SAM`) pair for the given `size`.
+    """
+    _sam = sam(size)
+    hard = holo.hardening.Fixed_Time_2PL_SAM(_sam, HARD_TIME)
+    return _sam, hard
+
+
+def number_grid(size):
+    """Final redshifts and binary numbers on the SAM grid for the given `size` (cached).
+
+    Returns
+    -------
+    edges : (4,) list of ndarray
+        Grid edges in total-mass, mass-ratio, redshift and orbital-frequency.
+    redz_final : (M, Q, Z, F) ndarray
+    number : (M-1, Q-1, Z-1, F) ndarray
+
+    """
+    key = ('number_grid', size)
+    if key not in _CACHE:
+        _sam, hard = sam_and_hard(size)
+        fobs_cents, fobs_edges = freqs(size)
+        fobs_orb_cents = fobs_cents / 2.0
+        fobs_orb_edges = fobs_edges / 2.0
+        redz_final, diff_num = sam_cyutils.dynamic_binary_number_at_fobs(fobs_orb_cents, _sam, hard, cosmo)
+        edges = [_sam.mtot, _sam.mrat, _sam.redz, fobs_orb_edges]
+        number = sam_cyutils.integrate_differential_number_3dx1d(edges, diff_num)
+        _CACHE[key] = (edges, redz_final, number)
+
+    return _CACHE[key]
+
+
+def strains(size):
+    """Single-source and background characteristic strains for the given `size` (cached).
+
+    Returns
+    -------
+    hc_ss : (F, R, L) ndarray
+    hc_bg : (F, R) ndarray
+
+    """
+    key = ('strains', size)
+    if key not in _CACHE:
+        edges, redz_final, number = number_grid(size)
+        seed()
+        hc_ss, hc_bg = holo.single_sources.ss_gws_redz(
+            edges, redz_final, number, realize=NREALS[size], loudest=NLOUDEST, params=False
+        )
+        _CACHE[key] = (hc_ss, hc_bg)
+
+    return _CACHE[key]
@@ -40,7 +40,7 @@ __license__ = "MIT"
 import os
 import logging
 
-__all__ = ["log", "cosmo"]
+__all__ = ["log", "cosmo", "cosmo_interp"]
 
 # ---- Define Global Parameters
 
@@ -59,6 +59,11 @@ _PATH_ROOT = os.path.join(_PATH_PACKAGE, os.path.pardir)
 _PATH_NOTEBOOKS = os.path.join(_PATH_ROOT, "notebooks", "")
 _PATH_DATA = os.path.join(_PATH_PACKAGE, "data", "")
 _PATH_OUTPUT = os.path.join(_PATH_ROOT, "output", "")
+#: user cache directory for files generated at runtime (e.g. interpolation tables), outside of the package tree;
+#: set by the `HOLODECK_CACHE` environment variable, otherwise `$XDG_CACHE_HOME/holodeck` (or `~/.cache/holodeck`)
+_PATH_CACHE = os.environ.get("HOLODECK_CACHE", os.path.join(
+    os.environ.get("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache")), "holodeck", ""
+))
 
 # NOTE: can only search for paths within the package _*NOT the root directory*_
 _check_paths = [_PATH_PACKAGE, _PATH_ROOT, _PATH_DATA]
@@ -81,6 +86,9 @@ import cosmopy   # noqa
 cosmo = cosmopy.Cosmology(h=Parameters.HubbleParam, Om0=Parameters.Omega0, Ob0=Parameters.OmegaBaryon)
 del cosmopy
 
+from . import cosmology   # noqa
+cosmo_interp = cosmology.Interp_Cosmology(cosmo)    #: fast interpolated cosmology from `holodeck.cosmology`
+
 # ---- Import submodules
 
 from . import constants       # noqa
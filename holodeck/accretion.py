@@ -11,6 +11,42 @@ import os
 import numpy as np
 from scipy.interpolate import RectBivariateSpline
 from holodeck import _PATH_DATA
+from holodeck.constants import PC
+
+_SIWEK22_FNAME = 'preferential_accretion/siwek+22/lambda_e={:.2f}.txt'
+_SIWEK22_ECCENS = [0.0, 0.2, 0.4, 0.6, 0.8]
+
+_PREF_ACC_INTERPS = {}    #: interpolants of tabulated accretion models, built once per process
+
+
+def _siwek22_lambda_interp():
+    """ Interpolant of the Siwek+2022 accretion-rate ratio, lambda = mdot_2 / mdot_1, in (q, e).
+
+    Returns
+    -------
+    RectBivariateSpline
+        Bilinear interpolant of the tabulated lambda values.
+    """
+    all_lambdas = []
+    for e in _SIWEK22_ECCENS:
+        fname = os.path.join(_PATH_DATA, _SIWEK22_FNAME.format(e))
+        lambda_e = np.loadtxt(fname)
+        qs = lambda_e[:, 0]
+        all_lambdas.append(lambda_e[:, 1])
+
+    return RectBivariateSpline(np.array(qs), np.array(_SIWEK22_ECCENS),
+                               np.array(all_lambdas).T, kx=1, ky=1)
+
+
+_PREF_ACC_LOADERS = dict(Siwek22=_siwek22_lambda_interp)
+
+
+def _pref_acc_interp(accmod):
+    """ Interpolant of the tabulated data for the given accretion model, loaded on first use.
+    """
+    if accmod not in _PREF_ACC_INTERPS:
+        _PREF_ACC_INTERPS[accmod] = _PREF_ACC_LOADERS[accmod]()
+    return _PREF_ACC_INTERPS[accmod]
 
 
 class Accretion:
@@ -172,43 +208,21 @@ class Accretion:
                 e_b = evol.eccen[:, step-1]
             else:
                 e_b = self.eccen
-            """ Now interpolate to get lambda at [q,e] """
-            def lambda_qe_interp_2d(fp="data/preferential_accretion/siwek+22/", es=[0.0,0.2,0.4,0.6,0.8]):
-                all_lambdas = []
-                for e in es:
-                    fname = 'preferential_accretion/siwek+22/lambda_e=%.2f.txt' % e
-                    fname = os.path.join(_PATH_DATA, fname)
-                    lambda_e = np.loadtxt(fname)
-                    qs = lambda_e[:, 0]
-                    lambdas = lambda_e[:, 1]
-                    all_lambdas.append(lambdas)
-                # True values of q, e
-                x = qs
-                y = es
-                # Populate the true values of q, e in a meshgrid
-                X, Y = np.meshgrid(x, y)
-                Z = all_lambdas
-
-                return(RectBivariateSpline(np.array(x), np.array(y),
-                                           np.array(Z).T, kx=1, ky=1))
-
-            lamb_interp = lambda_qe_interp_2d()
+            """ Now interpolate to get lambda at [q,e]
+                the tabulated data is only loaded once, see `_pref_acc_interp` """
+            lamb_interp = _pref_acc_interp(self.accmod)
             # Need to use RectBivariateSpline.ev to evaluate the interpolation
             # at points, allowing q_b and e_b to be in non-ascending order
             lamb_qe = lamb_interp.ev(q_b, e_b)
-            mdot_1 = 1./(np.array(lamb_qe) + 1.) * mdot
-            mdot_2 = np.array(lamb_qe)/(np.array(lamb_qe) + 1.) * mdot
+            mdot_1 = 1./(lamb_qe + 1.) * mdot
+            mdot_2 = lamb_qe/(lamb_qe + 1.) * mdot
 
             # After calculating the primary and secondary accretion rates,
             # they need to be placed at the correct index into `mdot_arr`, to
             # account for primary/secondary being at 0-th OR 1-st index
             mdot_arr = np.zeros(np.shape(evol.mass[:, step-1, :]))
-            inds_m1_primary = m1 >= m2  # where first mass is actually primary
-            inds_m2_primary = m2 >= m1  # where second mass is actually primary
-            mdot_arr[:, 0][inds_m1_primary] = mdot_1[inds_m1_primary]
-            mdot_arr[:, 0][~inds_m1_primary] = mdot_2[~inds_m1_primary]
-            mdot_arr[:, 1][inds_m2_primary] = mdot_1[inds_m2_primary]
-            mdot_arr[:, 1][~inds_m2_primary] = mdot_2[~inds_m2_primary]
+            mdot_arr[:, 0] = np.where(m1 >= m2, mdot_1, mdot_2)   # where first mass is actually primary
+            mdot_arr[:, 1] = np.where(m2 >= m1, mdot_1, mdot_2)   # where second mass is actually primary
             # `mdot_arr` is then passed to `_take_next_step()` in evolution.py
             return(mdot_arr)
 
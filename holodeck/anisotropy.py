@@ -8,10 +8,9 @@ import matplotlib.cm as cm
 
 import kalepy as kale
 import healpy as hp
-import h5py
 
 import holodeck as holo
-from holodeck import utils, cosmo, log, detstats, plot
+from holodeck import utils, cosmo, log, detstats, plot, librarian
 from holodeck.constants import YR
 
 NSIDE = 32
@@ -274,12 +273,12 @@ def lib_anisotropy(lib_path, hc_ref_10yr=HC_REF15_10YR, nbest=100, nreals=50, lm
     hdf_name = lib_path+'/sam_lib.hdf5'
     print('Hdf file:', hdf_name)
 
-    ss_file = h5py.File(hdf_name, 'r')
-    print('Loaded file, with keys:', list(ss_file.keys()))
-    hc_ss = ss_file['hc_ss'][:,:,:nreals,:]
-    hc_bg = ss_file['hc_bg'][:,:,:nreals]
-    fobs = ss_file['fobs'][:]
-    ss_file.close()
+    # strains are read lazily: only the ranking frequency of every sample, and then the best samples
+    ss_file = librarian.Library_Reader(hdf_name)
+    print('Opened file, with keys:', list(ss_file.keys()))
+    hc_ss = ss_file['hc_ss'].select(reals=slice(None, nreals))
+    hc_bg = ss_file['hc_bg'].select(reals=slice(None, nreals))
+    fobs = ss_file.fobs
 
     shape = hc_ss.shape
     nsamps, nfreqs, nreals, nloudest = shape[0], shape[1], shape[2], shape[3]
@@ -301,7 +300,7 @@ def lib_anisotropy(lib_path, hc_ref_10yr=HC_REF15_10YR, nbest=100, nreals=50, lm
         print('on nn=%d out of nbest=%d' % (nn,nbest))
         moll_hc_best[nn,...], Cl_best[nn,...] = sph_harm_from_hc(
             hc_ss[nsort[nn]], hc_bg[nsort[nn]], nside=nside, lmax=lmax, )
-        
+    ss_file.close()
 
     # ---- save to npz file
 
@@ -335,12 +334,12 @@ def lib_anisotropy_split(lib_path, hc_ref_10yr=HC_REF15_10YR, nbest=100, nreals=
     hdf_name = lib_path+'/sam_lib.hdf5'
     print('Hdf file:', hdf_name)
 
-    ss_file = h5py.File(hdf_name, 'r')
-    print('Loaded file, with keys:', list(ss_file.keys()))
-    hc_ss = ss_file['hc_ss'][:,:,:nreals,:]
-    hc_bg = ss_file['hc_bg'][:,:,:nreals]
-    fobs = ss_file['fobs'][:]
-    ss_file.close()
+    # strains are read lazily: only the ranking frequency of every sample, and then the best samples
+    ss_file = librarian.Library_Reader(hdf_name)
+    print('Opened file, with keys:', list(ss_file.keys()))
+    hc_ss = ss_file['hc_ss'].select(reals=slice(None, nreals))
+    hc_bg = ss_file['hc_bg'].select(reals=slice(None, nreals))
+    fobs = ss_file.fobs
 
     shape = hc_ss.shape
     nsamps, nfreqs, nreals, nloudest = shape[0], shape[1], shape[2], shape[3]
@@ -395,6 +394,8 @@ def lib_anisotropy_split(lib_path, hc_ref_10yr=HC_REF15_10YR, nbest=100, nreals=
         #               % (lmax, nside, nreals, bestrange[0], bestrange[1]-1))
         # fig.savefig(fig_name, dpi=300)
 
+    ss_file.close()
+    return
 
 
 ######################################################################
@@ -443,10 +444,31 @@ def Cl_analytic_from_num(fobs_orb_edges, number, hs, realize = False, floor = Fa
     elif floor is True: # assumes realize is False
         number = np.floor(number)
 
+    numh2 = np.sum(number*hs**2, axis=(0,1,2))
+    numh4 = np.sum(number*hs**4, axis=(0,1,2))
+    return _Cl_from_sums(fc, df, numh2, numh4)
+
+
+def _Cl_from_sums(fc, df, numh2, numh4):
+    """ C_0 and C_l>0 from the sums of number * h_s^2 and number * h_s^4 over M,q,z bins.
+
+    Parameters
+    ----------
+    fc : (F,) or broadcastable NDarray
+        Observed orbital frequency bin centers.
+    df : (F,) or broadcastable NDarray
+        Observed orbital frequency bin widths.
+    numh2, numh4 : (...,F) or (...,F,R) NDarrays
+        Sums of number * h_s^2 and number * h_s^4.
 
-    delta_term = (fc/(4*np.pi*df) * np.sum(number*hs**2, axis=(0,1,2)))**2
+    Returns
+    -------
+    C0 : (...,F) or (...,F,R) NDarray
+    Cl : (...,F) or (...,F,R) NDarray
+    """
+    delta_term = (fc/(4*np.pi*df) * numh2)**2
 
-    Cl = (fc/(4*np.pi*df))**2 * np.sum(number*hs**4, axis=(0,1,2))
+    Cl = (fc/(4*np.pi*df))**2 * numh4
 
     C0 = Cl + delta_term
 
@@ -539,33 +561,13 @@ def Cl_analytic_from_dnum(edges, dnum, redz=None, realize=False):
     
     """
     fobs_orb_edges = edges[-1]
-    fobs_gw_edges = fobs_orb_edges * 2.0
 
     df = np.diff(fobs_orb_edges)                 #: frequency bin widths
     fc = kale.utils.midpoints(fobs_orb_edges)    #: use frequency-bin centers for strain (more accurate!)
 
 
     if realize is False:
-        hs_edges = strain_amp_at_bin_edges_redz(edges, redz)
-
-        # ---- integrate from differential-number to number per bin
-        # integrate over dlog10(M)
-        numh2 = utils.trapz(dnum*hs_edges**2, np.log10(edges[0]), axis=0)
-        # integrate over mass-ratio
-        numh2 = utils.trapz(numh2, edges[1], axis=1)
-        # integrate over redshift
-        numh2 = utils.trapz(numh2, edges[2], axis=2)
-        # times dln(f)
-        numh2 = numh2 * np.diff(np.log(fobs_gw_edges)) 
-
-        # integrate over dlog10(M)
-        numh4 = utils.trapz(dnum*hs_edges**4, np.log10(edges[0]), axis=0)
-        # integrate over mass-ratio
-        numh4 = utils.trapz(numh4, edges[1], axis=1)
-        # integrate over redshift
-        numh4 = utils.trapz(numh4, edges[2], axis=2)
-        # times dln(f)
-        numh4 = numh4 * np.diff(np.log(fobs_gw_edges))  # how is this not a shape issue??
+        return Analytic_Cl(edges, redz=redz, dnum=True)(dnum)
 
     elif utils.isinteger(realize):
         # add reals axis
@@ -586,14 +588,141 @@ def Cl_analytic_from_dnum(edges, dnum, redz=None, realize=False):
         err = "`realize` ({}) must be one of {{False, integer}}!".format(realize)
         raise ValueError(err)
 
+    return _Cl_from_sums(fc, df, np.sum(numh2, axis=(0,1,2)), np.sum(numh4, axis=(0,1,2)))
 
-    delta_term = (fc / (4*np.pi * df) * np.sum(numh2, axis=(0,1,2)))**2
 
-    Cl = ((fc / (4*np.pi*df))**2 * np.sum(numh4, axis=(0,1,2)))
+class Analytic_Cl:
+    """ Analytic C_0 and C_l>0 (Eq. 17 of Sato-Polito & Kamionkowski) for many grids at once.
 
-    C0 = Cl + delta_term
+    The strain amplitude of each bin depends only on the grid `edges` (and redshifts), so it is
+    calculated once, along with its integration weights, and then reused for every number (or
+    differential number) grid.  Each grid then only costs two weighted sums over its M,q,z bins.
 
-    return C0, Cl
+    Examples
+    --------
+    >>> engine = Analytic_Cl(edges)
+    >>> C0, Cl = engine(numbers)       # numbers : (N,M,Q,Z,F) ==> C0, Cl : (N,F)
+    >>> ratio = engine.ratio(numbers)  # Cl / C0
+
+    """
+
+    def __init__(self, edges, redz=None, dnum=False):
+        """ Precompute the weighted strain amplitudes of the grid.
+
+        Parameters
+        ----------
+        edges : (4,) list of 1Darrays
+            Total mass, mass ratio, redshift and observer-frame orbital frequency edges,
+            with lengths M, Q, Z, F+1.
+        redz : (M,Q,Z,F) NDarray or None
+            Redshift of each grid point (e.g. `redz_final`), otherwise the redshift edges are used.
+        dnum : Bool
+            Whether grids are differential numbers, dN / [dlog10M dq dz dlnf], at grid points with
+            shape (M,Q,Z,F).  Otherwise, grids are numbers of binaries in each bin, (M-1,Q-1,Z-1,F).
+        """
+        self.dnum = dnum
+        fobs_orb_edges = edges[-1]
+        self._df = np.diff(fobs_orb_edges)                 #: frequency bin widths
+        self._fc = kale.utils.midpoints(fobs_orb_edges)    #: frequency-bin centers
+
+        if dnum:
+            hs = strain_amp_at_bin_edges_redz(edges, redz)
+            # trapezoid rule over dlog10(M), dq and dz, as weights at each grid point, times dln(f)
+            weights = np.diff(np.log(fobs_orb_edges * 2.0))
+            for ax, xx in enumerate([np.log10(edges[0]), edges[1], edges[2]]):
+                ww = np.zeros(len(xx))
+                ww[:-1] += 0.5 * np.diff(xx)
+                ww[1:] += 0.5 * np.diff(xx)
+                shape = [1, 1, 1, 1]
+                shape[ax] = ww.size
+                weights = weights * ww.reshape(shape)
+        else:
+            hs = strain_amp_at_bin_centers_redz(edges, redz)
+            weights = 1.0
+
+        hs2 = hs**2
+        self.shape = np.broadcast_shapes(np.shape(hs), np.shape(weights))
+        self._wh2 = np.broadcast_to(weights * hs2, self.shape).reshape(-1, self.shape[-1]) # (M*Q*Z, F)
+        self._wh4 = np.broadcast_to(weights * hs2**2, self.shape).reshape(-1, self.shape[-1]) # (M*Q*Z, F)
+        return
+
+    def __call__(self, grids, realize=False):
+        """ C_0 and C_l>0 of each grid.
+
+        Parameters
+        ----------
+        grids : (...,M,Q,Z,F) NDarray, or iterable of (M,Q,Z,F) NDarrays
+            Number (or differential number) of binaries, with any leading dimensions.
+        realize : False or integer
+            Number of Poisson realizations of each (number) grid.
+
+        Returns
+        -------
+        C0 : (...,F) or (...,F,R) NDarray
+        Cl : (...,F) or (...,F,R) NDarray
+        """
+        if not isinstance(grids, np.ndarray):
+            vals = [self(grid, realize=realize) for grid in grids]
+            return np.array([vv[0] for vv in vals]), np.array([vv[1] for vv in vals])
+
+        if grids.shape[-4:] != self.shape:
+            err = f"Grids have shape {grids.shape[-4:]}, expected {self.shape}!"
+            log.exception(err)
+            raise ValueError(err)
+
+        lead = grids.shape[:-4]
+        grids = grids.reshape(lead + (-1, self.shape[-1]))
+        fc, df = self._fc, self._df
+        if realize is False:
+            numh2 = np.einsum('...kf,kf->...f', grids, self._wh2)
+            numh4 = np.einsum('...kf,kf->...f', grids, self._wh4)
+        elif utils.isinteger(realize) and not self.dnum:
+            number = np.random.poisson(grids[...,np.newaxis], size=grids.shape + (realize,))
+            numh2 = np.einsum('...kfr,kf->...fr', number, self._wh2)
+            numh4 = np.einsum('...kfr,kf->...fr', number, self._wh4)
+            fc, df = fc[:,np.newaxis], df[:,np.newaxis]
+        else:
+            err = f"`realize` ({realize}) must be False, or an integer for number grids!"
+            log.exception(err)
+            raise ValueError(err)
+
+        return _Cl_from_sums(fc, df, numh2, numh4)
+
+    def ratio(self, grids, realize=False):
+        """ C_l>0 / C_0 of each grid, see `__call__`.
+        """
+        C0, Cl = self(grids, realize=realize)
+        return Cl / C0
+
+
+def lib_Cl_analytic(lib_path):
+    """ Load the analytic C_0 and C_l>0 of every sample in a library.
+
+    These are stored by libraries generated with the `--anis` option (see `Analytic_Cl`).
+
+    Parameters
+    ----------
+    lib_path : str
+        Path to the library file, or the directory containing 'sam_lib.hdf5'.
+
+    Returns
+    -------
+    fobs : (F,) 1Darray
+        Observed GW frequency bin centers.
+    C0 : (N,F) NDarray
+    Cl : (N,F) NDarray
+    """
+    from pathlib import Path
+    lib_path = Path(lib_path)
+    if lib_path.is_dir():
+        lib_path = lib_path.joinpath('sam_lib.hdf5')
+
+    with librarian.Library_Reader(lib_path) as lib:
+        if 'Cl_analytic' not in lib:
+            err = f"Library {lib_path} does not contain analytic C_l, it must be generated with `--anis`!"
+            log.exception(err)
+            raise KeyError(err)
+        return lib.fobs, lib['C0_analytic'].read(), lib['Cl_analytic'].read()
 
 
 
@@ -0,0 +1,340 @@
+"""Fast, vectorized cosmological interpolation tables.
+
+The `cosmopy` based `holodeck.cosmo` instance constructs a new (PCHIP) interpolant on every call to
+its inverse-lookup methods (e.g. `tlbk_to_z`), and uses `astropy` for forward calculations (e.g.
+`comoving_distance`).  Both are relatively slow when called repeatedly on large arrays, for example
+once per integration step in `holodeck.evolution.Evolution`.
+
+The `Interp_Cosmology` class precomputes tables of cosmological distance and time measures on a
+fixed grid of redshifts, along with their exact (analytic) derivatives.  Lookups then use cubic
+Hermite interpolation, in both the forward (redshift to measure) and inverse (measure to redshift)
+directions.  Each measure is strictly monotonic in redshift, and the tables are dense enough that the
+interpolants are monotonic as well, so forward and inverse lookups are consistent.
+
+The same tables can be used from cython kernels without the GIL, using the `nogil` functions
+`holodeck.cyutils.hermite_interp` and `holodeck.cyutils.hermite_interp_at_index` (declared in
+`holodeck/cyutils.pxd`), along with the arrays returned by :meth:`Interp_Cosmology.table`.
+
+The package-wide instance is `holodeck.cosmo_interp`, constructed from `holodeck.cosmo`.
+
+"""
+
+import numpy as np
+
+from holodeck import log
+from holodeck.constants import SPLC
+
+_REDZ_MAX = 1.0e4       #: maximum redshift of interpolation tables (matches `cosmopy` grids)
+_NUM_NODES = 2048       #: number of redshift nodes in interpolation tables
+
+
+class Interp_Cosmology:
+    """Tabulated cosmological measures with cubic-Hermite interpolation in redshift.
+
+    Tables are constructed on a grid of redshifts uniformly spaced in ``log(1+z)``, from ``z=0`` up to
+    `_REDZ_MAX`.  For each measure `Y(z)`, both `Y` and `dY/dz` are stored, so that the interpolant is
+    exact at the nodes (in value and slope).  Inverse lookups use the same nodes, with slopes
+    ``dz/dY = 1 / (dY/dz)``.
+
+    Values outside of the tabulated range are returned as `np.nan`, matching the behavior of
+    `cosmopy.Cosmology`.
+
+    """
+
+    _MEASURES = ['dcom', 'tlbk', 'tage']
+
+    def __init__(self, cosmo, num=_NUM_NODES, redz_max=_REDZ_MAX):
+        """Construct interpolation tables from the given cosmology instance.
+
+        Parameters
+        ----------
+        cosmo : `cosmopy.Cosmology` (or `astropy.cosmology.FlatLambdaCDM`) instance
+            Cosmology used to calculate tabulated values.
+        num : int
+            Number of redshift nodes in the interpolation tables.
+        redz_max : float
+            Maximum redshift of the interpolation tables.
+
+        """
+        # Coefficients of the (squared) Hubble function E(z)^2, used for analytic derivatives
+        if cosmo.has_massive_nu:
+            err = "`Interp_Cosmology` does not support cosmologies with massive neutrinos!"
+            log.exception(err)
+            raise ValueError(err)
+
+        self._Om0 = cosmo.Om0
+        self._Ode0 = cosmo.Ode0
+        self._Or0 = cosmo.Ogamma0 + cosmo.Onu0
+        self._Ok0 = 1.0 - self._Om0 - self._Ode0 - self._Or0
+        self._time_hubble = cosmo.hubble_time.to('s').value        # [sec]
+        self._dist_hubble = SPLC * self._time_hubble                # [cm]
+        self._age_universe = cosmo.age(0.0).to('s').value           # [sec]
+
+        redz = np.expm1(np.linspace(0.0, np.log1p(redz_max), num))
+        redz[0] = 0.0
+        efunc = self.efunc(redz)
+        if not np.allclose(efunc, cosmo.efunc(redz), rtol=1e-10):
+            err = "`Interp_Cosmology.efunc` does not match cosmology instance!  Unsupported cosmology?"
+            log.exception(err)
+            raise ValueError(err)
+
+        if np.fabs(self._Ok0) > 1.0e-10:
+            err = "`Interp_Cosmology` only supports flat cosmologies!"
+            log.exception(err)
+            raise ValueError(err)
+
+        dtdz = self._time_hubble / (1.0 + redz) / efunc
+        self._redz = redz
+        self._vals = dict(
+            dcom=cosmo.comoving_distance(redz).cgs.value,       # [cm]
+            tlbk=cosmo.lookback_time(redz).cgs.value,           # [sec]
+            tage=cosmo.age(redz).cgs.value,                     # [sec]
+        )
+        self._derivs = dict(
+            dcom=self._dist_hubble / efunc,                     # [cm]
+            tlbk=dtdz,                                          # [sec]
+            tage=-dtdz,                                         # [sec]
+        )
+        # Make sure tables are strictly monotonic, required for inverse lookups
+        for key, vals in self._vals.items():
+            diff = np.diff(vals)
+            if not (np.all(diff > 0.0) or np.all(diff < 0.0)):
+                err = f"Table for '{key}' is not strictly monotonic!"
+                log.exception(err)
+                raise ValueError(err)
+
+        self._dlog1pz_inv = (num - 1) / np.log1p(redz_max)
+        self._tables = {}
+        self._coeffs = {}
+        return
+
+    def table(self, xkey, ykey):
+        """Return the arrays describing the interpolant from `xkey` to `ykey`.
+
+        The returned arrays are contiguous, float64 arrays, with `xx` strictly increasing, suitable to
+        pass to `holodeck.cyutils.hermite_interp`.
+
+        Parameters
+        ----------
+        xkey : str
+            Name of the independent variable, one of 'redz' or the names in `_MEASURES`.
+        ykey : str
+            Name of the dependent variable, one of 'redz' or the names in `_MEASURES`.
+
+        Returns
+        -------
+        xx : (N,) ndarray
+            Node values of the independent variable (increasing).
+        yy : (N,) ndarray
+            Node values of the dependent variable.
+        dydx : (N,) ndarray
+            Derivatives of the dependent variable with respect to the independent variable at nodes.
+
+        """
+        key = (xkey, ykey)
+        if key in self._tables:
+            return self._tables[key]
+
+        _allowed = ['redz'] + self._MEASURES
+        if (xkey not in _allowed) or (ykey not in _allowed) or (xkey == ykey) or ('redz' not in key):
+            err = f"Unsupported table ({xkey}, {ykey})!  One of them must be 'redz', the other in {self._MEASURES}."
+            log.exception(err)
+            raise ValueError(err)
+
+        if xkey == 'redz':
+            xx = self._redz
+            yy = self._vals[ykey]
+            dydx = self._derivs[ykey]
+        else:
+            xx = self._vals[xkey]
+            yy = self._redz
+            dydx = 1.0 / self._derivs[xkey]
+
+        # make sure `xx` is increasing
+        if xx[-1] < xx[0]:
+            xx, yy, dydx = [vv[::-1] for vv in [xx, yy, dydx]]
+
+        table = tuple(np.ascontiguousarray(vv, dtype=np.float64) for vv in [xx, yy, dydx])
+        self._tables[key] = table
+        self._coeffs[key] = _hermite_coeffs(*table)
+        return table
+
+    def _interp(self, xnew, xkey, ykey):
+        """Interpolate to the target locations using the given table (see :meth:`Interp_Cosmology.table`).
+        """
+        xx, yy, dydx = self.table(xkey, ykey)
+        idx = None
+        # redshift nodes are uniformly spaced in log(1+z), so indices can be calculated directly
+        if xkey == 'redz':
+            # NOTE: `fmax` and `fmin` replace nan values, these are handled as out-of-bounds later
+            idx = np.log1p(np.fmax(xnew, 0.0)) * self._dlog1pz_inv
+            idx = np.fmin(idx, xx.size).astype(int)
+        return _eval_hermite(xnew, xx, self._coeffs[(xkey, ykey)], idx=idx)
+
+    # ==== Hubble function and differential measures
+
+    def efunc(self, redz):
+        """Dimensionless Hubble function :math:`E(z) = H(z) / H_0`.
+
+        Parameters
+        ----------
+        redz : array_like
+            Redshifts.
+
+        Returns
+        -------
+        efunc : array_like
+            Hubble function.  []
+
+        """
+        zp1 = 1.0 + np.asarray(redz)
+        efunc = self._Om0 * zp1**3 + self._Ode0 + self._Or0 * zp1**4 + self._Ok0 * zp1**2
+        return np.sqrt(efunc)
+
+    def dtdz(self, redz):
+        """Differential lookback time, :math:`dt/dz` in [sec], see [Hogg1999]_ Eq. 30.
+        """
+        redz = np.asarray(redz)
+        return self._time_hubble / (1.0 + redz) / self.efunc(redz)
+
+    def dVcdz(self, redz):
+        """Differential comoving volume of the universe, :math:`dV_c/dz` in [cm^3], see [Hogg1999]_ Eq. 28.
+        """
+        redz = np.asarray(redz)
+        dcom = self.z_to_dcom(redz)
+        return 4.0 * np.pi * self._dist_hubble * np.square(dcom) / self.efunc(redz)
+
+    # ==== Forward lookups
+
+    def z_to_dcom(self, redz):
+        """Comoving distance [cm] at the given redshifts.
+        """
+        return self._interp(redz, 'redz', 'dcom')
+
+    def z_to_dlum(self, redz):
+        """Luminosity distance [cm] at the given redshifts.
+        """
+        return (1.0 + np.asarray(redz)) * self.z_to_dcom(redz)
+
+    def z_to_tlbk(self, redz):
+        """Lookback time [sec] at the given redshifts.
+        """
+        return self._interp(redz, 'redz', 'tlbk')
+
+    def z_to_tage(self, redz):
+        """Age of the universe [sec] at the given redshifts.
+        """
+        return self._interp(redz, 'redz', 'tage')
+
+    # ==== Inverse lookups
+
+    def dcom_to_z(self, dcom):
+        """Redshift at the given comoving distances [cm].
+        """
+        return self._interp(dcom, 'dcom', 'redz')
+
+    def tlbk_to_z(self, tlbk):
+        """Redshift at the given lookback times [sec].
+        """
+        return self._interp(tlbk, 'tlbk', 'redz')
+
+    def tage_to_z(self, tage):
+        """Redshift at the given ages of the universe [sec].
+        """
+        return self._interp(tage, 'tage', 'redz')
+
+
+def interp_hermite(xnew, xold, yold, dydx):
+    """Cubic Hermite interpolation given function values and derivatives at (increasing) nodes.
+
+    This is the vectorized numpy equivalent of `holodeck.cyutils.hermite_interp`.
+
+    Parameters
+    ----------
+    xnew : array_like
+        Locations to interpolate to.
+    xold : (N,) ndarray
+        Node locations, strictly increasing.
+    yold : (N,) ndarray
+        Function values at nodes.
+    dydx : (N,) ndarray
+        Function derivatives at nodes.
+
+    Returns
+    -------
+    ynew : array_like
+        Interpolated values, with the same shape as `xnew`.  Values outside of the range of `xold` are
+        set to `np.nan`.
+
+    """
+    coeffs = _hermite_coeffs(xold, yold, dydx)
+    return _eval_hermite(xnew, xold, coeffs)
+
+
+def _hermite_coeffs(xold, yold, dydx):
+    """Polynomial coefficients of the cubic Hermite interpolant in each interval between nodes.
+
+    Returns
+    -------
+    coeffs : (4, N-1) ndarray
+        Coefficients `c` such that ``y = c[0] + c[1]*dx + c[2]*dx^2 + c[3]*dx^3`` where `dx` is the
+        distance from the left node of each interval.
+
+    """
+    hh = np.diff(xold)
+    m0 = dydx[:-1]
+    m1 = dydx[1:]
+    slope = np.diff(yold) / hh
+    coeffs = np.array([
+        yold[:-1],
+        m0,
+        (3.0*slope - 2.0*m0 - m1) / hh,
+        (m0 + m1 - 2.0*slope) / hh**2,
+    ])
+    return coeffs
+
+
+def _eval_hermite(xnew, xold, coeffs, idx=None):
+    """Evaluate piecewise cubic polynomials (from `_hermite_coeffs`) at the target locations.
+
+    Parameters
+    ----------
+    xnew : array_like
+        Locations to interpolate to.
+    xold : (N,) ndarray
+        Node locations, strictly increasing.
+    coeffs : (4, N-1) ndarray
+        Polynomial coefficients in each interval.
+    idx : array_like of int or None
+        Index of the interval containing each `xnew` value, with the same shape as `xnew`.  If `None`,
+        the indices are found by bisection.  Values need only be approximately correct, i.e. within one
+        interval, and are clipped to the valid range.
+
+    Returns
+    -------
+    ynew : array_like
+        Interpolated values, with the same shape as `xnew`.  Out of bounds values are `np.nan`.
+
+    """
+    xnew = np.asarray(xnew, dtype=float)
+    scalar = (xnew.ndim == 0)
+    xnew = np.atleast_1d(xnew)
+    num = xold.size
+    if idx is None:
+        idx = np.searchsorted(xold, xnew, side='right') - 1
+    idx = np.clip(idx, 0, num - 2)
+
+    dx = xnew - xold[idx]
+    ynew = coeffs[3][idx]
+    for cc in coeffs[2::-1]:
+        ynew *= dx
+        ynew += cc[idx]
+
+    bads = ~((xold[0] <= xnew) & (xnew <= xold[-1]))
+    if np.any(bads):
+        ynew[bads] = np.nan
+
+    if scalar:
+        return ynew[0]
+
+    return ynew
@@ -2,4 +2,7 @@
 """
 
 cdef double _interp_between_vals(double xnew, double xl, double xr, double yl, double yr)
-cdef double interp_at_index(int idx, double xnew, double[:] xold, double[:] yold)
\ No newline at end of file
+cdef double interp_at_index(int idx, double xnew, double[:] xold, double[:] yold)
+cdef int bisect_index(double xnew, double[:] xold, int size) nogil
+cdef double hermite_interp_at_index(int idx, double xnew, double[:] xold, double[:] yold, double[:] dydx) nogil
+cdef double hermite_interp(double xnew, double[:] xold, double[:] yold, double[:] dydx) nogil
@@ -358,6 +358,141 @@ cdef double interp_at_index(int idx, double xnew, double[:] xold, double[:] yold
     return _interp_between_vals(xnew, xold[idx], xold[idx+1], yold[idx], yold[idx+1])
 
 
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.nonecheck(False)
+@cython.cdivision(True)
+cdef int bisect_index(double xnew, double[:] xold, int size) nogil:
+    """Find the index of the interval in an increasing array containing the given value.
+
+    Parameters
+    ----------
+    xnew : double
+        Target value.
+    xold : double *
+        Strictly increasing array of values.
+    size : int
+        Size of the `xold` array.
+
+    Returns
+    -------
+    idx : int
+        Index such that ``xold[idx] <= xnew <= xold[idx+1]``, or `-1` if `xnew` is out of bounds
+        (or not finite).
+
+    """
+    cdef int lo = 0
+    cdef int hi = size - 1
+    cdef int mid
+    if not ((xold[lo] <= xnew) and (xnew <= xold[hi])):
+        return -1
+
+    while hi - lo > 1:
+        mid = (lo + hi) // 2
+        if xold[mid] <= xnew:
+            lo = mid
+        else:
+            hi = mid
+
+    return lo
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.nonecheck(False)
+@cython.cdivision(True)
+cdef double hermite_interp_at_index(int idx, double xnew, double[:] xold, double[:] yold, double[:] dydx) nogil:
+    """Perform cubic Hermite interpolation at the given index, given function values and derivatives.
+
+    Parameters
+    ----------
+    idx : int
+        Index in the arrays specifying the left reference value to interpolate between, with `idx+1`
+        giving the right value.
+    xnew : double
+        The independent (x) value to interpolate to.
+    xold : double *
+        Array of x-values giving the independent variables where the functions are evaluated.
+    yold : double *
+        Array of y-values giving the dependent variable (function values) of array.
+    dydx : double *
+        Array of derivatives of the dependent variable, at each `xold` value.
+
+    Returns
+    -------
+    ynew : double
+        Interpolated function value.
+
+    """
+    cdef double hh = xold[idx+1] - xold[idx]
+    cdef double tt = (xnew - xold[idx]) / hh
+    cdef double t1 = 1.0 - tt
+    cdef double ynew = (
+        (1.0 + 2.0*tt) * t1 * t1 * yold[idx] + tt * t1 * t1 * hh * dydx[idx]
+        + tt * tt * (3.0 - 2.0*tt) * yold[idx+1] - tt * tt * t1 * hh * dydx[idx+1]
+    )
+    return ynew
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.nonecheck(False)
+@cython.cdivision(True)
+cdef double hermite_interp(double xnew, double[:] xold, double[:] yold, double[:] dydx) nogil:
+    """Perform cubic Hermite interpolation to the given location, returning NAN if out of bounds.
+
+    Used with `holodeck.cosmology.Interp_Cosmology.table` arrays for cosmological conversions.
+
+    """
+    cdef int size = xold.shape[0]
+    cdef int idx = bisect_index(xnew, xold, size)
+    if idx < 0:
+        return NAN
+
+    return hermite_interp_at_index(idx, xnew, xold, yold, dydx)
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def interp_hermite(xnew, xold, yold, dydx):
+    """Cubic Hermite interpolation given function values and derivatives at (increasing) nodes.
+
+    This is a python wrapper around the `nogil` cython function `hermite_interp`, see also the numpy
+    implementation `holodeck.cosmology.interp_hermite`.
+
+    Parameters
+    ----------
+    xnew : array_like
+        Locations to interpolate to.
+    xold : (N,) ndarray
+        Node locations, strictly increasing.
+    yold : (N,) ndarray
+        Function values at nodes.
+    dydx : (N,) ndarray
+        Function derivatives at nodes.
+
+    Returns
+    -------
+    ynew : ndarray
+        Interpolated values, with the same shape as `xnew`.  Out of bounds values are `np.nan`.
+
+    """
+    xnew = np.asarray(xnew, dtype=np.float64)
+    shape = xnew.shape
+    cdef double[:] xx = np.ascontiguousarray(xnew.ravel())
+    cdef double[:] xo = np.ascontiguousarray(xold, dtype=np.float64)
+    cdef double[:] yo = np.ascontiguousarray(yold, dtype=np.float64)
+    cdef double[:] dy = np.ascontiguousarray(dydx, dtype=np.float64)
+    ynew = np.zeros(xx.shape[0])
+    cdef double[:] yy = ynew
+    cdef int ii
+    with nogil:
+        for ii in range(xx.shape[0]):
+            yy[ii] = hermite_interp(xx[ii], xo, yo, dy)
+
+    return ynew.reshape(shape)
+
+
 def sam_calc_gwb_single_eccen(ndens, mtot_log10, mrat, redz, dcom, gwfobs, sepa_evo, eccen_evo, nharms=100):
     """Pure-python wrapper for the SAM eccentric GWB calculation method.  See: `_sam_calc_gwb_single_eccen()`.
     """
@@ -1217,7 +1352,8 @@ cdef (int *) _sort_h2fdf(double[:] flat_h2fdf, long size):
     return indices
 
 
-def loudest_hc_from_sorted(number, h2fdf, nreals, nloudest, msort, qsort, zsort, normal_threshold=1e10):
+def loudest_hc_from_sorted(number, h2fdf, nreals, nloudest, msort, qsort, zsort, normal_threshold=1e10,
+                           bitgen=None):
     """
     Calculates the characteristic strain from loud single sources and a background of all other sources.
 
@@ -1239,6 +1375,9 @@ def loudest_hc_from_sorted(number, h2fdf, nreals, nloudest, msort, qsort, zsort,
         z indices of each bin, sorted from largest to smallest h2fdf.
     normal_threshold : float
         Threshold for approximating poisson sampling as normal.
+    bitgen : `numpy.random.BitGenerator` or None
+        Bit generator for the random draws, realizations are drawn one after the other.  Calls that share
+        a bit generator continue the same random stream.  If `None`, a new (unseeded) `PCG64` is used.
 
     Returns
     --------------------------
@@ -1254,9 +1393,11 @@ def loudest_hc_from_sorted(number, h2fdf, nreals, nloudest, msort, qsort, zsort,
     L = nloudest
     cdef np.ndarray[np.double_t, ndim=3] hc2ss = np.zeros((F,R,L))
     cdef np.ndarray[np.double_t, ndim=2] hc2bg = np.zeros((F,R))
+    if bitgen is None:
+        bitgen = PCG64()
     _loudest_hc_from_sorted(shape, h2fdf, number, nreals, nloudest, normal_threshold,
                             msort, qsort, zsort,
-                            hc2ss, hc2bg)
+                            hc2ss, hc2bg, bitgen)
     return hc2ss, hc2bg
 
 @cython.boundscheck(True)
@@ -1266,7 +1407,7 @@ def loudest_hc_from_sorted(number, h2fdf, nreals, nloudest, msort, qsort, zsort,
 cdef void _loudest_hc_from_sorted(long[:] shape, double[:,:,:,:] h2fdf, double[:,:,:,:] number,
             long nreals, long nloudest, long thresh,
             long[:] msort, long[:] qsort, long[:] zsort,
-            double[:,:,:] hc2ss, double[:,:] hc2bg):
+            double[:,:,:] hc2ss, double[:,:] hc2bg, object bitgen):
     """
     Calculates the characteristic strain from loud single sources and a background of all other sources.
 
@@ -1312,7 +1453,7 @@ cdef void _loudest_hc_from_sorted(long[:] shape, double[:,:,:,:] h2fdf, double[:
     # Setup random number generator from numpy library
     cdef bitgen_t *rng
     cdef const char *capsule_name = "BitGenerator"
-    capsule = PCG64().capsule
+    capsule = bitgen.capsule
     # Cast the pointer
     rng = <bitgen_t *> PyCapsule_GetPointer(capsule, capsule_name)
     for rr in range(R):
@@ -1541,7 +1682,7 @@ cdef void _loudest_hc_and_par_from_sorted(long[:] shape, double[:,:,:,:] h2fdf,
 def loudest_hc_and_par_from_sorted_redz(
     number, h2fdf, nreals, nloudest,
     mt, mr, rz, redz_final, dcom_final, sepa, angs,
-    msort, qsort, zsort, normal_threshold=1e10):
+    msort, qsort, zsort, normal_threshold=1e10, bitgen=None):
     """
     Calculates the characteristic strain and binary parameters from loud single sources and a
     background of all other sources.
@@ -1578,6 +1719,8 @@ def loudest_hc_and_par_from_sorted_redz(
         z indices of each bin, sorted from largest to smallest h2fdf.
     normal_threshold : float
         Threshold for approximating poisson sampling as normal.
+    bitgen : `numpy.random.BitGenerator` or None
+        Bit generator for the random draws, see `loudest_hc_from_sorted`.
 
     Returns
     --------------------------
@@ -1601,10 +1744,12 @@ def loudest_hc_and_par_from_sorted_redz(
     cdef np.ndarray[np.double_t, ndim=2] hc2bg = np.zeros((F,R))
     cdef np.ndarray[np.double_t, ndim=4] sspar = np.zeros((4,F,R,L))
     cdef np.ndarray[np.double_t, ndim=3] bgpar = np.zeros((7,F,R))
+    if bitgen is None:
+        bitgen = PCG64()
     _loudest_hc_and_par_from_sorted_redz(shape, h2fdf, number, nreals, nloudest, normal_threshold,
                             mt, mr, rz, redz_final, dcom_final, sepa, angs,
                             msort, qsort, zsort,
-                            hc2ss, hc2bg, sspar, bgpar)
+                            hc2ss, hc2bg, sspar, bgpar, bitgen)
     return hc2ss, hc2bg, sspar, bgpar
 
 
@@ -1617,7 +1762,7 @@ cdef void _loudest_hc_and_par_from_sorted_redz(long[:] shape, double[:,:,:,:] h2
             double[:] mt, double[:] mr, double[:] rz,
             double[:,:,:,:] redz_final, double[:,:,:,:] dcom_final, double[:,:,:,:] sepa, double[:,:,:,:] angs,
             long[:] msort, long[:] qsort, long[:] zsort,
-            double[:,:,:] hc2ss, double[:,:] hc2bg, double[:,:,:,:] sspar, double[:,:,:] bgpar):
+            double[:,:,:] hc2ss, double[:,:] hc2bg, double[:,:,:,:] sspar, double[:,:,:] bgpar, object bitgen):
     """
     Calculates the characteristic strain from loud single sources and a background of all other sources.
 
@@ -1695,7 +1840,7 @@ cdef void _loudest_hc_and_par_from_sorted_redz(long[:] shape, double[:,:,:,:] h2
     # Setup random number generator from numpy library
     cdef bitgen_t *rng
     cdef const char *capsule_name = "BitGenerator"
-    capsule = PCG64().capsule
+    capsule = bitgen.capsule
     # Cast the pointer
     rng = <bitgen_t *> PyCapsule_GetPointer(capsule, capsule_name)
     for rr in range(R):
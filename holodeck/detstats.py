@@ -6,9 +6,8 @@ for Hasasia PTA's.
 """
 
 import numpy as np
-from scipy import special, integrate
+from scipy import special, integrate, optimize
 from sympy import nsolve, Symbol
-import h5py
 import matplotlib.pyplot as plt
 import os
 from datetime import datetime
@@ -16,7 +15,7 @@ import warnings
 
 
 import holodeck as holo
-from holodeck import utils, cosmo, log, plot, anisotropy
+from holodeck import utils, cosmo, log, plot, anisotropy, librarian
 from holodeck.constants import MPC, YR
 from holodeck import cyutils 
 
@@ -138,13 +137,36 @@ def _orf_pta(pulsars):
 
     """
 
-    Gamma = np.zeros((len(pulsars), len(pulsars)))
-    for ii in range(len(pulsars)):
-        for jj in range(len(pulsars)):
+    thetas = [psr.theta for psr in pulsars]
+    phis = [psr.phi for psr in pulsars]
+    return _orf_positions(thetas, phis)
+
+
+def _orf_positions(thetas, phis):
+    """ Calculate the overlap reduction function matrix Gamma for pulsars at the given positions.
+
+    Parameters
+    ----------
+    thetas : (P,) 1Darray
+        Polar angle of each pulsar.
+    phis : (P,) 1Darray
+        Azimuthal angle of each pulsar.
+
+    Returns
+    -------
+    Gamma : (P,P) NDarray
+        Overlap reduction function matrix for all pulsars i,j with j>i
+        Only for j>1, 0 for j<=i
+
+    """
+
+    Gamma = np.zeros((len(thetas), len(thetas)))
+    for ii in range(len(thetas)):
+        for jj in range(len(thetas)):
             if (jj>ii): # 0 otherwise, allows sum over all
                 # calculate angle between two vectors.
-                theta_ij =  _relative_angle(pulsars[ii].theta, pulsars[ii].phi,
-                                           pulsars[jj].theta, pulsars[jj].phi)
+                theta_ij =  _relative_angle(thetas[ii], phis[ii],
+                                           thetas[jj], phis[jj])
                 # find ORF
                 Gamma[ii,jj] = _orf_ij(ii, jj, theta_ij)
 
@@ -1365,6 +1387,30 @@ def _build_gamma_interp_grid(Num, grid_name):
 
     np.savez(grid_name, rho_interp_grid=rho_interp, gamma_interp_grid=gamma_interp, Fe_bar=Fe_bar, Num=Num)
 
+def _load_gamma_interp_grid(Num, grid_path):
+    """ Load the rho to gamma interpolation grid for the given Num, building it if needed.
+
+    Returns
+    -------
+    rho_interp_grid : (G,) 1Darray
+    gamma_interp_grid : (G,) 1Darray
+    """
+    grid_name = grid_path+'/rho_gamma_interp_grid_Num%d.npz' % (Num)
+
+    # check if interpolation grid already exists, if not, build it
+    if os.path.exists(grid_name) is False:
+        # check if grid_path already exists, if not, makedir
+        if (os.path.exists(grid_path) is False):
+            os.makedirs(grid_path)
+        _build_gamma_interp_grid(Num, grid_name)
+
+    # read in data from saved grid
+    grid_file = np.load(grid_name)
+    rho_interp_grid = grid_file['rho_interp_grid']
+    gamma_interp_grid = grid_file['gamma_interp_grid']
+    grid_file.close()
+    return rho_interp_grid, gamma_interp_grid
+
 def _gamma_ssi_cython(rho, grid_path):
     """ Calculate the detection probability for each single source in each realization.
 
@@ -1384,21 +1430,7 @@ def _gamma_ssi_cython(rho, grid_path):
     """
 
     Num = np.size(rho[:,0,0,:])
-
-    grid_name = grid_path+'/rho_gamma_interp_grid_Num%d.npz' % (Num)
-
-    # check if interpolation grid already exists, if not, build it
-    if os.path.exists(grid_name) is False:
-        # check if grid_path already exists, if not, makedir
-        if (os.path.exists(grid_path) is False):
-            os.makedirs(grid_path)
-        _build_gamma_interp_grid(Num, grid_name)
-
-    # read in data from saved grid
-    grid_file = np.load(grid_name)
-    rho_interp_grid = grid_file['rho_interp_grid']
-    gamma_interp_grid = grid_file['gamma_interp_grid']
-    grid_file.close()
+    rho_interp_grid, gamma_interp_grid = _load_gamma_interp_grid(Num, grid_path)
 
     gamma_ssi = np.zeros_like(rho)
     # for ff in range(len(rho)):
@@ -1437,7 +1469,7 @@ def _ss_detection_probability(gamma_ss_i):
         Detection probability of any single source, for each R and S realization.
     """
 
-    gamma_ss = 1 - np.product(1-gamma_ss_i, axis=(0,3))
+    gamma_ss = 1 - np.prod(1-gamma_ss_i, axis=(0,3))
     return gamma_ss
 
 
@@ -1550,10 +1582,15 @@ def detect_ss_pta(pulsars, fobs, hc_ss, hc_bg,
                 custom_noise=None, nexcl_noise=0,
               theta_ss=None, phi_ss=None, Phi0_ss=None, iota_ss=None, psi_ss=None, nskies=25, 
               Fe_bar = None, red_amp=None, red_gamma=None, alpha_0=0.001, Fe_bar_guess=15,
-              ret_snr=False, print_nans=False, snr_cython=True, gamma_cython=True, grid_path=GAMMA_RHO_GRID_PATH):
+              ret_snr=False, print_nans=False, snr_cython=True, gamma_cython=True, grid_path=GAMMA_RHO_GRID_PATH,
+              mem_budget=None, dtype=np.float64):
     """ Calculate the single source detection probability, and all intermediary steps for
     R strain realizations and S sky realizations.
 
+    Strain realizations are processed in chunks that fit within `mem_budget` (see
+    `holodeck.utils.mem_chunks`).  Realizations are independent, so results do not depend on the
+    chunk size.
+
     Parameters
     ----------
     pulsars : (P,) list of hasasia.Pulsar objects
@@ -1596,6 +1633,10 @@ def detect_ss_pta(pulsars, fobs, hc_ss, hc_bg,
         False alarm probability
     ret_snr : Bool
         Whether or not to also return snr_ss.
+    mem_budget : float or None
+        [bytes] Memory budget, see `holodeck.utils.mem_budget`.
+    dtype : numpy dtype
+        Type of the returned arrays.  With `np.float32`, the (F,R,S,L) outputs use half the memory.
 
     Returns
     -------
@@ -1653,28 +1694,52 @@ def detect_ss_pta(pulsars, fobs, hc_ss, hc_bg,
         if custom_noise.shape != (len(pulsars), nfreqs, nreals, nloudest):
             err = f"{custom_noise.shape=}, must be shape (P,F,R,L)=({len(pulsars)}, {nfreqs}, {nreals}, {nloudest})"
             raise ValueError(err)
-        S_i = custom_noise
-    else:
-        S_i = _total_noise(cad, sigmas, hc_ss, hc_bg, fobs, red_amp, red_gamma, nexcl=nexcl_noise)
 
-    # amplitudw
-    amp = _amplitude(hc_ss, fobs, dfobs) # (F,R,L)
+    if (not gamma_cython) and (Fe_bar is None):
+        Num = hc_ss[:,0,:].size # number of single sources in a single strain realization (F*L)
+        Fe_bar = _Fe_thresh(Num, alpha_0=alpha_0, guess=Fe_bar_guess) # scalar
 
-    # SNR (includes a_pol, b_pol, and Phi_T calculations internally)
-    if snr_cython:
-        snr_ss = _snr_ss(amp, F_iplus, F_icross, iota_ss, dur, Phi0_ss, S_i, fobs) # (F,R,S,L)
-    else:
-        snr_ss = _snr_ss_5dim(amp, F_iplus, F_icross, iota_ss, dur, Phi0_ss, S_i, fobs) # (F,R,S,L)
+    # ---- split strain realizations into chunks that fit in memory
 
-    if gamma_cython:
-        gamma_ssi = _gamma_ssi_cython(snr_ss, grid_path=grid_path) # (F,R,S,L)
-    else:
-        if (Fe_bar is None):
-            Num = hc_ss[:,0,:].size # number of single sources in a single strain realization (F*L)
-            Fe_bar = _Fe_thresh(Num, alpha_0=alpha_0, guess=Fe_bar_guess) # scalar
+    npsrs = len(pulsars)
+    nskies = theta_ss.shape[1]
+    # per realization: noise (P,F,L), amplitude (F,L), and SNR, DP and temporaries (F,S,L)
+    # without cython, the SNR calculation also has several (P,F,S,L) temporaries
+    item_bytes = 8 * nfreqs * nloudest * (npsrs + 1 + 4 * nskies + (not snr_cython) * 6 * npsrs * nskies)
+    # antenna patterns (P,F,S,L), sky parameters and unit-vectors (F,S,L), and SNR and DP outputs (F,R,S,L)
+    fixed_bytes = nfreqs * nloudest * nskies * (8 * (2 * npsrs + 14) + 2 * ret_snr * nreals * np.dtype(dtype).itemsize)
+    chunks = utils.mem_chunks(nreals, item_bytes, fixed_bytes=fixed_bytes, budget=mem_budget, name='detect_ss_pta')
 
-        gamma_ssi = _gamma_ssi(Fe_bar, rho=snr_ss, print_nans=print_nans) # (F,R,S,L)
-    gamma_ss = _ss_detection_probability(gamma_ssi) # (R,S)
+    gamma_ss = np.zeros((nreals, nskies), dtype=dtype)
+    if ret_snr:
+        snr_ss = np.zeros((nfreqs, nreals, nskies, nloudest), dtype=dtype)
+        gamma_ssi = np.zeros_like(snr_ss)
+
+    for sl in chunks:
+        if custom_noise is not None:
+            S_i = custom_noise[:, :, sl]
+        else:
+            S_i = _total_noise(cad, sigmas, hc_ss[:, sl], hc_bg[:, sl], fobs, red_amp, red_gamma,
+                               nexcl=nexcl_noise) # (P,F,R,L)
+
+        # amplitudw
+        amp = _amplitude(hc_ss[:, sl], fobs, dfobs) # (F,R,L)
+
+        # SNR (includes a_pol, b_pol, and Phi_T calculations internally)
+        if snr_cython:
+            snr = _snr_ss(amp, F_iplus, F_icross, iota_ss, dur, Phi0_ss, S_i, fobs) # (F,R,S,L)
+        else:
+            snr = _snr_ss_5dim(amp, F_iplus, F_icross, iota_ss, dur, Phi0_ss, S_i, fobs) # (F,R,S,L)
+
+        if gamma_cython:
+            gamma = _gamma_ssi_cython(snr, grid_path=grid_path) # (F,R,S,L)
+        else:
+            gamma = _gamma_ssi(Fe_bar, rho=snr, print_nans=print_nans) # (F,R,S,L)
+
+        gamma_ss[sl] = _ss_detection_probability(gamma) # (R,S)
+        if ret_snr:
+            snr_ss[:, sl] = snr
+            gamma_ssi[:, sl] = gamma
 
     if ret_snr:
         return gamma_ss, snr_ss, gamma_ssi
@@ -1684,13 +1749,322 @@ def detect_ss_pta(pulsars, fobs, hc_ss, hc_bg,
 
 
 
+########################################################################
+########################## Batched Detection ###########################
+########################################################################
+
+class Batched_Detector:
+    """ Detection statistics for blocks of library samples, with a fixed PTA and sky realizations.
+
+    Everything that does not depend on the strains is calculated once, on construction: pulsar noise,
+    the overlap reduction function of each pulsar pair, and the antenna patterns and phase terms of
+    each single source sky realization.  The single source SNR of each pulsar factors into a sky term
+    G_p(F,S,L) and a strain term amp^2/S_i(F,R,L), where pulsars only differ in S_i by their white
+    noise, P_i.  The sum over pulsars is then done once, for each of the U unique white-noise levels:
+
+        snr^2 = amp^2 / (8 pi^3 f^3) * sum_u [ sum_{i in u} G_i ] / (P_u + S_h,rest)
+
+    which, for PTAs with a single white-noise level (e.g. those of `detect_lib`), removes the pulsar
+    dimension entirely.  Detection statistics are calculated for blocks of samples at once (see
+    `blocks`), and match those of `detect_bg_pta` and `detect_ss_pta` for each sample.
+    """
+
+    def __init__(self, pulsars, fobs, skies, red_amp=None, red_gamma=None, alpha_0=0.001,
+                 snr_cython=True, grid_path=GAMMA_RHO_GRID_PATH, mem_budget=None):
+        """ Precompute the strain-independent quantities for the given PTA and sky realizations.
+
+        Parameters
+        ----------
+        pulsars : (P,) list of hasasia.Pulsar objects
+            A set of pulsars generated by hasasia.sim.sim_pta()
+        fobs : (F,) 1Darray of scalars
+            Observer frame gw frequency bin centers in Hz.
+        skies : tuple of five (F,S,L) NDarrays
+            theta_ss, phi_ss, Phi0_ss, iota_ss, psi_ss of each single source in each of S sky
+            realizations, e.g. from `_build_skies`.
+        red_amp : scalar or None
+            Amplitude of pulsar red noise.
+        red_gamma : scalar or None
+            Power law index of pulsar red noise.
+        alpha_0 : scalar
+            False alarm probability
+        snr_cython : Bool
+            Use the SNR of `_snr_ss` (the cython calculation), otherwise that of `_snr_ss_5dim`.
+        grid_path : string
+            Path to snr interpolation grid
+        mem_budget : float or None
+            [bytes] Memory budget of each block of samples, see `holodeck.utils.mem_budget`.
+        """
+        self.fobs = np.asarray(fobs)
+        self.dur = 1.0/fobs[0]
+        self.cad = 1.0/(2*fobs[-1])
+        fobs_cents, fobs_edges = utils.pta_freqs(self.dur, num=len(fobs))
+        self.dfobs = np.diff(fobs_edges)
+        self.alpha_0 = alpha_0
+        self.mem_budget = mem_budget
+
+        theta_ss, phi_ss, Phi0_ss, iota_ss, psi_ss = skies
+        self.nfreqs, self.nskies, self.nloudest = theta_ss.shape
+        if self.nfreqs != len(fobs):
+            err = f"`skies` have {self.nfreqs} frequencies, but `fobs` has {len(fobs)}!"
+            raise ValueError(err)
+
+        # get pulsar properties
+        thetas = np.array([psr.theta for psr in pulsars])
+        phis = np.array([psr.phi for psr in pulsars])
+        sigmas = np.array([np.mean(psr.toaerrs) for psr in pulsars])
+        white = _white_noise(self.cad, sigmas) # (P,)
+        self.npsrs = len(pulsars)
+
+        self.red_noise = None
+        if (red_amp is not None) and (red_gamma is not None):
+            self.red_noise = _red_noise(red_amp, red_gamma, self.fobs) # (F,)
+
+        # background: white noise and squared ORF of each pulsar pair with j>i (all others are zero)
+        Gamma = _orf_pta(pulsars)
+        ii, jj = np.triu_indices(self.npsrs, 1)
+        self._bg_pairs = (white[ii], white[jj], Gamma[ii,jj]**2)
+
+        # single sources: sum the sky terms of the pulsars sharing each white-noise level
+        m_hat = _m_unitary_vector(theta_ss, phi_ss, psi_ss) # (3,F,S,L)
+        n_hat = _n_unitary_vector(theta_ss, phi_ss, psi_ss) # (3,F,S,L)
+        Omega_hat = _Omega_unitary_vector(theta_ss, phi_ss) # (3,F,S,L)
+        pi_hat = _pi_unitary_vector(phis, thetas) # (3,P)
+        F_iplus, F_icross = _antenna_pattern_functions(m_hat, n_hat, Omega_hat, pi_hat) # (P,F,S,L)
+        geom = _snr_ss_sky_terms(F_iplus, F_icross, iota_ss, self.dur, Phi0_ss, self.fobs,
+                                 snr_cython=snr_cython) # (P,F,S,L)
+        self._ss_levels, inverse = np.unique(white, return_inverse=True) # (U,)
+        self._ss_sky = np.zeros((self._ss_levels.size,) + geom.shape[1:]) # (U,F,S,L)
+        np.add.at(self._ss_sky, inverse, geom)
+
+        # single source detection probability, interpolated in SNR
+        Num = self.nfreqs * self.nloudest
+        self._gamma_grid = _load_gamma_interp_grid(Num, grid_path)
+        return
+
+    def blocks(self, nsamps, nreals):
+        """ Slices of the `nsamps` samples processed at once, with `nreals` strain realizations each.
+        """
+        # (F,R,S,L) arrays: snr^2, its increments, and gamma_ssi
+        size = 4 * self.nfreqs * nreals * self.nskies * self.nloudest * 8
+        return utils.mem_chunks(nsamps, size, budget=self.mem_budget, name='Batched_Detector')
+
+    def detect_bg(self, hc_bg, hc_ss=None, ss_noise=False):
+        """ Background detection probability and SNR, following `detect_bg_pta`.
+
+        Parameters
+        ----------
+        hc_bg : (B,F,R) NDarray
+            Characteristic strain of the background, for B samples and R realizations.
+        hc_ss : (B,F,R,L) NDarray or None
+            Characteristic strain of the single sources, only needed if `ss_noise`.
+        ss_noise : Bool
+            Whether to include the single sources (but the loudest) as a noise source.
+
+        Returns
+        -------
+        dp_bg : (B,R) NDarray
+            Background detection probability
+        snr_bg : (B,R) NDarray
+            Signal to noise ratio of the background, using the B statistic.
+        """
+        nsamps, nfreqs, nreals = hc_bg.shape
+        Sh = _power_spectral_density(hc_bg, self.fobs[np.newaxis,:,np.newaxis], reshape_freqs=False)[np.newaxis] # (1,B,F,R)
+
+        # noise shared by all pulsars
+        noise = np.zeros((1, 1, nfreqs, 1))
+        if self.red_noise is not None:
+            noise = noise + self.red_noise[np.newaxis,np.newaxis,:,np.newaxis]
+        if ss_noise:
+            Sh_ss = np.array([_Sh_ss_noise(hc_ss[nn], self.fobs) for nn in range(nsamps)])
+            noise = noise + Sh_ss[np.newaxis]
+
+        sum_1B = np.zeros((nsamps, nreals))
+        sum_0B = np.zeros((nsamps, nreals))
+        white_i, white_j, Gamma2 = self._bg_pairs
+        # pulsar pairs are summed in chunks, with (K,B,F,R) arrays
+        chunks = utils.mem_chunks(Gamma2.size, 8 * 8 * hc_bg.size, budget=self.mem_budget,
+                                  name='Batched_Detector.detect_bg')
+        for sl in chunks:
+            g2 = Gamma2[sl,np.newaxis,np.newaxis,np.newaxis]
+            noise_i = white_i[sl,np.newaxis,np.newaxis,np.newaxis] + noise
+            noise_j = white_j[sl,np.newaxis,np.newaxis,np.newaxis] + noise
+            _sum_1B, _sum_0B = _bg_pair_sums(noise_i, noise_j, g2, Sh)
+            sum_1B += _sum_1B
+            sum_0B += _sum_0B
+
+        dp_bg, snr_bg = _bg_detection_from_sums(sum_1B, sum_0B, self.alpha_0)
+        return dp_bg, snr_bg
+
+    def snr_ss(self, hc_ss, hc_bg, nexcl_noise=0):
+        """ SNR of each single source, following `detect_ss_pta`.
+
+        Parameters
+        ----------
+        hc_ss : (B,F,R,L) NDarray
+            Characteristic strain of the L loudest single sources, for B samples and R realizations.
+        hc_bg : (B,F,R) NDarray
+            Characteristic strain of the background.
+        nexcl_noise : int
+            Number of loudest single sources to exclude from hc_rest noise, in addition
+            to the source in question.
+
+        Returns
+        -------
+        snr_ss : (B,F,R,S,L) NDarray
+            SNR of each single source, in each sky realization.
+        """
+        fobs = self.fobs[np.newaxis,:,np.newaxis,np.newaxis]
+        amp = hc_ss * np.sqrt(10) / 4 * np.sqrt(self.dfobs[np.newaxis,:,np.newaxis,np.newaxis] / fobs) # (B,F,R,L)
+
+        # noise from all other GW sources (see `_Sh_rest_noise`)
+        if nexcl_noise > 0:
+            Sh_rest = np.array([_Sh_rest_noise(hss, hbg, self.fobs, nexcl_noise) for hss, hbg in zip(hc_ss, hc_bg)])
+        else:
+            hc2_rest = hc_bg[..., np.newaxis]**2 + np.sum(hc_ss**2, axis=-1, keepdims=True) - hc_ss**2
+            Sh_rest = hc2_rest / fobs**3 / (12 * np.pi**2) # (B,F,R,L)
+        if self.red_noise is not None:
+            Sh_rest = Sh_rest + self.red_noise[np.newaxis,:,np.newaxis,np.newaxis]
+
+        coef = amp**2 / (8 * (np.pi * fobs)**3) # (B,F,R,L)
+        snr2 = 0.0
+        for level, sky in zip(self._ss_levels, self._ss_sky):
+            snr2 = snr2 + (coef / (level + Sh_rest))[:,:,:,np.newaxis,:] * sky[np.newaxis,:,np.newaxis,:,:]
+
+        return np.sqrt(snr2)
+
+    def detect_ss(self, hc_ss, hc_bg, nexcl_noise=0):
+        """ Single source detection probabilities, following `detect_ss_pta`.
+
+        Parameters
+        ----------
+        hc_ss : (B,F,R,L) NDarray
+            Characteristic strain of the L loudest single sources, for B samples and R realizations.
+        hc_bg : (B,F,R) NDarray
+            Characteristic strain of the background.
+        nexcl_noise : int
+            Number of loudest single sources to exclude from hc_rest noise, in addition
+            to the source in question.
+
+        Returns
+        -------
+        gamma_ss : (B,R,S) NDarray
+            Probability of detecting any single source, for each R and S realization.
+        snr_ss : (B,F,R,S,L) NDarray
+            SNR of each single source.
+        gamma_ssi : (B,F,R,S,L) NDarray
+            DP of each single source.
+        """
+        snr_ss = self.snr_ss(hc_ss, hc_bg, nexcl_noise=nexcl_noise)
+        gamma_ssi = _interp_linear(snr_ss, *self._gamma_grid)
+        gamma_ss = 1 - np.prod(1 - gamma_ssi, axis=(1,4))
+        return gamma_ss, snr_ss, gamma_ssi
+
+
+def _bg_pair_sums(noise_i, noise_j, Gamma2, Sh):
+    """ Sums over pulsar pairs and frequencies in the B-statistic, with Sh0 = Sh.
+
+    Parameters
+    ----------
+    noise_i, noise_j : (K,...,F,R) NDarrays
+        Noise spectral density of the first and second pulsar in each of K pairs.
+    Gamma2 : (K,...) NDarray
+        Squared overlap reduction function of each pair, broadcastable against the noise.
+    Sh : (...,F,R) NDarray
+        Spectral density of the background.
+
+    Returns
+    -------
+    sum_1B : (...,R) NDarray
+        The sum shared by `_mean1_Bstatistic` and `_sigma1_Bstatistic`.
+    sum_0B : (...,R) NDarray
+        The sum of `_sigma0_Bstatistic`.
+    """
+    gsh2 = Gamma2 * Sh**2
+    # with Sh0 = Sh, the sums in `_mean1_Bstatistic` and `_sigma1_Bstatistic` are identical
+    sum_1B = np.sum(gsh2 / ((noise_i + Sh) * (noise_j + Sh) + gsh2), axis=(0,-2))
+    # NOTE: `_sigma0_Bstatistic` uses `noise_j` in both denominator factors
+    sum_0B = np.sum(gsh2 * noise_i * noise_j / ((noise_j + Sh)**2 + gsh2)**2, axis=(0,-2))
+    return sum_1B, sum_0B
+
+
+def _bg_detection_from_sums(sum_1B, sum_0B, alpha_0=0.001):
+    """ Background detection probability and SNR from the sums of `_bg_pair_sums`.
+    """
+    mu_1B = 2 * sum_1B
+    sigma_0B = np.sqrt(2 * sum_0B)
+    sigma_1B = np.sqrt(2 * sum_1B)
+    dp_bg = _bg_detection_probability(sigma_0B, sigma_1B, mu_1B, alpha_0)
+    snr_bg = mu_1B / sigma_1B
+    return dp_bg, snr_bg
+
+
+def _snr_ss_sky_terms(F_iplus, F_icross, iotas, dur, Phi_0, freqs, snr_cython=True):
+    """ Strain-independent factor of the SNR^2 of each single source for each pulsar.
+
+    The SNR^2 of pulsar p, for a single source at frequency f, is amp^2 / (S_p * 8 pi^3 f^3) times this
+    factor (see `_snr_ss` and `_snr_ss_5dim`).
+
+    Parameters
+    ----------
+    F_iplus : (P,F,S,L) NDarray
+        Antenna pattern function for each pulsar.
+    F_icross : (P,F,S,L) NDarray
+        Antenna pattern function for each pulsar.
+    iotas : (F,S,L) NDarray
+        Inclination, giving the wave polarizations a and b.
+    dur : scalar
+        Duration of observations.
+    Phi_0 : (F,S,L) NDarray
+        Initial GW Phase.
+    freqs : (F,) 1Darray
+        Observed frequency bin centers.
+    snr_cython : Bool
+        Use the expression of the cython `_snr_ss`, otherwise that of `_snr_ss_5dim`.
+
+    Returns
+    -------
+    sky : (P,F,S,L) NDarray
+    """
+    a_pol, b_pol = _a_b_polarization(iotas) # (F,S,L)
+    Phi_T = _gw_phase(dur, freqs, Phi_0) # (F,S,L)
+    sin0, cos0 = np.sin(Phi_0), np.cos(Phi_0)
+    sinT, cosT = np.sin(Phi_T), np.cos(Phi_T)
+
+    if snr_cython:
+        term1 = Phi_T * (1 + 2 * sin0**2) + cosT * (-sinT + 4 * cos0) - 4 * sin0
+        term2 = Phi_T * (1 + 2 * cos0**2) + sinT * cosT - 4 * cos0
+        term3 = 2 * Phi_T * sinT * cos0 + sinT * (sinT - 2 * sin0 + 2 * cosT * cos0 - 2 * cos0)
+    else:
+        term1 = Phi_T * (1 + 2 * sin0**2) + cosT * (-sinT + 4 * sin0) - 4 * sin0
+        term2 = Phi_T * (1 + 2 * cos0**2) + sinT * (cosT - 4 * cos0)
+        term3 = 2 * Phi_T * sin0 * cos0 + sinT * (sinT - 2 * sin0 + 2 * cosT * cos0 - 2 * cos0)
+
+    sky = (a_pol**2 * F_iplus**2 * term1
+           + b_pol**2 * F_icross**2 * term2
+           - 2 * a_pol * b_pol * F_iplus * F_icross * term3)
+    return sky
+
+
+def _interp_linear(xx, xgrid, ygrid):
+    """ Linear interpolation in a sorted grid, extrapolating linearly beyond its ends.
+
+    Matches `cyutils.gamma_of_rho_interp`, without needing to sort `xx`.
+    """
+    yy = np.interp(xx, xgrid, ygrid)
+    for sel, aa, bb in [(xx < xgrid[0], 0, 1), (xx > xgrid[-1], -2, -1)]:
+        slope = (ygrid[bb] - ygrid[aa]) / (xgrid[bb] - xgrid[aa])
+        yy[sel] = ygrid[aa] + slope * (xx[sel] - xgrid[aa])
+    return yy
+
+
 ########################################################################
 ######################### Running on Libraries #########################
 ########################################################################
 
 def detect_lib(hdf_name, output_dir, npsrs, sigma, nskies, thresh=DEF_THRESH,
                 plot=True, debug=False, grid_path=GAMMA_RHO_GRID_PATH, 
-                snr_cython = True, save_ssi=False, ret_dict=False):
+                snr_cython = True, save_ssi=False, ret_dict=False, profile=False):
     """ Calculate detection statistics for an ss library output.
 
     Parameters
@@ -1717,6 +2091,11 @@ def detect_lib(hdf_name, output_dir, npsrs, sigma, nskies, thresh=DEF_THRESH,
         Whether to use cython interpolation for ss snr calculation.
     save_ssi : Bool
         Whether to store gamma_ssi in npz arrays
+    profile : Bool
+        Whether to record the time and memory usage of the 'io', 'setup' and 'detection' stages,
+        using `holodeck.utils.Stage_Profiler`, saved to 'detstats.profile.npz'.
+
+    Samples are processed in blocks, using a `Batched_Detector` for the PTA and sky realizations.
 
     Returns
     -------
@@ -1746,16 +2125,19 @@ def detect_lib(hdf_name, output_dir, npsrs, sigma, nskies, thresh=DEF_THRESH,
     TODO: Update, no need to return ss_snr
     """
 
-    # Read in hdf file
-    ssfile = h5py.File(hdf_name, 'r')
-    fobs = ssfile['fobs'][:]
-    dur = 1.0/fobs[0]
-    cad = 1.0/(2*fobs[-1])
-    # if dfobs is None: dfobs = ssfile['dfobs'][:]
-    # if dur is None: dur = ssfile['pta_dur'][0]
-    # if cad is None: cad = ssfile['pta_cad'][0]
-    hc_ss = ssfile['hc_ss'][...]
-    hc_bg = ssfile['hc_bg'][...]
+    prof = utils.Stage_Profiler(enabled=profile)
+
+    # Open hdf file; strains are read lazily, a block of samples at a time
+    with prof('io'):
+        ssfile = librarian.Library_Reader(hdf_name)
+        fobs = ssfile.fobs
+        dur = 1.0/fobs[0]
+        cad = 1.0/(2*fobs[-1])
+        # if dfobs is None: dfobs = ssfile['dfobs'][:]
+        # if dur is None: dur = ssfile['pta_dur'][0]
+        # if cad is None: cad = ssfile['pta_cad'][0]
+        hc_ss = ssfile['hc_ss']
+        hc_bg = ssfile['hc_bg']
     shape = hc_ss.shape
     nsamps, nfreqs, nreals, nloudest = shape[0], shape[1], shape[2], shape[3]
 
@@ -1780,6 +2162,11 @@ def detect_lib(hdf_name, output_dir, npsrs, sigma, nskies, thresh=DEF_THRESH,
     if debug: print('Building ss skies.')
     theta_ss, phi_ss, Phi0_ss, iota_ss, psi_ss = _build_skies(nfreqs, nskies, nloudest)
 
+    # Precompute PTA and sky quantities shared by all samples
+    with prof('setup'):
+        detector = Batched_Detector(psrs, fobs, (theta_ss, phi_ss, Phi0_ss, iota_ss, psi_ss),
+                                    snr_cython=snr_cython, grid_path=grid_path)
+
     # Calculate DPs, SNRs, and DFs
     if debug: print('Calculating SS and BG detection statistics.')
     dp_ss = np.zeros((nsamps, nreals, nskies)) # (N,R,S)
@@ -1796,28 +2183,32 @@ def detect_lib(hdf_name, output_dir, npsrs, sigma, nskies, thresh=DEF_THRESH,
     # Num = nfreqs * nloudest # number of single sources in a single strain realization (F*L)
     # Fe_bar = _Fe_thresh(Num) # scalar
 
-    for nn in range(nsamps):
-        if debug: print('on sample nn=%d out of N=%d' % (nn,nsamps))
-        dp_bg[nn,:], snr_bg[nn,...] = detect_bg_pta(psrs, fobs, hc_bg[nn], ret_snr=True)
-        vals_ss = detect_ss_pta(psrs, fobs, hc_ss[nn], hc_bg[nn], 
-                                ret_snr=True, gamma_cython=True, snr_cython=snr_cython,
-                                theta_ss=theta_ss, phi_ss=phi_ss, Phi0_ss=Phi0_ss,
-                                iota_ss=iota_ss, psi_ss=psi_ss, grid_path=grid_path)
-        dp_ss[nn,:,:]  = vals_ss[0]
+    for block in detector.blocks(nsamps, nreals):
+        lo, hi = block.start, block.stop
+        if debug: print('on samples nn=%d-%d out of N=%d' % (lo,hi-1,nsamps))
+        with prof('io'):
+            hc_ss_block = hc_ss[lo:hi]
+            hc_bg_block = hc_bg[lo:hi]
+        with prof('detection'):
+            dp_bg[lo:hi], _snr_bg = detector.detect_bg(hc_bg_block)
+            snr_bg[lo:hi] = _snr_bg[:,np.newaxis,:]
+            dp_ss[lo:hi], _snr_ss, _gamma_ssi = detector.detect_ss(hc_ss_block, hc_bg_block)
         if save_ssi: 
-            snr_ss[nn] = vals_ss[1]
-            gamma_ssi[nn] = vals_ss[2]
-        df_ss[nn], df_bg[nn] = detfrac_of_reals(dp_ss[nn], dp_bg[nn], thresh)
-        ev_ss[nn] = expval_of_ss(vals_ss[2])
-
-
-        if plot:
-            fig = plot_sample_nn(fobs, hc_ss[nn], hc_bg[nn],
-                         dp_ss[nn], dp_bg[nn],
-                         df_ss[nn], df_bg[nn], nn=nn)
-            plot_fname = (output_dir+'/p%06d_detprob.png' % nn) # need to make this directory
-            fig.savefig(plot_fname, dpi=100)
-            plt.close(fig)
+            snr_ss[lo:hi] = _snr_ss
+            gamma_ssi[lo:hi] = _gamma_ssi
+        ev_ss[lo:hi] = np.sum(_gamma_ssi, axis=(1,4))
+
+        for nn in range(lo, hi):
+            df_ss[nn], df_bg[nn] = detfrac_of_reals(dp_ss[nn], dp_bg[nn], thresh)
+            if plot:
+                fig = plot_sample_nn(fobs, hc_ss_block[nn-lo], hc_bg_block[nn-lo],
+                                     dp_ss[nn], dp_bg[nn],
+                                     df_ss[nn], df_bg[nn], nn=nn)
+                plot_fname = (output_dir+'/p%06d_detprob.png' % nn) # need to make this directory
+                fig.savefig(plot_fname, dpi=100)
+                plt.close(fig)
+
+    ssfile.close()
 
     if debug: print('Saving npz files and allsamp plots.')
     fig1 = plot_detprob(dp_ss, dp_bg, nsamps)
@@ -1826,12 +2217,16 @@ def detect_lib(hdf_name, output_dir, npsrs, sigma, nskies, thresh=DEF_THRESH,
     fig2.savefig(output_dir+'/allsamp_detfracs.png', dpi=300)
     plt.close(fig1)
     plt.close(fig2)
-    if save_ssi:
-        np.savez(output_dir+'/detstats.npz', dp_ss=dp_ss, dp_bg=dp_bg, df_ss=df_ss, df_bg=df_bg,
-              snr_ss=snr_ss, snr_bg=snr_bg, ev_ss = ev_ss, gamma_ssi=gamma_ssi)
-    else:
-        np.savez(output_dir+'/detstats.npz', dp_ss=dp_ss, dp_bg=dp_bg, df_ss=df_ss, df_bg=df_bg,
-              snr_bg=snr_bg, ev_ss = ev_ss)
+    with prof('io'):
+        if save_ssi:
+            np.savez(output_dir+'/detstats.npz', dp_ss=dp_ss, dp_bg=dp_bg, df_ss=df_ss, df_bg=df_bg,
+                  snr_ss=snr_ss, snr_bg=snr_bg, ev_ss = ev_ss, gamma_ssi=gamma_ssi)
+        else:
+            np.savez(output_dir+'/detstats.npz', dp_ss=dp_ss, dp_bg=dp_bg, df_ss=df_ss, df_bg=df_bg,
+                  snr_bg=snr_bg, ev_ss = ev_ss)
+    if profile:
+        np.savez(output_dir+'/detstats.profile.npz', profile=prof.to_array())
+        if debug: print(prof.summary())
         
     # return dictionary 
     if ret_dict:
@@ -1909,13 +2304,13 @@ def detect_lib_clbrt_pta(hdf_name, output_dir, npsrs, nskies, thresh=DEF_THRESH,
     nn in range(neals). Then combine these into an hdf file separately.
     """
 
-    # Read in hdf file
-    ssfile = h5py.File(hdf_name, 'r')
-    fobs = ssfile['fobs'][:]
+    # Open hdf file; strains are read lazily, a block of samples at a time
+    ssfile = librarian.Library_Reader(hdf_name)
+    fobs = ssfile.fobs
     dur = 1.0/fobs[0]
     cad = 1.0/(2*fobs[-1])
-    hc_ss = ssfile['hc_ss'][...]
-    hc_bg = ssfile['hc_bg'][...]
+    hc_ss = ssfile['hc_ss']
+    hc_bg = ssfile['hc_bg']
     shape = hc_ss.shape
     nsamps, nfreqs, nreals, nloudest = shape[0], shape[1], shape[2], shape[3]
 
@@ -1968,8 +2363,9 @@ def detect_lib_clbrt_pta(hdf_name, output_dir, npsrs, nskies, thresh=DEF_THRESH,
 
             # use sigmin and sigmax from previous realization, 
             # unless it's the first realization of the sample
-            psrs, _sigstart, _sigmin, _sigmax = calibrate_one_pta(hc_bg[nn,:,rr], hc_ss[nn,:,rr,:], fobs, npsrs, tol=tol, maxbads=maxbads,
-                                     sigstart=_sigstart, sigmin=_sigmin, sigmax=_sigmax, debug=debug, ret_sig=True, ss_noise=ss_noise)
+            psrs, _, _sigstart, _sigmin, _sigmax = calibrate_one_pta(
+                hc_bg[nn,:,rr], hc_ss[nn,:,rr,:], fobs, npsrs, tol=tol, maxbads=maxbads,
+                sigstart=_sigstart, sigmin=_sigmin, sigmax=_sigmax, debug=debug, ret_sig=True, ss_noise=ss_noise)
             _sigmin /= 2
             _sigmax *= 2
             
@@ -2010,6 +2406,8 @@ def detect_lib_clbrt_pta(hdf_name, output_dir, npsrs, nskies, thresh=DEF_THRESH,
             fig.savefig(plot_fname, dpi=100)
             plt.close(fig)
 
+    ssfile.close()
+
     if debug: print('Saving npz files and allsamp plots.')
     fig1 = plot_detprob(dp_ss, dp_bg, nsamps)
     fig2 = plot_detfrac(df_ss, df_bg, nsamps, thresh)
@@ -2679,7 +3077,7 @@ def detect_pspace_model_clbrt_ramp(fobs_cents, hc_ss, hc_bg, npsrs, nskies, sigm
             real_dur = now
 
         # get calibrated psrs 
-        ramp, _rampmin, _rampmax = calibrate_one_ramp(hc_bg[:,rr], fobs_cents, psrs,
+        ramp, _rampmin, _rampmax = calibrate_one_ramp(hc_bg[:,rr], hc_ss[:,rr,:], fobs_cents, psrs,
                                     tol=tol, maxbads=maxbads,
                                     rampstart=_rampstart, rampmin=_rampmin, rampmax=_rampmax, debug=debug, 
                                     rgam=red_gamma, ss_noise=ss_noise)
@@ -2854,7 +3252,157 @@ def _red_amp_from_white_noise(cad, sigma, red2white, fref=1/YR):
                       red2white * _white_noise(cad, sigma)) 
     return red_amp
 
-def calibrate_one_pta(hc_bg, hc_ss, fobs, npsrs, 
+class PTA_Calibrator:
+    """ Calibrate a PTA noise parameter to a target background detection probability.
+
+    The B-statistic depends on the calibrated parameter, x (e.g. the white-noise sigma or the red-noise
+    amplitude), only through the pulsar noise spectra, which are modeled as
+
+        noise_i(f) = A_i(f) + x^2 B_i(f).
+
+    The ORF of each pulsar pair, the background spectrum and the noise terms A_i and B_i are computed
+    once, so each evaluation of the detection probability is only a sum over pulsar pairs, without
+    building a new PTA.  The root is then found with `scipy.optimize.brentq` in log(x), after
+    expanding the bracket as needed.
+    """
+
+    def __init__(self, fobs, hc_bg, thetas, phis, noise_fixed=0.0, noise_scaled=None, alpha_0=0.001):
+        """ Precompute the parameter-independent quantities.
+
+        Parameters
+        ----------
+        fobs : (F,) 1Darray
+            Observed GW frequencies.
+        hc_bg : (F,R) NDarray
+            Characteristic strain of the background, for R realizations.
+        thetas : (P,) 1Darray
+            Polar angle of each pulsar.
+        phis : (P,) 1Darray
+            Azimuthal angle of each pulsar.
+        noise_fixed : scalar or NDarray broadcastable to (P,F,R)
+            Noise spectral density which does not depend on the calibrated parameter, A_i.
+        noise_scaled : NDarray broadcastable to (P,F,R)
+            Noise spectral density per unit x^2, B_i.
+        alpha_0 : scalar
+            False alarm probability
+        """
+        self.fobs = np.asarray(fobs)
+        self.alpha_0 = alpha_0
+        nfreqs, self.nreals = np.shape(hc_bg)
+        npsrs = len(thetas)
+        shape = (npsrs, nfreqs, self.nreals)
+        if noise_scaled is None:
+            err = "`noise_scaled` must be provided!"
+            log.exception(err)
+            raise ValueError(err)
+
+        self._Sh = _power_spectral_density(hc_bg, self.fobs) # (F,R)
+        ii, jj = np.triu_indices(npsrs, 1)
+        self._Gamma2 = (_orf_positions(thetas, phis)[ii,jj]**2)[:,np.newaxis,np.newaxis] # (K,1,1)
+        noise_fixed = np.broadcast_to(noise_fixed, shape)
+        noise_scaled = np.broadcast_to(noise_scaled, shape)
+        self._fixed = (noise_fixed[ii], noise_fixed[jj]) # (K,F,R)
+        self._scaled = (noise_scaled[ii], noise_scaled[jj]) # (K,F,R)
+        return
+
+    def detprob(self, xx, reals=slice(None)):
+        """ Background detection probability for the noise parameter `xx`.
+
+        Parameters
+        ----------
+        xx : scalar or (R,) 1Darray
+            Value of the calibrated noise parameter, for each realization.
+        reals : slice
+            Realizations to include.
+
+        Returns
+        -------
+        dp_bg : (R,) 1Darray
+            Background detection probability of each realization.
+        """
+        x2 = np.square(xx)
+        noise_i = self._fixed[0][...,reals] + x2 * self._scaled[0][...,reals]
+        noise_j = self._fixed[1][...,reals] + x2 * self._scaled[1][...,reals]
+        sum_1B, sum_0B = _bg_pair_sums(noise_i, noise_j, self._Gamma2, self._Sh[...,reals])
+        dp_bg, _ = _bg_detection_from_sums(sum_1B, sum_0B, self.alpha_0)
+        return dp_bg
+
+    def calibrate(self, xstart, xmin, xmax, target=0.5, tol=0.03, maxbads=20, xtol=1e-6, debug=False):
+        """ Find the noise parameter giving the `target` detection probability, in each realization.
+
+        Parameters
+        ----------
+        xstart : scalar or None
+            Initial guess, accepted if its detection probability is within `tol` of the `target`.
+        xmin, xmax : scalar
+            Initial bracket of the noise parameter.
+        target : scalar
+            Target background detection probability.
+        tol : scalar
+            Tolerance on the detection probability for accepting `xstart`.
+        maxbads : int
+            Maximum number of times the bracket is expanded, by a factor of 3 on each side.
+        xtol : scalar
+            Tolerance of the root finding, in log(x).
+        debug : Bool
+            Whether to print info along the way.
+
+        Returns
+        -------
+        xx : (R,) 1Darray
+            Calibrated noise parameter of each realization, NaN if the target could not be bracketed.
+        xmin, xmax : (R,) 1Darray
+            Final bracket used for each realization.
+        """
+        xx = np.full(self.nreals, np.nan)
+        lo = np.full(self.nreals, float(xmin))
+        hi = np.full(self.nreals, float(xmax))
+        check_start = (xstart is not None) and np.isfinite(xstart) and (xstart > 0.0)
+        for rr in range(self.nreals):
+            reals = slice(rr, rr+1)
+
+            def func(lnx):
+                return self.detprob(np.exp(lnx), reals)[0] - target
+
+            # the detection probability decreases with increasing noise
+            flo = fhi = None
+            if check_start:
+                fstart = func(np.log(xstart))
+                if np.abs(fstart) <= tol:
+                    xx[rr] = xstart
+                    continue
+                # narrow the bracket using the initial guess
+                if (lo[rr] < xstart < hi[rr]):
+                    if fstart > 0.0:
+                        lo[rr], flo = xstart, fstart
+                    else:
+                        hi[rr], fhi = xstart, fstart
+
+            if flo is None: flo = func(np.log(lo[rr]))
+            if fhi is None: fhi = func(np.log(hi[rr]))
+            nbads = 0
+            while ((flo < 0.0) or (fhi > 0.0)) and (nbads < maxbads):
+                if debug: print(f"expanding bracket: {rr=}, {lo[rr]=:e}, {hi[rr]=:e}, {flo=:.2e}, {fhi=:.2e}")
+                if flo < 0.0: # detection probability too low, allow lower noise
+                    hi[rr], fhi = lo[rr], flo
+                    lo[rr] = lo[rr] / 3
+                    flo = func(np.log(lo[rr]))
+                else: # detection probability too high, allow higher noise
+                    lo[rr], flo = hi[rr], fhi
+                    hi[rr] = hi[rr] * 3
+                    fhi = func(np.log(hi[rr]))
+                nbads += 1
+
+            if (flo < 0.0) or (fhi > 0.0) or np.isnan(flo) or np.isnan(fhi):
+                if debug: print(f"FAILED! {rr=}, DP_BG={target} not bracketed by [{lo[rr]:e}, {hi[rr]:e}]")
+                continue
+
+            xx[rr] = np.exp(optimize.brentq(func, np.log(lo[rr]), np.log(hi[rr]), xtol=xtol))
+
+        return xx, lo, hi
+
+
+def calibrate_one_pta(hc_bg, hc_ss, fobs, npsrs,
                       sigstart=1e-6, sigmin=1e-9, sigmax=1e-4, debug=False, maxbads=20, tol=0.03,
                       phis=None, thetas=None, ret_sig = False, red_amp=None, red_gamma=None, red2white=None,
                       ss_noise=False):
@@ -2874,14 +3422,18 @@ def calibrate_one_pta(hc_bg, hc_ss, fobs, npsrs,
     Returns 
     -------
     psrs : hasasia.sim.pta object
-        Calibrated PTA.
+        Calibrated PTA, or None if the calibration failed.
+    red_amp : float
+        red noise amplitude, returned only if ret_sig=True
+    sigma : float
+        final sigma, returned only if ret_sig=True
     sigmin : float
         minimum of the final sigma range used, returned only if ret_sig=True
     sigmax : float, returned only if ret_sig=True
         maximum of the final sigma range used
-    sigma : float
-        final sigma, returned only if ret_sig=True
 
+    The white noise is calibrated with a `PTA_Calibrator`, and the PTA is only built once,
+    with the calibrated sigma.
     """
 
     # get duration and cadence from fobs
@@ -2891,71 +3443,32 @@ def calibrate_one_pta(hc_bg, hc_ss, fobs, npsrs,
     # randomize pulsar positions
     if phis is None: phis = np.random.uniform(0, 2*np.pi, size = npsrs)
     if thetas is None: thetas = np.random.uniform(np.pi/2, np.pi/2, size = npsrs)
-    sigma = sigstart
-    if red2white is not None:
-        red_amp = _red_amp_from_white_noise(cad, sigma, red2white) 
-
-    psrs = hsim.sim_pta(timespan=dur/YR, cad=1/(cad/YR), sigma=sigma,
-                    phi=phis, theta=thetas)
-    dp_bg = detect_bg_pta(psrs, fobs, hc_bg=hc_bg[:,np.newaxis], hc_ss=hc_ss[:,np.newaxis,:],
-                            red_amp=red_amp, red_gamma=red_gamma, ss_noise=ss_noise)[0]
-
-    nclose=0 # number of attempts close to 0.5, could be stuck close
-    nfar=0 # number of attempts far from 0.5, could be stuck far
 
-    # calibrate sigma
-    while np.abs(dp_bg-0.50)>tol:
-        sigma = np.mean([sigmin, sigmax]) # a weighted average would be better
+    # white noise, and red noise tied to it, scale as sigma^2
+    noise_fixed = np.zeros((len(fobs), 1))
+    noise_scaled = np.full((len(fobs), 1), _white_noise(cad, 1.0))
+    if (red2white is not None) and (red_gamma is not None):
+        red_amp_unit = _red_amp_from_white_noise(cad, 1.0, red2white)
+        noise_scaled = noise_scaled + _red_noise(red_amp_unit, red_gamma, fobs)[:,np.newaxis]
+    elif (red_amp is not None) and (red_gamma is not None):
+        noise_fixed = noise_fixed + _red_noise(red_amp, red_gamma, fobs)[:,np.newaxis]
+    if ss_noise:
+        noise_fixed = noise_fixed + _Sh_ss_noise(hc_ss[:,np.newaxis,:], fobs) # (F,1)
+
+    calibrator = PTA_Calibrator(fobs, hc_bg[:,np.newaxis], thetas, phis,
+                                noise_fixed=noise_fixed, noise_scaled=noise_scaled)
+    sigma, sigmin, sigmax = calibrator.calibrate(sigstart, sigmin, sigmax, tol=tol, maxbads=maxbads, debug=debug)
+    sigma, sigmin, sigmax = sigma[0], sigmin[0], sigmax[0]
+
+    if np.isnan(sigma):
+        psrs = None
+        if debug: print(f"FAILED! DP_BG=0.5 impossible with {red_amp=}, {red_gamma=}")
+    else:
         if red2white is not None:
-            red_amp = _red_amp_from_white_noise(cad, sigma, red2white) 
+            red_amp = _red_amp_from_white_noise(cad, sigma, red2white)
         psrs = hsim.sim_pta(timespan=dur/YR, cad=1/(cad/YR), sigma=sigma,
                         phi=phis, theta=thetas)
-        dp_bg = detect_bg_pta(psrs, fobs, hc_bg=hc_bg[:,np.newaxis], hc_ss=hc_ss[:,np.newaxis,:],
-                                 red_amp=red_amp, red_gamma=red_gamma, ss_noise=ss_noise)[0]
-
-        # if debug: print(f"{dp_bg=}")
-        if (dp_bg < (0.5-tol)) or (dp_bg > (0.5+tol)):
-            nfar +=1
 
-        # check if we need to expand the range
-        if (nfar>5*maxbads  # if we've had many bad guesses
-            or (sigmin/sigmax > 0.99 # or our range is small and we are far from the goal
-                and (dp_bg<0.4 or dp_bg>0.6))):
-            
-            # then we must expand the range
-            if debug: print(f"STUCK! {nfar=}, {dp_bg=}, {sigmin=:e}, {sigmax=:e}")
-            if dp_bg < 0.5-tol: # stuck way too low, allow much lower sigmin to raise DP
-                sigmin = sigmin/3
-            if dp_bg > 0.5+tol: # stuck way too high, allow much higher sigmax to lower DP
-                sigmax = sigmax*3
-
-            # reset count for far guesses
-            nfar = 0
-
-        # check how we should narrow our range
-        if dp_bg<0.5-tol: # dp too low, lower sigma
-            sigmax = sigma
-        elif dp_bg>0.5+tol: # dp too high, raise sigma
-            sigmin = sigma
-        else:
-            nclose += 1 # check how many attempts between 0.49 and 0.51 fail
-
-        # check if we are stuck near the goal value with a bad range    
-        if nclose>maxbads: # if many fail, we're stuck; expand sampling range
-            if debug: print(f"{nclose=}, {dp_bg=}, {sigmin=:e}, {sigmax=:e}")
-            sigmin = sigmin/3
-            sigmax = sigmax*3
-            nclose=0
-
-        # check if goal DP is just impossible
-        if sigmax<1e-20:
-            psrs=None
-            if debug: print(f"FAILED! DP_BG=0.5 impossible with {red_amp=}, {red_gamma=}")
-            break
-    # print(f"test1: {dp_bg=}")
-    # print(f"test1: {sigma=}")
-    # print(f"in calibration: {utils.stats(psrs[0].toaerrs)=}, \n{utils.stats(hc_bg)=},\
-    #             {utils.stats(fobs)=}, {dp_bg=}")
     if ret_sig:
         return psrs, red_amp, sigma, sigmin, sigmax
     return psrs
@@ -2971,8 +3484,6 @@ def calibrate_one_pta_gsc(hc_bg, fobs, npsrs,
     ----------
     hc_bg : (F,) 1Darray
         The background characteristic strain for one realization.
-    hc_ss : (F,L) NDarray
-        The SS characteristic strains for one realization
     fobs : (F,) 1Darray
         Observed GW frequencies.
     npsrs : integer
@@ -2983,14 +3494,20 @@ def calibrate_one_pta_gsc(hc_bg, fobs, npsrs,
     Returns 
     -------
     psrs : hasasia.sim.pta object
-        Calibrated PTA.
+        Calibrated PTA, or None if the calibration failed.
+    red_amp : float
+        red noise amplitude
+    sigma : float
+        final sigma, returned only if ret_sig=True
     sigmin : float
         minimum of the final sigma range used, returned only if ret_sig=True
     sigmax : float, returned only if ret_sig=True
         maximum of the final sigma range used
-    sigma : float
-        final sigma, returned only if ret_sig=True
+    spectra : list of hasasia.sensitivity.Spectrum, returned only if ret_sig=True
+    noise_gsc : (P,F,1) NDarray, returned only if ret_sig=True
 
+    For white-noise-only pulsars, the GWB sensitivity curve noise is proportional to sigma^2,
+    so the hasasia spectra are only calculated for the initial and calibrated sigma.
     """
 
     # get duration and cadence from fobs
@@ -3000,76 +3517,29 @@ def calibrate_one_pta_gsc(hc_bg, fobs, npsrs,
     # randomize pulsar positions
     if phis is None: phis = np.random.uniform(0, 2*np.pi, size = npsrs)
     if thetas is None: thetas = np.random.uniform(np.pi/2, np.pi/2, size = npsrs)
-    sigma = sigstart
-    if red2white is not None:
-        red_amp = _white_noise(cad, sigma) * red2white
 
-    psrs = hsim.sim_pta(timespan=dur/YR, cad=1/(cad/YR), sigma=sigma,
+    psrs = hsim.sim_pta(timespan=dur/YR, cad=1/(cad/YR), sigma=sigstart,
                     phi=phis, theta=thetas)
     
-    # get sensitivity curve
+    # get sensitivity curve, per unit sigma^2
     spectra, noise_gsc = psrs_spectra_gwbnoise(psrs, fobs, nreals=1, npsrs=npsrs, divide_flag=divide_flag) 
-    
-    dp_bg = detect_bg_pta(psrs, fobs, hc_bg=hc_bg[:,np.newaxis], custom_noise=noise_gsc,
-                            red_amp=red_amp, red_gamma=red_gamma, ss_noise=ss_noise)[0]
 
-    nclose=0 # number of attempts close to 0.5, could be stuck close
-    nfar=0 # number of attempts far from 0.5, could be stuck far
+    calibrator = PTA_Calibrator(fobs, hc_bg[:,np.newaxis], thetas, phis,
+                                noise_scaled=noise_gsc/sigstart**2)
+    sigma, sigmin, sigmax = calibrator.calibrate(sigstart, sigmin, sigmax, tol=tol, maxbads=maxbads, debug=debug)
+    sigma, sigmin, sigmax = sigma[0], sigmin[0], sigmax[0]
 
-    # calibrate sigma
-    while np.abs(dp_bg-0.50)>tol:
-        sigma = np.mean([sigmin, sigmax]) # a weighted average would be better
-        if red2white is not None:
-            red_amp = sigma * red2white
+    if np.isnan(sigma):
+        psrs = None
+        if debug: print(f"FAILED! DP_BG=0.5 impossible with {red_amp=}, {red_gamma=}")
+    elif sigma != sigstart:
         psrs = hsim.sim_pta(timespan=dur/YR, cad=1/(cad/YR), sigma=sigma,
                         phi=phis, theta=thetas)
-        spectra, noise_gsc = psrs_spectra_gwbnoise(psrs, fobs, nreals=1, npsrs=npsrs) 
-        dp_bg = detect_bg_pta(psrs, fobs, hc_bg=hc_bg[:,np.newaxis], custom_noise=noise_gsc,
-                                 red_amp=red_amp, red_gamma=red_gamma, ss_noise=ss_noise)[0]
-
-        # if debug: print(f"{dp_bg=}")
-        if (dp_bg < (0.5-tol)) or (dp_bg > (0.5+tol)):
-            nfar +=1
-
-        # check if we need to expand the range
-        if (nfar>5*maxbads  # if we've had many bad guesses
-            or (sigmin/sigmax > 0.99 # or our range is small and we are far from the goal
-                and (dp_bg<0.4 or dp_bg>0.6))):
-            
-            # then we must expand the range
-            if debug: print(f"STUCK! {nfar=}, {dp_bg=}, {sigmin=:e}, {sigmax=:e}")
-            if dp_bg < 0.5-tol: # stuck way too low, allow much lower sigmin to raise DP
-                sigmin = sigmin/3
-            if dp_bg > 0.5+tol: # stuck way too high, allow much higher sigmax to lower DP
-                sigmax = sigmax*3
-
-            # reset count for far guesses
-            nfar = 0
-
-        # check how we should narrow our range
-        if dp_bg<0.5-tol: # dp too low, lower sigma
-            sigmax = sigma
-        elif dp_bg>0.5+tol: # dp too high, raise sigma
-            sigmin = sigma
-        else:
-            nclose += 1 # check how many attempts between 0.49 and 0.51 fail
-
-        # check if we are stuck near the goal value with a bad range    
-        if nclose>maxbads: # if many fail, we're stuck; expand sampling range
-            if debug: print(f"{nclose=}, {dp_bg=}, {sigmin=:e}, {sigmax=:e}")
-            sigmin = sigmin/3
-            sigmax = sigmax*3
-            nclose=0
-
-        # check if goal DP is just impossible
-        if sigmax<1e-20:
-            psrs=None
-            if debug: print(f"FAILED! DP_BG=0.5 impossible with {red_amp=}, {red_gamma=}")
-            break
-    # print(f"test1: {dp_bg=}")
-    # print(f"test1: {sigma=}")
-    # print(f"in calibration: {utils.stats(psrs[0].toaerrs)=}, \n{utils.stats(hc_bg)=},\
-    #             {utils.stats(fobs)=}, {dp_bg=}")
+        spectra, noise_gsc = psrs_spectra_gwbnoise(psrs, fobs, nreals=1, npsrs=npsrs, divide_flag=divide_flag)
+
+    if (red2white is not None) and (psrs is not None):
+        red_amp = sigma * red2white
+
     if ret_sig:
         return psrs, red_amp, sigma, sigmin, sigmax, spectra, noise_gsc
     return psrs, red_amp
@@ -3090,81 +3560,40 @@ def calibrate_one_ramp(hc_bg, hc_ss, fobs, psrs,
         Observed GW frequencies.
     psrs : hasasia.sim.pta object
         PTA w/ fixed white noise
-    sigma : scalar
-        White noise sigma
+    rgam : scalar
+        Power-law index of the red noise.
 
     Returns 
     -------
     redamp : float
-        final redamp, returned only if ret_ramp = True
+        final redamp, or None if the calibration failed.
     redampmin : float
-        minimum of the final sigma range used, returned only if ret_sig=True
-    redampmax : float, returned only if ret_sig=True
+        minimum of the final sigma range used
+    redampmax : float
         maximum of the final sigma range used
 
     """
 
-    # get duration and cadence from fobs
-    dur = 1.0/fobs[0]
+    # get cadence from fobs
     cad = 1.0/(2.0*fobs[-1])
 
-    # randomize pulsar positions
-    ramp = rampstart
-    dp_bg = detect_bg_pta(psrs, fobs, hc_bg=hc_bg[:,np.newaxis], hc_ss=hc_ss[:,np.newaxis,:],
-                red_amp=rgam, red_gamma=ramp, ss_noise=ss_noise)[0]
-
-    nclose=0 # number of attempts close to 0.5, could be stuck close
-    nfar=0 # number of attempts far from 0.5, could be stuck far
-
-    # calibrate sigma
-    while np.abs(dp_bg-0.50)>tol:
-        ramp = np.mean([rampmin, rampmax]) # a weighted average would be better
-        dp_bg = detect_bg_pta(psrs, fobs, hc_bg=hc_bg[:,np.newaxis], hc_ss=hc_ss[:,np.newaxis,:],
-                    red_amp=ramp, red_gamma=rgam, ss_noise=ss_noise)[0]
-
-        # if debug: print(f"{dp_bg=}")
-        if (dp_bg < (0.5-tol)) or (dp_bg > (0.5+tol)):
-            nfar +=1
-
-        # check if we need to expand the range
-        if (nfar>5*maxbads  # if we've had many bad guesses
-            or (rampmin/rampmax > 0.99 # or our range is small and we are far from the goal
-                and (dp_bg<0.4 or dp_bg>0.6))):
-            
-            # then we must expand the range
-            if debug: print(f"STUCK! {nfar=}, {dp_bg=}, {rampmin=:e}, {rampmax=:e}")
-            if dp_bg < 0.5-tol: # stuck way too low, allow much lower sigmin to raise DP
-                rampmin = rampmin/3
-            if dp_bg > 0.5+tol: # stuck way too high, allow much higher sigmax to lower DP
-                rampmax = rampmax*3
-
-            # reset count for far guesses
-            nfar = 0
-
-        # check how we should narrow our range
-        if dp_bg<0.5-tol: # dp too low, lower sigma
-            rampmax = ramp
-        elif dp_bg>0.5+tol: # dp too high, raise sigma
-            rampmin = ramp
-        else:
-            nclose += 1 # check how many attempts between 0.49 and 0.51 fail
-
-        # check if we are stuck near the goal value with a bad range    
-        if nclose>maxbads: # if many fail, we're stuck; expand sampling range
-            if debug: print(f"{nclose=}, {dp_bg=}, {rampmin=:e}, {rampmax=:e}")
-            rampmin = rampmin/3
-            rampmax = rampmax*3
-            nclose=0
-
-        # check if goal DP is just impossible
-        if rampmax<1e-50:
-            ramp=None
-            if debug: print(f"FAILED! DP_BG=0.5 impossible with sigma={np.mean(psrs[0].toaerrs)}, {rgam=}")
-            break
-    # print(f"test1: {dp_bg=}")
-    # print(f"test1: {sigma=}")
-    # print(f"in calibration: {utils.stats(psrs[0].toaerrs)=}, \n{utils.stats(hc_bg)=},\
-    #             {utils.stats(fobs)=}, {dp_bg=}")
+    # white noise of each pulsar is fixed, red noise scales as ramp^2
+    thetas = np.array([psr.theta for psr in psrs])
+    phis = np.array([psr.phi for psr in psrs])
+    sigmas = np.array([np.mean(psr.toaerrs) for psr in psrs])
+    noise_fixed = _white_noise(cad, sigmas)[:,np.newaxis,np.newaxis] # (P,1,1)
+    if ss_noise:
+        noise_fixed = noise_fixed + _Sh_ss_noise(hc_ss[:,np.newaxis,:], fobs)[np.newaxis] # (P,F,1)
+    noise_scaled = _red_noise(1.0, rgam, fobs)[np.newaxis,:,np.newaxis] # (1,F,1)
+
+    calibrator = PTA_Calibrator(fobs, hc_bg[:,np.newaxis], thetas, phis,
+                                noise_fixed=noise_fixed, noise_scaled=noise_scaled)
+    ramp, rampmin, rampmax = calibrator.calibrate(rampstart, rampmin, rampmax, tol=tol, maxbads=maxbads, debug=debug)
+    ramp, rampmin, rampmax = ramp[0], rampmin[0], rampmax[0]
+
+    if np.isnan(ramp):
+        ramp = None
+        if debug: print(f"FAILED! DP_BG=0.5 impossible with sigma={np.mean(psrs[0].toaerrs)}, {rgam=}")
     return ramp, rampmin, rampmax
 
 
@@ -71,12 +71,13 @@ from __future__ import annotations
 # ! -- then call it again with a revision to the estimate, using right-edge values -- !
 # ! ===============================================================================================!
 
+import numba
 import numpy as np
 
 import kalepy as kale
 
 import holodeck as holo
-from holodeck import utils, cosmo, log
+from holodeck import utils, cosmo, cosmo_interp, log
 from holodeck.constants import PC
 from holodeck.hardening import _Hardening
 # from holodeck import accretion
@@ -289,9 +290,11 @@ class Evolution:
         xpar : str, in ['fobs', 'sepa']
             String specifying the variable of interpolation.
         targets : array_like,
-            Locations to interpolate to.
+            Locations to interpolate to, either a scalar or an array of any shape.
             * if ``xpar == sepa`` : binary separation, units of [cm],
             * if ``xpar == fobs`` : binary orbital freq, observer-frame, units of [1/sec],
+            All targets are interpolated at once (e.g. all frequency bins times all harmonics),
+            using a single pass over each binary's evolution track.
         params : None or (list of str)
             Names of the parameters that should be interpolated.
             If `None`, defaults to :attr:`Evolution._EVO_PARS` attribute.
@@ -310,7 +313,8 @@ class Evolution:
         vals : dict,
             Dictionary of arrays for each interpolated parameter.
             The returned shape is (N, T), where `T` is the number of target locations to interpolate
-            to, and `N` is the total number of binaries.
+            to, and `N` is the total number of binaries.  If `targets` is multidimensional, with
+            shape (T1, T2, ...), then the returned shape is (N, T1, T2, ...).
             Each data array is filled with `np.nan` values if the targets are outside of its
             evolution track.  If ``coal=True``, then binaries that do *not* coalesce before redshift
             zero also have their data array values fillwed with `np.nan`.
@@ -324,6 +328,11 @@ class Evolution:
           `lin_interp` parameter will override the behavior (see `Parameters`_ above).
 
         """
+        # multidimensional targets are interpolated as a flat array, and reshaped at the end
+        tshape = np.shape(targets)
+        if len(tshape) > 1:
+            targets = np.ravel(targets)
+
         # parse/sanitize input arguments
         xnew, xold, params, lin_interp_list, rev, squeeze = self._at__inputs(xpar, targets, params, lin_interp)
 
@@ -366,6 +375,8 @@ class Evolution:
             # remove excess dimensions if a single target was requested (i.e. ``T=1``)
             if squeeze:
                 ynew = ynew.squeeze()
+            elif len(tshape) > 1:
+                ynew = ynew.reshape(ynew.shape[:1] + tshape + ynew.shape[2:])
             # store
             data[par] = ynew
 
@@ -498,10 +509,9 @@ class Evolution:
 
         """
         # ---- For every binary, find the step index immediately following each target value
-        # (N, T, M) | `xnew` is (T,) for T-targets,  `xold` is (N, M) for N-binaries and M-steps
-        select = (xnew[np.newaxis, :, np.newaxis] <= xold[:, np.newaxis, :])
         # (N, T), xvalue index [0, M-1] following each target point (T,), for each binary (N,)
-        aft = np.argmax(select, axis=-1)
+        #     `xnew` is (T,) for T-targets,  `xold` is (N, M) for N-binaries and M-steps
+        aft = _first_index_at_or_above(np.asarray(xnew, dtype=float), np.asarray(xold, dtype=float))
 
         # ---- Determine which locations are 'valid' (i.e. within the evolutionary tracks)
         # zero values in `aft` mean no `xold` after the targets were found; these are 'invalid',
@@ -573,11 +583,11 @@ class Evolution:
             else:   # nocov
                 raise ValueError("Unexpected shape of yold: {}!".format(np.shape(yold)))
 
-        if not lin_interp_flag:
-            yold = np.log10(yold)
-
         # (2, N, T) for scalar data or (2, N, 2, T) for "double-data"
         yold = [np.take_along_axis(yold, cc, axis=-1) for cc in cut]
+        # only the selected values are converted to log-space
+        if not lin_interp_flag:
+            yold = [np.log10(yy) for yy in yold]
         # Interpolate by `frac` for each binary   (N, T) or (N, 2, T) for "double-data"
         ynew = yold[1] + (np.subtract(*yold) * frac)
         # In the "double-data" case, move the doublet back to the last dimension
@@ -683,7 +693,7 @@ class Evolution:
         # Get rest-frame orbital-frequency [1/s]
         frst_orb_cents = utils.frst_from_fobs(fobs_orb_cents[np.newaxis, :], redz)
         # Comoving distance [cm]
-        dcom = cosmo.z_to_dcom(redz)
+        dcom = cosmo_interp.z_to_dcom(redz)
 
         # `mass` has shape (Binaries, Frequencies, 2), units [gram]
         #    convert to (2, B, F), then separate into m1, m2 each with shape (B, F)
@@ -754,7 +764,7 @@ class Evolution:
 
         self.scafa[:, 0] = pop.scafa
         redz = cosmo.a_to_z(pop.scafa)
-        tlook = cosmo.z_to_tlbk(redz)
+        tlook = cosmo_interp.z_to_tlbk(redz)
         self.tlook[:, 0] = tlook
         # `pop.mass` has shape (N, 2), broadcast to (N, S, 2) for `S` steps
         # self.mass[:, :, :] = pop.mass[:, np.newaxis, :]
@@ -827,7 +837,7 @@ class Evolution:
         self.tlook[:, right] = tlook
         # update scale-factor for systems at z > 0.0 (i.e. a < 1.0 and tlook > 0.0)
         val = (tlook > 0.0)
-        self.scafa[val, right] = cosmo.z_to_a(cosmo.tlbk_to_z(tlook[val]))
+        self.scafa[val, right] = cosmo.z_to_a(cosmo_interp.tlbk_to_z(tlook[val]))
         # set systems after z = 0 to scale-factor of unity
         self.scafa[~val, right] = 1.0
         # ! ====================================================================
@@ -861,7 +871,7 @@ class Evolution:
         self.tlook[:, right] = tlook
         # update scale-factor for systems at z > 0.0 (i.e. a < 1.0 and tlook > 0.0)
         val = (tlook > 0.0)
-        self.scafa[val, right] = cosmo.z_to_a(cosmo.tlbk_to_z(tlook[val]))
+        self.scafa[val, right] = cosmo.z_to_a(cosmo_interp.tlbk_to_z(tlook[val]))
         # set systems after z = 0 to scale-factor of unity
         self.scafa[~val, right] = 1.0
 
@@ -1081,3 +1091,50 @@ class Evolution:
         if self._evolved is not True:
             raise RuntimeError("This instance has not been evolved yet!")
         return
+
+
+# =================================================================================================
+# ====    Utility Functions    ====
+# =================================================================================================
+
+
+@numba.njit
+def _first_index_at_or_above(xnew, xold):
+    """Find the first step in each evolutionary track at or above each target value.
+
+    This is equivalent to ``np.argmax(xnew[np.newaxis, :, np.newaxis] <= xold[:, np.newaxis, :], axis=-1)``,
+    without constructing the (N, T, M) intermediate array.  Targets are sorted once, and each track is
+    then traversed in a single pass: the first index at-or-above a target can only increase with the
+    target value.  Tracks do not need to be monotonic.
+
+    Parameters
+    ----------
+    xnew : (T,) ndarray
+        Target values.
+    xold : (N, M) ndarray
+        Values along the evolutionary track of each binary.
+
+    Returns
+    -------
+    aft : (N, T) ndarray of int
+        Index of the first step with ``xold >= xnew`` for each binary and target; zero if there is
+        no such step (or if the target is NaN).
+
+    """
+    nbins, nsteps = xold.shape
+    ntargs = xnew.size
+    order = np.argsort(xnew)
+    aft = np.zeros((nbins, ntargs), dtype=np.int64)
+    for ii in range(nbins):
+        jj = 0
+        for kk in order:
+            xx = xnew[kk]
+            # NOTE: comparisons with NaN are always false, and NaN values are never selected
+            while (jj < nsteps) and not (xx <= xold[ii, jj]):
+                jj += 1
+            # all remaining targets are larger, and there are no steps left; leave them as zero
+            if jj == nsteps:
+                break
+            aft[ii, kk] = jj
+
+    return aft
@@ -7,6 +7,7 @@ from holodeck.constants import MSOL, GYR
 import numpy as np
 import kalepy as kale
 from holodeck.sams import cyutils as sam_cyutils
+from holodeck.sams.sam import Grid_Sampler
 
 
 class Realizer:
@@ -59,6 +60,9 @@ class Realizer:
 
 
 class Realizer_SAM:
+
+    _DENSE_THRESH = 1e2   #: cells with more binaries than this are Poisson-drawn individually, not from alias table
+
     def __init__(
             self, fobs_orb_edges, sam=None, hard=None, params=None, 
             pspace=holo.param_spaces.PS_Uniform_09B(holo.log, nsamples=1, sam_shape=None, seed=None)):
@@ -96,7 +100,7 @@ class Realizer_SAM:
         self._hard = hard
         self._fobs_orb_edges = fobs_orb_edges
 
-    def __call__(self, nreals=100, clean=False):
+    def __call__(self, nreals=100, clean=False, seed=None):
         """ Calculate samples and weights for an entire semi-analytic population.
         
         Parameters
@@ -106,6 +110,8 @@ class Realizer_SAM:
         clean : boolean
             Whether or not to make a samples array for every realization 
             and clean weights==zero bins from each array
+        seed : int, `numpy.random.Generator` or None
+            Seed for the random number generator, used when `clean` is True.
 
         Returns
         -------
@@ -126,7 +132,6 @@ class Realizer_SAM:
         fobs_orb_edges = self._fobs_orb_edges
 
         fobs_orb_cents = kale.utils.midpoints(fobs_orb_edges)
-        fobs = 2.0 * fobs_orb_cents
 
 
         # ---- Calculate number of binaries in each bin
@@ -140,26 +145,23 @@ class Realizer_SAM:
 
         samples = get_samples_from_edges(edges, redz, number.shape, flatten=True)
         names = ['mtot', 'mrat', 'redz', 'fobs']
-        number = number.flatten()
-        shape = (number.size, nreals)
-        weights = gravwaves.poisson_as_needed(number[..., np.newaxis] * np.ones(shape)).reshape(shape)
-
-        
 
         if clean:
+            # draw only the occupied cells of each realization, from an alias table built once
+            # cells above `_DENSE_THRESH` are Poisson-drawn directly, as in `gravwaves.poisson_as_needed`
+            sampler = Grid_Sampler(edges, number, threshold=self._DENSE_THRESH)
+            rng = np.random.default_rng(seed)
             nonzero_samples = []
             nonzero_weights = []
             for rr in range(nreals):
-                nonzero = weights[:,rr]!=0
-                mtot = samples[0][nonzero]
-                mrat = samples[1][nonzero]
-                redz = samples[2][nonzero]
-                fobs = samples[3][nonzero]
-                nonzero_samples.append([mtot, mrat, redz, fobs])
-                nonzero_weights.append(weights[:,rr][nonzero])
+                cells, counts = sampler.realize(rng)
+                nonzero_samples.append([ss[cells] for ss in samples])
+                nonzero_weights.append(counts)
     
             weights = nonzero_weights
             samples = nonzero_samples
+        else:
+            weights = gravwaves.poisson_as_needed(number.flatten(), nreals=nreals)
 
         return names, samples, weights
             
@@ -194,41 +196,23 @@ def get_samples_from_edges(edges, redz, number_shape, flatten=True):
         redz = np.moveaxis(redz, dd, 0)
         redz = kale.utils.midpoints(redz, axis=0) # get final redz at bin centers
         redz = np.moveaxis(redz, 0, dd)
-    sel = (redz > 0.0) # identify emitting sources
-    redz[~sel] = -1.0 # set all other redshifts to zero
-    redz[redz<0] = -1.0
-
-    # get bin shape
-    nmtot = len(mtot)
-    nmrat = len(mrat)
-    nredz = redz.shape[2]
-    nfobs = len(fobs)
-    # if np.any([number_shape[0] != nmtot, number_shape[1]!=nmrat, number_shape[2]!=nredz, number_shape[3]!=nfobs]):
-    #     err = f"Parameter bin shape [{nmtot=}, {nmrat=}, {nredz=}, {nfobs=}] does not match {number_shape=}."
-    #     raise ValueError(err)
-    print(f"Parameter bin shape [{nmtot=}, {nmrat=}, {nredz=}, {nfobs=}] should match {number_shape=}.")
-
-    # Reshape arrays to [M,Q,Z,F]
-    mtot = np.repeat(mtot, nmrat*nredz*nfobs).reshape(nmtot, nmrat, nredz, nfobs)
-
-    mrat = np.repeat(mrat, nmtot*nredz*nfobs).reshape(nmrat, nmtot, nredz, nfobs) # Q,M,Z,F
-    mrat = np.swapaxes(mrat, 0, 1) # M,Q,Z,F
-
-    fobs = np.repeat(fobs, nmrat*nredz*nmtot).reshape(nfobs, nmrat, nredz, nmtot) # F,Q,Z,M
-    fobs = np.swapaxes(fobs, 0, 3) # M,Q,Z,F
-
-    # check shapes again
-    if np.any([mtot.shape != number_shape, 
-                mrat.shape != number_shape,
-                redz.shape != number_shape,
-                fobs.shape != number_shape]):
-        err = f"Sample shapes don't all match number! {mtot.shape=}, {mrat.shape=}, {redz.shape=}, {fobs.shape=}"
+    redz[~(redz > 0.0)] = -1.0 # set redshifts of non-emitting sources to -1
+
+    number_shape = tuple(number_shape)
+    if redz.shape != number_shape:
+        err = f"Parameter bin shape {redz.shape=} does not match {number_shape=}."
+        log.exception(err)
         raise ValueError(err)
 
+    # Broadcast arrays to [M,Q,Z,F]
+    mtot = np.broadcast_to(mtot[:, np.newaxis, np.newaxis, np.newaxis], number_shape)
+    mrat = np.broadcast_to(mrat[np.newaxis, :, np.newaxis, np.newaxis], number_shape)
+    fobs = np.broadcast_to(fobs[np.newaxis, np.newaxis, np.newaxis, :], number_shape)
+
     if flatten:
         samples = [mtot.flatten(), mrat.flatten(), redz.flatten(), fobs.flatten()]
     else:
-        samples = [mtot, mrat, redz, fobs]
+        samples = [np.array(mtot), np.array(mrat), redz, np.array(fobs)]
 
     return samples
 
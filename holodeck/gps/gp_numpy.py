@@ -0,0 +1,539 @@
+"""Numpy/scipy Gaussian-Process backend, batched over frequencies.
+
+This module provides a self-contained alternative to the `george` + `emcee` GPs in
+`holodeck.gps.gp_utils`.  All frequency bins share the same training inputs (the library parameters), so
+kernel matrices, Cholesky factors and predictions are computed for all frequencies at once in stacked
+arrays of shape (F, N, N).  Hyperparameters are fit by maximizing the marginal likelihood with analytic
+gradients (L-BFGS-B), instead of MCMC sampling.
+
+The hyperparameters use the same parametrization as `gp_utils.GaussProc`, i.e. for each frequency
+
+    ``[log(amplitude), log(metric_0), ..., log(metric_{D-1}), log_alpha_0, ...]``
+
+where the `log_alpha` values are included (in order) for each parameter using a 'RationalQuadraticKernel'.
+Models can be converted in both directions with `Batched_GP.from_gauss_procs` and `Batched_GP.to_gauss_procs`,
+so that the outputs of this backend and of `gp_utils.train_gp` are interchangeable.
+
+"""
+
+import numpy as np
+import scipy as sp
+import scipy.optimize  # noqa
+
+from holodeck import utils
+
+#: Kernels supported by this backend, names match those of `george.kernels`
+KERNELS = ['ExpSquaredKernel', 'RationalQuadraticKernel']
+#: Bounds of all (log) hyperparameters, matching the prior ranges used by `gp_utils.GaussProc`
+PAR_MIN = -20.0
+PAR_MAX = +20.0
+
+_LOG_2PI = np.log(2.0 * np.pi)
+_BAD_LNLIKE = -1.0e25     # log-likelihood used for non-positive-definite kernel matrices during optimization
+
+
+class Batched_GP:
+    """Gaussian processes for F frequency bins, sharing the same N training points in D dimensions.
+
+    Attributes
+    ----------
+    x : (N, D) ndarray
+        Training inputs (library parameters).
+    y : (F, N) ndarray
+        Zero-mean training data at each frequency.
+    yerr : (F, N) ndarray
+        Uncertainties of the training data.
+    par_dict : dict
+        Parameter names and their 'min' and 'max' values.
+    kernel : dict
+        Kernel name for each parameter.
+    kernel_map : (F, P) ndarray or None
+        Best-fit hyperparameters for each frequency, set by `fit`.
+    mean_spectra : (F,) ndarray or None
+        Mean of the training data that was removed to produce `y`.
+
+    """
+
+    def __init__(self, x, y, yerr, par_dict, kernel="ExpSquaredKernel", y_is_variance=False, mean_spectra=None):
+        x = np.atleast_2d(x)
+        y = np.atleast_2d(y)
+        yerr = np.broadcast_to(yerr, y.shape)
+        par_list = list(par_dict.keys())
+        if (x.shape[1] != len(par_list)) or (y.shape[1] != x.shape[0]):
+            err = f"Shapes of `x` {x.shape}, `y` {y.shape} and `par_dict` ({len(par_list)}) are inconsistent!"
+            raise ValueError(err)
+
+        if isinstance(kernel, str):
+            kernel = {par: kernel for par in par_list}
+
+        kernel_lcase = [kk.lower() for kk in KERNELS]
+        try:
+            kernel = {par: KERNELS[kernel_lcase.index(kernel[par].lower())] for par in par_list}
+        except (ValueError, KeyError) as err:
+            err = f"Unsupported or missing kernel ({err})!  Each parameter must use one of {KERNELS}."
+            raise ValueError(err)
+
+        self.x = x
+        self.y = y
+        self.yerr = yerr
+        self.y_is_variance = y_is_variance
+        self.par_dict = par_dict
+        self.par_list = par_list
+        self.kernel = kernel
+        self.mean_spectra = None if mean_spectra is None else np.asarray(mean_spectra)
+        self.kernel_map = None
+
+        #: parameters using the 'RationalQuadraticKernel', in the order their `log_alpha` values are stored
+        self.uses_rational_quadratic = [par for par in kernel.keys() if kernel[par] == 'RationalQuadraticKernel']
+        self._rq_axes = [par_list.index(par) for par in self.uses_rational_quadratic]
+
+        # squared distances between training points along each dimension, (D, N, N)
+        self._d2 = self._sq_dists(x, x)
+        self._chol = None
+        self._chol_inv = None
+        self._alpha = None
+        return
+
+    @property
+    def nfreqs(self):
+        return self.y.shape[0]
+
+    @property
+    def npars(self):
+        """Number of hyperparameters for each frequency.
+        """
+        return 1 + len(self.par_list) + len(self.uses_rational_quadratic)
+
+    @property
+    def pmin(self):
+        return np.full(self.npars, PAR_MIN)
+
+    @property
+    def pmax(self):
+        return np.full(self.npars, PAR_MAX)
+
+    # ---- Kernels and likelihoods
+
+    @staticmethod
+    def _sq_dists(xx, yy):
+        return np.square(xx.T[:, :, np.newaxis] - yy.T[:, np.newaxis, :])
+
+    def _log_factors(self, pars, d2):
+        """Yield the log of the kernel factor along each dimension, and its hyperparameter derivatives.
+
+        Parameters
+        ----------
+        pars : (F, P) ndarray
+            Hyperparameters for each frequency.
+        d2 : (D, N, M) ndarray
+            Squared distances along each dimension.
+
+        Yields
+        ------
+        dd : int
+            Dimension number.
+        lnf : (F, N, M) ndarray
+            Log of the kernel factor along dimension `dd`.
+        dlnf_dtau : (F, N, M) ndarray
+            Derivative of `lnf` with respect to the log-metric of this dimension.
+        dlnf_dalpha : (F, N, M) ndarray or None
+            Derivative of `lnf` with respect to `log_alpha` for rational-quadratic kernels, otherwise None.
+
+        """
+        ndim = len(self.par_list)
+        for dd in range(ndim):
+            tau = np.exp(pars[:, 1+dd])[:, np.newaxis, np.newaxis]
+            if dd in self._rq_axes:
+                jj = 1 + ndim + self._rq_axes.index(dd)
+                alpha = np.exp(pars[:, jj])[:, np.newaxis, np.newaxis]
+                uu = d2[dd][np.newaxis, :, :] / (2.0 * alpha * tau)
+                log1pu = np.log1p(uu)
+                lnf = - alpha * log1pu
+                dlnf_dtau = alpha * uu / (1.0 + uu)
+                dlnf_dalpha = lnf + dlnf_dtau
+            else:
+                lnf = -0.5 * d2[dd][np.newaxis, :, :] / tau
+                dlnf_dtau = - lnf
+                dlnf_dalpha = None
+
+            yield dd, lnf, dlnf_dtau, dlnf_dalpha
+
+    def _kernel(self, pars, d2):
+        """Noise-free kernel matrices for each frequency, (F, N, M).
+        """
+        lnk = pars[:, 0, np.newaxis, np.newaxis]
+        for _, lnf, _, _ in self._log_factors(pars, d2):
+            lnk = lnk + lnf
+        return np.exp(lnk)
+
+    def log_likelihood(self, pars=None, grad=False):
+        """Log marginal likelihood of the training data, for each frequency.
+
+        Parameters
+        ----------
+        pars : (F, P) ndarray or None
+            Hyperparameters for each frequency.  If `None`, `kernel_map` is used.
+        grad : bool
+            Whether to also return the gradient with respect to `pars`.
+
+        Returns
+        -------
+        lnlike : (F,) ndarray
+            Log-likelihood for each frequency.  Frequencies whose kernel matrix is not positive definite are
+            given `-np.inf`.
+        dlnlike : (F, P) ndarray
+            Gradient of `lnlike`, only returned if `grad` is True.
+
+        """
+        pars = self._parse_pars(pars)
+        nfreqs, nn = self.y.shape
+        kern = self._kernel(pars, self._d2)
+        chol, good = _batched_cholesky(kern + _diag(np.square(self.yerr)))
+        chol_inv = _batched_tri_inv(chol)
+        kinv = np.einsum('fki,fkj->fij', chol_inv, chol_inv)
+        alpha = np.einsum('fij,fj->fi', kinv, self.y)
+
+        logdet = 2.0 * np.sum(np.log(np.diagonal(chol, axis1=1, axis2=2)), axis=-1)
+        lnlike = -0.5 * np.sum(self.y * alpha, axis=-1) - 0.5 * logdet - 0.5 * nn * _LOG_2PI
+        lnlike[~good] = -np.inf
+        if not grad:
+            return lnlike
+
+        # d(lnlike)/d(p) = 0.5 * tr[(alpha alpha^T - K^-1) dK/dp]
+        ww = alpha[:, :, np.newaxis] * alpha[:, np.newaxis, :] - kinv
+        ww *= kern
+        dlnlike = np.zeros_like(pars)
+        dlnlike[:, 0] = 0.5 * np.sum(ww, axis=(1, 2))
+        ndim = len(self.par_list)
+        for dd, _, dlnf_dtau, dlnf_dalpha in self._log_factors(pars, self._d2):
+            dlnlike[:, 1+dd] = 0.5 * np.sum(ww * dlnf_dtau, axis=(1, 2))
+            if dlnf_dalpha is not None:
+                jj = 1 + ndim + self._rq_axes.index(dd)
+                dlnlike[:, jj] = 0.5 * np.sum(ww * dlnf_dalpha, axis=(1, 2))
+
+        dlnlike[~good] = 0.0
+        return lnlike, dlnlike
+
+    def _parse_pars(self, pars):
+        if pars is None:
+            if self.kernel_map is None:
+                err = "Hyperparameters must be given, or set with `fit`!"
+                raise ValueError(err)
+            pars = self.kernel_map
+        pars = np.atleast_2d(pars)
+        if pars.shape != (self.nfreqs, self.npars):
+            err = f"Hyperparameters shape {pars.shape} should be (F, P)=({self.nfreqs}, {self.npars})!"
+            raise ValueError(err)
+        return pars
+
+    # ---- Training
+
+    def fit(self, nrestarts=4, seed=None, maxiter=1000):
+        """Fit the hyperparameters of all frequencies by maximizing the marginal likelihood.
+
+        All frequencies are optimized together (their likelihoods are independent, so the total is simply
+        the sum), so that each step requires only a single batched evaluation.  The optimization is repeated
+        from `nrestarts` different initial positions, and the best result for each frequency is kept.
+
+        Parameters
+        ----------
+        nrestarts : int
+            Number of optimizations from different starting points.
+        seed : int or None
+            Seed for the random starting points.
+        maxiter : int
+            Maximum number of L-BFGS-B iterations for each optimization.
+
+        Returns
+        -------
+        kernel_map : (F, P) ndarray
+            Best-fit hyperparameters for each frequency, also stored to `kernel_map`.
+
+        """
+        rng = np.random.default_rng(seed)
+        shape = (self.nfreqs, self.npars)
+        bounds = [(PAR_MIN, PAR_MAX)] * (self.nfreqs * self.npars)
+
+        def func(pp):
+            lnlike, dlnlike = self.log_likelihood(pp.reshape(shape), grad=True)
+            lnlike = np.where(np.isfinite(lnlike), lnlike, _BAD_LNLIKE)
+            return -np.sum(lnlike), -dlnlike.ravel()
+
+        # starting points are based on the variance of the data and the spread of the training points
+        base = np.zeros(shape)
+        base[:, 0] = np.log(np.var(self.y, axis=-1) + np.mean(np.square(self.yerr), axis=-1))
+        base[:, 1:1+len(self.par_list)] = np.log(np.var(self.x, axis=0) + 1e-10)[np.newaxis, :]
+
+        best = np.zeros(shape)
+        best_lnlike = np.full(self.nfreqs, -np.inf)
+        for ii in range(nrestarts):
+            p0 = base if ii == 0 else base + rng.normal(0.0, 1.0, shape)
+            p0 = np.clip(p0, PAR_MIN, PAR_MAX)
+            res = sp.optimize.minimize(func, p0.ravel(), jac=True, method='L-BFGS-B', bounds=bounds,
+                                       options=dict(maxiter=maxiter))
+            pars = res.x.reshape(shape)
+            lnlike = self.log_likelihood(pars)
+            sel = (lnlike > best_lnlike)
+            best[sel] = pars[sel]
+            best_lnlike[sel] = lnlike[sel]
+
+        if not np.all(np.isfinite(best_lnlike)):
+            bads = np.where(~np.isfinite(best_lnlike))[0]
+            err = f"GP fits failed for frequencies {bads}!"
+            raise RuntimeError(err)
+
+        self.kernel_map = best
+        self.compute()
+        return best
+
+    def compute(self, pars=None):
+        """Compute and store the Cholesky factors used for predictions.
+        """
+        if pars is not None:
+            self.kernel_map = self._parse_pars(pars)
+        pars = self._parse_pars(None)
+        kern = self._kernel(pars, self._d2) + _diag(np.square(self.yerr))
+        chol, good = _batched_cholesky(kern)
+        if not np.all(good):
+            err = f"Kernel matrices are not positive definite for frequencies {np.where(~good)[0]}!"
+            raise np.linalg.LinAlgError(err)
+
+        self._chol = chol
+        self._chol_inv = _batched_tri_inv(chol)
+        self._alpha = np.einsum('fki,fk->fi', self._chol_inv, np.einsum('fij,fj->fi', self._chol_inv, self.y))
+        return
+
+    # ---- Predictions
+
+    def predict(self, xnew, return_var=True):
+        """Predictive mean (and variance) of the zero-mean training data at new points, for all frequencies.
+
+        Parameters
+        ----------
+        xnew : (M, D) or (D,) array_like
+            Points at which to predict.
+        return_var : bool
+            Whether to also return the predictive variances.
+
+        Returns
+        -------
+        mean : (F, M) ndarray
+        var : (F, M) ndarray
+            Only if `return_var` is True.
+
+        """
+        if self._alpha is None:
+            self.compute()
+
+        xnew = np.atleast_2d(xnew)
+        pars = self.kernel_map
+        kstar = self._kernel(pars, self._sq_dists(self.x, xnew))     # (F, N, M)
+        mean = np.einsum('fnm,fn->fm', kstar, self._alpha)
+        if not return_var:
+            return mean
+
+        vv = np.einsum('fij,fjm->fim', self._chol_inv, kstar)
+        var = np.exp(pars[:, 0])[:, np.newaxis] - np.sum(vv**2, axis=1)
+        return mean, var
+
+    # ---- Conversion to and from `gp_utils.GaussProc`
+
+    @classmethod
+    def from_gauss_procs(cls, gp_george):
+        """Construct from a list of trained `gp_utils.GaussProc` instances (e.g. from `gp_utils.train_gp`).
+        """
+        gp0 = gp_george[0]
+        x = gp0.x
+        y = np.array([gp.y for gp in gp_george])
+        yerr = np.array([gp.yerr for gp in gp_george])
+        mean_spectra = np.array([gp.mean_spectra for gp in gp_george])
+        bgp = cls(x, y, yerr, gp0.par_dict, kernel=gp0.kernel, y_is_variance=gp0.y_is_variance,
+                  mean_spectra=mean_spectra)
+        if bgp.uses_rational_quadratic != gp0.uses_rational_quadratic:
+            err = "Parameter ordering of rational-quadratic kernels does not match!"
+            raise ValueError(err)
+
+        kernel_map = [gp.emcee_kernel_map for gp in gp_george]
+        if not np.any([km is None for km in kernel_map]):
+            bgp.compute(np.array(kernel_map))
+        return bgp
+
+    def to_gauss_procs(self):
+        """Convert to a list of `gp_utils.GaussProc` instances, usable with the existing `gp_utils` functions.
+
+        NOTE: this requires the `george` package.  Each `GaussProc` 'chain' contains only the best-fit point.
+        """
+        from holodeck.gps import gp_utils
+
+        gp_george = []
+        lnlike = None if self.kernel_map is None else self.log_likelihood()
+        for ii in range(self.nfreqs):
+            gp = gp_utils.GaussProc(self.x, self.y[ii], self.yerr[ii], self.y_is_variance, self.par_dict, self.kernel)
+            if self.kernel_map is not None:
+                gp.emcee_kernel_map = self.kernel_map[ii].copy()
+                gp.emcee_flatchain = self.kernel_map[ii][np.newaxis, :].copy()
+                gp.emcee_flatlnprob = lnlike[ii:ii+1].copy()
+            if self.mean_spectra is not None:
+                gp.mean_spectra = self.mean_spectra[ii]
+            gp_george.append(gp)
+
+        return gp_george
+
+
+def train_gp(spectra_file, nfreqs=30, test_frac=0.0, center_measure="median", y_is_variance=False,
+             kernel="ExpSquaredKernel", nrestarts=4, seed=None, maxiter=1000):
+    """Train batched numpy GPs on the first `nfreqs` of the GWB in `spectra_file`.
+
+    This is the counterpart of `gp_utils.train_gp`, using the same training data (see `gp_utils.get_gwb`).
+
+    Parameters
+    ----------
+    spectra_file : str or pathlib.Path
+        The spectral library
+    nfreqs : int
+        The number of frequencies to train on, starting with the lowest in the library
+    test_frac : float
+        Fraction of LHS points to reserve for testing. Reserves this fraction at the beginning of the samples.
+    center_measure : str, optional
+        The measure of center for the dataset that the GP will be trained on, "mean" or "median"
+    y_is_variance : bool, optional
+        Whether to train on the variance (spread) of the data, instead of its center
+    kernel : str or dict, optional
+        The kernel to use for all parameters, or a dictionary of {parameter: kernel}
+    nrestarts, seed, maxiter :
+        Passed to `Batched_GP.fit`.
+
+    Returns
+    -------
+    gp : `Batched_GP` instance
+        Trained GPs.
+
+    """
+    from holodeck.librarian import Library_Reader
+    from holodeck.gps.gp_utils import get_gwb, get_nreals
+
+    with Library_Reader(spectra_file) as spectra:
+        utils.my_print(f"Loaded spectra from {spectra_file}")
+        gp_freqs, xobs, yerr, yobs, yobs_mean = get_gwb(spectra, nfreqs, test_frac, center_measure)
+        pars = list(spectra.attrs["param_names"].astype(str))
+        nreals = get_nreals(spectra)
+
+    par_dict = {par: {"min": np.min(xobs[:, ind]), "max": np.max(xobs[:, ind])} for ind, par in enumerate(pars)}
+    # use the same training data and errors as `gp_utils.train_gp`
+    if y_is_variance:
+        yy = yerr
+        yerr = yerr / np.sqrt(2*nreals - 2)
+    else:
+        yy = yobs
+        yerr = yerr / np.sqrt(nreals)
+
+    gp = Batched_GP(xobs, yy.T, yerr.T, par_dict, kernel=kernel, y_is_variance=y_is_variance, mean_spectra=yobs_mean)
+    gp.fit(nrestarts=nrestarts, seed=seed, maxiter=maxiter)
+    return gp
+
+
+def hc_from_gp(gp, gp_variance, env_pars, include_gp_unc=True):
+    """Calculate the characteristic strain using batched GPs, the counterpart of `gp_utils.hc_from_gp`.
+
+    Parameters
+    ----------
+    gp : `Batched_GP`
+        GPs trained on the center of the spectra.
+    gp_variance : `Batched_GP`
+        GPs trained on the variance of the spectra.
+    env_pars : (D,) array_like
+        Ordered parameters for the GPs to use as input.
+    include_gp_unc : bool
+        Whether to include the uncertainty of the GP predictions themselves.
+
+    Returns
+    -------
+    hc : (F,) ndarray
+        Characteristic strains.
+    rho : (F,) ndarray
+        Predictive distribution means, shifted by the original data's means.
+    rho_pred : (F, 2) ndarray
+        Predictive distribution means and total uncertainties of the zero-mean data.
+
+    """
+    mean_pred, mean_pred_var = gp.predict(env_pars)
+    std_pred, std_pred_var = gp_variance.predict(env_pars)
+    mean_pred, mean_pred_var = mean_pred[:, 0], mean_pred_var[:, 0]
+    std_pred, std_pred_var = std_pred[:, 0], std_pred_var[:, 0]
+
+    if include_gp_unc:
+        total_pred_unc = np.sqrt(std_pred**2 + std_pred_var + mean_pred_var)
+    else:
+        total_pred_unc = std_pred
+
+    rho_pred = np.stack([mean_pred, total_pred_unc], axis=-1)
+    rho = gp.mean_spectra + mean_pred
+    hc = np.sqrt(10**rho)
+    return hc, rho, rho_pred
+
+
+def sample_hc_from_gp(gp, env_pars, nsamples=100, seed=None):
+    """Draw characteristic strain samples from the predictive distribution of batched GPs.
+
+    Parameters
+    ----------
+    gp : `Batched_GP`
+    env_pars : (D,) array_like
+        Ordered parameters for the GPs to use as input.
+    nsamples : int
+        The number of samples to draw.
+    seed : int or None
+        Random seed.
+
+    Returns
+    -------
+    hc : (S, F) ndarray
+        Characteristic strain samples.
+
+    """
+    rng = np.random.default_rng(seed)
+    mean, var = gp.predict(env_pars)
+    rho = gp.mean_spectra + mean[:, 0] + np.sqrt(np.maximum(var[:, 0], 0.0)) * rng.normal(size=(nsamples, gp.nfreqs))
+    return np.sqrt(10**rho)
+
+
+def _diag(vals):
+    """Construct stacked diagonal matrices (F, N, N) from (F, N) values.
+    """
+    out = np.zeros(vals.shape + vals.shape[-1:])
+    idx = np.arange(vals.shape[-1])
+    out[..., idx, idx] = vals
+    return out
+
+
+def _batched_cholesky(mats):
+    """Cholesky factors of stacked matrices, flagging (instead of raising on) non-positive-definite matrices.
+
+    Returns
+    -------
+    chol : (F, N, N) ndarray
+        Lower-triangular factors.  Failed entries are set to the identity.
+    good : (F,) ndarray of bool
+        Whether each factorization succeeded.
+
+    """
+    good = np.ones(mats.shape[0], dtype=bool)
+    try:
+        chol = np.linalg.cholesky(mats)
+    except np.linalg.LinAlgError:
+        chol = np.zeros_like(mats)
+        for ii, mm in enumerate(mats):
+            try:
+                chol[ii] = np.linalg.cholesky(mm)
+            except np.linalg.LinAlgError:
+                chol[ii] = np.eye(mm.shape[0])
+                good[ii] = False
+
+    return chol, good
+
+
+def _batched_tri_inv(chol):
+    """Inverse of stacked lower-triangular matrices (F, N, N).
+    """
+    eye = np.broadcast_to(np.eye(chol.shape[-1]), chol.shape)
+    return np.linalg.solve(chol, eye)
@@ -4,20 +4,28 @@ import time
 import warnings
 from functools import reduce
 from multiprocessing import Pool, cpu_count
+from pathlib import Path
 
-import emcee
-import george
-import george.kernels as kernels
-import h5py
 import numpy as np
-import schwimmbad
-from holodeck import utils
+from holodeck import utils, log
 from holodeck.constants import YR
 
+# NOTE: these are only required for `GaussProc` training and predictions; the data-loading functions (e.g. `get_gwb`)
+#       are also used by the numpy backend in `holodeck.gps.gp_numpy`, which does not need them.
+try:
+    import emcee
+    import george
+    import george.kernels as kernels
+    import schwimmbad
+except ImportError as err:
+    log.warning(f"failed to load GP packages in {__file__}: {err}")
+    log.warning("`george`, `emcee` and `schwimmbad` are required for `GaussProc`; see `holodeck.gps.gp_numpy`")
+
 VERBOSE = True
 
 FLOOR_STRAIN_SQUARED = 1e-40
 FLOOR_ERR = 1.0
+CHECKPOINT_FILE = "gp_freq{freq_ind:03d}.npz"
 
 
 class GaussProc(object):
@@ -171,7 +179,11 @@ def train_gp(spectra_file,
              center_measure="median",
              y_is_variance=False,
              kernel="ExpSquaredKernel",
-             mpi=True):
+             mpi=True,
+             parallel_freqs=False,
+             processes=1,
+             checkpoint_dir=None,
+             seed=None):
     """Train gaussian processes on the first `nfreqs` of the GWB in `spectra_file`.
 
     Parameters
@@ -198,6 +210,14 @@ def train_gp(spectra_file,
         The options to pass when constructing the kernel. Unpacks as **kwargs to george.kernels
     mpi : bool, optional
         Whether to use MPI or Python's multiprocessing module
+    parallel_freqs : bool, optional
+        Whether to fit different frequencies in parallel, see `fit_kernel_params`
+    processes : int, optional
+        Number of processes for a multiprocessing pool (when `mpi` is False)
+    checkpoint_dir : str or pathlib.Path or None, optional
+        Directory in which to checkpoint (and from which to resume) the fit of each frequency
+    seed : int or None, optional
+        Base random seed, from which an independent seed is spawned for each frequency
 
     Returns
     -------
@@ -208,7 +228,9 @@ def train_gp(spectra_file,
     FIXME: Add docs.
 
     """
-    spectra = h5py.File(spectra_file, "r")
+    # the library is read lazily, so only the frequencies being trained on are loaded
+    from holodeck.librarian import Library_Reader
+    spectra = Library_Reader(spectra_file)
 
     if VERBOSE:
         utils.my_print(f"Loaded spectra from {spectra_file}")
@@ -228,7 +250,7 @@ def train_gp(spectra_file,
         gp_george, num_kpars = create_gp_kernels(gp_freqs,
                                                  pars,
                                                  xobs,
-                                                 yerr=(yerr/np.sqrt(2*spectra['gwb'].shape[-1] - 2)),
+                                                 yerr=(yerr/np.sqrt(2*get_nreals(spectra) - 2)),
                                                  yobs=yerr,
                                                  y_is_variance=y_is_variance,
                                                  kernel=kernel)
@@ -237,7 +259,7 @@ def train_gp(spectra_file,
         gp_george, num_kpars = create_gp_kernels(gp_freqs,
                                                  pars,
                                                  xobs,
-                                                 yerr=(yerr/np.sqrt(spectra['gwb'].shape[-1])),
+                                                 yerr=(yerr/np.sqrt(get_nreals(spectra))),
                                                  yobs=yobs,
                                                  y_is_variance=y_is_variance,
                                                  kernel=kernel)
@@ -246,7 +268,8 @@ def train_gp(spectra_file,
     # to find MAP value for each frequency.
 
     fit_kernel_params(gp_freqs, yobs_mean, gp_george, num_kpars, nwalkers,
-                      nsamples, burn_frac, mpi)
+                      nsamples, burn_frac, mpi, parallel_freqs=parallel_freqs,
+                      processes=processes, checkpoint_dir=checkpoint_dir, seed=seed)
 
     return gp_george
 
@@ -256,7 +279,7 @@ def get_gwb(spectra, nfreqs, test_frac=0.0, center_measure="median"):
 
     Parameters
     ----------
-    spectra : h5py._hl.files.File
+    spectra : h5py._hl.files.File or `holodeck.librarian.Library_Reader`
         The variable containing the library in HDF5 format
     nfreqs : int
         The number of frequencies to train on, starting with the lowest in the
@@ -285,10 +308,13 @@ def get_gwb(spectra, nfreqs, test_frac=0.0, center_measure="median"):
     FIXME: Add docs.
 
     """
+    if spectra.attrs.get('stats_only', False):
+        return _get_gwb_from_stats(spectra, nfreqs, test_frac=test_frac, center_measure=center_measure)
+
     # Filter out NaN values which signify a failed sample point
-    # shape: (samples, freqs, realizations)
-    gwb_spectra = spectra['gwb']
-    xobs = spectra['sample_params']
+    # shape: (samples, freqs, realizations); only the frequencies being trained on are read
+    gwb_spectra = spectra['gwb'][:, :nfreqs, :]
+    xobs = spectra['sample_params'][()]
     bads = np.any(np.isnan(gwb_spectra), axis=(1, 2))
     if VERBOSE:
         utils.my_print(f"Found {utils.frac_str(bads)} samples with NaN entries.  Removing them from library.")
@@ -307,7 +333,7 @@ def get_gwb(spectra, nfreqs, test_frac=0.0, center_measure="median"):
     if VERBOSE:
         utils.my_print(f"setting aside {test_frac} of samples ({test_ind}) for testing, and choosing {nfreqs} frequencies")
 
-    gwb_spectra = gwb_spectra[test_ind:, :nfreqs, :]**2
+    gwb_spectra = gwb_spectra[test_ind:, :, :]**2
     xobs = xobs[test_ind:, :]
 
     # Find all the zeros and set them to be h_c = 1e-20
@@ -349,6 +375,84 @@ def get_gwb(spectra, nfreqs, test_frac=0.0, center_measure="median"):
     return gp_freqs, xobs, yerr, yobs, yobs_mean
 
 
+def _get_gwb_from_stats(spectra, nfreqs, test_frac=0.0, center_measure="median"):
+    """Get the GWB training data from a statistics-only library (see `holodeck.librarian.run_model`).
+
+    This is the counterpart of `get_gwb`, using the statistics over realizations stored in the library
+    instead of the realizations themselves.  The median is taken from the stored quantiles, the mean
+    of the squared strain from the mean and standard deviation of the strain, and the error from the
+    standard deviation of the log strain (floored at `FLOOR_STRAIN_SQUARED`, as in `get_gwb`).
+
+    Parameters and returns are the same as `get_gwb`.
+
+    """
+    quantiles = spectra['stats_quantiles'][()]
+    xobs = spectra['sample_params'][()]
+    gwb_mean = spectra['gwb_mean'][:, :nfreqs]
+    bads = np.any(np.isnan(gwb_mean), axis=1)
+    if VERBOSE:
+        utils.my_print(f"Found {utils.frac_str(bads)} samples with NaN entries.  Removing them from library.")
+    if 'mmb_amp' in spectra.attrs['param_names']:
+        raise RuntimeError("Parameter `mmb_amp` should not be here!  Needs to be log-spaced (`mmb_amp_log10`)!")
+
+    good = ~bads
+    test_ind = int(np.count_nonzero(good) * test_frac)
+    if VERBOSE:
+        utils.my_print(f"setting aside {test_frac} of samples ({test_ind}) for testing, and choosing {nfreqs} frequencies")
+
+    def _load(key):
+        return spectra[key][:, :nfreqs][good][test_ind:]
+
+    xobs = xobs[good][test_ind:, :]
+
+    if center_measure.lower() == "median":
+        idx = np.argmin(np.abs(quantiles - 0.5))
+        if not np.isclose(quantiles[idx], 0.5):
+            raise ValueError(f"Library `stats_quantiles` ({quantiles}) do not include the median!")
+        center = _load('gwb_quantiles')[..., idx]**2
+    elif center_measure.lower() == "mean":
+        center = _load('gwb_mean')**2 + _load('gwb_std')**2
+    else:
+        raise ValueError(
+            f"`center_measure` must be 'mean' or 'median', not '{center_measure}'"
+        )
+    center = np.log10(np.maximum(center, FLOOR_STRAIN_SQUARED))
+
+    # log-moments were calculated from strains floored at `sqrt(FLOOR_STRAIN_SQUARED)`; if the mean is at
+    # the floor, then all realizations were
+    log_mean = _load('gwb_log_mean')
+    low_real = (log_mean <= 0.5 * np.log10(FLOOR_STRAIN_SQUARED))
+    err = np.where(low_real, FLOOR_ERR, 2.0 * _load('gwb_log_std'))
+
+    yobs = center.copy()
+    yerr = err.copy()
+    gp_freqs = spectra["fobs"][:nfreqs].copy()
+    gp_freqs *= YR
+
+    yobs_mean = np.mean(yobs, axis=0)
+    yobs -= yobs_mean[None, :]
+
+    return gp_freqs, xobs, yerr, yobs, yobs_mean
+
+
+def get_nreals(spectra):
+    """Number of realizations used to construct the given library.
+
+    Parameters
+    ----------
+    spectra : h5py._hl.files.File or `holodeck.librarian.Library_Reader`
+        The variable containing the library in HDF5 format
+
+    Returns
+    -------
+    nreals : int
+
+    """
+    if spectra.attrs.get('stats_only', False):
+        return int(spectra.attrs['nreals'])
+    return spectra['gwb'].shape[-1]
+
+
 '''
 def get_parameter_values(spectra, test_frac=0.0):
     """Get array of GWB parameters.
@@ -447,7 +551,8 @@ def create_gp_kernels(gp_freqs, pars, xobs, yerr, yobs, y_is_variance, kernel):
 
 
 def fit_kernel_params(gp_freqs, yobs_mean, gp_george, nkpars, nwalkers,
-                      nsamples, burn_frac, mpi, sample_kwargs={}):
+                      nsamples, burn_frac, mpi, sample_kwargs={},
+                      parallel_freqs=False, processes=1, checkpoint_dir=None, seed=None):
     """Fit the parameters of the GP kernels.
 
     Parameters
@@ -466,75 +571,189 @@ def fit_kernel_params(gp_freqs, yobs_mean, gp_george, nkpars, nwalkers,
         Number of emcee samples
     burn_frac : float
         Burn-in fraction to discard from chains
-
+    mpi : bool
+        Whether to use MPI or Python's multiprocessing module for the pool
+    sample_kwargs : dict, optional
+        Additional kwargs passed to the first burn-in call of `emcee.EnsembleSampler.run_mcmc`
+    parallel_freqs : bool, optional
+        If True, the pool is used to fit different frequencies in parallel (each with a serial emcee sampler),
+        otherwise frequencies are fit one after another, with the pool used to parallelize each emcee sampler.
+    processes : int, optional
+        Number of processes to use for a multiprocessing pool (ignored if `mpi` is True).
+        With the default of 1, everything is run serially.
+    checkpoint_dir : str or pathlib.Path or None, optional
+        If given, the chains of each frequency are saved to this directory as soon as they finish, and
+        frequencies that already have a checkpoint are loaded instead of being re-fit.
+    seed : int or None, optional
+        Entropy for a `numpy.random.SeedSequence`, from which an independent child seed is spawned for each
+        frequency, so that results are independent of the order (and process) in which frequencies are fit.
+        If None, fresh entropy is used, but each frequency still gets its own random stream.
 
     Examples
     --------
     FIXME: Add docs.
 
     """
-    sampler = [0.0] * len(gp_freqs)
-    ndim = nkpars
-    utils.my_print(f"{mpi=}")
-    pool = schwimmbad.choose_pool(
-        mpi=mpi)  # processes=min(nwalkers // 2, cpu_count()) )
+    nfreqs = len(gp_freqs)
+    pool = schwimmbad.choose_pool(mpi=mpi, processes=processes)
 
     # Schwimmbad docs are not clear if this needs to be here if we are passing the pool to
-    # EnsembleSampler, but I've added it just in case.
+    # EnsembleSampler, but I've added it just in case.  Worker ranks must always wait here, even if all
+    # frequencies are loaded from checkpoints, until the master closes the pool.
     if mpi and not pool.is_master():
         pool.wait()
         sys.exit(0)
 
-    for freq_ind in range(len(gp_freqs)):
-        # Paralellize emcee with nwalkers //2 or the maximum number of processors available, whichever is smaller
-        # with Pool(min(nwalkers // 2, cpu_count())) as pool:
-        t_start = time.time()
-
-        # Set up the sampler.
-        sampler[freq_ind] = emcee.EnsembleSampler(nwalkers,
-                                                  ndim,
-                                                  gp_george[freq_ind].lnprob,
-                                                  pool=pool)
-
-        # Initialize the walkers.
-        p0 = [
-            np.random.uniform(gp_george[freq_ind].pmin[0],
-                              gp_george[freq_ind].pmax[0], ndim)
-            for _ in range(nwalkers)
+    if checkpoint_dir is not None:
+        checkpoint_dir = Path(checkpoint_dir)
+        checkpoint_dir.mkdir(parents=True, exist_ok=True)
+
+    # ---- load existing checkpoints
+
+    chains = [None] * nfreqs
+    for freq_ind in range(nfreqs):
+        if checkpoint_dir is None:
+            break
+        fname = _get_checkpoint_fname(checkpoint_dir, freq_ind)
+        if fname.exists():
+            chains[freq_ind] = _load_checkpoint(
+                fname, gp_george[freq_ind], nkpars, yobs_mean[freq_ind], nwalkers, nsamples, burn_frac
+            )
+
+    todo = [ii for ii in range(nfreqs) if chains[ii] is None]
+    utils.my_print(f"{mpi=} {parallel_freqs=} | {nfreqs-len(todo)}/{nfreqs} frequencies loaded from checkpoints")
+
+    # ---- fit remaining frequencies
+
+    if len(todo) > 0:
+        # spawn seeds for all frequencies (not only those to-do), so that each frequency's seed does not
+        # depend on which checkpoints exist; forked workers would otherwise share the global random state
+        seeds = np.random.SeedSequence(seed).spawn(nfreqs)
+        tasks = [
+            (ii, nfreqs, gp_george[ii], nkpars, yobs_mean[ii], nwalkers, nsamples, burn_frac, sample_kwargs,
+             seeds[ii], checkpoint_dir)
+            for ii in todo
         ]
+        if parallel_freqs:
+            # each task runs a serial sampler, and checkpoints itself upon completion
+            results = pool.map(_fit_kernel_params_at_freq, tasks)
+        else:
+            results = [_fit_kernel_params_at_freq(task, pool=pool) for task in tasks]
 
-        utils.my_print(freq_ind, "Running burn-in")
-        p0, lnp, _ = sampler[freq_ind].run_mcmc(p0, int(burn_frac * nsamples), **sample_kwargs)
-        sampler[freq_ind].reset()
-
-        utils.my_print(freq_ind, "Running second burn-in")
-        p = p0[np.argmax(lnp)]
-        p0 = [p + 1e-8 * np.random.randn(ndim) for _ in range(nwalkers)]
-        p0, _, _ = sampler[freq_ind].run_mcmc(p0, int(burn_frac * nsamples))
-        sampler[freq_ind].reset()
-
-        utils.my_print(freq_ind, "Running production")
-        p0, _, _ = sampler[freq_ind].run_mcmc(p0, int(nsamples))
+        for ii, res in zip(todo, results):
+            chains[ii] = res
 
-        utils.my_print(
-            f"Completed {freq_ind} out of {len(gp_freqs)-1} in {(time.time() - t_start) / 60.0:.2f} min\n"
-        )
-
-    # Close the pool
+    # Close the pool, this also releases any waiting MPI workers
     pool.close()
+
     # Populate the GP class with the details of the kernel
     # MAP values for each frequency.
-    for ii in range(len(gp_freqs)):
-        gp_george[ii].emcee_flatchain = sampler[ii].flatchain
-        gp_george[ii].emcee_flatlnprob = sampler[ii].flatlnprobability
+    for ii in range(nfreqs):
+        flatchain, flatlnprob = chains[ii]
+        gp_george[ii].emcee_flatchain = flatchain
+        gp_george[ii].emcee_flatlnprob = flatlnprob
 
-        gp_george[ii].emcee_kernel_map = sampler[ii].flatchain[np.argmax(
-            sampler[ii].flatlnprobability)]
+        gp_george[ii].emcee_kernel_map = flatchain[np.argmax(flatlnprob)]
 
         # add-in mean yobs (freq) values
         gp_george[ii].mean_spectra = yobs_mean[ii]
 
 
+def _fit_kernel_params_at_freq(task, pool=None):
+    """Run the emcee fit of the kernel parameters for a single frequency.
+
+    Parameters
+    ----------
+    task : tuple
+        (freq_ind, nfreqs, gp, nkpars, center, nwalkers, nsamples, burn_frac, sample_kwargs, seed, checkpoint_dir)
+        Packed into a single argument so that this function can be mapped over a pool.
+        `seed` is a `numpy.random.SeedSequence` (or anything accepted by `numpy.random.default_rng`).
+    pool : pool instance or None
+        Pool used to parallelize the emcee sampler itself.
+
+    Returns
+    -------
+    flatchain : (N, nkpars) numpy.array
+    flatlnprob : (N,) numpy.array
+
+    """
+    freq_ind, nfreqs, gp, nkpars, center, nwalkers, nsamples, burn_frac, sample_kwargs, seed, checkpoint_dir = task
+    ndim = nkpars
+    t_start = time.time()
+    rng = np.random.default_rng(seed)
+
+    # Set up the sampler.
+    # emcee copies the global `np.random` state on construction, so replace it with one drawn from `rng`
+    sampler = emcee.EnsembleSampler(nwalkers, ndim, gp.lnprob, pool=pool)
+    sampler.random_state = np.random.RandomState(rng.integers(2**32)).get_state()
+
+    # Initialize the walkers.
+    p0 = [rng.uniform(gp.pmin[0], gp.pmax[0], ndim) for _ in range(nwalkers)]
+
+    utils.my_print(freq_ind, "Running burn-in")
+    p0, lnp, _ = sampler.run_mcmc(p0, int(burn_frac * nsamples), **sample_kwargs)
+    sampler.reset()
+
+    utils.my_print(freq_ind, "Running second burn-in")
+    p = p0[np.argmax(lnp)]
+    p0 = [p + 1e-8 * rng.standard_normal(ndim) for _ in range(nwalkers)]
+    p0, _, _ = sampler.run_mcmc(p0, int(burn_frac * nsamples))
+    sampler.reset()
+
+    utils.my_print(freq_ind, "Running production")
+    p0, _, _ = sampler.run_mcmc(p0, int(nsamples))
+
+    flatchain = sampler.flatchain
+    flatlnprob = sampler.flatlnprobability
+    if checkpoint_dir is not None:
+        fname = _get_checkpoint_fname(checkpoint_dir, freq_ind)
+        _save_checkpoint(fname, gp, nkpars, center, flatchain, flatlnprob, nwalkers, nsamples, burn_frac)
+
+    utils.my_print(
+        f"Completed {freq_ind} out of {nfreqs-1} in {(time.time() - t_start) / 60.0:.2f} min\n"
+    )
+    return flatchain, flatlnprob
+
+
+def _get_checkpoint_fname(checkpoint_dir, freq_ind):
+    return Path(checkpoint_dir).joinpath(CHECKPOINT_FILE.format(freq_ind=freq_ind))
+
+
+def _checkpoint_kernel(gp):
+    """String identifying the kernel of each parameter of `gp`, e.g. 'alpha:ExpSquaredKernel,beta:...'.
+    """
+    return ",".join([f"{par}:{gp.kernel[par]}" for par in sorted(gp.kernel.keys())])
+
+
+def _save_checkpoint(fname, gp, nkpars, center, flatchain, flatlnprob, nwalkers, nsamples, burn_frac):
+    # write to a temporary file first, so that an interrupted write never leaves a truncated checkpoint
+    temp = fname.with_name("_" + fname.name)
+    np.savez(temp, flatchain=flatchain, flatlnprob=flatlnprob, x=gp.x, y=gp.y,
+             kernel=_checkpoint_kernel(gp), nkpars=nkpars, center=center,
+             nwalkers=nwalkers, nsamples=nsamples, burn_frac=burn_frac)
+    temp.replace(fname)
+    return
+
+
+def _load_checkpoint(fname, gp, nkpars, center, nwalkers, nsamples, burn_frac):
+    """Load the chains from a checkpoint file, after verifying it matches the current training data and settings.
+
+    The kernel (and number of kernel parameters) and the spectrum center (which depends on `center_measure`)
+    are compared as well, so that chains with the wrong parameter dimension are never reused.
+    """
+    data = np.load(fname)
+    settings = dict(kernel=_checkpoint_kernel(gp), nkpars=nkpars, center=center,
+                    nwalkers=nwalkers, nsamples=nsamples, burn_frac=burn_frac)
+    match = all([kk in data for kk in settings.keys()])
+    match = match and np.array_equal(data['x'], gp.x) and np.array_equal(data['y'], gp.y)
+    match = match and all([np.array_equal(data[kk], vv) for kk, vv in settings.items()])
+    if not match:
+        err = f"Checkpoint {fname} does not match the current training data or settings!  Use a new checkpoint path."
+        raise ValueError(err)
+
+    return data['flatchain'], data['flatlnprob']
+
+
 def set_up_predictions(spectra, gp_george):
     """Set up a list of GPs ready for predictions.
 
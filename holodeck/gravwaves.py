@@ -17,6 +17,16 @@ from holodeck.constants import SPLC, NWTG, MPC
 
 
 _CALC_MC_PARS = ['mass', 'sepa', 'dadt', 'scafa', 'eccen']
+#: maximum number of elements in each (binaries, targets) array when interpolating evolution for GW emission
+_EMIT_MAX_ELEMENTS = 2**22
+#: expectation number of binaries below which GW emission realizations are drawn sparsely
+_EMIT_SPARSE_THRESH = 1.0
+#: expectation number of binaries above which GW emission realizations are drawn in aggregate
+_EMIT_GAUSS_THRESH = 1.0e3
+#: number of lattice points of the characteristic-function inversion used for quantiles in `gwb_poisson_stats`
+_GWB_STATS_NFFT = 2**16
+#: expectation number of the loudest binaries excluded from the quantile calculation in `gwb_poisson_stats`
+_GWB_STATS_TAIL = 1.0e-3
 
 
 class Grav_Waves:
@@ -40,9 +50,30 @@ class GW_Discrete(Grav_Waves):
         self._box_vol_cgs = self._bin_evo._sample_volume
         return
 
-    def emit(self, eccen=None, stats=False, progress=True, nloudest=5):
-        fobs_gw = self.fobs_gw
-        nfreqs = fobs_gw.size
+    def emit(self, eccen=None, stats=False, progress=True, nloudest=5, chunk=None):
+        """Calculate the GW signals from the discrete binary population at all observed frequencies.
+
+        All frequencies and harmonics are interpolated together (in chunks of frequencies, see
+        `_gws_harmonics_at_evo_fobs_all`), and results are stored to the `both`, `fore`, `back`,
+        `strain`, `loudest` and `harms` attributes.
+
+        Parameters
+        ----------
+        eccen : None or bool,
+            Whether to include eccentric harmonics.  If `None`, eccentric harmonics are included if
+            the binary evolution has eccentricities.
+        stats : bool,
+            Unused.
+        progress : bool,
+            Show a progress bar over chunks of frequencies.
+        nloudest : int,
+            Number of loudest binaries to store for each frequency and realization.
+        chunk : None or int,
+            Number of frequencies to interpolate at once.  If `None`, chosen such that the
+            interpolation intermediates are bounded by `_EMIT_MAX_ELEMENTS` elements.
+
+        """
+        fobs_gw = np.asarray(self.fobs_gw)
         nharms = self.nharms
         nreals = self.nreals
         bin_evo = self._bin_evo
@@ -54,32 +85,22 @@ class GW_Discrete(Grav_Waves):
         if eccen not in [True, False]:
             raise ValueError("`eccen` '{}' is invalid!".format(eccen))
 
-        loudest = np.zeros((nfreqs, nloudest, nreals))
-        fore = np.zeros((nfreqs, nreals))
-        back = np.zeros((nfreqs, nreals))
-        both = np.zeros((nfreqs, nreals))
-
         if eccen:
             harm_range = range(1, nharms+1)
         else:
             harm_range = [2]
 
-        harms = np.zeros((nfreqs, nharms))
+        # log-width of each frequency bin, the first bin uses the width of the second
+        lnf = np.log(fobs_gw)
+        dlnf = np.diff(lnf, prepend=2*lnf[0] - lnf[1])
 
-        freq_iter = enumerate(fobs_gw)
-        freq_iter = utils.tqdm(freq_iter, total=len(fobs_gw), desc='GW frequencies') if progress else freq_iter
-        for ii, fogw in freq_iter:
-            lo = fobs_gw[0] if (ii == 0) else fobs_gw[ii-1]
-            hi = fobs_gw[1] if (ii == 0) else fobs_gw[ii]
-            dlnf = np.log(hi) - np.log(lo)
-            _both, _fore, _back, _loud, _gwb_harms = _gws_harmonics_at_evo_fobs(
-                fogw, dlnf, bin_evo, harm_range, nreals, box_vol, loudest=nloudest
-            )
-            loudest[ii, :] = _loud
-            both[ii, :] = _both
-            fore[ii, :] = _fore
-            back[ii, :] = _back
-            harms[ii, :] = _gwb_harms
+        both, fore, back, loudest, gwb_harms = _gws_harmonics_at_evo_fobs_all(
+            fobs_gw, dlnf, bin_evo, harm_range, nreals, box_vol,
+            loudest=nloudest, chunk=chunk, progress=progress,
+        )
+        # for circular binaries there is only a single harmonic, broadcast to all `nharms`
+        harms = np.zeros((fobs_gw.size, nharms))
+        harms[...] = gwb_harms
 
         self.both = np.sqrt(both)
         self.fore = np.sqrt(fore)
@@ -224,6 +245,228 @@ def _gws_harmonics_at_evo_fobs(fobs_gw, dlnf, evo, harm_range, nreals, box_vol,
     return both, fore, back, loud, gwb_harms
 
 
+def _gws_harmonics_at_evo_fobs_all(fobs_gw, dlnf, evo, harm_range, nreals, box_vol, loudest=5,
+                                   chunk=None, progress=False):
+    """Calculate GW signals at all harmonics of many observer-frame GW frequencies.
+
+    This is a vectorized version of `_gws_harmonics_at_evo_fobs`.  The binary evolution is
+    interpolated to all frequencies and harmonics in a single call to `Evolution.at` (per chunk of
+    frequencies), Poisson realizations are only drawn for binaries that contribute, rare binaries are
+    realized sparsely, and the loudest sources are found by partial selection (see
+    `_realize_discrete_gws`).
+
+    Parameters
+    ----------
+    fobs_gw : (F,) array_like
+        Observer-frame GW-frequencies in units of [1/sec].
+    dlnf : (F,) array_like
+        Log-width of each observered-frequency bin, i.e. $\\Delta \\ln f$.
+    evo : `holodeck.evolution.Evolution`
+        Initialized and evolved binary evolution instance.
+    harm_range : list[int]
+        Harmonics of the orbital-frequency at which to calculate GW emission.
+    nreals : int
+        Number of realizations to calculate in Poisson sampling.
+    box_vol : float
+        Volume of the simulation box that the binary population is derived from.  Units of [cm^3].
+    loudest : int
+        Number of 'loudest' (highest amplitude) strain values to calculate and return separately.
+    chunk : None or int
+        Number of frequencies to interpolate at once.  If `None`, chosen such that the
+        (N, T) interpolated arrays from `Evolution.at` have at most `_EMIT_MAX_ELEMENTS` elements.
+    progress : bool
+        Show a progress bar over chunks of frequencies.
+
+    Returns
+    -------
+    both : (F, R) ndarray,
+        Combined (background + foreground) GW Strain-squared at each frequency.
+    fore : (F, R) ndarray,
+        GW foreground strain-squared (i.e. loudest single source) at each frequency.
+    back : (F, R) ndarray,
+        GW background strain-squared (i.e. all sources except for the loudest) at each frequency.
+    loud : (F, L, R) ndarray,
+        Strain-squared of the `L` loudest binaries (L=`loudest` input parameter).
+    gwb_harms : (F, H) ndarray,
+        Expectation value of the GWB strain-squared from each harmonic.
+
+    """
+    fobs_gw = np.atleast_1d(fobs_gw)
+    nfreqs = fobs_gw.size
+    dlnf = np.broadcast_to(dlnf, fobs_gw.shape)
+    harm_range = np.atleast_1d(harm_range)
+    nharms = harm_range.size
+    nbins = evo.size
+
+    if chunk is None:
+        chunk = int(_EMIT_MAX_ELEMENTS // (nbins * nharms))
+    chunk = int(np.clip(chunk, 1, nfreqs))
+
+    both = np.zeros((nfreqs, nreals))
+    fore = np.zeros((nfreqs, nreals))
+    loud = np.zeros((nfreqs, loudest, nreals))
+    gwb_harms = np.zeros((nfreqs, nharms))
+
+    chunk_iter = range(0, nfreqs, chunk)
+    if progress:
+        chunk_iter = utils.tqdm(chunk_iter, desc='GW frequencies')
+
+    for lo in chunk_iter:
+        hi = min(lo + chunk, nfreqs)
+        nc = hi - lo
+        # (C*H,) observer-frame orbital-frequency for each frequency and harmonic, and their indices
+        fobs_orb = (fobs_gw[lo:hi, np.newaxis] / harm_range[np.newaxis, :]).flatten()
+        fidx = np.repeat(np.arange(nc), nharms)
+        harms = np.tile(harm_range, nc)
+        # Each parameter will be (N, C*H)
+        data_harms = evo.at('fobs', fobs_orb, params=_CALC_MC_PARS)
+
+        redz = cosmo.a_to_z(data_harms['scafa'])
+        # (N, C*H) ==> there are 'V' valid elements
+        valid = (redz > 0.0)
+        # (V,) index of the target (frequency & harmonic) for each valid element
+        tidx = np.nonzero(valid)[1]
+        harms_1d = harms[tidx]
+
+        eccen = data_harms['eccen']
+        if eccen is None:
+            gne = 1
+            assert np.all(harm_range == 2)
+        else:
+            eccen = eccen[valid]
+            gne = utils.gw_freq_dist_func(harms_1d, ee=eccen)
+            # when eccentricity is very low, set all harmonics to zero except for n=2
+            sel_e0 = (eccen < 1e-12)
+            gne[sel_e0] = 0.0
+            gne[sel_e0 & (harms_1d == 2)] = 1.0
+
+        redz = redz[valid]
+        frst_orb = utils.frst_from_fobs(fobs_orb[tidx], redz)
+        dcom = holo.cosmo_interp.z_to_dcom(redz)
+        mchirp = utils.chirp_mass(*data_harms['mass'][valid].T)
+        hs2 = utils.gw_strain_source(mchirp, dcom, frst_orb)**2
+
+        dfdt, _ = utils.dfdt_from_dadt(data_harms['dadt'][valid], data_harms['sepa'][valid], frst_orb=frst_orb)
+        _dlnf = dlnf[lo:hi][fidx[tidx]]
+        num_binaries = utils.lambda_factor_dlnf(frst_orb, dfdt, redz, dcom=dcom) * _dlnf / box_vol
+        # (V,) strain-squared per binary (per unit log-frequency) including harmonic weighting
+        temp = hs2 * gne * (2.0 / harms_1d)**2
+
+        # Expectation value of hc^2 for each frequency and harmonic, (C*H,) ==> (C, H)
+        gwb_harms[lo:hi] = np.bincount(
+            tidx, weights=temp * num_binaries / _dlnf, minlength=nc*nharms
+        ).reshape(nc, nharms)
+
+        # group valid elements by frequency to draw realizations
+        fidx = fidx[tidx]
+        order = np.argsort(fidx, kind='stable')
+        bounds = np.searchsorted(fidx[order], np.arange(nc + 1))
+        for ii in range(nc):
+            sel = order[bounds[ii]:bounds[ii+1]]
+            both[lo+ii], fore[lo+ii], loud[lo+ii] = _realize_discrete_gws(
+                temp[sel], num_binaries[sel], dlnf[lo+ii], nreals, loudest
+            )
+
+    back = both - fore
+    return both, fore, back, loud, gwb_harms
+
+
+def _realize_discrete_gws(hs2, num_exp, dlnf, nreals, loudest):
+    """Draw Poisson realizations of discrete binaries, and sum their GW strains at one frequency.
+
+    Binaries are realized in one of three ways depending on their expectation number:
+
+    * Above `_EMIT_GAUSS_THRESH`, each binary's number is approximately normally distributed, so
+      their summed strain is drawn from a single normal distribution per realization.  These
+      binaries are always present, so they are loudest-source candidates in every realization.
+    * Above `_EMIT_SPARSE_THRESH`, binaries are realized densely with `poisson_as_needed`.
+    * Below it, the total number of occurrences over all realizations is drawn as Poisson(R*num),
+      and each occurrence is assigned to a uniformly random realization.  This is exactly
+      equivalent to independent Poisson draws in each realization, but only costs memory and time
+      proportional to the number of binaries that actually occur.
+
+    Parameters
+    ----------
+    hs2 : (V,) ndarray
+        Strain-squared contribution of each binary (including harmonic weighting).
+    num_exp : (V,) ndarray
+        Expectation value of the number of each binary.
+    dlnf : float
+        Log-width of the observered-frequency bin.
+    nreals : int
+        Number of realizations.
+    loudest : int
+        Number of loudest binaries to return.
+
+    Returns
+    -------
+    both : (R,) ndarray
+        Total GW strain-squared.
+    fore : (R,) ndarray
+        Strain-squared of the loudest binary.
+    loud : (L, R) ndarray
+        Strain-squared of the `L` loudest binaries, in decreasing order.
+
+    """
+    # binaries with no strain or no expected number never contribute
+    sel = (hs2 > 0.0) & (num_exp > 0.0)
+    hs2 = hs2[sel]
+    num_exp = num_exp[sel]
+
+    both = np.zeros(nreals)
+    # candidates for the loudest binaries, each (L, R)
+    cands = [np.zeros((loudest, nreals))]
+
+    # ---- aggregate realizations of very common binaries
+    gauss = (num_exp > _EMIT_GAUSS_THRESH)
+    if np.any(gauss):
+        hh = hs2[gauss]
+        mean = np.sum(hh * num_exp[gauss])
+        stdev = np.sqrt(np.sum(hh**2 * num_exp[gauss]))
+        both += np.random.normal(mean, stdev, size=nreals)
+        if loudest < hh.size:
+            hh = np.partition(hh, hh.size - loudest)[-loudest:]
+        cands.append(np.broadcast_to(hh[:, np.newaxis], (hh.size, nreals)))
+
+    # ---- dense realizations of common binaries
+    dense = (num_exp > _EMIT_SPARSE_THRESH) & ~gauss
+    if np.any(dense):
+        hh = hs2[dense]
+        # (D, R)
+        num_pois = poisson_as_needed(num_exp[dense], nreals=nreals)
+        both += hh @ num_pois
+        # strains of binaries that occur in each realization, select the L largest without a full sort
+        vals = hh[:, np.newaxis] * (num_pois > 0)
+        if loudest < hh.size:
+            vals = -np.partition(-vals, loudest - 1, axis=0)[:loudest]
+        cands.append(vals)
+
+    # ---- sparse realizations of rare binaries
+    sparse = (num_exp <= _EMIT_SPARSE_THRESH)
+    if np.any(sparse):
+        hh = hs2[sparse]
+        ntot = np.random.poisson(num_exp[sparse] * nreals)
+        bidx = np.repeat(np.arange(hh.size), ntot)
+        ridx = np.random.randint(0, nreals, bidx.size)
+        both += np.bincount(ridx, weights=hh[bidx], minlength=nreals)
+        # each binary only counts once towards the loudest in a given realization
+        bidx, ridx = np.divmod(np.unique(bidx * nreals + ridx), nreals)
+        vals = hh[bidx]
+        # sort by realization, then by decreasing strain; keep the first L in each realization
+        order = np.lexsort((-vals, ridx))
+        ridx = ridx[order]
+        rank = np.arange(ridx.size) - np.searchsorted(ridx, ridx)
+        keep = (rank < loudest)
+        temp = np.zeros((loudest, nreals))
+        temp[rank[keep], ridx[keep]] = vals[order][keep]
+        cands.append(temp)
+
+    loud = np.concatenate(cands, axis=0)
+    loud = -np.sort(-loud, axis=0)[:loudest]
+    fore = loud[0].copy()
+    return both / dlnf, fore, loud
+
+
 def _gws_from_samples(vals, weights, fobs_gw_edges):
     """Calculate GW signals at the given frequencies, from weighted samples of a binary population.
 
@@ -402,7 +645,7 @@ def sampled_gws_from_sam(sam, fobs_gw, hard=holo.hardening.Hard_GW, **kwargs):
 
     """
     fobs_orb = fobs_gw / 2.0
-    vals, weights, edges, dens, mass = holo.sam.sample_sam_with_hardening(sam, hard, fobs=fobs_orb, **kwargs)
+    vals, weights, edges, dens, mass = holo.sams.sam.sample_sam_with_hardening(sam, hard, fobs_orb, **kwargs)
     gff, gwf, gwb = _gws_from_samples(vals, weights, fobs_gw)
     return gff, gwf, gwb
 
@@ -423,7 +666,9 @@ def _gws_from_number_grid_integrated_redz(edges, redz, number, realize, sum=True
     realize : bool or int,
         Specification of how to construct one or more discrete realizations.
         If a `bool` value, then whether or not to construct a realization.
-        If an `int` value, then how many discrete realizations to construct.
+        If an `int` value, then how many discrete realizations to construct.  When summing, these are
+        drawn by `cyutils.sam_poisson_gwb`; use `_gws_from_number_grid_streamed` for the loudest
+        binaries or quantiles of realizations.
     sum : bool,
         Whether or not to sum over axes {0, 1, 2}.
 
@@ -457,13 +702,12 @@ def _gws_from_number_grid_integrated_redz(edges, redz, number, realize, sum=True
     elif utils.isinteger(realize):
         if sum:
             import holodeck.cyutils   # noqa
-            # This function reate
+            # sum each realization bin-by-bin, without storing the realizations of the full grid
             hc2 = holo.cyutils.sam_poisson_gwb(number, hc2, realize)
 
         else:
-            log.warning(f"`sum`={sum} :: this requires a large amount of memory!")
-            shape = number.shape + (realize,)
-            hc2 = hc2[..., np.newaxis] * poisson_as_needed(number[..., np.newaxis] * np.ones(shape))
+            log.warning(f"`sum`={sum} :: this requires a large amount of memory!  See `_gws_from_number_grid_streamed`.")
+            hc2 = hc2[..., np.newaxis] * poisson_as_needed(number, nreals=realize)
             if holo.sam._DEBUG:
                 log.info(f"number = {utils.stats(number)}")
                 log.info(f"hc2 = {utils.stats(hc2)}")
@@ -497,7 +741,9 @@ def _gws_from_number_grid_integrated(edges, number, realize, sum=True):
     realize : bool or int,
         Specification of how to construct one or more discrete realizations.
         If a `bool` value, then whether or not to construct a realization.
-        If an `int` value, then how many discrete realizations to construct.
+        If an `int` value, then how many discrete realizations to construct.  When summing, these are
+        drawn by `cyutils.sam_poisson_gwb`; use `_gws_from_number_grid_streamed` for the loudest
+        binaries or quantiles of realizations.
     sum : bool,
         Whether or not to sum over axes {0, 1, 2}.
 
@@ -531,13 +777,12 @@ def _gws_from_number_grid_integrated(edges, number, realize, sum=True):
     elif utils.isinteger(realize):
         if sum:
             import holodeck.cyutils   # noqa
-            # This function reate
+            # sum each realization bin-by-bin, without storing the realizations of the full grid
             hc2 = holo.cyutils.sam_poisson_gwb(number, hc2, realize)
 
         else:
-            log.warning(f"`sum`={sum} :: this requires a large amount of memory!")
-            shape = number.shape + (realize,)
-            hc2 = hc2[..., np.newaxis] * poisson_as_needed(number[..., np.newaxis] * np.ones(shape))
+            log.warning(f"`sum`={sum} :: this requires a large amount of memory!  See `_gws_from_number_grid_streamed`.")
+            hc2 = hc2[..., np.newaxis] * poisson_as_needed(number, nreals=realize)
             if holo.sam._DEBUG:
                 log.info(f"number = {utils.stats(number)}")
                 log.info(f"hc2 = {utils.stats(hc2)}")
@@ -556,6 +801,326 @@ def _gws_from_number_grid_integrated(edges, number, realize, sum=True):
     return hc
 
 
+def _gws_from_number_grid_streamed(edges, number, nreals, redz=None, loudest=0, quantiles=None,
+                                   mem_budget=None):
+    """Calculate realizations of the GWB from a number-grid, streaming blocks of realizations.
+
+    Unlike `_gws_from_number_grid_integrated_redz` with ``sum=False``, the full (M, Q, Z, F, R)
+    array of realizations is never constructed.  Realizations are drawn in blocks, sized so that
+    the intermediate and output arrays fit within `mem_budget`, and each block is immediately reduced to
+    per-frequency quantities: the total GWB, and optionally the loudest single sources.
+
+    Parameters
+    ----------
+    edges : (4,) list of 1darrays
+        A list containing the edges along each dimension.  The four dimensions correspond to
+        total mass, mass ratio, redshift, and observer-frame orbital frequency.
+        The length of each of the four arrays is M, Q, Z, F.
+    number : (M-1, Q-1, Z-1, F-1) ndarray
+        The number of binaries in each bin of parameter space.
+    nreals : int
+        Number of realizations to construct.
+    redz : None or (M, Q, Z, F-1) ndarray
+        Final redshifts of binaries.  If given, strains are calculated with
+        `char_strain_sq_from_bin_edges_redz`, otherwise with `char_strain_sq_from_bin_edges`.
+    loudest : int
+        Number of loudest single sources to distinguish from the background in each realization.
+    quantiles : None or array_like of float
+        Quantiles (in [0.0, 1.0]) of the GWB characteristic strain, over realizations, to calculate.
+    mem_budget : None or float
+        [bytes] Memory budget, see `holodeck.utils.mem_budget`.
+
+    Returns
+    -------
+    data : dict
+        * 'hc' : (F-1, R) characteristic strain of the GWB, including all sources.
+        * 'hc_ss' : (F-1, R, L) characteristic strain of the `L` loudest single sources.
+          Only if ``loudest > 0``.
+        * 'hc_bg' : (F-1, R) characteristic strain of all sources except the `L` loudest.
+          Only if ``loudest > 0``.
+        * 'quantiles' : (F-1, Nq) quantiles of 'hc' over realizations.
+          Only if `quantiles` is given.
+
+    """
+    if not utils.isinteger(nreals) or (nreals < 1):
+        err = f"`nreals` ({nreals}) must be a positive integer!"
+        log.exception(err)
+        raise ValueError(err)
+
+    if redz is None:
+        hc2 = char_strain_sq_from_bin_edges(edges)
+    else:
+        hc2 = char_strain_sq_from_bin_edges_redz(edges, redz)
+
+    nfreqs = number.shape[-1]
+    # flatten the (M, Q, Z) bins  ::  (G, F)
+    number = number.reshape(-1, nfreqs)
+    hc2 = hc2.reshape(-1, nfreqs)
+    # only bins with binaries contribute
+    sel = np.any(number > 0.0, axis=-1)
+    number = number[sel]
+    hc2 = hc2[sel]
+    nbins = number.shape[0]
+
+    # the number of realizations in each block is set by the peak number of bytes held, at once, for each
+    # (bin, frequency, realization) element.  `poisson_as_needed` holds its float64 output, the expectation
+    # values that numpy broadcasts to the full block shape before drawing, and the int64 draws.
+    # `_loudest_from_counts` holds the float64 counts and negated strains, plus either the boolean
+    # occupied-mask (while building the strains) or the `argpartition` indices.
+    nbytes = 2 * np.dtype(float).itemsize + np.dtype(np.int64).itemsize
+    if loudest > 0:
+        nbytes = max(nbytes, 2 * np.dtype(float).itemsize + np.dtype(np.intp).itemsize)
+    # the selected grids, and the (F, R) and (F, R, L) outputs, are held throughout
+    fixed = np.dtype(float).itemsize * (2 * nbins * nfreqs + (1 + loudest) * nfreqs * nreals)
+    chunks = utils.mem_chunks(nreals, nbytes * nbins * nfreqs, fixed_bytes=fixed, budget=mem_budget,
+                              name='_gws_from_number_grid_streamed')
+
+    gwb = np.zeros((nfreqs, nreals))
+    if loudest > 0:
+        loud = np.zeros((nfreqs, nreals, loudest))
+
+    for sl in chunks:
+        # (G, F, B)
+        counts = poisson_as_needed(number, nreals=sl.stop-sl.start)
+        gwb[:, sl] = np.einsum('gf,gfb->fb', hc2, counts)
+        if loudest > 0:
+            loud[:, sl, :] = _loudest_from_counts(hc2, counts, loudest)
+
+        del counts
+
+    data = dict(hc=np.sqrt(gwb))
+    if loudest > 0:
+        data['hc_ss'] = np.sqrt(loud)
+        # clip the (roundoff) negative values when single sources are the entire background
+        data['hc_bg'] = np.sqrt(np.clip(gwb - np.sum(loud, axis=-1), 0.0, None))
+    if quantiles is not None:
+        data['quantiles'] = np.quantile(data['hc'], quantiles, axis=-1).T
+
+    return data
+
+
+def _loudest_from_counts(hc2, counts, loudest):
+    """Find the strains of the loudest individual binaries, given the number in each bin.
+
+    Parameters
+    ----------
+    hc2 : (G, F) ndarray
+        Characteristic strain squared of a single binary in each bin.
+    counts : (G, F, B) ndarray
+        Number of binaries in each bin, for each realization.
+    loudest : int
+        Number of loudest binaries to find.
+
+    Returns
+    -------
+    loud : (F, B, L) ndarray
+        Characteristic strain squared of the `L` loudest binaries, in decreasing order.  Bins
+        containing multiple binaries contribute each of them.
+
+    """
+    nbins = hc2.shape[0]
+    # (G, F, B) negated strains of bins that contain any binaries; built negated so that the partition
+    # below does not need another full-size copy
+    vals = np.where(counts > 0, -hc2[..., np.newaxis], 0.0)
+    # the L loudest bins, without a full sort; then sort those  ::  (L', F, B)
+    if loudest < nbins:
+        # copy the L indices, so that the full (G, F, B) index array is released
+        idx = np.argpartition(vals, loudest - 1, axis=0)[:loudest].copy()
+    else:
+        idx = np.broadcast_to(np.arange(nbins)[:, np.newaxis, np.newaxis], vals.shape)
+    vals = -np.take_along_axis(vals, idx, axis=0)
+    cnts = np.take_along_axis(counts, idx, axis=0)
+    del idx
+    order = np.argsort(-vals, axis=0)
+    vals = np.take_along_axis(vals, order, axis=0)
+    cnts = np.take_along_axis(cnts, order, axis=0)
+
+    # expand bins by their number of binaries: the `j`th loudest binary is in the sorted bin `k`
+    # where `k` is the number of bins whose cumulative count is <= `j`
+    cum = np.cumsum(cnts, axis=0)
+    jj = np.arange(loudest)[:, np.newaxis, np.newaxis, np.newaxis]
+    kk = np.sum(cum[np.newaxis] <= jj, axis=1)
+    vals = np.concatenate([vals, np.zeros((1,) + vals.shape[1:])], axis=0)
+    loud = np.take_along_axis(vals, kk, axis=0)
+    # (L, F, B) ==> (F, B, L)
+    return np.moveaxis(loud, 0, -1)
+
+
+def gwb_poisson_stats(edges, number, redz=None, quantiles=None, nfft=None, tail=None):
+    """Calculate statistics of Poisson realizations of the GWB analytically, without drawing realizations.
+
+    In each realization, the GWB is ``hc^2 = sum_i N_i h_i^2`` where the number of binaries in each bin
+    `N_i` is Poisson distributed with expectation value `number`, and `h_i^2` is the characteristic strain
+    squared of one binary in that bin.  The cumulants of this compound-Poisson distribution are exactly
+    ``k_n = sum_i number_i (h_i^2)^n``, so the mean and variance of `hc^2` are calculated directly from the
+    number-grid.  Quantiles are calculated by inverting the characteristic function of this distribution,
+    see `_compound_poisson_quantiles`.
+
+    Parameters
+    ----------
+    edges : (4,) list of 1darrays
+        A list containing the edges along each dimension.  The four dimensions correspond to
+        total mass, mass ratio, redshift, and observer-frame orbital frequency.
+        The length of each of the four arrays is M, Q, Z, F.
+    number : (M-1, Q-1, Z-1, F-1) ndarray
+        The number of binaries in each bin of parameter space.
+    redz : None or (M, Q, Z, F-1) ndarray
+        Final redshifts of binaries.  If given, strains are calculated with
+        `char_strain_sq_from_bin_edges_redz`, otherwise with `char_strain_sq_from_bin_edges`.
+    quantiles : None or array_like of float
+        Quantiles (in [0.0, 1.0]) of the GWB characteristic strain, over realizations, to calculate.
+    nfft : None or int
+        Number of lattice points used to invert the characteristic function.  `None` uses `_GWB_STATS_NFFT`.
+    tail : None or float
+        Expectation number of the loudest binaries at each frequency that are excluded when calculating
+        quantiles.  Quantiles above ``1 - tail`` are unreliable.  `None` uses `_GWB_STATS_TAIL`.
+
+    Returns
+    -------
+    data : dict
+        * 'mean' : (F-1,) expectation value of the GWB characteristic strain squared, `hc^2`.
+        * 'var' : (F-1,) variance of `hc^2` over realizations.
+        * 'quantiles' : (F-1, Nq) quantiles of the characteristic strain `hc` over realizations.
+          Only if `quantiles` is given.
+
+    Notes
+    -----
+    `_gws_from_number_grid_integrated_redz` and `cyutils.sam_poisson_gwb` replace Poisson draws with
+    (floored) normal draws in bins with more than 1e10 binaries, which changes their mean by at most 0.5
+    binaries in those bins, i.e. negligibly.
+    Calculating quantiles requires a sort of the grid and an FFT of length `nfft` for each frequency, which
+    is much cheaper than drawing realizations of typical grid sizes.
+
+    """
+    if redz is None:
+        hc2 = char_strain_sq_from_bin_edges(edges)
+    else:
+        hc2 = char_strain_sq_from_bin_edges_redz(edges, redz)
+
+    nfreqs = number.shape[-1]
+    # flatten the (M, Q, Z) bins  ::  (G, F)
+    hc2 = np.broadcast_to(hc2, number.shape).reshape(-1, nfreqs)
+    number = number.reshape(-1, nfreqs)
+    # bins without binaries, or without strain (e.g. binaries that have not yet reached this frequency), do not
+    # contribute; and their strains may be non-finite
+    sel = (number > 0.0) & (hc2 > 0.0) & np.isfinite(hc2)
+    number = np.where(sel, number, 0.0)
+    hc2 = np.where(sel, hc2, 0.0)
+
+    data = dict(
+        mean=np.sum(number * hc2, axis=0),
+        var=np.sum(number * hc2**2, axis=0),
+    )
+    if quantiles is not None:
+        quantiles = np.atleast_1d(quantiles)
+        if np.any(quantiles < 0.0) or np.any(quantiles > 1.0):
+            err = f"`quantiles` ({quantiles}) must be between [0.0, 1.0]!"
+            log.exception(err)
+            raise ValueError(err)
+
+        nfft = _GWB_STATS_NFFT if nfft is None else int(nfft)
+        tail = _GWB_STATS_TAIL if tail is None else tail
+        xq = np.zeros((nfreqs, quantiles.size))
+        for ff in range(nfreqs):
+            ss = sel[:, ff]
+            xq[ff] = _compound_poisson_quantiles(number[ss, ff], hc2[ss, ff], quantiles, nfft, tail)
+        data['quantiles'] = np.sqrt(xq)
+
+    return data
+
+
+def _compound_poisson_quantiles(lam, val, quantiles, nfft, tail):
+    """Calculate quantiles of a compound-Poisson distribution, by inverting its characteristic function.
+
+    The distribution is of ``X = sum_i N_i val_i``, with ``N_i ~ Poisson(lam_i)``.  Its characteristic function,
+    ``phi(t) = exp(sum_i lam_i [exp(i t val_i) - 1])``, is evaluated on a lattice of `nfft` points and inverted
+    with an FFT.  To do so, components are treated in three groups:
+
+    * the loudest components, whose total expectation number is below `tail`, are excluded.  The CDF is then
+      ``exp(-lam_tail) * F_rest(x)``, which is exact below the smallest excluded value.
+    * components with values below the lattice spacing are combined into a single normal distribution, with the
+      same mean and variance.
+    * the remaining components are placed on the lattice, split between the two nearest points such that their
+      total value is conserved.  The sum over components is then itself an FFT.
+
+    Parameters
+    ----------
+    lam : (G,) ndarray
+        Expectation number of each component (positive).
+    val : (G,) ndarray
+        Value of each component (positive).
+    quantiles : (Q,) ndarray
+        Quantiles to calculate.
+    nfft : int
+        Number of lattice points.
+    tail : float
+        Expectation number of the loudest components that are excluded.
+
+    Returns
+    -------
+    xq : (Q,) ndarray
+        Quantiles of the distribution.  Quantiles below the probability of ``X == 0`` are zero.
+
+    """
+    xq = np.zeros(quantiles.shape)
+    if lam.size == 0:
+        return xq
+
+    # probability of no binaries at all, i.e. of `X == 0`
+    prob_zero = np.exp(-np.sum(lam))
+
+    # ---- exclude the loudest components, with a total expectation number below `tail`
+    idx = np.argsort(val)[::-1]
+    lam, val = lam[idx], val[idx]
+    ntail = np.searchsorted(np.cumsum(lam), tail, side='right')
+    lam_tail = np.sum(lam[:ntail])
+    lam, val = lam[ntail:], val[ntail:]
+
+    # ---- construct the lattice, spanning the bulk of the remaining distribution
+    mean = np.sum(lam * val)
+    stdev = np.sqrt(np.sum(lam * val**2))
+    pad = 8
+    if stdev > 0.0:
+        lo = max(0.0, mean - 10.0 * stdev)
+        dx = (mean + 50.0 * stdev - lo) / (nfft - 2 * pad)
+        xlo = lo - pad * dx
+        # values of the cell upper-edges, at which the CDF is evaluated
+        xx = xlo + (np.arange(nfft) + 0.5) * dx
+
+        # components below the lattice spacing are approximated as normal
+        gauss = (val < dx)
+        mean_gauss = np.sum(lam[gauss] * val[gauss])
+        var_gauss = np.sum(lam[gauss] * val[gauss]**2)
+        lam, val = lam[~gauss], val[~gauss]
+        # split the remaining components between lattice points; values beyond the lattice are aliased, which
+        # is exact at the lattice frequencies
+        pos = val / dx
+        jj = np.floor(pos)
+        ww = pos - jj
+        jj = jj.astype(np.int64) % nfft
+        weights = np.bincount(jj, weights=lam * (1.0 - ww), minlength=nfft)
+        weights += np.bincount((jj + 1) % nfft, weights=lam * ww, minlength=nfft)
+
+        # characteristic function, shifted to the start of the lattice, and smoothed over the lattice spacing
+        tt = 2.0 * np.pi * np.fft.rfftfreq(nfft, d=dx)
+        # `sum_i lam_i exp(i t val_i)`, with the (1j * t * x) phase convention
+        arg = np.conj(np.fft.rfft(weights)) - np.sum(lam)
+        arg = arg + 1j * tt * (mean_gauss - xlo) - 0.5 * tt**2 * (var_gauss + dx**2)
+        # probability in each lattice cell
+        prob = np.fft.irfft(np.conj(np.exp(arg)), n=nfft)
+        cdf = np.maximum.accumulate(np.clip(np.cumsum(prob), 0.0, 1.0))
+    else:
+        # nothing but the tail: all of the remaining probability is at zero
+        xx = np.zeros(1)
+        cdf = np.ones(1)
+
+    # ---- find the quantiles, accounting for the excluded tail
+    target = np.clip(quantiles * np.exp(lam_tail), 0.0, 1.0)
+    xq = np.interp(target, cdf, xx)
+    xq[quantiles <= prob_zero] = 0.0
+    return np.clip(xq, 0.0, None)
+
+
 def gwb_ideal(fobs_gw, ndens, mtot, mrat, redz, dlog10, sum=True):
 
     const = ((4.0 * np.pi) / (3 * SPLC**2))
@@ -603,7 +1168,7 @@ def gwb_ideal(fobs_gw, ndens, mtot, mrat, redz, dlog10, sum=True):
     return gwb
 
 
-def poisson_as_needed(values, thresh=1e10):
+def poisson_as_needed(values, thresh=1e10, nreals=None, rng=None):
     """Calculate Poisson distribution when values are below threshold, otherwise approximate with normal distribution.
 
     Parameters
@@ -612,22 +1177,37 @@ def poisson_as_needed(values, thresh=1e10):
         Expectation values for poisson distribution.
     thresh : float
         Expectation value above which to use Normal distribution approximation.
+    nreals : None or int
+        If given, draw `nreals` realizations of each value, along a new trailing axis.  This avoids
+        explicitly broadcasting `values` to the output shape.
+    rng : None or `numpy.random.Generator`
+        Source of random draws.  If `None`, the global `numpy.random` state is used.
 
     Returns
     -------
     output : ndarray
         (Approximately) Poisson distributed values.
-        Same shape as input `values`.
+        Same shape as input `values`, or ``values.shape + (nreals,)`` if `nreals` is given.
 
     """
+    rng = np.random if (rng is None) else rng
+    values = np.asarray(values)
+    shape = values.shape if (nreals is None) else values.shape + (nreals,)
     # NOTE: do not use `int` type as it can cause overflow errors
     # output = np.zeros_like(values, dtype=int)
-    output = np.zeros_like(values)
+    output = np.zeros(shape)
     idx = (values <= thresh)
-    output[idx] = np.random.poisson(values[idx])
-    tt = values[~idx]
-    # output[~idx] = np.floor(np.random.normal(tt, np.sqrt(tt))).astype(int)
-    output[~idx] = np.floor(np.random.normal(tt, np.sqrt(tt)))
+    if nreals is None:
+        output[idx] = rng.poisson(values[idx])
+        tt = values[~idx]
+        # output[~idx] = np.floor(np.random.normal(tt, np.sqrt(tt))).astype(int)
+        output[~idx] = np.floor(rng.normal(tt, np.sqrt(tt)))
+        return output
+
+    tt = values[idx][:, np.newaxis]
+    output[idx] = rng.poisson(tt, size=(tt.shape[0], nreals))
+    tt = values[~idx][:, np.newaxis]
+    output[~idx] = np.floor(rng.normal(tt, np.sqrt(tt), size=(tt.shape[0], nreals)))
     return output
 
 
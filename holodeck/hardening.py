@@ -50,7 +50,7 @@ import pickle as pkl
 from scipy.interpolate import RectBivariateSpline
 
 import holodeck as holo
-from holodeck import utils, cosmo, log, _PATH_DATA
+from holodeck import utils, cosmo, log, _PATH_DATA, _PATH_CACHE
 from holodeck.constants import GYR, NWTG, PC, MSOL
 
 #: number of influence radii to set minimum radius for dens calculation
@@ -463,12 +463,17 @@ class Dynamical_Friction_NFW(_Hardening):
     *   This module does not evolve eccentricity.
     *   The hardening rate (da/dt) is not allowed to be larger than the orbital/virial velocity of the halo
         (as a function of radius).
+    *   Host properties that depend only on the MBH masses (stellar masses, characteristic radii) are calculated
+        once per `Evolution` and cached (see `Dynamical_Friction_NFW._host_quantities`), unless binary masses are
+        evolving (i.e. accretion is included).  With ``static_halo=True`` the DM-halo mass and NFW parameters are
+        also cached, using each binary's initial redshift.
 
     """
 
     _TIDAL_STRIPPING_DYNAMICAL_TIMES = 10.0
 
-    def __init__(self, mmbulge=None, msigma=None, smhm=None, coulomb=10.0, attenuate=True, rbound_from_density=True):
+    def __init__(self, mmbulge=None, msigma=None, smhm=None, coulomb=10.0, attenuate=True, rbound_from_density=True,
+                 static_halo=False):
         """Create a hardening rate instance with the given parameters.
 
         Parameters
@@ -493,6 +498,10 @@ class Dynamical_Friction_NFW(_Hardening):
             NOTE: this is only used if `attenuate==True`
             If True:  calculate R-bound using an assumed stellar density profile.
             If False: calculate R-bound using a velocity dispersion (constant in radius, from `gbh` instance).
+        static_halo : bool,
+            Whether the DM-halo of each binary is held fixed during evolution.
+            If True:  halo mass and NFW parameters are calculated once, at the initial redshift of each binary.
+            If False: halo mass and NFW parameters are recalculated at the current redshift of each step.
 
         """
         self._mmbulge = holo.relations.get_mmbulge_relation(mmbulge)
@@ -501,9 +510,12 @@ class Dynamical_Friction_NFW(_Hardening):
         self._coulomb = coulomb
         self._attenuate = attenuate
         self._rbound_from_density = rbound_from_density
+        self._static_halo = static_halo
 
         self._NFW = holo.relations.NFW
         self._time_dynamical = None
+        # cached host quantities, stored as tuple of (`Evolution` instance, dict of arrays)
+        self._host_cache = None
         return
 
     def dadt_dedt(self, evo, step, attenuate=None):
@@ -537,11 +549,124 @@ class Dynamical_Friction_NFW(_Hardening):
         val = (evo.scafa[:, step] > 0.0)
         redz[val] = cosmo.a_to_z(evo.scafa[val, step])
 
-        dadt, dedt = self._dadt_dedt(mass, sepa, redz, dt, eccen, attenuate)
+        host = self._host_quantities_for_evo(evo, step)
+        dadt, dedt = self._dadt_dedt(mass, sepa, redz, dt, eccen, attenuate, host=host)
 
         return dadt, dedt
 
-    def _dadt_dedt(self, mass, sepa, redz, dt, eccen, attenuate):
+    def _host_quantities_for_evo(self, evo, step):
+        """Get the (cached) host quantities for the binaries in the given `Evolution` instance.
+
+        The cache is reset at step zero, or whenever a different `Evolution` instance is used.  If binary masses are
+        evolving (i.e. ``evo._acc`` is not None), mass-dependent quantities cannot be cached, and they are
+        recalculated at each step.
+
+        Parameters
+        ----------
+        evo : `Evolution` instance
+            The evolutionary tracks of the binary population, providing binary parameters.
+        step : int,
+            Integration step at which to calculate hardening rates.
+
+        Returns
+        -------
+        host : dict
+            Host quantities for each binary, see `Dynamical_Friction_NFW._host_quantities`.
+
+        """
+        static_mass = (evo._acc is None)
+        redz_init = cosmo.a_to_z(evo.scafa[:, 0]) if self._static_halo else None
+
+        if not static_mass:
+            return self._host_quantities(evo.mass[:, step, :], redz_init)
+
+        cache = self._host_cache
+        if (step == 0) or (cache is None) or (cache[0] is not evo):
+            host = self._host_quantities(evo.mass[:, 0, :], redz_init)
+            self._host_cache = (evo, host)
+        else:
+            host = cache[1]
+
+        return host
+
+    def _host_quantities(self, mass, redz=None):
+        """Calculate host-galaxy and DM-halo quantities which do not depend on binary separation.
+
+        Parameters
+        ----------
+        mass : (N, 2) array_like
+            Masses of both MBHs (0-primary, 1-secondary) in units of [grams].
+        redz : (N,) array_like or None
+            Redshifts at which to calculate DM-halo properties.  If `None`, halo properties are not calculated,
+            and must instead be calculated at each step.
+
+        Returns
+        -------
+        host : dict
+            Dictionary of (N,) arrays, with keys:
+            * `mstar` : stellar-mass of the merged host [gram],
+            * `mstar_sec` : stellar-mass of the secondary host [gram],
+            * `rinfl` : minimum radius at which densities are calculated [cm],
+            * `rstar`, `rhard`, `rlc`, `rbnd` : characteristic radii used for attenuation [cm],
+            * `mhalo`, `rho_s`, `rs` : DM-halo mass [gram], NFW density [g/cm^3] and scale radius [cm],
+              only if `redz` is given.
+
+        """
+        assert np.shape(mass)[-1] == 2 and np.ndim(mass) <= 2
+        mass = np.atleast_2d(mass)
+        m1, m2 = mass.T
+        mbh = m1 + m2
+
+        host = {}
+        # assume galaxies are merged, and total stellar mass is given from Mstar-Mbh of total MBH mass
+        host['mstar'] = mstar = self._mmbulge.mstar_from_mbh(mbh, scatter=False)
+        host['mstar_sec'] = mstar_sec = self._mmbulge.mstar_from_mbh(m2, scatter=False)
+        # set minimum radius to be a factor times influence-radius
+        host['rinfl'] = _MIN_DENS_RAD__INFL_RAD_MULT * _radius_influence_dehnen(m2, mstar_sec)
+
+        # ---- characteristic radii needed for [BBR1980]_ attenuation
+        # characteristic stellar radius in [cm]
+        host['rstar'] = _radius_stellar_characteristic_dabringhausen_2008(mstar)
+        # characteristic hardening-radius in [cm]
+        host['rhard'] = _radius_hard_BBR1980_dehnen(mbh, mstar)
+        # characteristic loss-cone-radius in [cm]
+        host['rlc'] = _radius_loss_cone_BBR1980_dehnen(mbh, mstar)
+        # Calculate R-bound based on stellar density profile (mass enclosed)
+        if self._rbound_from_density:
+            host['rbnd'] = _radius_influence_dehnen(mbh, mstar)
+        # Calculate R-bound based on uniform velocity dispersion (MBH scaling relation)
+        else:
+            vdisp = self._msigma.vdisp_from_mbh(m1, scatter=False)   # use primary-bh's mass (index 0)
+            host['rbnd'] = NWTG * mbh / vdisp**2
+
+        if redz is not None:
+            host.update(self._halo_quantities(mstar, np.atleast_1d(redz)))
+
+        return host
+
+    def _halo_quantities(self, mstar, redz):
+        """Calculate DM-halo mass and NFW parameters of the host.
+
+        Parameters
+        ----------
+        mstar : (N,) array_like
+            Stellar-mass of the host galaxy [gram].
+        redz : (N,) array_like
+            Redshifts of the host.
+
+        Returns
+        -------
+        halo : dict
+            Dictionary of (N,) arrays: `mhalo` halo mass [gram], `rho_s` NFW characteristic density [g/cm^3],
+            and `rs` NFW scale radius [cm].
+
+        """
+        mhalo = self._smhm.halo_mass(mstar, redz, clip=True)
+        rho_s, rs = self._NFW._nfw_rho_rad(mhalo, redz)
+        halo = dict(mhalo=mhalo, rho_s=rho_s, rs=rs)
+        return halo
+
+    def _dadt_dedt(self, mass, sepa, redz, dt, eccen, attenuate, host=None):
         """Calculate DF hardening rate given physical quantities.
 
         Parameters
@@ -558,6 +683,9 @@ class Dynamical_Friction_NFW(_Hardening):
             Binary eccentricity.
         attenuate : bool
             Whether to include 'attenuation' as the radius approach the stellar-scattering regime.
+        host : dict or None
+            Precomputed host quantities from `Dynamical_Friction_NFW._host_quantities`.  If `None`, they are
+            calculated here.  If the DM-halo quantities are not included, they are calculated using `redz`.
 
         Returns
         -------
@@ -572,16 +700,26 @@ class Dynamical_Friction_NFW(_Hardening):
         mass = np.atleast_2d(mass)
         redz = np.atleast_1d(redz)
 
-        # Get Host DM-Halo mass
-        # assume galaxies are merged, and total stellar mass is given from Mstar-Mbh of total MBH mass
-        mstar = self._mmbulge.mstar_from_mbh(mass.sum(axis=-1), scatter=False)
-        mhalo = self._smhm.halo_mass(mstar, redz, clip=True)
+        if host is None:
+            host = self._host_quantities(mass)
+
+        # Get Host DM-Halo parameters
+        if 'rho_s' in host:
+            halo = host
+        else:
+            halo = self._halo_quantities(host['mstar'], redz)
+        rho_s = halo['rho_s']
+        rs = halo['rs']
+
+        # ---- Get velocity of halo at the binary separation
+        vhalo = self._NFW._mass_from_rho_rad(sepa, rho_s, rs)
+        vhalo = np.sqrt(NWTG * vhalo / sepa)
+        time_dyn = sepa / vhalo
 
         # ---- Get effective mass of inspiraling secondary
         m2 = mass[:, 1]
-        mstar_sec = self._mmbulge.mstar_from_mbh(m2, scatter=False)
+        mstar_sec = host['mstar_sec']
         # model tidal-stripping of secondary's bulge (see: [Kelley2017a]_ Eq.6)
-        time_dyn = self._NFW.time_dynamical(sepa, mhalo, redz)
         tfrac = dt / (time_dyn * self._TIDAL_STRIPPING_DYNAMICAL_TIMES)
         power_index = np.clip(1.0 - tfrac, 0.0, 1.0)
         meff = m2 * np.power((m2 + mstar_sec)/m2, power_index)
@@ -589,14 +727,11 @@ class Dynamical_Friction_NFW(_Hardening):
         log.debug(f"DF meff/m2 = {utils.stats(meff/m2)} [Msol]")
 
         # ---- Get local density
-        # set minimum radius to be a factor times influence-radius
-        rinfl = _MIN_DENS_RAD__INFL_RAD_MULT * _radius_influence_dehnen(m2, mstar_sec)
-        dens_rads = np.maximum(sepa, rinfl)
-        dens = self._NFW.density(dens_rads, mhalo, redz)
+        dens_rads = np.maximum(sepa, host['rinfl'])
+        dens = self._NFW._density_from_rho_rad(dens_rads, rho_s, rs)
 
         # ---- Get velocity of secondary MBH
         mt, mr = utils.mtmr_from_m1m2(mass)
-        vhalo = self._NFW.velocity_circular(sepa, mhalo, redz)
         vorb = utils.velocity_orbital(mt, mr, sepa=sepa)[:, 1]  # secondary velocity
         velo = np.sqrt(vhalo**2 + vorb**2)
 
@@ -609,7 +744,7 @@ class Dynamical_Friction_NFW(_Hardening):
 
         # ---- Apply 'attenuation' following [BBR1980]_ to account for stellar-scattering / loss-cone effects
         if attenuate:
-            atten = self._attenuation_BBR1980(sepa, mass, mstar)
+            atten = self._attenuation_BBR1980(sepa, mass, host['mstar'], host=host)
             dadt = dadt / atten
 
         # Hardening rate cannot be larger than orbital/virial velocity
@@ -642,7 +777,7 @@ class Dynamical_Friction_NFW(_Hardening):
         dvdt = - 2*np.pi * mass_sec_eff * dens * self._coulomb * np.square(NWTG / velo)
         return dvdt
 
-    def _attenuation_BBR1980(self, sepa, m1m2, mstar):
+    def _attenuation_BBR1980(self, sepa, m1m2, mstar, host=None):
         """Calculate attentuation factor following [BBR1980]_ prescription.
 
         Characteristic radii are currently calculated using hard-coded Dehnen stellar-density profiles, and a fixed
@@ -661,6 +796,9 @@ class Dynamical_Friction_NFW(_Hardening):
             Masses of each binary component (0-primary, 1-secondary).
         mstar : (N,) array-like of scalar,
             Mass of the stellar-bulge / stellar-core (ambiguous).
+        host : dict or None
+            Precomputed host quantities from `Dynamical_Friction_NFW._host_quantities`, providing the
+            characteristic radii.  If `None`, they are calculated here.
 
         Returns
         -------
@@ -672,20 +810,14 @@ class Dynamical_Friction_NFW(_Hardening):
         m1, m2 = m1m2.T
         mbh = m1 + m2
 
-        # characteristic stellar radius in [cm]
-        rstar = _radius_stellar_characteristic_dabringhausen_2008(mstar)
-        # characteristic hardening-radius in [cm]
-        rhard = _radius_hard_BBR1980_dehnen(mbh, mstar)
-        # characteristic loss-cone-radius in [cm]
-        rlc = _radius_loss_cone_BBR1980_dehnen(mbh, mstar)
+        if host is None:
+            host = self._host_quantities(m1m2)
 
-        # Calculate R-bound based on stellar density profile (mass enclosed)
-        if self._rbound_from_density:
-            rbnd = _radius_influence_dehnen(mbh, mstar)
-        # Calculate R-bound based on uniform velocity dispersion (MBH scaling relation)
-        else:
-            vdisp = self._msigma.vdisp_from_mbh(m1)   # use primary-bh's mass (index 0)
-            rbnd = NWTG * mbh / vdisp**2
+        # characteristic stellar, hardening, loss-cone and binding radii in [cm]
+        rstar = host['rstar']
+        rhard = host['rhard']
+        rlc = host['rlc']
+        rbnd = host['rbnd']
 
         # Number of stars in the stellar bulge/core
         nstar = mstar / (0.6 * MSOL)
@@ -725,13 +857,16 @@ class Fixed_Time_2PL(_Hardening):
 
     NOTE/BUG: the actual binary lifetimes tend to be 1-5% shorter than the requested value.
 
-    The normalization for each binary, to produce the desired lifetime, is calculated as follows:
-    (1) A set of random test binary parameters are chosen.
-    (2) The normalization constants are determined, using least-squares optimization, to yield the
-        desired lifetime.
-    (3) Interpolants are constructed to interpolate between the test binary parameters.
-    (4) The interpolants are called on the provided binary parameters, to calculate the
-        interpolated normalization constants to reach the desired lifetimes.
+    The normalization for each binary, to produce the desired lifetime, is either calculated
+    exactly (root-finding on the total lifetime), or interpolated from a table:
+    (1) The normalization constants are calculated exactly on a fixed, structured grid of binary
+        total-mass, mass-ratio, lifetime and initial separation.
+    (2) The table is saved to disk, keyed on (rchar, gamma_inner, gamma_outer), and reused by later
+        instances and processes (see :meth:`Fixed_Time_2PL._calculate_norm_interpolant`).
+    (3) Normalizations are multilinearly interpolated (in log-space) from the table, and binaries
+        outside of the tabulated domain are calculated exactly.
+    (4) The interpolation error is measured when the table is built.  If it exceeds
+        `_NORM_TABLE_MAX_ERR`, a warning is logged and all normalizations are calculated exactly.
 
     Construction/Initialization: note that in addition to the standard :meth:`Fixed_Time.__init__`
     constructor, there are two additional constructors are provided:
@@ -747,11 +882,21 @@ class Fixed_Time_2PL(_Hardening):
     _INTERP_NUM_POINTS = 3e4
     _INTERP_THRESH_PAD_FACTOR = 5.0      #: allowance for when to use chunking and when to process full array
     _NORM_CHUNK_SIZE = 1e3
+
+    _NORM_TABLE_VERSION = 1              #: version of normalization table format/calculation
+    #: domain of normalization table: log10(M/MSOL), log10(q), log10(time/GYR), log10(sepa_init/PC)
+    _NORM_TABLE_EXTR = [[5.0, 11.0], [-5.0, 0.0], [-3.0, np.log10(30.0)], [3.0, 5.0]]
+    _NORM_TABLE_SHAPE = (25, 21, 11, 17)   #: number of grid points along each table dimension
+    _NORM_TABLE_PATH = os.path.join(_PATH_CACHE, "hardening_norm_tables", "")  #: see `holodeck._PATH_CACHE`
+    _NORM_TABLE_CHECK_NUM = 1000         #: number of random points used to measure table errors
+    _NORM_TABLE_MAX_ERR = 0.02           #: maximum fractional interpolation error for tables to be used
+    _norm_tables = {}                    #: normalization tables already loaded in this process
+
     CONSISTENT = True
 
     def __init__(self, time, mtot, mrat, redz, sepa_init,
                  rchar=100.0*PC, gamma_inner=-1.0, gamma_outer=+1.5,
-                 progress=False, interpolate_norm=False):
+                 progress=False, interpolate_norm=False, norm_table_path=None):
         """Initialize `Fixed_Time` instance for the given binary properties and function parameters.
 
         Parameters
@@ -781,6 +926,13 @@ class Fixed_Time_2PL(_Hardening):
         gamma_outer : scalar
             Power-law of hardening timescale in the dynamical-friction regime
             (large separations: r > rchar), at times referred to internally as `g2`.
+        progress : bool
+            Whether or not to show progress bars while calculating normalizations.
+        interpolate_norm : bool  or  None
+            Whether to interpolate normalizations from a (persistent) table, instead of calculating
+            them exactly.  If `None`, a table is used when there are many binaries.
+        norm_table_path : str  or  None
+            Directory in which normalization tables are stored.  If `None`, `_NORM_TABLE_PATH`.
 
         """
         self._progress = progress
@@ -822,35 +974,27 @@ class Fixed_Time_2PL(_Hardening):
         # if `interpolate_norm` is None:  use an interpolant if there are lots of points to calculate
         interp_num_thresh = self._INTERP_THRESH_PAD_FACTOR * self._INTERP_NUM_POINTS
         log.debug(f"size={len(mtot)} vs. limit={interp_num_thresh}; `interpolate_norm`={interpolate_norm}")
+        interp = None
         if (interpolate_norm is True) or ((interpolate_norm is None) and (len(mtot) > interp_num_thresh)):
-            log.debug("constructing hardening normalization interpolant")
-            log.warning("INTERPOLATED NORMALIZATION DOES NOT PERFORM AS WELL")
-            # both are callable as `interp(args)`, with `args` shaped (N, 4),
-            # the 4 parameters are:      [log10(M/MSOL), log10(q), time/Gyr, log10(Rmax/PC)]
-            # the interpolants return the log10 of the norm values
-            interp, backup = self._calculate_norm_interpolant(rchar, gamma_inner, gamma_outer)
-
-            log.debug("calculating normalization from interpolants")
-            points = [np.log10(mtot/MSOL), np.log10(mrat), time/GYR, np.log10(sepa_init/PC)]
+            log.debug("loading hardening normalization table")
+            # callable as `interp(args)`, with `args` shaped (N, 4), the 4 parameters are:
+            #     [log10(M/MSOL), log10(q), log10(time/Gyr), log10(Rmax/PC)]
+            # the interpolant returns the log10 of the norm values, and NaN outside of the table
+            # `None` is returned if the table is not accurate enough, in which case norms are calculated exactly
+            interp = self._calculate_norm_interpolant(rchar, gamma_inner, gamma_outer, path=norm_table_path)
+
+        if interp is not None:
+            log.debug("calculating normalization from table")
+            points = [np.log10(mtot/MSOL), np.log10(mrat), np.log10(time/GYR), np.log10(sepa_init/PC)]
             points = np.array(points)
-            norm = interp(points.T)
+            norm = 10.0 ** interp(points.T)
             bads = ~np.isfinite(norm)
             if np.any(bads):
-                msg = f"Normal interpolant failed on {utils.frac_str(bads, 4)} points.  Using backup interpolant"
-                log.info(msg)
-                bp = points.T[bads]
-                # If scipy throws an error on the shape here, see: https://github.com/scipy/scipy/issues/4123
-                # or https://stackoverflow.com/a/26806707/230468
-                norm[bads] = backup(bp)
-                bads = ~np.isfinite(norm)
-                if np.any(bads):
-                    err = f"Backup interpolant failed on {utils.frac_str(bads, 4)} points!"
-                    log.exception(err)
-                    raise ValueError(err)
-
-            norm = 10.0 ** norm
-
-        # For small numbers of points, calculate the normalization directly
+                log.info(f"{utils.frac_str(bads, 4)} points outside of normalization table, calculating exactly")
+                args = [aa[bads] for aa in [time, mtot, mrat]] + [rchar, gamma_inner, gamma_outer, sepa_init[bads]]
+                norm[bads] = self._get_norm_chunk(*args, progress=progress)
+
+        # For small numbers of points (or inaccurate tables), calculate the normalization directly
         else:
             log.info("calculating normalization exactly")
             norm = self._get_norm_chunk(time, mtot, mrat, rchar, gamma_inner, gamma_outer, sepa_init, progress=progress)
@@ -1033,141 +1177,184 @@ class Fixed_Time_2PL(_Hardening):
     # ====     Internal Functions    ====
 
     @classmethod
-    def _calculate_norm_interpolant(cls, rchar, gamma_inner, gamma_outer):
-        """Generate interpolants to map from binary parameters to hardening rate normalization.
+    def _calculate_norm_interpolant(cls, rchar, gamma_inner, gamma_outer, path=None):
+        """Generate an interpolant to map from binary parameters to hardening rate normalization.
 
-        Interpolants are calculated as follows:
-        (1) A set of random test binary parameters and lifetimes are chosen.
-        (2) The normalizations to yield those binary lifetimes are calculated with least-squares
-            optimization.
-        (3) Interpolants are constructed to yield the normalization paramters for the given
-            binary parameters and binary lifetime.
-
-        Two interpolators are returned, a linear-interpolator that is the preferable one, and a
-        backup nearest-interplator that is more robust and works at times when the linear
-        interpolator fails.
+        The interpolant is constructed from a table of normalizations on a structured grid
+        (see :meth:`Fixed_Time_2PL._norm_table`), which is only calculated once for each set of
+        `rchar`, `gamma_inner` and `gamma_outer` values.  Tables are saved to the directory `path`,
+        and loaded from there by later instances (and processes).  The table is also cached in
+        memory for the rest of the current process.
 
         Parameters
         ----------
-        rchar : scalar  or  array_like  #! Possible that only a scalar value is currently working!
-            Characteristic radius separating the two power-law regimes, in units of [cm]:
-            *   scalar : uniform radius for all binaries
-            *   array_like : characteristic radius for each binary.
+        rchar : scalar
+            Characteristic radius separating the two power-law regimes, in units of [cm].
         gamma_inner : scalar
             Power-law of hardening timescale in the stellar-scattering regime,
             (small separations: r < rchar), at times referred to internally as `g1`.
         gamma_outer : scalar
             Power-law of hardening timescale in the dynamical-friction regime
-            (large separations: r > rchar), at times referred to internally as `g1`.
+            (large separations: r > rchar), at times referred to internally as `g2`.
+        path : str  or  None
+            Directory in which normalization tables are stored.  If `None`, `_NORM_TABLE_PATH`.
 
         Returns
         -------
-        interp : callable
-            Linear interpolator from (M, q, t, r) => A
-            (total-mass, mass-ratio, lifetime, initial-radius) => hardening normalization
-        backup : callable
-            Nearest interpolator from (M, q, t, r) => A, to use as a backup when `interp` fails.
-            (total-mass, mass-ratio, lifetime, initial-radius) => hardening normalization
+        interp : `scipy.interpolate.RegularGridInterpolator`  or  None
+            Multilinear interpolator from (N, 4) points to log10 of the hardening normalization,
+            i.e. (log10(M/MSOL), log10(q), log10(t/GYR), log10(r/PC)) => log10(A/[cm/s]).
+            Points outside of the tabulated domain return `np.nan`.
+            `None` if the interpolation error of the table exceeds `_NORM_TABLE_MAX_ERR`.
 
         """
+        axes, log_norm, max_err = cls._norm_table(rchar, gamma_inner, gamma_outer, path=path)
+        if max_err > cls._NORM_TABLE_MAX_ERR:
+            log.warning(
+                f"normalization table interpolation error {max_err:.2e} exceeds {cls._NORM_TABLE_MAX_ERR:.2e}, "
+                "calculating normalizations exactly"
+            )
+            return None
 
-        def get_norm_for_random_points(num_points):
-            num = int(num_points)
-            max_fix_tries = 10
-
-            # ---- Initialization
-            # Define the range of parameters to be explored
-            mt = [1e5, 1e11]   #: total mass [Msol]
-            mr = [1e-5, 1.0]   #: mass ratio
-            # td = [0.0, 20.0]   #: lifetime [Gyr]    LINEAR
-            td = [1.0e-3, 3.0e1]   #: lifetime [Gyr]        LOG
-            rm = [1e3, 1e5]    #: radius maximum (initial separation) [pc]
-
-            # Choose random test binary parameters
-            mt = 10.0 ** np.random.uniform(*np.log10(mt), num) * MSOL
-            mr = 10.0 ** np.random.uniform(*np.log10(mr), num)
-            td = np.random.uniform(*td, num+1)[1:] * GYR
-            # td = 10.0 ** np.random.uniform(*np.log10(td), num) * GYR
-            rm = 10.0 ** np.random.uniform(*np.log10(rm), num) * PC
-
-            # ---- Get normalization for these parameters
-            norm = cls._get_norm_chunk(td, mt, mr, rchar, gamma_inner, gamma_outer, rm)
-            points = [mt, mr, td, rm]
-            bads = ~(np.isfinite(norm) & (norm > 0.0))
-            fix_tries = 0
-            while np.any(bads) and (fix_tries < max_fix_tries):
-                err = f"bad random point norms {utils.frac_str(bads)}, norms: {utils.stats(norm)}"
-                if fix_tries >= max_fix_tries:
-                    log.exception(err)
-                    raise RuntimeError(err)
-
-                # bads = np.where(bads)[0]
-                # units = [MSOL, 1.0, GYR, PC]
-                # for pp, un in zip(points, units):
-                #     # print(f"{utils.stats(pp[bads]/un)}")
-                #     print(f"{pp[bads]/un}")
-
-                args = [aa[bads] for aa in [td, mt, mr, rm]]
-                num = args[0].size
-                args = [aa*np.random.normal(1.0, 0.05, num) for aa in args]
-                # args = [td, mt, mr, rchar, gamma_inner, gamma_outer, rm]
-                args = args[:-1] + [rchar, gamma_inner, gamma_outer] + [args[-1],]
-                norm[bads] = cls._get_norm_chunk(*args)
-                fix_tries += 1
-                log.debug(f"fixing bad norm values: {fix_tries} :: {norm[bads]=}")
-                bads = ~(np.isfinite(norm) & (norm > 0.0))
-
-            return norm, points
-
-        def convert_points_to_interp_vals(points):
-            units = [MSOL, 1.0, GYR, PC]
-            logs = [True, True, False, True]   #: which parameters to interpolate in log-space
-            # logs = [True, True, True, True]   #: which parameters to interpolate in log-space
-            vals = [pp/uu for pp, uu in zip(points, units)]
-            vals = [np.log10(pp) if ll else pp for pp, ll in zip(vals, logs)]
-            vals = np.array(vals).T
-            return vals
-
-        num_points = int(cls._INTERP_NUM_POINTS)
-        log.debug("calculating exact normalization for {num_points:.2e} points")
-        norm, points = get_norm_for_random_points(num_points)
-
-        # Make sure results are valid
-        valid = np.isfinite(norm) & (norm > 0.0)
-        frac_val = np.count_nonzero(valid) / valid.size
-        if frac_val > 0.9:
-            norm = norm[valid]
-            points = [pp[valid] for pp in points]
-        else:
-            log.error(f"norms from random points: {utils.stats(norm)}")
-            err = f"Invalid normalizations!  {utils.frac_str(valid)}"
+        interp = sp.interpolate.RegularGridInterpolator(axes, log_norm, bounds_error=False, fill_value=np.nan)
+        return interp
+
+    @classmethod
+    def _norm_table_axes(cls):
+        """Grid points of the normalization table, in each of its four dimensions.
+        """
+        return [np.linspace(*extr, num) for extr, num in zip(cls._NORM_TABLE_EXTR, cls._NORM_TABLE_SHAPE)]
+
+    @classmethod
+    def _norm_table(cls, rchar, gamma_inner, gamma_outer, path=None):
+        """Load the table of hardening normalizations for the given parameters, building it if needed.
+
+        Tables are stored as `npz` files, named by the class, table-version, and the parameter values.
+        The exact parameters and the table grid are also stored, and compared when loading: if they
+        do not match, the table is rebuilt.
+
+        Parameters
+        ----------
+        rchar : scalar
+            Characteristic radius separating the two power-law regimes, in units of [cm].
+        gamma_inner : scalar
+            Power-law of hardening timescale in the inner regime (small separations: r < rchar).
+        gamma_outer : scalar
+            Power-law of hardening timescale in the outer regime (large separations: r > rchar).
+        path : str  or  None
+            Directory in which normalization tables are stored.  If `None`, `_NORM_TABLE_PATH`.
+
+        Returns
+        -------
+        axes : list[np.ndarray]
+            Grid points in log10(M/MSOL), log10(q), log10(t/GYR), log10(r/PC).
+        log_norm : (M, Q, T, R) np.ndarray
+            Log10 of hardening normalizations, units of [cm/s].
+        max_err : float
+            Maximum fractional interpolation error of the table, see `_build_norm_table`.
+
+        """
+        if not np.isscalar(rchar):
+            err = "Normalization tables require a scalar `rchar`!"
             log.exception(err)
             raise ValueError(err)
 
-        vals = convert_points_to_interp_vals(points)
+        path = cls._NORM_TABLE_PATH if (path is None) else path
+        params = np.array([rchar, gamma_inner, gamma_outer], dtype=float)
+        axes = cls._norm_table_axes()
+        fname = (
+            f"{cls.__name__.lower()}_norm_v{cls._NORM_TABLE_VERSION}"
+            f"__rchar{rchar/PC:.4e}pc_gin{gamma_inner:+.4f}_gout{gamma_outer:+.4f}.npz"
+        )
+        fname = os.path.join(path, fname)
+
+        key = (fname, tuple(params))
+        if key in cls._norm_tables:
+            return cls._norm_tables[key]
+
+        table = None
+        if os.path.exists(fname):
+            with np.load(fname) as data:
+                match = (
+                    np.array_equal(data['params'], params) and (data['shape'].tolist() == list(cls._NORM_TABLE_SHAPE))
+                    and np.allclose(data['extr'], cls._NORM_TABLE_EXTR)
+                )
+                if match:
+                    table = data['log_norm']
+                    max_err = float(data['max_err'])
+                    log.debug(f"loaded normalization table from {fname}, max error: {data['max_err']:.2e}")
+                else:
+                    log.warning(f"normalization table {fname} does not match parameters, rebuilding")
+
+        if table is None:
+            table, max_err = cls._build_norm_table(axes, *params)
+            try:
+                os.makedirs(path, exist_ok=True)
+                # write to a temporary file first, so that concurrent processes never read partial files
+                temp = fname + f".{os.getpid()}.tmp"
+                with open(temp, 'wb') as out:
+                    np.savez(out, log_norm=table, params=params, max_err=max_err,
+                             shape=np.array(cls._NORM_TABLE_SHAPE), extr=np.array(cls._NORM_TABLE_EXTR))
+                os.replace(temp, fname)
+                log.info(f"saved normalization table to {fname}")
+            except OSError as err:
+                log.warning(f"could not save normalization table to {fname}: {err}")
+
+        cls._norm_tables[key] = (axes, table, max_err)
+        return axes, table, max_err
+
+    @classmethod
+    def _build_norm_table(cls, axes, rchar, gamma_inner, gamma_outer):
+        """Calculate the exact hardening normalizations over the grid of binary parameters.
+
+        Parameters
+        ----------
+        axes : list[np.ndarray]
+            Grid points in log10(M/MSOL), log10(q), log10(t/GYR), log10(r/PC).
+        rchar : scalar
+            Characteristic radius separating the two power-law regimes, in units of [cm].
+        gamma_inner : scalar
+            Power-law of hardening timescale in the inner regime (small separations: r < rchar).
+        gamma_outer : scalar
+            Power-law of hardening timescale in the outer regime (large separations: r > rchar).
 
-        # ---- Construct interpolants
+        Returns
+        -------
+        log_norm : (M, Q, T, R) np.ndarray
+            Log10 of hardening normalizations, units of [cm/s].
+        max_err : float
+            Maximum fractional error of the interpolated normalizations, measured at (reproducible)
+            random points within the table domain.
 
-        # construct both a linear (1th order) and nearest (0th order) interpolant
-        log.debug("constructing interpolants")
-        interp = sp.interpolate.LinearNDInterpolator(vals, np.log10(norm), rescale=True)
-        backup = sp.interpolate.NearestNDInterpolator(vals, np.log10(norm), rescale=True)
+        """
+        def get_norm(lmt, lmr, ltd, lrm):
+            norm = cls._get_norm_chunk(
+                (10.0 ** ltd) * GYR, (10.0 ** lmt) * MSOL, 10.0 ** lmr,
+                rchar, gamma_inner, gamma_outer, (10.0 ** lrm) * PC, progress=False
+            )
+            return norm
+
+        shape = tuple(aa.size for aa in axes)
+        log.info(f"building normalization table {shape} for {cls.__name__}({rchar/PC:.2e} pc, {gamma_inner}, {gamma_outer})")
+        grid = np.meshgrid(*axes, indexing='ij')
+        norm = get_norm(*[gg.ravel() for gg in grid])
+        valid = np.isfinite(norm) & (norm > 0.0)
+        if not np.all(valid):
+            err = f"Invalid normalizations in table!  {utils.frac_str(~valid)}"
+            log.exception(err)
+            raise ValueError(err)
 
-        log.debug("testing interpolants")
-        check_norm, check_points = get_norm_for_random_points(1000)
-        check_vals = convert_points_to_interp_vals(check_points)
-        interp_norm = 10.0 ** interp(check_vals)
-        backup_norm = 10.0 ** backup(check_vals)
-        error_interp = (interp_norm - check_norm) / check_norm
-        error_backup = (backup_norm - check_norm) / check_norm
+        log_norm = np.log10(norm).reshape(shape)
 
-        log.debug(f"{utils.stats(check_norm)=}")
-        log.debug(f"{utils.stats(interp_norm)=}")
-        log.debug(f"{utils.stats(backup_norm)=}")
-        log.debug(f"{utils.stats(error_interp)=}")
-        log.debug(f"{utils.stats(error_backup)=}")
+        # measure the interpolation error at reproducible, random points
+        interp = sp.interpolate.RegularGridInterpolator(axes, log_norm)
+        rng = np.random.default_rng(seed=int(cls._NORM_TABLE_VERSION))
+        points = [rng.uniform(aa[0], aa[-1], int(cls._NORM_TABLE_CHECK_NUM)) for aa in axes]
+        check = get_norm(*points)
+        max_err = np.max(np.fabs(10.0 ** interp(np.array(points).T) / check - 1.0))
+        log.info(f"normalization table maximum interpolation error: {max_err:.2e}")
 
-        return interp, backup
+        return log_norm, max_err
 
     @classmethod
     def _get_norm_chunk(cls, target_time, *args, progress=True, **kwargs):
@@ -1230,8 +1417,10 @@ class Fixed_Time_2PL(_Hardening):
     def _get_norm(cls, target_time, *args, guess=1e7, max_err=1e-6):
         """Calculate normalizations of the input arrays, to obtain the target binary lifetime.
 
-        Uses deterministic least-squares optimization to find the best normalization values, using
-        `scipy.optimize.newton`.
+        Uses deterministic root-finding to find the normalization values, using
+        `scipy.optimize.newton` on the logarithms of the normalization and lifetime.  The lifetime
+        is close to inversely proportional to the normalization, so this converges in a few
+        iterations.
 
         Parameters
         ----------
@@ -1265,7 +1454,10 @@ class Fixed_Time_2PL(_Hardening):
         # perform optimization
         with warnings.catch_warnings():
             warnings.simplefilter("ignore")
-            norm = sp.optimize.newton(lambda xx: integ(xx) - target_time, g1, maxiter=200, tol=1e-6)
+            log_norm = sp.optimize.newton(
+                lambda xx: np.log(integ(np.exp(xx)) / target_time), np.log(g1), maxiter=200, tol=1e-10
+            )
+            norm = np.exp(log_norm)
             err = (integ(norm) - target_time) / target_time
             log.debug(f"Fixed_Time._get_norm() : errors = {utils.stats(err)}")
             if np.any(err > max_err):
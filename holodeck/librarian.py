@@ -3,13 +3,16 @@
 
 import abc
 import argparse
+import concurrent.futures
+import multiprocessing
+import multiprocessing.connection
 from pathlib import Path
 from datetime import datetime
 import psutil
-import resource
 import os
 import shutil
 import sys
+import threading
 
 import h5py
 import numpy as np
@@ -51,8 +54,38 @@ FITS_NBINS_TURN = [5, 10, 15]
 
 # FNAME_SIM_FILE = "lib-sams_gwb-ss__p{pnum:06d}.npz"
 FNAME_SIM_FILE = "sam-lib__p{pnum:06d}.npz"
+FNAME_SIM_PROFILE_FILE = "sam-lib__p{pnum:06d}.profile.npz"
 PSPACE_FILE_SUFFIX = ".pspace.npz"
 
+# Statistics-only output (see `--stats-only` and `run_model`)
+STATS_QUANTILES = utils.Streaming_Stats.QUANTILES   #: quantiles of realizations stored
+STATS_NREALS_BLOCK = 50         #: number of realizations calculated at once
+STATS_LOG_FLOOR = 1.0e-20       #: floor of strains in log-moments, matches `gps.gp_utils.FLOOR_STRAIN_SQUARED`
+#: realization axis of each library quantity, in individual simulations (i.e. excluding the sample axis)
+_REALIZATION_AXES = dict(gwb=1, hc_ss=1, hc_bg=1, sspar=2, bgpar=2)
+
+COMBINE_NUM_WORKERS = 8         #: default number of threads reading simulation files in `sam_lib_combine`
+
+# Library file layout and access (see `Library_Reader`)
+LIB_CHUNK_BYTES = 2**20         #: [bytes] target size of hdf5 chunks in combined libraries
+LIB_READER_CACHE = 2**27        #: [bytes] read-ahead buffer of each `Library_View`
+LIB_READER_CHUNK_CACHE = 2**26  #: [bytes] hdf5 chunk cache of each dataset opened by `Library_Reader`
+#: names of the axes of each library quantity, in combined libraries
+_LIBRARY_AXES = dict(
+    fobs=('freqs',),
+    sample_params=('samples', 'params'),
+    sample_done=('samples',),
+    sample_failed=('samples',),
+    stats_quantiles=('quantiles',),
+    gwb=('samples', 'freqs', 'reals'),
+    hc_ss=('samples', 'freqs', 'reals', 'loudest'),
+    hc_bg=('samples', 'freqs', 'reals'),
+    sspar=('samples', 'pars', 'freqs', 'reals', 'loudest'),
+    bgpar=('samples', 'pars', 'freqs', 'reals'),
+    C0_analytic=('samples', 'freqs'),
+    Cl_analytic=('samples', 'freqs'),
+)
+
 
 # ==============================================================================
 # ====    Class Definitions    ====
@@ -95,7 +128,7 @@ class _Param_Space(abc.ABC):
             dists.append(val)
 
         # if strength = 2, then n must be equal to p**2, with p prime, and d <= p + 1
-        lhs = qmc.LatinHypercube(d=ndims, centered=False, strength=1, seed=seed)
+        lhs = qmc.LatinHypercube(d=ndims, strength=1, seed=seed)
         # (S, D) - samples, dimensions
         uniform_samples = lhs.random(n=nsamples)
         param_samples = np.zeros_like(uniform_samples)
@@ -535,8 +568,19 @@ def run_sam_at_pspace_num(args, space, pnum):
     rv : bool
         True if this simulation was successfully run.
 
+    Notes
+    -----
+    If `args.profile` is True, the wall time, CPU time and memory usage of each calculation stage are
+    recorded using `holodeck.utils.Stage_Profiler`, and saved to a separate file (see `FNAME_SIM_PROFILE_FILE`)
+    alongside the simulation file.  These are collected into the 'profile' group by `sam_lib_combine`.
+
+    If `args.float32` is True, strain realizations ('hc_ss', 'hc_bg', 'gwb') are stored in single precision,
+    halving their size in the simulation files and in the combined library.
+
     """
     log = args.log
+    prof = utils.Stage_Profiler(enabled=getattr(args, 'profile', False))
+    dtype = np.float32 if getattr(args, 'float32', False) else np.float64
 
     # ---- get output filename for this simulation, check if already exists
 
@@ -563,7 +607,9 @@ def run_sam_at_pspace_num(args, space, pnum):
 
     try:
         log.debug("Selecting `sam` and `hard` instances")
-        sam, hard = space(pnum)
+        # the SAM itself is constructed lazily, so this is dominated by the hardening normalization
+        with prof('hardening_norm'):
+            sam, hard = space(pnum)
         _log_mem_usage(log)
 
         log.debug("Calculating 'edges' and 'number' for this SAM.")
@@ -576,16 +622,27 @@ def run_sam_at_pspace_num(args, space, pnum):
             log.exception(err)
             raise RuntimeError(err)
 
-        redz_final, diff_num = sam_cyutils.dynamic_binary_number_at_fobs(
-            fobs_orb_cents, sam, hard, cosmo
-        )
-        edges = [sam.mtot, sam.mrat, sam.redz, fobs_orb_edges]
-        number = sam_cyutils.integrate_differential_number_3dx1d(edges, diff_num)
+        with prof('sam_density'):
+            sam.static_binary_density
+
+        with prof('dynamic_number'):
+            redz_final, diff_num = sam_cyutils.dynamic_binary_number_at_fobs(
+                fobs_orb_cents, sam, hard, cosmo
+            )
+            edges = [sam.mtot, sam.mrat, sam.redz, fobs_orb_edges]
+            number = sam_cyutils.integrate_differential_number_3dx1d(edges, diff_num)
 
         log.debug(f"{utils.stats(number)=}")
 
         _log_mem_usage(log)
 
+        # ---- Calculate analytic anisotropy, C_0 and C_l>0, from the number grid
+
+        if getattr(args, 'anis_flag', False):
+            from holodeck import anisotropy   # noqa
+            with prof('anisotropy'):
+                data['C0_analytic'], data['Cl_analytic'] = anisotropy.Analytic_Cl(edges, redz_final)(number)
+
         # if use_redz is None:
         #     try:
         #         use_redz = sam._redz_final
@@ -594,14 +651,25 @@ def run_sam_at_pspace_num(args, space, pnum):
         #         use_redz = sam._redz_prime[:, :, :, np.newaxis] * np.ones_like(number)
         #         log.warning("using `redz_prime`")
 
+        # ---- Calculate statistics of realizations, without storing them
+
+        if getattr(args, 'stats_only', False):
+            log.debug(f"Calculating statistics of {args.nreals} realizations | {args.gwb_flag=} {args.ss_flag=}")
+            data.update(_realization_stats(
+                edges, redz_final, number, args.nreals, nloudest=args.nloudest,
+                gwb_flag=args.gwb_flag, ss_flag=args.ss_flag, params_flag=args.params_flag, prof=prof,
+            ))
+            _log_mem_usage(log)
+
         # ---- Calculate SS/CW Sources & binary parameters
 
-        if args.ss_flag:
+        elif args.ss_flag:
             log.debug(f"Calculating `ss_gws` for shape ({fobs_cents.size}, {args.nreals}) | {args.params_flag=}")
-            vals = holo.single_sources.ss_gws_redz(
-                edges, redz_final, number, realize=args.nreals,
-                loudest=args.nloudest, params=args.params_flag,
-            )
+            with prof('loudest'):
+                vals = holo.single_sources.ss_gws_redz(
+                    edges, redz_final, number, realize=args.nreals,
+                    loudest=args.nloudest, params=args.params_flag, dtype=dtype,
+                )
             if args.params_flag:
                 hc_ss, hc_bg, sspar, bgpar = vals
                 data['sspar'] = sspar
@@ -617,9 +685,11 @@ def run_sam_at_pspace_num(args, space, pnum):
 
         # ---- Calculate GWB
 
-        if args.gwb_flag:
+        if args.gwb_flag and not getattr(args, 'stats_only', False):
             log.debug(f"Calculating `gwb` for shape ({fobs_cents.size}, {args.nreals})")
-            gwb = holo.gravwaves._gws_from_number_grid_integrated_redz(edges, redz_final, number, args.nreals)
+            with prof('gwb'):
+                gwb = holo.gravwaves._gws_from_number_grid_integrated_redz(edges, redz_final, number, args.nreals)
+                gwb = gwb.astype(dtype, copy=False)
             log.debug(f"{holo.utils.stats(gwb)=}")
             _log_mem_usage(log)
             data['gwb'] = gwb
@@ -635,12 +705,21 @@ def run_sam_at_pspace_num(args, space, pnum):
 
     log.debug(f"Saving {pnum} to file | {args.gwb_flag=} {args.ss_flag=} {args.params_flag=}")
     log.debug(f"data has keys: {list(data.keys())}")
-    np.savez(sim_fname, **data)
+    with prof('io'):
+        np.savez(sim_fname, **data)
     log.info(f"Saved to {sim_fname}, size {holo.utils.get_file_size(sim_fname)} after {(datetime.now()-beg)}")
 
+    # the 'io' stage can only be recorded after the main file is written, so store profiling separately
+    if prof.enabled:
+        prof_fname = _get_sim_profile_fname(args.output_sims, pnum)
+        np.savez(prof_fname, profile=prof.to_array())
+        log.info(f"Stage profile for {pnum=}:\n{prof.summary()}")
+
     # ---- Plot hc and pars
 
-    if rv and args.plot:
+    if rv and args.plot and getattr(args, 'stats_only', False):
+        log.warning("Plots are not available with `--stats-only`, skipping.")
+    elif rv and args.plot:
         log.info("generating characteristic strain/psd plots")
         try:
             log.info("generating strain plots")
@@ -667,9 +746,20 @@ def run_sam_at_pspace_num(args, space, pnum):
 
 
 def run_model(sam, hard, nreals, nfreqs, nloudest=5,
-              gwb_flag=True, details_flag=False, singles_flag=False, params_flag=False):
+              gwb_flag=True, details_flag=False, singles_flag=False, params_flag=False, profile=False,
+              stats_only=False, dtype=np.float64):
     """Run the given modeling, storing requested data
+
+    If `profile` is True, the wall time, CPU time and memory usage of each stage are stored in the returned
+    dictionary under the 'profile' key, as an array from `holodeck.utils.Stage_Profiler.to_array`.
+
+    If `stats_only` is True, realizations are not stored.  Instead, statistics over realizations of each
+    requested quantity are stored, see `_realization_stats`.
+
+    Strain realizations ('hc_ss', 'hc_bg', 'gwb') are returned with the given `dtype`, e.g. `np.float32` to halve
+    their memory and storage.  Calculations, and binary parameters, are always double precision.
     """
+    prof = utils.Stage_Profiler(enabled=profile)
     fobs_cents, fobs_edges = holo.librarian.get_freqs(None)
     if nfreqs is not None:
         fobs_edges = fobs_edges[:nfreqs+1]
@@ -679,12 +769,16 @@ def run_model(sam, hard, nreals, nfreqs, nloudest=5,
 
     data = dict(fobs_cents=fobs_cents, fobs_edges=fobs_edges)
 
-    redz_final, diff_num = sam_cyutils.dynamic_binary_number_at_fobs(
-        fobs_orb_cents, sam, hard, cosmo
-    )
-    use_redz = redz_final
-    edges = [sam.mtot, sam.mrat, sam.redz, fobs_orb_edges]
-    number = sam_cyutils.integrate_differential_number_3dx1d(edges, diff_num)
+    with prof('sam_density'):
+        sam.static_binary_density
+
+    with prof('dynamic_number'):
+        redz_final, diff_num = sam_cyutils.dynamic_binary_number_at_fobs(
+            fobs_orb_cents, sam, hard, cosmo
+        )
+        use_redz = redz_final
+        edges = [sam.mtot, sam.mrat, sam.redz, fobs_orb_edges]
+        number = sam_cyutils.integrate_differential_number_3dx1d(edges, diff_num)
     if details_flag:
         data['static_binary_density'] = sam.static_binary_density
         data['number'] = number
@@ -698,14 +792,22 @@ def run_model(sam, hard, nreals, nfreqs, nloudest=5,
         data['gwb_mtot_redz_final'] = gwb_mtot_redz_final
         data['num_mtot_redz_final'] = num_mtot_redz_final
 
+    if stats_only:
+        nloudest = nloudest if singles_flag else 1
+        data.update(_realization_stats(
+            edges, use_redz, number, nreals, nloudest=nloudest,
+            gwb_flag=gwb_flag, ss_flag=singles_flag, params_flag=params_flag, prof=prof,
+        ))
+
     # calculate single sources and/or binary parameters
-    if singles_flag or params_flag:
+    elif singles_flag or params_flag:
         nloudest = nloudest if singles_flag else 1
 
-        vals = holo.single_sources.ss_gws_redz(
-            edges, use_redz, number, realize=nreals,
-            loudest=nloudest, params=params_flag,
-        )
+        with prof('loudest'):
+            vals = holo.single_sources.ss_gws_redz(
+                edges, use_redz, number, realize=nreals,
+                loudest=nloudest, params=params_flag, dtype=dtype,
+            )
         if params_flag:
             hc_ss, hc_bg, sspar, bgpar = vals
             data['sspar'] = sspar
@@ -717,9 +819,82 @@ def run_model(sam, hard, nreals, nfreqs, nloudest=5,
             data['hc_ss'] = hc_ss
             data['hc_bg'] = hc_bg
 
-    if gwb_flag:
-        gwb = holo.gravwaves._gws_from_number_grid_integrated_redz(edges, use_redz, number, nreals)
-        data['gwb'] = gwb
+    if gwb_flag and not stats_only:
+        with prof('gwb'):
+            gwb = holo.gravwaves._gws_from_number_grid_integrated_redz(edges, use_redz, number, nreals)
+        data['gwb'] = gwb.astype(dtype, copy=False)
+
+    if profile:
+        data['profile'] = prof.to_array()
+
+    return data
+
+
+def _realization_stats(edges, redz_final, number, nreals, nloudest=1,
+                       gwb_flag=True, ss_flag=False, params_flag=False, prof=None, nblock=None):
+    """Calculate statistics over realizations of GW signals, without storing the realizations.
+
+    Realizations are calculated in blocks of `nblock`, and each block is accumulated into a
+    `holodeck.utils.Streaming_Stats` instance for each quantity.
+
+    Parameters
+    ----------
+    edges : (4,) list of 1darrays
+        [mtot, mrat, redz, fobs_orb_edges] with shapes (M, Q, Z, F+1)
+    redz_final : (M, Q, Z, F) ndarray
+        Redshift final (redshift at the given frequencies).
+    number : (M-1, Q-1, Z-1, F) ndarray
+        Absolute number of binaries in the given bin (dimensionless).
+    nreals : int
+        Total number of realizations.
+    nloudest : int
+        Number of loudest single sources.
+    gwb_flag, ss_flag, params_flag : bool
+        Whether to calculate statistics of 'gwb', of 'hc_ss' & 'hc_bg', and of 'sspar' & 'bgpar'.
+    prof : None or `holodeck.utils.Stage_Profiler`
+        Profiler in which to record the 'loudest' and 'gwb' stages.
+    nblock : None or int
+        Number of realizations to calculate at once.  `None` uses `STATS_NREALS_BLOCK`.
+
+    Returns
+    -------
+    data : dict
+        For each quantity `name` (e.g. 'gwb'), the entries '{name}_{stat}' for each `stat` in
+        `holodeck.utils.Streaming_Stats.STATS`, where the realization axis has been removed (and
+        quantiles are along a new trailing axis).  Also 'nreals', and the 'stats_quantiles' themselves.
+
+    """
+    prof = utils.Stage_Profiler(enabled=False) if prof is None else prof
+    nblock = STATS_NREALS_BLOCK if nblock is None else nblock
+    stats = {}
+    for lo in range(0, nreals, nblock):
+        nr = min(nblock, nreals - lo)
+        block = {}
+        if ss_flag or params_flag:
+            with prof('loudest'):
+                vals = holo.single_sources.ss_gws_redz(
+                    edges, redz_final, number, realize=nr, loudest=nloudest, params=params_flag,
+                )
+            if ss_flag:
+                block['hc_ss'], block['hc_bg'] = vals[:2]
+            if params_flag:
+                block['sspar'], block['bgpar'] = vals[2:]
+
+        if gwb_flag:
+            with prof('gwb'):
+                block['gwb'] = holo.gravwaves._gws_from_number_grid_integrated_redz(edges, redz_final, number, nr)
+
+        for name, vals in block.items():
+            if name not in stats:
+                # binary parameters are not strains, do not floor them
+                floor = None if name in ['sspar', 'bgpar'] else STATS_LOG_FLOOR
+                stats[name] = utils.Streaming_Stats(quantiles=STATS_QUANTILES, log_floor=floor)
+            stats[name].update(vals, axis=_REALIZATION_AXES[name])
+
+    data = dict(nreals=nreals, stats_quantiles=np.asarray(STATS_QUANTILES))
+    for name, st in stats.items():
+        for key, val in st.results().items():
+            data[f"{name}_{key}"] = val
 
     return data
 
@@ -818,8 +993,13 @@ def _calc_model_details(edges, redz_final, number):
     return gwb_pars, num_pars, gwb_mtot_redz_final, num_mtot_redz_final
 
 
-def sam_lib_combine(path_output, log, path_pspace=None, recreate=False, gwb_only=False):
-    """
+def sam_lib_combine(path_output, log, path_pspace=None, recreate=False, gwb_only=False,
+                    append=False, nworkers=None):
+    """Combine the individual simulation files into a single library file.
+
+    Simulation files are read concurrently, by a bounded pool of `nworkers` threads, and each is written
+    into the (pre-created, chunked) datasets of the library as soon as it has been loaded.  Only a few
+    simulations are held in memory at once, so combining is limited by I/O instead of memory.
 
     Arguments
     ---------
@@ -827,12 +1007,20 @@ def sam_lib_combine(path_output, log, path_pspace=None, recreate=False, gwb_only
         Path to output directory where combined library will be saved.
     log : `logging.Logger`
         Logging instance.
-    path_sims : str or None,
-        Path to output directory containing simulation files.
-        If `None` this is set to be the same as `path_output`.
     path_pspace : str or None,
         Path to file containing _Param_Space subclass instance.
         If `None` then `path_output` is searched for a `_Param_Space` save file.
+    recreate : bool
+        Replace an existing combined library with a new one.
+    gwb_only : bool
+        Only combine the GWB data (no single source, or binary parameter data).
+    append : bool
+        Add simulations to an existing combined library (e.g. as new simulation files arrive), or start
+        a new one.  Missing simulation files are allowed: their samples are stored as NaN (like failed
+        simulations), and are added by subsequent calls once their files exist.  Failed simulations are
+        retried by subsequent calls, e.g. once they have been re-run.
+    nworkers : int or None
+        Number of threads reading simulation files.  `None`: use `COMBINE_NUM_WORKERS`.
 
     Returns
     -------
@@ -850,7 +1038,7 @@ def sam_lib_combine(path_output, log, path_pspace=None, recreate=False, gwb_only
     # ---- see if a combined library already exists
 
     lib_path = get_sam_lib_fname(path_output, gwb_only)
-    if lib_path.exists():
+    if lib_path.exists() and not append:
         lvl = log.INFO if recreate else log.WARNING
         log.log(lvl, f"combined library already exists: {lib_path}")
         if not recreate:
@@ -884,68 +1072,210 @@ def sam_lib_combine(path_output, log, path_pspace=None, recreate=False, gwb_only
     # ---- make sure all files exist; get shape information from files
 
     log.info(f"checking that all {nsamp} files exist")
-    fobs, nreals, nloudest, has_gwb, has_ss, has_params = _check_files_and_load_shapes(log, path_sims, nsamp)
-    nfreqs = fobs.size
+    fobs, nreals, nloudest, has_gwb, has_ss, has_params, has_anis, stats_only = _check_files_and_load_shapes(
+        log, path_sims, nsamp, allow_missing=append,
+    )
+    nfreqs = fobs.size if fobs is not None else None
     log.debug(f"{nfreqs=}, {nreals=}, {nloudest=}")
-    log.debug(f"{has_gwb=}, {has_ss=}, {has_params=}")
+    log.debug(f"{has_gwb=}, {has_ss=}, {has_params=}, {has_anis=}, {stats_only=}")
 
     if not has_gwb and gwb_only:
         err = f"Combining with {gwb_only=}, but received {has_gwb=} from `_check_files_and_load_shapes`!"
         log.exception(err)
         raise RuntimeError(err)
 
-    if (fobs is None) or (nreals is None):
-        err = f"After checking files, {fobs=} and {nreals=}!"
+    # library datasets are created from the first successful simulation, so there must be at least one
+    if fobs is None:
+        err = f"No successful simulations in {path_sims} (all {nsamp} are missing or failures), nothing to combine!"
         log.exception(err)
         raise ValueError(err)
 
-    # ---- load results from all files
-
-    gwb = np.zeros((nsamp, nfreqs, nreals)) if has_gwb else None
+    if nreals is None:
+        err = f"After checking files, {fobs=} and {nreals=}!"
+        log.exception(err)
+        raise ValueError(err)
 
+    names = ['gwb'] if has_gwb else []
     if (not gwb_only) and has_ss:
-        hc_ss = np.zeros((nsamp, nfreqs, nreals, nloudest))
-        hc_bg = np.zeros((nsamp, nfreqs, nreals))
-    else:
-        hc_ss = None
-        hc_bg = None
-
+        names += ['hc_ss', 'hc_bg']
     if (not gwb_only) and has_params:
-        sspar = np.zeros((nsamp, 4, nfreqs, nreals, nloudest))
-        bgpar = np.zeros((nsamp, 7, nfreqs, nreals))
+        names += ['sspar', 'bgpar']
+
+    # statistics-only libraries store each '{name}_{stat}' instead of the realizations themselves
+    if stats_only:
+        keys = [f"{name}_{stat}" for name in names for stat in utils.Streaming_Stats.STATS]
     else:
-        sspar = None
-        bgpar = None
+        keys = names
+
+    # analytic anisotropy does not depend on realizations
+    if (not gwb_only) and has_anis:
+        keys = keys + ['C0_analytic', 'Cl_analytic']
+
+    # ---- create (or open) the output file, and stream all new simulations into it
+
+    mode = 'r+' if (append and lib_path.exists()) else 'w'
+    log.info(f"Writing collected data to file {lib_path} ({mode=})")
+    with h5py.File(lib_path, mode, rdcc_nbytes=LIB_READER_CHUNK_CACHE) as h5:
+        if mode == 'w':
+            h5.create_dataset('fobs', data=fobs)
+            # parameters are set as each simulation is loaded; missing and failed simulations are NaN
+            h5.create_dataset('sample_params', data=np.full_like(param_samples, np.nan))
+            h5.create_dataset('sample_done', data=np.zeros(nsamp, dtype=bool))
+            h5.attrs['param_names'] = np.array(param_names).astype('S')
+            if stats_only:
+                h5.attrs['stats_only'] = True
+                h5.attrs['nreals'] = nreals
+        elif 'sample_done' not in h5:
+            err = f"Existing library {lib_path} does not support appending, it must be recreated!"
+            log.exception(err)
+            raise ValueError(err)
+        elif (h5['fobs'].shape != fobs.shape) or (bool(h5.attrs.get('stats_only', False)) != stats_only):
+            err = f"Existing library {lib_path} does not match the simulation files in {path_sims}!"
+            log.exception(err)
+            raise ValueError(err)
 
-    gwb, hc_ss, hc_bg, sspar, bgpar, bad_files = _load_library_from_all_files(
-        path_sims, gwb, hc_ss, hc_bg, sspar, bgpar, log,
-    )
-    if has_gwb: log.info(f"Loaded data from all library files | {utils.stats(gwb)=}")
-    param_samples[bad_files] = np.nan
-
-    # ---- Save to concatenated output file ----
-
-    log.info(f"Writing collected data to file {lib_path}")
-    with h5py.File(lib_path, 'w') as h5:
-        h5.create_dataset('fobs', data=fobs)
-        h5.create_dataset('sample_params', data=param_samples)
-        if gwb is not None:
-            h5.create_dataset('gwb', data=gwb)
-        if not gwb_only:
-            if has_ss:
-                h5.create_dataset('hc_ss', data=hc_ss)
-                h5.create_dataset('hc_bg', data=hc_bg)
-            if has_params:
-                h5.create_dataset('sspar', data=sspar)
-                h5.create_dataset('bgpar', data=bgpar)
-        h5.attrs['param_names'] = np.array(param_names).astype('S')
+        done = h5['sample_done'][()]
+        pnums = [pnum for pnum in np.flatnonzero(~done) if _get_sim_fname(path_sims, pnum).exists()]
+        log.info(f"Combining {len(pnums)} new simulations ({np.count_nonzero(done)} already combined)")
+        _stream_sims_into_library(h5, path_sims, pnums, keys, param_samples, log, nworkers=nworkers)
+
+        # profiles are small; always collect all of them again
+        if 'profile' in h5:
+            del h5['profile']
+        _save_profile_group(h5, _load_profiles_from_all_files(path_sims, nsamp, log))
+
+        num_done = np.count_nonzero(h5['sample_done'][()])
+        num_failed = np.count_nonzero(h5['sample_failed'][()])
+
+    if num_done < nsamp:
+        log.warning(
+            f"Library is incomplete: {num_done}/{nsamp} simulations combined ({num_failed} failures); "
+            "use `append` to add more."
+        )
 
     log.warning(f"Saved to {lib_path}, size: {holo.utils.get_file_size(lib_path)}")
 
     return lib_path
 
 
-def _check_files_and_load_shapes(log, path_sims, nsamp):
+def _stream_sims_into_library(h5, path_sims, pnums, keys, param_samples, log, nworkers=None):
+    """Load simulation files concurrently, and write each into the library datasets as it arrives.
+
+    Files are read by a pool of `nworkers` threads (`np.load` spends most of its time in I/O and
+    decompression, which release the GIL), and at most `2*nworkers` loaded files are held in memory.
+    All writes happen on the calling thread.  Datasets are created from the first successful file,
+    filled with NaN, so that failed (and missing) simulations are NaN.  `sam_lib_combine` ensures that
+    there is at least one successful file, so the datasets always exist.
+
+    Successful simulations are marked in 'sample_done', and failures in 'sample_failed' (created if
+    needed).  Failures are not done, so that they are loaded again when appending to the library.
+
+    Arguments
+    ---------
+    h5 : `h5py.File`
+        Open (writable) library file, containing 'sample_params' and 'sample_done'.
+    path_sims : str
+        Path to find individual simulation files.
+    pnums : list of int
+        Simulation numbers to load.
+    keys : list of str
+        Quantities to load from each file, e.g. ['gwb', 'hc_ss', 'hc_bg'].
+    param_samples : (S, D) ndarray
+        Parameters of all samples, stored for each successfully loaded simulation.
+    log : `logging.Logger`
+        Logging instance.
+    nworkers : int or None
+        Number of threads reading simulation files.  `None`: use `COMBINE_NUM_WORKERS`.
+
+    Returns
+    -------
+    bad_files : list of int
+        Simulation numbers of failure files.
+
+    """
+    nworkers = COMBINE_NUM_WORKERS if nworkers is None else max(int(nworkers), 1)
+    keys = keys + ([] if 'stats_quantiles' in h5 else ['stats_quantiles'])
+    h5.require_dataset('sample_failed', shape=h5['sample_done'].shape, dtype=bool, fillvalue=False)
+
+    bad_files = []
+    pbar = tqdm.tqdm(total=len(pnums))
+    pnums = iter(pnums)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=nworkers) as pool, pbar:
+        pending = {}
+        while True:
+            # keep a bounded number of files in flight
+            while len(pending) < 2 * nworkers:
+                pnum = next(pnums, None)
+                if pnum is None:
+                    break
+                pending[pool.submit(_load_sim_for_library, path_sims, pnum, keys)] = pnum
+
+            if len(pending) == 0:
+                break
+
+            finished, _ = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in finished:
+                pnum = pending.pop(future)
+                data = future.result()
+                pbar.update(1)
+                if data is None:
+                    log.warning(f"file {pnum=:06d} is a failure file, setting values to NaN")
+                    bad_files.append(pnum)
+                    h5['sample_failed'][pnum] = True
+                else:
+                    _write_sim_into_library(h5, pnum, data, param_samples)
+
+    log.info(f"{len(bad_files)} new files are failures")
+    return bad_files
+
+
+def _load_sim_for_library(path_sims, pnum, keys):
+    """Load the given `keys` (those that exist, for optional keys) of a simulation file.
+
+    Returns `None` for failure files.  Called from the reading threads of `_stream_sims_into_library`.
+    """
+    fname = _get_sim_fname(path_sims, pnum)
+    with np.load(fname, allow_pickle=True) as temp:
+        # When a processor fails for a given parameter, the output file is still created with the 'fail' key added
+        if 'fail' in temp:
+            return None
+        return {key: temp[key][()] for key in keys if (key != 'stats_quantiles') or (key in temp)}
+
+
+def _write_sim_into_library(h5, pnum, data, param_samples):
+    """Write the `data` of simulation `pnum` into the library, creating datasets as needed, and mark it done.
+    """
+    quantiles = data.pop('stats_quantiles', None)
+    if (quantiles is not None) and ('stats_quantiles' not in h5):
+        h5.create_dataset('stats_quantiles', data=quantiles)
+    for key, vals in data.items():
+        if key not in h5:
+            # keep single-precision simulations (`--float32`) in single precision
+            dtype = vals.dtype if np.issubdtype(vals.dtype, np.floating) else float
+            _create_library_dataset(h5, key, shape=(h5['sample_done'].size,) + vals.shape, dtype=dtype)
+        h5[key][pnum] = vals
+
+    h5['sample_params'][pnum] = param_samples[pnum]
+    h5['sample_failed'][pnum] = False
+    h5['sample_done'][pnum] = True
+    return
+
+
+def _save_profile_group(h5, profile):
+    """Store stage profiles from `_load_profiles_from_all_files` into a 'profile' group, if there are any.
+    """
+    if profile is None:
+        return
+
+    stages, values = profile
+    group = h5.create_group('profile')
+    group.attrs['stages'] = np.array(stages).astype('S')
+    for ii, field in enumerate(utils.Stage_Profiler.FIELDS):
+        group.create_dataset(field, data=values[..., ii])
+    return
+
+
+def _check_files_and_load_shapes(log, path_sims, nsamp, allow_missing=False):
     """Check that all `nsamp` files exist in the given path, and load info about array shapes.
 
     Arguments
@@ -955,13 +1285,25 @@ def _check_files_and_load_shapes(log, path_sims, nsamp):
     nsamp : int
         Number of simulations/files that should be found.
         This should typically be loaded from the parameter-space object used to generate the library.
+    allow_missing : bool
+        Skip missing files, instead of raising an error.
 
     Returns
     -------
-    fobs : (F,) ndarray
+    fobs : (F,) ndarray or None
         Observer-frame frequency bin centers at which GW signals are calculated.
+        `None` if there are no successful (i.e. existing, non-failure) simulation files.
     nreals : int
         Number of realizations in the output files.
+    nloudest : int
+        Number of loudest single sources in the output files.
+    has_gwb, has_ss, has_params : bool
+        Whether the files contain the GWB, single sources and background, and binary parameters.
+    has_anis : bool
+        Whether the files contain the analytic anisotropy, 'C0_analytic' and 'Cl_analytic'.
+    stats_only : bool
+        Whether the files contain statistics over realizations (see `_realization_stats`), instead of
+        the realizations themselves.
 
     """
     fobs = None
@@ -970,11 +1312,17 @@ def _check_files_and_load_shapes(log, path_sims, nsamp):
     has_gwb = False
     has_ss = False
     has_params = False
+    has_anis = False
+    stats_only = False
 
     log.info(f"Checking {nsamp} files in {path_sims}")
+    num_missing = 0
     for ii in tqdm.trange(nsamp):
         temp_fname = _get_sim_fname(path_sims, ii)
         if not temp_fname.exists():
+            if allow_missing:
+                num_missing += 1
+                continue
             err = f"Missing at least file number {ii} out of {nsamp} files!  {temp_fname}"
             log.exception(err)
             raise ValueError(err)
@@ -987,9 +1335,26 @@ def _check_files_and_load_shapes(log, path_sims, nsamp):
         data_keys = list(temp.keys())
         log.debug(f"{ii=} {temp_fname.name=} {data_keys=}")
 
+        # failure files contain no data
+        if 'fail' in data_keys:
+            continue
+
         if fobs is None:
             fobs = temp['fobs'][()]
 
+        has_anis = has_anis or ('Cl_analytic' in data_keys)
+
+        # statistics-only files store the number of realizations, and a '{name}_{stat}' entry per quantity
+        if 'stats_quantiles' in data_keys:
+            stats_only = True
+            nreals = int(temp['nreals'])
+            has_gwb = has_gwb or ('gwb_mean' in data_keys)
+            has_ss = has_ss or ('hc_ss_mean' in data_keys)
+            has_params = has_params or ('sspar_mean' in data_keys)
+            if (nloudest is None) and ('hc_ss_mean' in data_keys):
+                nloudest = temp['hc_ss_mean'].shape[-1]
+            continue
+
         if (not has_gwb) and ('gwb' in data_keys):
             has_gwb = True
 
@@ -1017,68 +1382,60 @@ def _check_files_and_load_shapes(log, path_sims, nsamp):
         if (nloudest is None) and ('hc_ss' in data_keys):
             nloudest = temp['hc_ss'].shape[-1]
 
-    return fobs, nreals, nloudest, has_gwb, has_ss, has_params
+    if num_missing > 0:
+        log.warning(f"Missing {num_missing}/{nsamp} files")
 
+    return fobs, nreals, nloudest, has_gwb, has_ss, has_params, has_anis, stats_only
 
-def _load_library_from_all_files(path_sims, gwb, hc_ss, hc_bg, sspar, bgpar, log):
-    """Load data from all individual simulation files.
+
+def _load_profiles_from_all_files(path_sims, nsamp, log):
+    """Load stage-profiling data from all individual simulation profile files, if they exist.
 
     Arguments
     ---------
     path_sims : str
-        Path to find individual simulation files.
-    gwb : (S, F, R) ndarray
-        Array in which to store GWB data from all of 'S' files.
-        S: num-samples/simulations,  F: num-frequencies,  R: num-realizations.
+        Path to find individual simulation (profile) files.
+    nsamp : int
+        Number of simulations/files.
     log : `logging.Logger`
         Logging instance.
 
-    """
-    if hc_bg is not None:
-        nsamp = hc_bg.shape[0]
-    elif gwb is not None:
-        nsamp = gwb.shape[0]
-    else:
-        err = f"Unable to get shape from either `hc_bg` or `gwb`!"
-        log.exception(err)
-        raise RuntimeError(err)
+    Returns
+    -------
+    None  or  (stages, values)
+        `None` if no profile files are found, otherwise:
+        stages : (S,) list of str
+            Names of all stages found in any file.
+        values : (N, S, K) ndarray
+            Values of each of the K fields in `utils.Stage_Profiler.FIELDS`, for each of the N simulations and
+            S stages.  Missing entries (missing files or stages) are NaN.
 
-    log.info(f"Collecting data from {nsamp} files")
-    bad_files = np.zeros(nsamp, dtype=bool)     #: track which files contain UN-useable data
-    msg = None
-    for pnum in tqdm.trange(nsamp):
-        fname = _get_sim_fname(path_sims, pnum)
-        temp = np.load(fname, allow_pickle=True)
-        # When a processor fails for a given parameter, the output file is still created with the 'fail' key added
-        if ('fail' in temp):
-            msg = f"file {pnum=:06d} is a failure file, setting values to NaN ({fname})"
-            log.warning(msg)
-            # set all parameters to NaN for failure files.  Note that this is distinct from gwb=0.0 which can be real.
-            if gwb is not None:
-                gwb[pnum, :, :] = np.nan
-            # `hc_ss` will be set to None if `gwb_only==True`
-            if hc_ss is not None:
-                hc_ss[pnum, :, :, :] = np.nan
-                hc_bg[pnum, :, :] = np.nan
-
-            bad_files[pnum] = True
+    """
+    fields = utils.Stage_Profiler.FIELDS
+    profiles = [None] * nsamp
+    stages = []
+    for pnum in range(nsamp):
+        fname = _get_sim_profile_fname(path_sims, pnum)
+        if not fname.exists():
             continue
+        prof = np.load(fname)['profile']
+        profiles[pnum] = prof
+        stages.extend([ss for ss in prof['stage'] if ss not in stages])
+
+    num_found = sum([prof is not None for prof in profiles])
+    if num_found == 0:
+        return None
+
+    log.info(f"Loaded stage profiles from {num_found}/{nsamp} files")
+    values = np.full((nsamp, len(stages), len(fields)), np.nan)
+    for pnum, prof in enumerate(profiles):
+        if prof is None:
+            continue
+        for rec in prof:
+            jj = stages.index(rec['stage'])
+            values[pnum, jj, :] = [rec[ff] for ff in fields]
 
-        # store the GWB from this file
-        if gwb is not None:
-            gwb[pnum, :, :] = temp['gwb'][...]
-        # `hc_ss` will be set to None if `gwb_only==True`
-        if (hc_ss is not None):
-            hc_ss[pnum, :, :, :] = temp['hc_ss'][...]
-            hc_bg[pnum, :, :] = temp['hc_bg'][...]
-        # `hc_ss` will be set to None if `gwb_only==True`
-        if bgpar is not None:
-            sspar[pnum, :, :, :, :] = temp['sspar'][...]
-            bgpar[pnum, :, :, :] = temp['bgpar'][...]
-
-    log.info(f"{utils.frac_str(bad_files)} files are failures")
-
-    return gwb, hc_ss, hc_bg, sspar, bgpar, bad_files
+    return stages, values
 
 
 def fit_library_spectra(library_path, log, recreate=False):
@@ -1118,9 +1475,12 @@ def fit_library_spectra(library_path, log, recreate=False):
 
         # ---- load library GWB and convert to PSD
 
+        # for statistics-only libraries, the spectrum at each of the 'stats_quantiles' is fit in place of
+        # each realization
         with h5py.File(library_path, 'r') as library:
             fobs = library['fobs'][()]
-            psd = utils.char_strain_to_psd(fobs[np.newaxis, :, np.newaxis], library['gwb'][()])
+            gwb_key = 'gwb_quantiles' if library.attrs.get('stats_only', False) else 'gwb'
+            psd = utils.char_strain_to_psd(fobs[np.newaxis, :, np.newaxis], library[gwb_key][()])
 
         nsamps, nfreqs, nreals = psd.shape
         log.debug(f"{nsamps=}, {nfreqs=}, {nreals=}")
@@ -1278,6 +1638,675 @@ def _find_sam_lib_in_path_tree(path, pattern=None):
     return path_list
 
 
+# ==============================================================================
+# ====    Library Access    ====
+# ==============================================================================
+
+
+class Library_Reader:
+    """Lazy, sliceable access to a combined library file (e.g. 'sam_lib.hdf5').
+
+    Nothing is loaded on construction.  Indexing the reader with the name of a dataset returns a
+    `Library_View`, from which only the requested samples, frequencies and realizations are read.  The
+    reader can be used in place of an open `h5py.File` by code that indexes datasets, e.g.
+    ``lib['gwb'][:, :nfreqs]`` and ``lib.attrs``.
+
+    Examples
+    --------
+    >>> with Library_Reader("sam_lib.hdf5") as lib:
+    ...     gwb = lib['gwb'].select(freqs=slice(0, 5), reals=slice(0, 10))
+    ...     for samples, vals in gwb.iter_blocks():
+    ...         ...
+
+    """
+
+    def __init__(self, fname, cache=LIB_READER_CACHE, chunk_cache=LIB_READER_CHUNK_CACHE):
+        """Open the library file for reading.
+
+        Parameters
+        ----------
+        fname : str or `pathlib.Path`
+            Path to a combined library file (see `sam_lib_combine`).
+        cache : int
+            [bytes] Size of the read-ahead buffer of each `Library_View`.
+        chunk_cache : int
+            [bytes] Size of the hdf5 chunk cache of each dataset.  Chunks which have been fully read are
+            evicted first, which suits streaming through samples.
+
+        """
+        self.fname = Path(fname)
+        self._cache = cache
+        self._h5 = h5py.File(self.fname, 'r', rdcc_nbytes=chunk_cache, rdcc_w0=1.0)
+        self._fobs = None
+        return
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+        return
+
+    def close(self):
+        self._h5.close()
+        return
+
+    def __contains__(self, key):
+        return key in self._h5
+
+    def __getitem__(self, key):
+        """Get a `Library_View` of the dataset `key` (or the `h5py.Group`, for groups).
+        """
+        item = self._h5[key]
+        if not isinstance(item, h5py.Dataset):
+            return item
+        return Library_View(item, axes=_library_axes(key, item.ndim), cache=self._cache)
+
+    def keys(self):
+        return self._h5.keys()
+
+    @property
+    def attrs(self):
+        return self._h5.attrs
+
+    @property
+    def stats_only(self):
+        """Whether this is a statistics-only library (see `run_model`).
+        """
+        return bool(self.attrs.get('stats_only', False))
+
+    @property
+    def fobs(self):
+        if self._fobs is None:
+            self._fobs = self._h5['fobs'][()]
+        return self._fobs
+
+    @property
+    def sample_params(self):
+        return self._h5['sample_params'][()]
+
+    @property
+    def param_names(self):
+        return list(self.attrs['param_names'].astype(str))
+
+    @property
+    def nsamps(self):
+        return self._h5['sample_params'].shape[0]
+
+    @property
+    def nfreqs(self):
+        return self._h5['fobs'].size
+
+    @property
+    def nreals(self):
+        if self.stats_only:
+            return int(self.attrs['nreals'])
+        for key in ['gwb', 'hc_bg']:
+            if key in self._h5:
+                return self._h5[key].shape[2]
+        return None
+
+
+class Library_View:
+    """Lazy view of (a subset of) one library dataset.
+
+    A view stores the indices selected along each axis, and reads from disk only when indexed (with
+    numpy-style basic indexing, or integer/boolean arrays applied to each axis independently), when
+    converted with `numpy.asarray`, or when iterated over with `iter_blocks`.  Integer indexing along
+    the first axis, as in ``for nn in range(len(view)): view[nn]``, reads ahead a block of entries sized
+    to the read-ahead buffer and to the chunk layout of the dataset, so that sequential loops read each
+    chunk once.
+
+    """
+
+    def __init__(self, dset, axes=None, cache=LIB_READER_CACHE, _index=None):
+        self._dset = dset
+        self._cache = cache
+        if _index is None:
+            _index = [np.arange(nn) for nn in dset.shape]
+        self._index = _index
+        if axes is None:
+            axes = tuple(f"axis{ii}" for ii in range(dset.ndim))
+        self.axes = tuple(axes)
+        # read-ahead buffer along the first axis, (lo, hi, data) in view indices
+        self._buffer = None
+        self._last = None
+        return
+
+    def __repr__(self):
+        return f"Library_View('{self._dset.name}', shape={self.shape}, axes={self.axes})"
+
+    @property
+    def shape(self):
+        return tuple(idx.size for idx in self._index)
+
+    @property
+    def ndim(self):
+        return len(self._index)
+
+    @property
+    def size(self):
+        return int(np.prod(self.shape))
+
+    @property
+    def dtype(self):
+        return self._dset.dtype
+
+    @property
+    def nbytes(self):
+        return self.size * self.dtype.itemsize
+
+    @property
+    def chunks(self):
+        return self._dset.chunks
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __array__(self, dtype=None, copy=None):
+        vals = self.read()
+        if dtype is not None:
+            vals = vals.astype(dtype, copy=False)
+        return vals
+
+    def read(self):
+        """Read all of the data in this view into memory.
+        """
+        return self._read(self._index)
+
+    def select(self, **kwargs):
+        """Get a sub-view, selecting along axes by name, e.g. ``view.select(freqs=slice(0, 5))``.
+
+        Each value can be a slice, or an array of integers or booleans.  Integers select the entries of
+        the current view (not of the dataset on disk).
+
+        """
+        index = list(self._index)
+        for name, sel in kwargs.items():
+            if name not in self.axes:
+                err = f"`{name}` is not an axis of {self}!"
+                holo.log.exception(err)
+                raise ValueError(err)
+
+            ax = self.axes.index(name)
+            if np.ndim(sel) == 0 and not isinstance(sel, slice):
+                err = f"Use a slice or array to select along `{name}` (integers would drop the axis)!"
+                holo.log.exception(err)
+                raise ValueError(err)
+
+            index[ax] = index[ax][sel]
+
+        return Library_View(self._dset, axes=self.axes, cache=self._cache, _index=index)
+
+    def __getitem__(self, key):
+        """Read the selected data, using numpy-style indexing of this view.
+        """
+        key = self._expand_key(key)
+        # integer along the first axis: use the read-ahead buffer
+        if (self.ndim > 0) and isinstance(key[0], (int, np.integer)):
+            ii = int(key[0])
+            ii = ii + len(self) if ii < 0 else ii
+            if not (0 <= ii < len(self)):
+                raise IndexError(f"index {key[0]} is out of bounds for axis 0 with size {len(self)}")
+            vals = self._read_ahead(ii)
+            return vals[key[1:]]
+
+        index = []
+        drop = []
+        for ax, (idx, kk) in enumerate(zip(self._index, key)):
+            if isinstance(kk, (int, np.integer)):
+                drop.append(ax)
+                kk = [kk]
+            index.append(idx[kk])
+
+        vals = self._read(index)
+        if len(drop) > 0:
+            vals = vals.reshape([nn for ax, nn in enumerate(vals.shape) if ax not in drop])
+        return vals
+
+    def iter_blocks(self, size=None):
+        """Iterate over blocks of entries along the first axis (typically samples).
+
+        Parameters
+        ----------
+        size : int or None
+            Number of entries in each block.  `None`: use the largest block fitting in the read-ahead
+            buffer, rounded to a multiple of the chunk size along the first axis.
+
+        Yields
+        ------
+        index : (B,) ndarray of int
+            Indices of the block entries, along the first axis of this view.
+        vals : (B, ...) ndarray
+            Data in this block.
+
+        """
+        size = self._block_size() if size is None else int(size)
+        for lo in range(0, len(self), size):
+            index = [self._index[0][lo:lo+size]] + list(self._index[1:])
+            yield np.arange(lo, lo + index[0].size), self._read(index)
+        return
+
+    def _expand_key(self, key):
+        if not isinstance(key, tuple):
+            key = (key,)
+        if any(kk is None for kk in key):
+            raise IndexError("`Library_View` does not support `np.newaxis`!")
+        nell = sum(kk is Ellipsis for kk in key)
+        if nell > 1:
+            raise IndexError("an index can only have a single ellipsis ('...')")
+        if nell == 1:
+            ii = [kk is Ellipsis for kk in key].index(True)
+            fill = (slice(None),) * (self.ndim - len(key) + 1)
+            key = key[:ii] + fill + key[ii+1:]
+        if len(key) > self.ndim:
+            raise IndexError(f"too many indices for {self}")
+        return tuple(key) + (slice(None),) * (self.ndim - len(key))
+
+    def _block_size(self):
+        """Number of entries along the first axis to read at once, based on the buffer and chunks.
+        """
+        row = max(self.nbytes // max(len(self), 1), 1)
+        size = max(int(self._cache // row), 1)
+        chunk = 1 if self.chunks is None else self.chunks[0]
+        if size >= chunk:
+            size = chunk * (size // chunk)
+        return max(min(size, len(self)), 1)
+
+    def _read_ahead(self, ii):
+        """Get entry `ii` along the first axis, reading ahead a block if access is sequential.
+        """
+        buf = self._buffer
+        if (buf is None) or not (buf[0] <= ii < buf[1]):
+            # read a single entry on the first (or random) access, and blocks once reading sequentially
+            sequential = (self._last is not None) and (ii == self._last + 1)
+            hi = min(ii + self._block_size(), len(self)) if sequential else ii + 1
+            index = [self._index[0][ii:hi]] + list(self._index[1:])
+            buf = (ii, hi, self._read(index))
+            self._buffer = buf
+
+        self._last = ii
+        return buf[2][ii - buf[0]]
+
+    def _read(self, index):
+        """Read the data at the given (per-axis) dataset indices.
+
+        Each axis is read as a (strided) slice where possible, otherwise as its bounding slice, which is
+        then subselected in memory.
+        """
+        if any(idx.size == 0 for idx in index):
+            return np.zeros([idx.size for idx in index], dtype=self.dtype)
+
+        slices = []
+        local = []
+        for idx in index:
+            lo = int(idx[0])
+            if idx.size == 1:
+                slices.append(slice(lo, lo + 1))
+                local.append(None)
+                continue
+
+            step = int(idx[1] - idx[0])
+            if (step > 0) and np.all(np.diff(idx) == step):
+                slices.append(slice(lo, int(idx[-1]) + 1, step))
+                local.append(None)
+            else:
+                lo = int(idx.min())
+                slices.append(slice(lo, int(idx.max()) + 1))
+                local.append(idx - lo)
+
+        vals = self._dset[tuple(slices)]
+        if any(ll is not None for ll in local):
+            sel = [np.arange(nn) if ll is None else ll for ll, nn in zip(local, vals.shape)]
+            vals = vals[np.ix_(*sel)]
+        return vals
+
+
+def _library_axes(key, ndim):
+    """Names of the axes of the library dataset `key` (see `_LIBRARY_AXES`).
+    """
+    if key in _LIBRARY_AXES:
+        axes = _LIBRARY_AXES[key]
+    else:
+        # statistics-only datasets '{name}_{stat}' have no realization axis, and quantiles are last
+        name = None
+        for nn in _REALIZATION_AXES:
+            if key.startswith(nn + '_'):
+                name = nn
+        axes = None if name is None else tuple(aa for aa in _LIBRARY_AXES[name] if aa != 'reals')
+        if (axes is not None) and key.endswith('_quantiles'):
+            axes = axes + ('quantiles',)
+
+    if (axes is None) or (len(axes) != ndim):
+        axes = tuple(f"axis{ii}" for ii in range(ndim))
+    return axes
+
+
+def _library_chunks(shape, itemsize, target=LIB_CHUNK_BYTES):
+    """Chunk shape for a library dataset of the given `shape`, with chunks of roughly `target` bytes.
+
+    Chunks contain whole samples where possible; larger samples are split along their leading axes.
+    This keeps reads of a few samples, or of a few frequencies of each sample, within a few chunks.
+
+    """
+    chunks = list(shape)
+    for ax in range(len(chunks)):
+        size = int(np.prod(chunks)) * itemsize
+        if size <= target:
+            break
+        rest = size // max(chunks[ax], 1)
+        chunks[ax] = max(int(target // rest), 1)
+
+    chunks = tuple(max(cc, 1) for cc in chunks)
+    return chunks
+
+
+def _create_library_dataset(h5, key, data=None, shape=None, dtype=float):
+    """Create the dataset `key` in the combined library, chunked for `Library_Reader` access.
+
+    Either `data` is stored, or an empty dataset with the given `shape` and `dtype` is created, filled
+    with NaN (for floating-point types).
+    """
+    if data is not None:
+        data = np.asarray(data)
+        shape = data.shape
+        dtype = data.dtype
+
+    dtype = np.dtype(dtype)
+    chunks = _library_chunks(shape, dtype.itemsize) if len(shape) > 0 and np.prod(shape) > 0 else None
+    fill = np.nan if np.issubdtype(dtype, np.floating) else None
+    return h5.create_dataset(key, data=data, shape=shape, dtype=dtype, chunks=chunks, fillvalue=fill)
+
+
+# ==============================================================================
+# ====    Model Evaluation Service    ====
+# ==============================================================================
+
+
+#: [s] default time allowed for all `Model_Service` workers to start (and warm up)
+SERVICE_START_TIMEOUT = 3600.0
+#: state of a `Model_Service` worker process, set by `_model_service_init`
+_MODEL_SERVICE_STATE = {}
+
+
+class Model_Service:
+    """Pool of warm worker processes that evaluate models of a parameter-space with `run_model`.
+
+    Each worker imports holodeck, loads the cython modules, builds the cosmology tables and (if
+    `warmup`) evaluates one model at the center of the parameter-space, once, when the service starts.
+    Subsequent evaluations only pay for the model calculation itself.  Batches of parameters are
+    divided between workers.  With ``nworkers=0``, models are evaluated in the calling process.
+    Each worker seeds numpy's global random state from its own child of ``np.random.SeedSequence(seed)``,
+    so that different workers draw different realizations.
+
+    The service can also be exposed on a local (unix) socket with `Model_Service.serve`, and used from
+    other processes with `Model_Service_Client`.
+
+    Examples
+    --------
+    >>> space = holo.param_spaces.PS_Uniform_07A(log, 10, (40, 41, 42), None)
+    >>> with Model_Service(space, nreals=100, nfreqs=20, singles_flag=True) as service:
+    ...     results = service.evaluate(space.param_samples)
+    ...     gwb = [rr['gwb'] for rr in results]
+
+    """
+
+    def __init__(self, space, nworkers=None, warmup=True, sam_shape=None, seed=None, timeout=None, **run_kwargs):
+        """Start the worker processes.
+
+        Parameters
+        ----------
+        space : `_Param_Space` instance
+            Parameter space from which models are constructed, with `_Param_Space.model_for_params`.
+        nworkers : int or None
+            Number of worker processes.  `None`: one per CPU.  `0`: evaluate in the calling process.
+        warmup : bool
+            Whether each worker evaluates one model on startup.
+        sam_shape : int, (3,) of int, or None
+            Shape of SAM grids.  `None`: use ``space.sam_shape``.
+        seed : int, `numpy.random.SeedSequence`, or None
+            Seed of the workers' random states.  `None`: use fresh entropy.  With ``nworkers=0``, the
+            random state of the calling process is only re-seeded if a `seed` is given.
+        timeout : float or None
+            Time [s] allowed for all workers to start (and warm up).  `None`: use `SERVICE_START_TIMEOUT`.
+        **run_kwargs : dict
+            Arguments passed to `run_model`, e.g. `nreals`, `nfreqs`, `singles_flag`.
+
+        """
+        run_kwargs.setdefault('nreals', DEF_NUM_REALS)
+        run_kwargs.setdefault('nfreqs', DEF_NUM_FBINS)
+        sam_shape = space.sam_shape if (sam_shape is None) else sam_shape
+        initargs = (space, sam_shape, run_kwargs, warmup)
+
+        self._space = space
+        self._pool = None
+        self._state = None
+        self._worker_pids = set()
+        if nworkers == 0:
+            seed = None if (seed is None) else np.random.SeedSequence(seed)
+            self._state = _model_service_init(*initargs, state={}, seed=seed)
+        else:
+            nworkers = os.cpu_count() if (nworkers is None) else int(nworkers)
+            timeout = SERVICE_START_TIMEOUT if (timeout is None) else timeout
+            # forked workers would otherwise all inherit the same random state; give each its own seed
+            mp_context = multiprocessing.get_context()
+            seeds = mp_context.Queue()
+            for ss in np.random.SeedSequence(seed).spawn(nworkers):
+                seeds.put(ss)
+            # the pool only starts a new worker when no existing one is idle.  Each worker is initialized
+            # (and warmed up) by `_model_service_init` before running any task, and the start-up tasks all
+            # wait on this barrier, so none can finish until `nworkers` distinct workers are running.
+            started = mp_context.Barrier(nworkers, timeout=timeout)
+            self._pool = concurrent.futures.ProcessPoolExecutor(
+                max_workers=nworkers, mp_context=mp_context,
+                initializer=_model_service_worker_init, initargs=(seeds, started) + initargs,
+            )
+            try:
+                self._worker_pids = set(self._pool.map(_model_service_started, range(nworkers)))
+            except threading.BrokenBarrierError:
+                self._pool.shutdown(cancel_futures=True)
+                self._pool = None
+                err = f"Not all {nworkers} model-service workers started within {timeout} s!"
+                space._log.exception(err)
+                raise RuntimeError(err)
+
+        self._nworkers = nworkers
+        return
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+        return
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+        return
+
+    @property
+    def space(self):
+        return self._space
+
+    def evaluate(self, params):
+        """Evaluate models for one or more sets of parameters.
+
+        Parameters
+        ----------
+        params : dict, list of dict, or (N, P) array_like
+            Parameters of each model.  Arrays give values in the order of ``space.param_names``.
+
+        Returns
+        -------
+        results : dict or list of dict
+            Output of `run_model` for each set of parameters.  A single dict is returned for a single
+            input dict.
+
+        """
+        single = isinstance(params, dict)
+        params = self._param_dicts(params)
+        if self._pool is None:
+            results = [_model_service_eval(pars, state=self._state) for pars in params]
+        else:
+            chunksize = max(len(params) // (4 * self._nworkers), 1)
+            results = list(self._pool.map(_model_service_eval, params, chunksize=chunksize))
+
+        return results[0] if single else results
+
+    def serve(self, address, authkey=None):
+        """Accept evaluation requests on a local socket, until a client sends 'shutdown'.
+
+        Clients connect with `Model_Service_Client` (one at a time).  Each request is a tuple of
+        ``(command, payload)``, with commands 'evaluate' (payload: parameters, see `evaluate`),
+        'param_names', and 'shutdown'.  Each response is a tuple ``(status, value)`` with status 'ok' or
+        'error', in which case `value` is the error message.
+
+        Parameters
+        ----------
+        address : str
+            Path of the unix socket.
+        authkey : bytes or None
+            Authentication key required from clients.
+
+        """
+        log = self._space._log
+        with multiprocessing.connection.Listener(address, family='AF_UNIX', authkey=authkey) as listener:
+            log.info(f"Model service listening on {address}")
+            while True:
+                with listener.accept() as conn:
+                    while True:
+                        try:
+                            command, payload = conn.recv()
+                        except EOFError:
+                            break
+
+                        if command == 'shutdown':
+                            conn.send(('ok', None))
+                            log.info("Model service shutting down")
+                            return
+
+                        try:
+                            if command == 'evaluate':
+                                value = self.evaluate(payload)
+                            elif command == 'param_names':
+                                value = list(self._space.param_names)
+                            else:
+                                raise ValueError(f"Unrecognized command '{command}'!")
+                            conn.send(('ok', value))
+                        except Exception as err:
+                            log.exception(err)
+                            conn.send(('error', f"{err.__class__.__name__}: {err}"))
+
+    def _param_dicts(self, params):
+        if isinstance(params, dict):
+            return [params]
+
+        params = list(params)
+        if (len(params) > 0) and isinstance(params[0], dict):
+            return params
+
+        names = self._space.param_names
+        params = np.atleast_2d(params)
+        if params.shape[1] != len(names):
+            err = f"Parameters have shape {params.shape}, but space has {len(names)} parameters {names}!"
+            self._space._log.exception(err)
+            raise ValueError(err)
+
+        return [dict(zip(names, pars)) for pars in params]
+
+
+class Model_Service_Client:
+    """Connection to a `Model_Service` running on a local socket (see `Model_Service.serve`).
+    """
+
+    def __init__(self, address, authkey=None):
+        self._conn = multiprocessing.connection.Client(address, family='AF_UNIX', authkey=authkey)
+        return
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+        return
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+        return
+
+    def _request(self, command, payload=None):
+        self._conn.send((command, payload))
+        status, value = self._conn.recv()
+        if status != 'ok':
+            err = f"Model service failed on '{command}': {value}"
+            holo.log.exception(err)
+            raise RuntimeError(err)
+        return value
+
+    def evaluate(self, params):
+        """Evaluate models for the given parameters, see `Model_Service.evaluate`.
+        """
+        return self._request('evaluate', params)
+
+    def param_names(self):
+        return self._request('param_names')
+
+    def shutdown(self):
+        """Stop the service, and close this connection.
+        """
+        self._request('shutdown')
+        self.close()
+        return
+
+
+def _model_service_worker_init(seeds, started, *args):
+    """Initialize a `Model_Service` worker process, seeded with the next `SeedSequence` from `seeds`.
+
+    `started` is the barrier waited on by `_model_service_started`, once all workers are initialized.
+    """
+    _model_service_init(*args, seed=seeds.get(), started=started)
+    return
+
+
+def _model_service_init(space, sam_shape, run_kwargs, warmup, state=None, seed=None, started=None):
+    """Initialize the state of a `Model_Service` worker (the module-level state, if `state` is None).
+
+    If a `seed` (`numpy.random.SeedSequence`) is given, numpy's global random state is seeded from it.
+    """
+    if seed is not None:
+        np.random.seed(seed.generate_state(4))
+    state = _MODEL_SERVICE_STATE if (state is None) else state
+    state.update(space=space, sam_shape=sam_shape, run_kwargs=run_kwargs, started=started)
+    if warmup:
+        # load cython modules, cosmology tables, numba functions, and hardening tables
+        params = space.normalized_params(0.5)
+        _model_service_eval(params, state=state, nreals=1)
+
+    return state
+
+
+def _model_service_started(ii):
+    """Wait until all `Model_Service` workers have been started (and initialized), see `Model_Service.__init__`.
+    """
+    _MODEL_SERVICE_STATE['started'].wait()
+    return os.getpid()
+
+
+def _model_service_eval(params, state=None, **kwargs):
+    """Evaluate the model for the given parameters, using the state of a `Model_Service` worker.
+    """
+    state = _MODEL_SERVICE_STATE if (state is None) else state
+    sam, hard = state['space'].model_for_params(params, sam_shape=state['sam_shape'])
+    kwargs = {**state['run_kwargs'], **kwargs}
+    nreals = kwargs.pop('nreals')
+    nfreqs = kwargs.pop('nfreqs')
+    return run_model(sam, hard, nreals, nfreqs, **kwargs)
+
+
 # ==============================================================================
 # ====    Fitting Functions    ====
 # ==============================================================================
@@ -1529,6 +2558,12 @@ def _get_sim_fname(path, pnum):
     return temp
 
 
+def _get_sim_profile_fname(path, pnum):
+    temp = FNAME_SIM_PROFILE_FILE.format(pnum=pnum)
+    temp = path.joinpath(temp)
+    return temp
+
+
 def get_sam_lib_fname(path, gwb_only):
     fname = 'sam_lib'
     if gwb_only:
@@ -1546,12 +2581,7 @@ def get_fits_path(library_path):
 
 
 def _log_mem_usage(log):
-    # results.ru_maxrss is KB on Linux, B on macos
-    mem_max = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
-    if sys.platform.lower().startswith('darwin'):
-        mem_max = (mem_max / 1024 ** 3)
-    else:
-        mem_max = (mem_max / 1024 ** 2)
+    mem_max = utils.get_peak_rss() / 1024**3
 
     process = psutil.Process(os.getpid())
     mem_rss = process.memory_info().rss / 1024**3
@@ -1656,6 +2686,14 @@ def _setup_argparse(comm, *args, **kwargs):
                         help='produce plots for each simulation configuration')
     parser.add_argument('--seed', action='store', type=int, default=None,
                         help='Random seed to use')
+    parser.add_argument('--profile', action='store_true', default=False,
+                        help='record wall/cpu time and memory usage of each calculation stage')
+    parser.add_argument('--stats-only', action='store_true', dest='stats_only', default=False,
+                        help='store statistics (moments and quantiles) over realizations, instead of realizations')
+    parser.add_argument('--anis', action='store_true', dest='anis_flag', default=False,
+                        help="calculate and store the analytic anisotropy, 'C0_analytic' and 'Cl_analytic'")
+    parser.add_argument('--float32', action='store_true', default=False,
+                        help='store strain realizations in single precision, halving their size in the library')
 
     # parser.add_argument('-v', '--verbose', action='store_true', default=False, dest='verbose',
     #                     help='verbose output [INFO]')
@@ -1771,6 +2809,14 @@ if __name__ == "__main__":
         '--gwb', action='store_true', default=False,
         help='only merge the key GWB data (no single source, or binary parameter data).'
     )
+    combine.add_argument(
+        '--append', '-a', action='store_true', default=False,
+        help='add new simulation files to an existing combined library (missing files are allowed).'
+    )
+    combine.add_argument(
+        '--nworkers', '-n', type=int, default=COMBINE_NUM_WORKERS,
+        help='number of threads reading simulation files.'
+    )
 
     # ---- fit
 
@@ -1791,6 +2837,24 @@ if __name__ == "__main__":
         )
     )
 
+    # ---- serve
+
+    serve = subparsers.add_parser('serve', help='evaluate models of a parameter-space on a local socket')
+    serve.add_argument(
+        'path', default=None,
+        help='library directory (or parameter-space save file) from which to load the parameter space'
+    )
+    serve.add_argument('socket', help='path of the unix socket on which to listen')
+    serve.add_argument(
+        '--nworkers', '-n', type=int, default=None,
+        help='number of worker processes (default: one per CPU, 0: evaluate in the server process).'
+    )
+    serve.add_argument('--nreals', type=int, default=DEF_NUM_REALS, help='number of realizations')
+    serve.add_argument('--nfreqs', type=int, default=DEF_NUM_FBINS, help='number of frequency bins')
+    serve.add_argument('--nloudest', type=int, default=DEF_NUM_LOUDEST, help='number of loudest sources')
+    serve.add_argument('--ss', action='store_true', default=False, help='calculate single sources.')
+    serve.add_argument('--params', action='store_true', default=False, help='calculate binary parameters.')
+
     # ---- Run sub-command
 
     args = parser.parse_args()
@@ -1798,7 +2862,9 @@ if __name__ == "__main__":
     path = Path(args.path)
 
     if args.subcommand == 'combine':
-        sam_lib_combine(path, log, recreate=args.recreate, gwb_only=args.gwb)
+        sam_lib_combine(
+            path, log, recreate=args.recreate, gwb_only=args.gwb, append=args.append, nworkers=args.nworkers,
+        )
 
     elif args.subcommand == 'fit':
         if args.all is not False:
@@ -1807,6 +2873,15 @@ if __name__ == "__main__":
         else:
             fit_library_spectra(path, log, recreate=args.recreate)
 
+    elif args.subcommand == 'serve':
+        space, _ = load_pspace_from_path(log, path)
+        service = Model_Service(
+            space, nworkers=args.nworkers, nreals=args.nreals, nfreqs=args.nfreqs, nloudest=args.nloudest,
+            singles_flag=args.ss, params_flag=args.params,
+        )
+        with service:
+            service.serve(args.socket)
+
     else:
         parser.print_help()
         sys.exit()
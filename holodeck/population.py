@@ -81,6 +81,7 @@ import abc
 import os
 from typing import Tuple
 
+import h5py
 import numpy as np
 
 import holodeck as holo
@@ -292,6 +293,9 @@ class Pop_Illustris(_Population_Discrete):
     and released publically, described in [Rodriguez-Gomez2015]_.
 
     Takes as input a data file that includes BH and subhalo data for BH and/or galaxy mergers.
+    Only the columns (and rows) that are needed are read from the file: binaries can be selected by
+    total mass and redshift (`mtot` and `redz`) before any other data is loaded, and the galaxy
+    properties (`mbulge` and `vdisp`) are only loaded when they are first accessed.
 
     Notes
     -----
@@ -306,7 +310,7 @@ class Pop_Illustris(_Population_Discrete):
 
     """
 
-    def __init__(self, fname=None, **kwargs):
+    def __init__(self, fname=None, mtot=None, redz=None, **kwargs):
         """Initialize a binary population using data in the given filename.
 
         Parameters
@@ -314,6 +318,10 @@ class Pop_Illustris(_Population_Discrete):
         fname : None or str,
             Filename for input data.
             * `None`: default value `_DEF_ILLUSTRIS_FNAME` is used.
+        mtot : None or (2,) of scalar,
+            Select binaries with total BH masses within these bounds [grams], either may be `None`.
+        redz : None or (2,) of scalar,
+            Select binaries with redshifts within these bounds, either may be `None`.
         kwargs : dict,
             Additional keyword-arguments passed to `super().__init__`.
 
@@ -323,6 +331,12 @@ class Pop_Illustris(_Population_Discrete):
             fname = os.path.join(_PATH_DATA, fname)
 
         self._fname = fname             #: Filename for binary data
+        self._bounds = dict(mtot=mtot, redz=redz)   #: Selection bounds applied when loading data
+        self._rows = None               #: Indices of selected binaries in the file (`None` for all)
+        self._st_idx = None             #: Index of stellar particles in the file's particle-types
+        self._file_size = None          #: Number of binaries selected from the file
+        self._mbulge = None
+        self._vdisp = None
         super().__init__(**kwargs)
         if 'eccen' in kwargs:
             self.eccen = kwargs['eccen']
@@ -332,26 +346,108 @@ class Pop_Illustris(_Population_Discrete):
         """Set the population parameters using an input simulation file.
         """
         super()._init()
-        fname = self._fname
-        header, data = utils.load_hdf5(fname)
-        self._sample_volume = header['box_volume_mpc'] * (1e6*PC)**3   #: comoving-volume of sim [cm^3]
-
-        # Select the stellar radius
-        part_names = header['part_names'].tolist()
-        st_idx = part_names.index('star')
-        # ---- Binary Properties
-        gal_rads = data['SubhaloHalfmassRadType']
-        gal_rads = gal_rads[:, st_idx, :]
-        # Set initial separation to sum of stellar half-mass radii
-        self.sepa = np.sum(gal_rads, axis=-1)       #: Initial binary separation [cm]
-        self.mass = data['SubhaloBHMass']      #: BH Mass in subhalo [grams]
-        self.scafa = data['time']              #: scale-factor at time of 'merger' event in sim []
-        # ---- Galaxy Properties
-        # Get the stellar mass, and take that as bulge mass
-        self.mbulge = data['SubhaloMassInRadType'][:, st_idx, :]   #: Stellar mass / stellar-bulge mass [grams]
-        self.vdisp = data['SubhaloVelDisp']    #: Velocity dispersion of galaxy [?cm/s?]
+        with h5py.File(self._fname, 'r') as h5:
+            self._sample_volume = h5.attrs['box_volume_mpc'] * (1e6*PC)**3   #: comoving-volume of sim [cm^3]
+
+            # Select the stellar radius
+            part_names = h5.attrs['part_names'].tolist()
+            self._st_idx = part_names.index('star')
+
+            # ---- Select binaries, only using the columns needed for the selection
+            mass = h5['SubhaloBHMass'][()]
+            scafa = h5['time'][()]
+            self._rows = self._select_rows(mass, scafa)
+            if self._rows is not None:
+                mass = mass[self._rows]
+                scafa = scafa[self._rows]
+
+            # ---- Binary Properties
+            gal_rads = self._read_rows(h5['SubhaloHalfmassRadType'], self._st_idx)
+            # Set initial separation to sum of stellar half-mass radii
+            self.sepa = np.sum(gal_rads, axis=-1)       #: Initial binary separation [cm]
+            self.mass = mass      #: BH Mass in subhalo [grams]
+            self.scafa = scafa    #: scale-factor at time of 'merger' event in sim []
+
+        # ---- Galaxy Properties are loaded lazily, see `mbulge` and `vdisp`
+        self._file_size = np.size(self.sepa)
         return
 
+    def _select_rows(self, mass, scafa):
+        """Indices of binaries within the `mtot` and `redz` bounds, or `None` if there are no bounds.
+        """
+        sel = np.ones(np.shape(scafa), dtype=bool)
+        bounded = False
+        for name, vals in [['mtot', lambda: np.sum(mass, axis=-1)], ['redz', lambda: cosmo.a_to_z(scafa)]]:
+            bounds = self._bounds[name]
+            if bounds is None:
+                continue
+            if np.size(bounds) != 2:
+                err = f"`{name}` bounds must be (2,) of scalar or `None`, not {bounds}!"
+                log.exception(err)
+                raise ValueError(err)
+            vals = vals()
+            lo, hi = bounds
+            if lo is not None:
+                sel &= (lo <= vals)
+            if hi is not None:
+                sel &= (vals <= hi)
+            bounded = True
+
+        if not bounded:
+            return None
+
+        log.debug(f"Selected {np.count_nonzero(sel)}/{sel.size} binaries with bounds {self._bounds}")
+        return np.flatnonzero(sel)
+
+    def _read_rows(self, dset, *index):
+        """Read the selected rows of an hdf5 dataset, with any additional `index` on later axes.
+        """
+        if self._rows is None:
+            return dset[(slice(None),) + index]
+        if self._rows.size == 0:
+            return np.zeros((0,) + dset[(slice(0, 1),) + index].shape[1:], dtype=dset.dtype)
+        # hdf5 reads the (increasing) row indices directly, without loading the full dataset
+        return dset[(self._rows,) + index]
+
+    def _load_galaxy_property(self, key, name):
+        """Load a galaxy property from the input file, if this population still matches its rows.
+
+        Once the population has been resampled, properties that were not resampled along with it
+        can no longer be loaded, and are `None`.
+        """
+        if self.size != self._file_size:
+            log.debug(f"Population size has changed, `{name}` is no longer available from file")
+            return None
+
+        with h5py.File(self._fname, 'r') as h5:
+            if key == 'SubhaloMassInRadType':
+                return self._read_rows(h5[key], self._st_idx)
+            return self._read_rows(h5[key])
+
+    @property
+    def mbulge(self):
+        """Stellar mass / stellar-bulge mass of each galaxy [grams], (N, 2), loaded when first needed.
+        """
+        if self._mbulge is None:
+            self._mbulge = self._load_galaxy_property('SubhaloMassInRadType', 'mbulge')
+        return self._mbulge
+
+    @mbulge.setter
+    def mbulge(self, value):
+        self._mbulge = value
+
+    @property
+    def vdisp(self):
+        """Velocity dispersion of each galaxy [?cm/s?], (N, 2), loaded when first needed.
+        """
+        if self._vdisp is None:
+            self._vdisp = self._load_galaxy_property('SubhaloVelDisp', 'vdisp')
+        return self._vdisp
+
+    @vdisp.setter
+    def vdisp(self, value):
+        self._vdisp = value
+
 
 # =========================
 # ====    Modifiers    ====
@@ -421,8 +517,10 @@ class PM_Eccentricity(_Population_Modifier):
 class PM_Resample(_Population_Modifier):
     """Population Modifier to resample a population instance to a new number of binaries.
 
-    Uses `kalepy` kernel density estimation (KDE) to resample the original population into a new
+    Uses Gaussian kernel density estimation (KDE) to resample the original population into a new
     one, changing the total number of binaries by some factor (usually increasing the population).
+    Resampling is performed by :func:`holodeck.utils.resample_kde`, which matches the bandwidth and
+    boundary semantics of `kalepy.KDE`, and generates samples in seeded, multi-threaded chunks.
 
     Notes
     -----
@@ -443,8 +541,9 @@ class PM_Resample(_Population_Modifier):
     # Additional variables to be resampled
     # NOTE: mtot, mrat, redz, sepa, eccen (if not None) are all resampled automatically
     _DEF_ADDITIONAL_KEYS = ['vdisp', 'mbulge']
+    _BW_RESCALE = 0.25     #: factor by which to rescale the (Scott's rule) KDE bandwidth
 
-    def __init__(self, resample=10.0, plot=False, additional_keys=True):
+    def __init__(self, resample=10.0, plot=False, additional_keys=True, seed=None, nthreads=None):
         """Initialize `PM_Resample` instance.
 
         Parameters
@@ -461,9 +560,16 @@ class PM_Resample(_Population_Modifier):
             `False` or `None`: no additional parameters are resampled.
             `list[str]`: the provided additional parameters are resampled, which must be attributes
                 of the population instance being resampled.
+        seed : int or None,
+            Random seed for resampling.  If `None`, a seed is drawn from the global `numpy.random`
+            state.
+        nthreads : int or None,
+            Number of threads used to generate new samples.  If `None`, all available processors.
 
         """
         self.resample = resample
+        self._seed = seed
+        self._nthreads = nthreads
         self._plot = plot
         self._old_data = None      #: Version of the previous population stored for plotting purposes
         self._new_data = None      #: Version of the updated population stored for plotting purposes
@@ -485,8 +591,6 @@ class PM_Resample(_Population_Modifier):
             Binary population to be modified.
 
         """
-        import kalepy as kale
-
         # ---- Package data for resampling
 
         # Store basic quantities
@@ -517,11 +621,11 @@ class PM_Resample(_Population_Modifier):
 
         # Add optional variables specified in `_additional_keys` (by default, from `_DEF_ADDITIONAL_KEYS`)
         opt_idx = []
-        for ii, opt in enumerate(self._additional_keys):
+        for opt in self._additional_keys:
             # Load value
             vals = getattr(pop, opt, None)
             if vals is not None:
-                idx = len(labels) + ii
+                idx = len(old_data)
                 opt_idx.append(idx)
                 labels.append(opt)
                 for kk in range(2):
@@ -534,10 +638,11 @@ class PM_Resample(_Population_Modifier):
         old_size = pop.size
         new_size = old_size * resample
 
-        # construct a `kalepy` Kernel Density Estimator instance
-        kde = kale.KDE(old_data, reflect=reflect, bw_rescale=0.25)
-        # resample the population data
-        new_data = kde.resample(new_size)
+        # resample the population data from a kernel density estimate
+        new_data = utils.resample_kde(
+            old_data, new_size, reflect=reflect, bw_rescale=self._BW_RESCALE,
+            seed=self._seed, nthreads=self._nthreads,
+        )
 
         # Convert back to desired quantities
         mt = MSOL * 10**new_data[0]
@@ -987,10 +987,7 @@ class NFW(_Density_Profile):
 
         """
         rho_s, rs = NFW._nfw_rho_rad(mhalo, redz)
-        dens = rads / rs
-        dens = dens * np.square(1 + dens)
-        dens = rho_s / dens
-        return dens
+        return NFW._density_from_rho_rad(rads, rho_s, rs)
 
     @staticmethod
     def mass(rads: ArrayLike, mhalo: ArrayLike, redz: ArrayLike) -> ArrayLike:
@@ -1014,6 +1011,52 @@ class NFW(_Density_Profile):
         rads, mhalo, redz = np.broadcast_arrays(rads, mhalo, redz)
         # Get Halo concentration
         rho_s, rs = NFW._nfw_rho_rad(mhalo, redz)
+        return NFW._mass_from_rho_rad(rads, rho_s, rs)
+
+    @staticmethod
+    def _density_from_rho_rad(rads, rho_s, rs):
+        """NFW DM density profile given precomputed halo parameters (see `NFW._nfw_rho_rad`).
+
+        Parameters
+        ----------
+        rads : ArrayLike
+            Target radial distances.  [cm]
+        rho_s : ArrayLike
+            DM halo characteristic density.   [g/cm^3]
+        rs : ArrayLike
+            Scale radius of the DM halo.  [cm]
+
+        Returns
+        -------
+        dens : ArrayLike
+            Densities at the given radii.  [g/cm^3]
+
+        """
+        dens = rads / rs
+        dens = dens * np.square(1 + dens)
+        dens = rho_s / dens
+        return dens
+
+    @staticmethod
+    def _mass_from_rho_rad(rads, rho_s, rs):
+        """DM mass enclosed from an NFW profile given precomputed halo parameters (see `NFW._nfw_rho_rad`).
+
+        Parameters
+        ----------
+        rads : ArrayLike
+            Target radial distances.  [cm]
+        rho_s : ArrayLike
+            DM halo characteristic density.   [g/cm^3]
+        rs : ArrayLike
+            Scale radius of the DM halo.  [cm]
+
+        Returns
+        -------
+        mass : ArrayLike
+            Mass enclosed within the given radii.  [gram]
+
+        """
+        rads, rho_s, rs = np.broadcast_arrays(rads, rho_s, rs)
         # NOTE: Expression causes numerical problems for rads/rs <~ 1e-8
         # only use proper analytic expression in safe regime ("hi")
         # use small radius approximation for unsafe regime ("lo")
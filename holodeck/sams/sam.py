@@ -36,8 +36,10 @@ References
 
 """
 
+import copy
 from datetime import datetime
 
+import numba
 import numpy as np
 import scipy as sp
 import scipy.interpolate  # noqa
@@ -45,7 +47,7 @@ import scipy.interpolate  # noqa
 import kalepy as kale
 
 import holodeck as holo
-from holodeck import cosmo, utils, log
+from holodeck import cosmo, cosmo_interp, utils, log
 from holodeck.constants import SPLC, MSOL, MPC
 from holodeck import relations, single_sources
 from . import cyutils as sam_cyutils
@@ -273,7 +275,7 @@ class Semi_Analytic_Model:
                 gal_merger_rate = self._gmr(mstar_tot, mstar_rat, redz)
 
             # `gsmf` returns [1/Mpc^3]   `dtdz` returns [sec]   `gal_merger_rate` is [1/sec]  ===>  [Mpc^-3]
-            dens = self._gsmf(mass_gsmf, redz) * gal_merger_rate * cosmo.dtdz(redz)
+            dens = self._gsmf(mass_gsmf, redz) * gal_merger_rate * cosmo_interp.dtdz(redz)
 
             # ---- Convert to MBH Binary density
 
@@ -405,7 +407,7 @@ class Semi_Analytic_Model:
 
         # (M, Q, Z, X) comoving-distance in [Mpc]
         dc = np.zeros_like(redz_final)
-        dc[coal] = cosmo.comoving_distance(redz_final[coal]).to('Mpc').value
+        dc[coal] = cosmo_interp.z_to_dcom(redz_final[coal]) / MPC
 
         # (M, Q, Z, X) this is `(dVc/dz) * (dz/dt)` in units of [Mpc^3/s]
         cosmo_fact = np.zeros_like(redz_final)
@@ -452,7 +454,7 @@ class Semi_Analytic_Model:
         rz = self._redz_prime[..., np.newaxis] * np.ones(new_shape)
         coal = (rz > 0.0)
 
-        dc = cosmo.comoving_distance(rz[coal]).to('Mpc').value
+        dc = cosmo_interp.z_to_dcom(rz[coal]) / MPC
         frst_orb = utils.frst_from_fobs(
             fobs_orb[np.newaxis, np.newaxis, np.newaxis, :], rz
         )
@@ -557,7 +559,7 @@ class Semi_Analytic_Model:
 
         # (M, Q, Z, X) comoving-distance in [Mpc]
         dc = np.zeros_like(redz_final)
-        dc[coal] = cosmo.comoving_distance(redz_final[coal]).to('Mpc').value
+        dc[coal] = cosmo_interp.z_to_dcom(redz_final[coal]) / MPC
 
         # (M, Q, Z, X) this is `(dVc/dz) * (dz/dt)` in units of [Mpc^3/s]
         cosmo_fact = np.zeros_like(redz_final)
@@ -682,7 +684,8 @@ class Semi_Analytic_Model:
         gwb = holo.gravwaves.gwb_ideal(fobs_gw, ndens, mt, mr, rz, dlog10=True, sum=sum)
         return gwb
 
-    def gwb(self, fobs_gw_edges, hard=holo.hardening.Hard_GW(), realize=100, loudest=1, params=False):
+    def gwb(self, fobs_gw_edges, hard=holo.hardening.Hard_GW(), realize=100, loudest=1, params=False,
+            mem_budget=None, bitgen=None, dtype=np.float64):
         """Calculate the (smooth/semi-analytic) GWB and CWs at the given observed GW-frequencies.
 
         Parameters
@@ -700,6 +703,13 @@ class Semi_Analytic_Model:
             Number of loudest single sources to distinguish from the background.
         params : Boolean
             Whether or not to return astrophysical parameters of the binaries.
+        mem_budget : float or None
+            [bytes] Memory budget, realizations are calculated in chunks that fit within it.
+            See `holodeck.utils.mem_budget`.
+        bitgen : `numpy.random.BitGenerator` or None
+            Bit generator for the random draws, see `holodeck.single_sources.ss_gws_redz`.
+        dtype : numpy dtype
+            Type of the returned strains, e.g. `np.float32` for single-precision `hc_ss` and `hc_bg`.
 
 
         Returns
@@ -745,7 +755,8 @@ class Semi_Analytic_Model:
         # ---- Get the Single Source and GWB spectrum from number of binaries over grid
 
         ret_vals = single_sources.ss_gws_redz(edges, redz_final, number,
-                                              realize=realize, loudest=loudest, params=params)
+                                              realize=realize, loudest=loudest, params=params,
+                                              mem_budget=mem_budget, bitgen=bitgen, dtype=dtype)
 
         hc_ss = ret_vals[0]
         hc_bg = ret_vals[1]
@@ -758,13 +769,53 @@ class Semi_Analytic_Model:
 
         return hc_ss, hc_bg
 
+    def gwb_poisson_stats(self, fobs_gw_edges, hard=holo.hardening.Hard_GW(), quantiles=None):
+        """Calculate statistics of Poisson realizations of the GWB analytically, without drawing realizations.
+
+        See `holodeck.gravwaves.gwb_poisson_stats`.
+
+        Parameters
+        ----------
+        fobs_gw_edges : (F+1,) array_like of scalar,
+            Observer-frame GW-frequency bin edges. [1/sec]
+        hard : holodeck.evolution._Hardening class or instance
+            Hardening mechanism to apply over the range of `fobs_gw`.
+        quantiles : None or array_like of float
+            Quantiles (in [0.0, 1.0]) of the GWB characteristic strain, over realizations, to calculate.
+
+        Returns
+        -------
+        data : dict
+            * 'mean' : (F,) expectation value of the GWB characteristic strain squared, `hc^2`.
+            * 'var' : (F,) variance of `hc^2` over realizations.
+            * 'quantiles' : (F, Nq) quantiles of the characteristic strain `hc` over realizations.
+              Only if `quantiles` is given.
+
+        """
+        if not isinstance(hard, (holo.hardening.Fixed_Time_2PL_SAM, holo.hardening.Hard_GW)):
+            err = (
+                "`sam_cyutils` methods only work with `Fixed_Time_2PL_SAM` or `Hard_GW` hardening models!  "
+                "Use `gwb_only` for alternative classes!"
+            )
+            self._log.exception(err)
+            raise ValueError(err)
+
+        fobs_orb_edges = fobs_gw_edges / 2.0
+        fobs_orb_cents = kale.utils.midpoints(fobs_gw_edges) / 2.0
+        redz_final, diff_num = sam_cyutils.dynamic_binary_number_at_fobs(
+            fobs_orb_cents, self, hard, cosmo
+        )
+        edges = [self.mtot, self.mrat, self.redz, fobs_orb_edges]
+        number = sam_cyutils.integrate_differential_number_3dx1d(edges, diff_num)
+        return holo.gravwaves.gwb_poisson_stats(edges, number, redz=redz_final, quantiles=quantiles)
+
     def _ndens_gal(self, mass_gal, mrat_gal, redz):
         if GSMF_USES_MTOT or GPF_USES_MTOT or GMT_USES_MTOT:
             self._log.warning("{self.__class__}._ndens_gal assumes that primary mass is used for GSMF, GPF and GMT!")
 
         # NOTE: dlog10(M_1) / dlog10(M) = (M/M_1) * (dM_1/dM) = 1
         nd = self._gsmf(mass_gal, redz) * self._gpf(mass_gal, mrat_gal, redz)
-        nd = nd * cosmo.dtdz(redz) / self._gmt(mass_gal, mrat_gal, redz)
+        nd = nd * cosmo_interp.dtdz(redz) / self._gmt(mass_gal, mrat_gal, redz)
         return nd
 
     def _ndens_mbh(self, mass_gal, mrat_gal, redz):
@@ -798,6 +849,38 @@ class Semi_Analytic_Model:
             integ = integ.sum()
         return integ
 
+    def redshift_subgrid(self, lo, hi):
+        """Copy of this model restricted to the redshift edges ``redz[lo:hi]``.
+
+        The SAM components (GSMF, GPF, GMT, GMR, M-MBulge) are shared with this instance.  Binary densities
+        are sliced if they have already been calculated, otherwise they are calculated only over the subgrid.
+        Each redshift of the grid is independent (including the M-MBulge scatter, which is over masses), so
+        the subgrid values are identical to those of the full grid.
+
+        Parameters
+        ----------
+        lo, hi : int
+            Indices of the first, and one past the last, redshift edges of the subgrid.
+
+        Returns
+        -------
+        sub : `Semi_Analytic_Model`
+            Model over the grid edges [`mtot`, `mrat`, `redz[lo:hi]`].
+
+        """
+        if not (0 <= lo) or not (lo + 2 <= hi <= self.redz.size):
+            err = f"Redshift edges [{lo}:{hi}] must contain at least one bin of {self.redz.size} edges!"
+            self._log.exception(err)
+            raise ValueError(err)
+
+        sub = copy.copy(self)
+        sub.redz = self.redz[lo:hi]
+        sub._shape = None
+        for key in ['_density', '_gmt_time', '_redz_prime']:
+            val = getattr(self, key)
+            setattr(sub, key, None if val is None else val[:, :, lo:hi])
+        return sub
+
     @utils.deprecated_fail("`dynamic_binary_number_at_fobs` or `sam_cyutils.dynamic_binary_number_at_fobs`")
     def dynamic_binary_number(self, *args, **kwargs):
         pass
@@ -812,10 +895,202 @@ class Semi_Analytic_Model:
 # ===========================================
 
 
+class Grid_Sampler:
+    """Draw discrete binaries from a grid of binary numbers, using an alias table over occupied cells.
+
+    The table is built once, over the cells with non-zero number, so that each binary is drawn in
+    O(1) time regardless of the grid size.  Cells whose expected number exceeds ``threshold`` are
+    'dense': they are represented by a single weighted point instead of by individual binaries.
+
+    Drawing a Poisson number of binaries from the alias table (with total expectation value equal to
+    the summed number of the sparse cells) is equivalent to drawing an independent Poisson number in
+    each cell.
+
+    """
+
+    def __init__(self, edges, number, threshold=None):
+        """Construct the alias table for the given grid.
+
+        Parameters
+        ----------
+        edges : (D,) list of 1darrays
+            Edges of the grid along each dimension, in the coordinates that binaries should be
+            distributed uniformly within each cell (e.g. ``log10(M)``).  Lengths are (N_i + 1,).
+        number : (N_1, ..., N_D) ndarray of scalar
+            Expected number of binaries in each grid cell.
+        threshold : float or None
+            Cells with number above this value are treated as dense cells.  `None` for no dense cells.
+
+        """
+        edges = [np.asarray(ee) for ee in edges]
+        number = np.asarray(number, dtype=float)
+        shape = tuple([ee.size - 1 for ee in edges])
+        if number.shape != shape:
+            err = f"Shape of `number` {number.shape} does not match shape of `edges` {shape}!"
+            log.exception(err)
+            raise ValueError(err)
+
+        if not np.all(np.isfinite(number) & (number >= 0.0)):
+            err = "`number` must be finite and non-negative!"
+            log.exception(err)
+            raise ValueError(err)
+
+        flat = number.ravel()
+        dense = (flat > threshold) if (threshold is not None) else np.zeros(flat.size, dtype=bool)
+        self._dense_cells = np.flatnonzero(dense)
+        self._dense_number = flat[dense]
+        self._cells = np.flatnonzero((flat > 0.0) & ~dense)
+        weights = flat[self._cells]
+        self._total = weights.sum()
+
+        if self._cells.size > 0:
+            self._prob, self._alias = _alias_table(weights)
+        else:
+            self._prob = np.zeros(0)
+            self._alias = np.zeros(0, dtype=np.int64)
+
+        self._edges = edges
+        self._shape = shape
+        self._threshold = threshold
+        return
+
+    @property
+    def total(self):
+        """Expected number of binaries in the sparse (non-dense) cells.
+        """
+        return self._total
+
+    @property
+    def dense_cells(self):
+        """Flat indices of the dense cells.
+        """
+        return self._dense_cells
+
+    @property
+    def dense_number(self):
+        """Expected number of binaries in each of the dense cells.
+        """
+        return self._dense_number
+
+    def draw(self, nsamp, rng=None):
+        """Draw cells from the sparse part of the grid, with probability proportional to their number.
+
+        Parameters
+        ----------
+        nsamp : int
+            Number of binaries to draw.
+        rng : `numpy.random.Generator` or None
+            Random number generator.
+
+        Returns
+        -------
+        cells : (S,) ndarray of int
+            Flat index (into the full grid) of the cell containing each binary.
+
+        """
+        rng = np.random.default_rng(rng)
+        nsamp = int(nsamp)
+        if (nsamp > 0) and (self._cells.size == 0):
+            err = f"Cannot draw {nsamp} binaries from a grid with no occupied cells!"
+            log.exception(err)
+            raise ValueError(err)
+
+        idx = rng.integers(0, self._cells.size, size=nsamp) if (nsamp > 0) else np.zeros(0, dtype=np.int64)
+        keep = (rng.random(nsamp) < self._prob[idx])
+        idx = np.where(keep, idx, self._alias[idx])
+        return self._cells[idx]
+
+    def locations(self, cells, rng=None):
+        """Find the coordinates of points in the given cells.
+
+        Parameters
+        ----------
+        cells : (S,) ndarray of int
+            Flat index of the cell for each point.
+        rng : `numpy.random.Generator` or None
+            If given, points are distributed uniformly within each cell, otherwise they are placed at
+            the cell centers.
+
+        Returns
+        -------
+        vals : (D, S) ndarray of scalar
+            Coordinates of each point, in the same coordinates as `edges`.
+
+        """
+        idx = np.unravel_index(cells, self._shape)
+        vals = np.zeros((len(self._edges), np.size(cells)))
+        for dd, (edge, ii) in enumerate(zip(self._edges, idx)):
+            frac = 0.5 if (rng is None) else rng.random(ii.size)
+            vals[dd] = edge[ii] + (edge[ii+1] - edge[ii]) * frac
+
+        return vals
+
+    def realize(self, seed=None):
+        """Construct a Poisson realization of the number of binaries in each occupied cell.
+
+        Parameters
+        ----------
+        seed : int, `numpy.random.Generator` or None
+            Seed for the random number generator.
+
+        Returns
+        -------
+        cells : (C,) ndarray of int
+            Sorted flat indices of the cells containing at least one binary.
+        weights : (C,) ndarray of scalar
+            Number of binaries in each of `cells`.
+
+        """
+        rng = np.random.default_rng(seed)
+        cells, counts = np.unique(self.draw(rng.poisson(self._total), rng), return_counts=True)
+        dense = holo.gravwaves.poisson_as_needed(self._dense_number, rng=rng)
+        sel = (dense > 0.0)
+        cells = np.concatenate([cells, self._dense_cells[sel]])
+        weights = np.concatenate([counts, dense[sel]])
+        idx = np.argsort(cells, kind='stable')
+        return cells[idx], weights[idx]
+
+    def sample(self, seed=None, poisson_inside=False, poisson_outside=False):
+        """Sample binaries from the grid.
+
+        Dense cells are represented by one point at the cell center, weighted by the cell's number.
+        Binaries in sparse cells are drawn individually, distributed uniformly within their cell, and
+        each have unit weight.
+
+        Parameters
+        ----------
+        seed : int, `numpy.random.Generator` or None
+            Seed for the random number generator.
+        poisson_inside : bool
+            Whether the weights of dense cells are Poisson draws, instead of the expectation values.
+        poisson_outside : bool
+            Whether the number of binaries drawn from sparse cells is a Poisson draw, instead of the
+            rounded expectation value.
+
+        Returns
+        -------
+        vals : (D, S) ndarray of scalar
+            Coordinates of each sample point.
+        weights : (S,) ndarray of scalar
+            Weight of each sample point.
+
+        """
+        rng = np.random.default_rng(seed)
+        weights = self._dense_number
+        if poisson_inside:
+            weights = holo.gravwaves.poisson_as_needed(weights, rng=rng)
+
+        nsamp = rng.poisson(self._total) if poisson_outside else int(np.around(self._total))
+        cells = self.draw(nsamp, rng)
+
+        vals = np.concatenate([self.locations(self._dense_cells), self.locations(cells, rng=rng)], axis=-1)
+        weights = np.concatenate([weights, np.ones(nsamp)])
+        return vals, weights
+
+
 def sample_sam_with_hardening(
-        sam, hard,
-        fobs_orb=None, sepa=None, sample_threshold=10.0, cut_below_mass=None, limit_merger_time=None,
-        **sample_kwargs
+        sam, hard, fobs_orb, sample_threshold=10.0, cut_below_mass=None,
+        poisson_inside=False, poisson_outside=False, seed=None,
 ):
     """Discretize Semi-Analytic Model into sampled binaries assuming the given binary hardening rate.
 
@@ -827,10 +1102,17 @@ def sample_sam_with_hardening(
         Binary hardening model for calculating binary hardening rates (dadt or dfdt).
     fobs_orb : ArrayLike
         Observer-frame orbital-frequencies.  Units of [1/sec].
-        NOTE: Either `fobs_orb` or `sepa` must be provided, and not both.
-    sepa : ArrayLike
-        Binary orbital separation.  Units of [cm].
-        NOTE: Either `fobs_orb` or `sepa` must be provided, and not both.
+    sample_threshold : float or None
+        Grid cells with more binaries than this are represented by a single weighted point, instead
+        of by individual binaries.  `None` or zero to sample all binaries.
+    cut_below_mass : float or None
+        Remove binaries with secondary masses below this value.  Units of [grams].
+    poisson_inside : bool
+        Whether the weights of above-threshold cells are Poisson draws.
+    poisson_outside : bool
+        Whether the number of binaries sampled from below-threshold cells is a Poisson draw.
+    seed : int, `numpy.random.Generator` or None
+        Seed for the random number generator.
 
     Returns
     -------
@@ -839,7 +1121,7 @@ def sample_sam_with_hardening(
         * mtot : total mass of binary (m1+m2) in [grams]
         * mrat : mass ratio of binary (m2/m1 <= 1)
         * redz : redshift of binary
-        * fobs_orb / sepa : observer-frame orbital-frequency [1/s]  or  binary separation [cm]
+        * fobs_orb : observer-frame orbital-frequency [1/s]
     weights : (S,) ndarray of scalar
         Weights of each sample point.
     edges : (4,) of list of scalars
@@ -847,19 +1129,21 @@ def sample_sam_with_hardening(
         The lengths of each list will be [(M,), (Q,), (Z,), (F,)]
     dnum : (M, Q, Z, F) ndarray of scalar
         Number-density of binaries over grid specified by `edges`.
+    mass : (M-1, Q-1, Z-1, F-1) ndarray of scalar
+        Number of binaries in each grid cell.
 
     """
 
-    if (sample_threshold < 1.0) and (sample_threshold > 0.0):
+    if (sample_threshold is not None) and (sample_threshold < 1.0) and (sample_threshold > 0.0):
         msg = (
             f"`sample_threshold={sample_threshold}` values less than unity can lead to surprising behavior!"
         )
         log.warning(msg)
 
     # returns  dN/[dlog10(M) dq dz dln(f_r)]
-    # edges: Mtot [grams], mrat (q), redz (z), {fobs_orb (f) [1/s]   OR   sepa (a) [cm]}
+    # edges: Mtot [grams], mrat (q), redz (z), fobs_orb (f) [1/s]
     # `fobs_orb` is observer-frame orbital-frequency
-    edges, dnum = sam.dynamic_binary_number(hard, fobs_orb=fobs_orb, sepa=sepa, limit_merger_time=limit_merger_time)
+    edges, dnum, _ = sam.dynamic_binary_number_at_fobs(hard, fobs_orb)
 
     edges_integrate = [np.copy(ee) for ee in edges]
     edges_sample = [np.log10(edges[0]), edges[1], edges[2], np.log(edges[3])]
@@ -894,7 +1178,7 @@ def sample_sam_with_hardening(
         log.warning(msg)
 
     # Find the 'mass' (total number of binaries in each bin) by multiplying each bin by its volume
-    # NOTE: this needs to be done manually, instead of within kalepy, because of log-spacings
+    # NOTE: this needs to be done manually because of log-spacings
     mass = utils._integrate_grid_differential_number(edges_integrate, dnum, freq=True)
 
     # ---- sample binaries from distribution
@@ -904,12 +1188,10 @@ def sample_sam_with_hardening(
             "Set `sample_threshold` to only sample outliers."
         )
         log.warning(msg)
-        vals = kale.sample_grid(edges_sample, dnum, mass=mass, **sample_kwargs)
-        weights = np.ones(vals.shape[1], dtype=int)
-    else:
-        vals, weights = kale.sample_outliers(
-            edges_sample, dnum, sample_threshold, mass=mass, **sample_kwargs
-        )
+        sample_threshold = None
+
+    sampler = Grid_Sampler(edges_sample, mass, threshold=sample_threshold)
+    vals, weights = sampler.sample(seed=seed, poisson_inside=poisson_inside, poisson_outside=poisson_outside)
 
     vals[0] = 10.0 ** vals[0]
     vals[3] = np.e ** vals[3]
@@ -917,7 +1199,7 @@ def sample_sam_with_hardening(
     # If we sampled in comoving-volume, instead of redshift, convert back to redshift
     if REDZ_SAMPLE_VOLUME:
         vals[2] = np.power(vals[2] / (4.0*np.pi/3.0), 1.0/3.0)
-        vals[2] = cosmo.dcom_to_z(vals[2] * MPC)
+        vals[2] = cosmo_interp.dcom_to_z(vals[2] * MPC)
 
     # Remove low-mass systems after sampling also
     if cut_below_mass is not None:
@@ -1086,3 +1368,183 @@ def add_scatter_to_masses(mtot, mrat, dens, scatter, refine=4, log=None):
 
     return output
 
+
+def redshift_decomposition(nredz, nparts):
+    """Divide a grid of redshift edges into contiguous parts, with (close to) equal numbers of bins.
+
+    Consecutive parts share their boundary edge, so that each redshift bin belongs to exactly one part.
+
+    Parameters
+    ----------
+    nredz : int
+        Number of redshift edges of the grid.
+    nparts : int
+        Number of parts, at most the number of redshift bins (``nredz - 1``).
+
+    Returns
+    -------
+    parts : list of (2,) tuple of int
+        Indices of the first, and one past the last, redshift edges of each part; see
+        `Semi_Analytic_Model.redshift_subgrid`.
+
+    """
+    nbins = nredz - 1
+    if not (1 <= nparts <= nbins):
+        err = f"Number of parts ({nparts}) must be between 1 and the number of redshift bins ({nbins})!"
+        log.exception(err)
+        raise ValueError(err)
+
+    bins = np.array_split(np.arange(nbins), nparts)
+    return [(int(bb[0]), int(bb[-1]) + 2) for bb in bins]
+
+
+def merge_loudest(hc_ss, hc_bg):
+    """Merge the loudest single sources and backgrounds of disjoint parts of the same population.
+
+    Parameters
+    ----------
+    hc_ss : list of (F, R, L) ndarray
+        Characteristic strain of the `L` loudest single sources of each part.
+    hc_bg : list of (F, R) ndarray
+        Characteristic strain of the background (all other sources) of each part.
+
+    Returns
+    -------
+    hc_ss : (F, R, L) ndarray
+        Characteristic strain of the `L` loudest single sources of the whole population, in decreasing order.
+    hc_bg : (F, R) ndarray
+        Characteristic strain of all other sources of the whole population.
+
+    """
+    loudest = hc_ss[0].shape[-1]
+    ss2 = np.concatenate([hh**2 for hh in hc_ss], axis=-1)
+    tot2 = np.sum([bb**2 for bb in hc_bg], axis=0) + np.sum(ss2, axis=-1)
+    ss2 = -np.sort(-ss2, axis=-1)[..., :loudest]
+    # clip the (roundoff) negative values when single sources are the entire background
+    bg2 = np.clip(tot2 - np.sum(ss2, axis=-1), 0.0, None)
+    return np.sqrt(ss2), np.sqrt(bg2)
+
+
+def gwb_redshift_decomposed(
+    sam, fobs_gw_edges, hard=holo.hardening.Hard_GW(), realize=100, loudest=1,
+    nparts=None, comm=None, seed=None, mem_budget=None,
+):
+    """Calculate the GWB and loudest single sources of a SAM, decomposing its grid along redshift.
+
+    The (M, Q, Z, F) grids of `Semi_Analytic_Model.gwb` are only ever constructed for one part of the
+    redshift grid at a time (see `redshift_decomposition`), so that peak memory is reduced by roughly the
+    number of parts.  Parts are distributed over the ranks of `comm`, and the partial single-source and
+    background strains are merged with `merge_loudest` (on every rank).  Each part uses its own random
+    stream, spawned from `seed`, so the results do not depend on the number of ranks.
+
+    Parameters
+    ----------
+    sam : `Semi_Analytic_Model`
+        Model whose grid is decomposed.  Binary densities are not calculated over its full grid.
+    fobs_gw_edges : (F+1,) array_like of scalar,
+        Observer-frame GW-frequency bin edges. [1/sec]
+    hard : holodeck.evolution._Hardening class or instance
+        Hardening mechanism, see `Semi_Analytic_Model.gwb`.  Hardening normalizations depend only on the
+        (mtot, mrat) grid, so an instance constructed for `sam` is valid for each of its parts.
+    realize : int
+        Number of realizations.
+    loudest : int
+        Number of loudest single sources to distinguish from the background.
+    nparts : None or int
+        Number of parts of the redshift grid.  `None`: one part per rank of `comm` (or one part in total).
+    comm : None or MPI communicator (e.g. `mpi4py.MPI.COMM_WORLD`)
+        Communicator over which to distribute parts.  `None`: all parts are calculated by this process.
+    seed : None or int
+        Seed of the random streams of all parts.  This must be the same on all ranks.
+    mem_budget : float or None
+        [bytes] Memory budget for the realizations of each part, see `holodeck.utils.mem_budget`.
+
+    Returns
+    -------
+    hc_ss : (F, R, L) ndarray
+        Characteristic strain of the `L` loudest single sources at each frequency.
+    hc_bg : (F, R) ndarray
+        Characteristic strain of the GWB from all other sources.
+
+    """
+    rank, size = (0, 1) if comm is None else (comm.rank, comm.size)
+    nparts = size if nparts is None else int(nparts)
+    if nparts < size:
+        err = f"Number of parts ({nparts}) must be at least the number of ranks ({size})!"
+        log.exception(err)
+        raise ValueError(err)
+
+    parts = redshift_decomposition(sam.redz.size, nparts)
+    seeds = np.random.SeedSequence(seed).spawn(nparts)
+    hc_ss = hc_bg = None
+    for pp in range(rank, nparts, size):
+        lo, hi = parts[pp]
+        sub = sam.redshift_subgrid(lo, hi)
+        vals = sub.gwb(
+            fobs_gw_edges, hard=hard, realize=realize, loudest=loudest,
+            mem_budget=mem_budget, bitgen=np.random.PCG64(seeds[pp]),
+        )
+        del sub
+        # merge as we go, so that only one part is held at a time
+        if hc_ss is None:
+            hc_ss, hc_bg = vals
+        else:
+            hc_ss, hc_bg = merge_loudest([hc_ss, vals[0]], [hc_bg, vals[1]])
+
+    if comm is not None:
+        hc_ss, hc_bg = zip(*comm.allgather((hc_ss, hc_bg)))
+        hc_ss, hc_bg = merge_loudest(hc_ss, hc_bg)
+
+    return hc_ss, hc_bg
+
+
+@numba.njit
+def _alias_table(weights):
+    """Construct a Walker/Vose alias table for sampling indices with probability proportional to `weights`.
+
+    Parameters
+    ----------
+    weights : (N,) ndarray of scalar
+        Non-negative weights, with a positive sum.
+
+    Returns
+    -------
+    prob : (N,) ndarray of scalar
+        Probability of keeping each index, instead of switching to its alias.
+    alias : (N,) ndarray of int
+        Alias of each index.
+
+    """
+    num = weights.size
+    prob = weights * (num / weights.sum())
+    alias = np.arange(num)
+    small = np.empty(num, dtype=np.int64)
+    large = np.empty(num, dtype=np.int64)
+    nsmall = 0
+    nlarge = 0
+    for ii in range(num):
+        if prob[ii] < 1.0:
+            small[nsmall] = ii
+            nsmall += 1
+        else:
+            large[nlarge] = ii
+            nlarge += 1
+
+    while (nsmall > 0) and (nlarge > 0):
+        nsmall -= 1
+        ss = small[nsmall]
+        ll = large[nlarge - 1]
+        alias[ss] = ll
+        prob[ll] = (prob[ll] + prob[ss]) - 1.0
+        if prob[ll] < 1.0:
+            nlarge -= 1
+            small[nsmall] = ll
+            nsmall += 1
+
+    # remaining entries are (up to round-off) exactly full
+    for ii in range(nlarge):
+        prob[large[ii]] = 1.0
+    for ii in range(nsmall):
+        prob[small[ii]] = 1.0
+
+    return prob, alias
@@ -2,8 +2,10 @@
 """
 
 import numpy as np
+import pytest
 
 import holodeck as holo
+from holodeck.sams import cyutils as sam_cyutils
 # from holodeck.constants import MSOL, PC, YR
 
 
@@ -101,4 +103,193 @@ def test_sam_basics__gsmf_double_chechter():
     sam = holo.sams.Semi_Analytic_Model(gsmf=gsmf, shape=SHAPE)
     _test_sam_basics(sam)
 
-    return
\ No newline at end of file
+    return
+
+
+def test_grid_sampler():
+    rng = np.random.default_rng(12345)
+    edges = [np.linspace(0.0, 1.0, 5), np.logspace(0.0, 1.0, 4), np.linspace(-2.0, 0.0, 7)]
+    number = rng.lognormal(0.0, 1.0, (4, 3, 6))
+    number[rng.random(number.shape) < 0.3] = 0.0
+    prob = number.ravel() / number.sum()
+
+    # cells are drawn in proportion to their number, and never from empty cells
+    sampler = holo.sams.sam.Grid_Sampler(edges, number)
+    cells = sampler.draw(200000, rng)
+    assert np.all(number.ravel()[cells] > 0.0)
+    frac = np.bincount(cells, minlength=number.size) / cells.size
+    assert np.allclose(frac, prob, atol=5e-3)
+
+    # points are placed within their cells
+    vals = sampler.locations(cells, rng=rng)
+    idx = np.unravel_index(cells, number.shape)
+    for ee, vv, ii in zip(edges, vals, idx):
+        assert np.all((ee[ii] <= vv) & (vv <= ee[ii+1]))
+
+    # realizations are reproducible, and unbiased including dense cells
+    sampler = holo.sams.sam.Grid_Sampler(edges, number, threshold=2.0)
+    assert np.all(sampler.dense_number > 2.0)
+    cc, ww = sampler.realize(1)
+    test_cc, test_ww = sampler.realize(1)
+    assert np.all(cc == test_cc) and np.all(ww == test_ww)
+    assert np.all(np.diff(cc) > 0) and np.all(ww > 0)
+
+    NREALS = 2000
+    total = np.zeros(number.size)
+    for rr in range(NREALS):
+        cc, ww = sampler.realize(rng)
+        total[cc] += ww
+    assert np.allclose(total / NREALS, number.ravel(), rtol=0.0, atol=5.0*np.sqrt(number.max()/NREALS))
+
+    # dense cells are single weighted points, sparse cells are unit-weight binaries
+    vals, weights = sampler.sample(seed=2)
+    ndense = sampler.dense_cells.size
+    assert vals.shape == (3, weights.size)
+    assert np.allclose(weights[:ndense], sampler.dense_number)
+    assert np.all(weights[ndense:] == 1.0)
+    assert weights.size - ndense == int(np.around(sampler.total))
+    return
+
+
+def test_sample_sam_with_hardening():
+    sam = holo.sams.Semi_Analytic_Model(shape=10)
+    hard = holo.hardening.Hard_GW()
+    fobs_cents, fobs_edges = holo.utils.pta_freqs(num=4)
+    vals, weights, edges, dnum, mass = holo.sams.sam.sample_sam_with_hardening(
+        sam, hard, fobs_edges/2.0, sample_threshold=10.0, seed=12345
+    )
+    assert vals.shape == (4, weights.size)
+    assert np.all(np.isfinite(vals))
+    # with expectation-value weights in dense cells, the total number is preserved
+    assert np.isclose(weights.sum(), mass.sum(), rtol=1e-3)
+    for ee, vv in zip(edges, vals):
+        assert np.all((ee[0] <= vv*(1.0 + 1e-8)) & (vv <= ee[-1]*(1.0 + 1e-8)))
+    return
+
+
+def test_gwb_chunked_realizations():
+    sam = holo.sams.Semi_Analytic_Model(shape=10)
+    fobs_cents, fobs_edges = holo.utils.pta_freqs(num=4)
+    for params in [False, True]:
+        true = sam.gwb(fobs_edges, realize=7, loudest=2, params=params, bitgen=np.random.PCG64(12345))
+        # one realization per chunk
+        test = sam.gwb(fobs_edges, realize=7, loudest=2, params=params, bitgen=np.random.PCG64(12345),
+                       mem_budget=1)
+        assert len(test) == len(true)
+        for tt, vv in zip(true, test):
+            assert np.array_equal(tt, vv)
+    return
+
+
+def test_gwb_float32():
+    sam = holo.sams.Semi_Analytic_Model(shape=10)
+    fobs_cents, fobs_edges = holo.utils.pta_freqs(num=4)
+    true = sam.gwb(fobs_edges, realize=7, loudest=2, params=True, bitgen=np.random.PCG64(12345))
+    # realizations are calculated in double precision, only the outputs are single precision
+    test = sam.gwb(fobs_edges, realize=7, loudest=2, params=True, bitgen=np.random.PCG64(12345),
+                   dtype=np.float32)
+    # strains are single precision, binary parameters (masses in grams) are not
+    for tt, vv, dtype in zip(true, test, [np.float32, np.float32, np.float64, np.float64]):
+        assert vv.dtype == dtype
+        assert np.array_equal(vv, tt.astype(dtype))
+    return
+
+
+def test_gwb_poisson_stats():
+    sam = holo.sams.Semi_Analytic_Model(shape=10)
+    fobs_cents, fobs_edges = holo.utils.pta_freqs(num=4)
+    quantiles = [0.16, 0.5, 0.84]
+    data = sam.gwb_poisson_stats(fobs_edges, quantiles=quantiles)
+    assert data['mean'].shape == data['var'].shape == (4,)
+    assert data['quantiles'].shape == (4, len(quantiles))
+    assert np.all(np.diff(data['quantiles'], axis=-1) > 0.0)
+
+    # realizations of the same model
+    hc_ss, hc_bg = sam.gwb(fobs_edges, realize=2000, loudest=1, bitgen=np.random.PCG64(12345))
+    hc2 = hc_bg**2 + np.sum(hc_ss**2, axis=-1)
+    assert np.allclose(np.median(np.sqrt(hc2), axis=-1), data['quantiles'][:, 1], rtol=0.05, atol=0.0)
+    return
+
+
+def test_redshift_subgrid():
+    fobs_cents, fobs_edges = holo.utils.pta_freqs(num=3)
+    fobs_orb_cents = fobs_cents / 2.0
+    hard = holo.hardening.Hard_GW()
+    sam = holo.sams.Semi_Analytic_Model(shape=10)
+    _, diff_num = sam_cyutils.dynamic_binary_number_at_fobs(fobs_orb_cents, sam, hard, holo.cosmo)
+    edges = [sam.mtot, sam.mrat, sam.redz, fobs_edges / 2.0]
+    true = sam_cyutils.integrate_differential_number_3dx1d(edges, diff_num)
+
+    parts = holo.sams.sam.redshift_decomposition(sam.redz.size, 4)
+    assert parts[0][0] == 0 and parts[-1][1] == sam.redz.size
+    test = []
+    for lo, hi in parts:
+        # densities are calculated over the subgrid, or sliced from the full grid
+        fresh = holo.sams.Semi_Analytic_Model(shape=10).redshift_subgrid(lo, hi)
+        sub = sam.redshift_subgrid(lo, hi)
+        assert sub.shape == (sam.shape[0], sam.shape[1], hi - lo)
+        assert np.allclose(fresh.static_binary_density, sub.static_binary_density, rtol=1e-12, atol=0.0)
+
+        _, diff_num = sam_cyutils.dynamic_binary_number_at_fobs(fobs_orb_cents, fresh, hard, holo.cosmo)
+        edges = [fresh.mtot, fresh.mrat, fresh.redz, fobs_edges / 2.0]
+        test.append(sam_cyutils.integrate_differential_number_3dx1d(edges, diff_num))
+
+    assert np.allclose(np.concatenate(test, axis=2), true, rtol=1e-12, atol=0.0)
+
+    with pytest.raises(ValueError):
+        sam.redshift_subgrid(3, 4)
+    with pytest.raises(ValueError):
+        holo.sams.sam.redshift_decomposition(sam.redz.size, sam.redz.size)
+    return
+
+
+def test_merge_loudest():
+    rng = np.random.default_rng(12345)
+    nfreqs, nreals, loudest = 3, 4, 2
+    # individual binaries of each of three parts
+    binaries = [rng.uniform(0.0, 1.0, (nfreqs, nreals, num)) for num in [1, 5, 8]]
+    hc_ss, hc_bg = [], []
+    for bins in binaries:
+        bins = -np.sort(-bins, axis=-1)
+        ss = np.zeros((nfreqs, nreals, loudest))
+        ss[..., :bins.shape[-1]] = bins[..., :loudest]
+        hc_ss.append(np.sqrt(ss))
+        hc_bg.append(np.sqrt(np.sum(bins[..., loudest:], axis=-1)))
+
+    test_ss, test_bg = holo.sams.sam.merge_loudest(hc_ss, hc_bg)
+    bins = -np.sort(-np.concatenate(binaries, axis=-1), axis=-1)
+    assert np.allclose(test_ss**2, bins[..., :loudest])
+    assert np.allclose(test_bg**2, np.sum(bins[..., loudest:], axis=-1))
+    return
+
+
+def test_gwb_redshift_decomposed():
+    sam = holo.sams.Semi_Analytic_Model(shape=10)
+    fobs_cents, fobs_edges = holo.utils.pta_freqs(num=4)
+    nreals, loudest = 400, 2
+    test = holo.sams.sam.gwb_redshift_decomposed(sam, fobs_edges, realize=nreals, loudest=loudest, nparts=3, seed=1)
+    assert test[0].shape == (4, nreals, loudest)
+    assert test[1].shape == (4, nreals)
+    assert np.all(np.diff(test[0], axis=-1) <= 0.0)
+    # reproducible
+    again = holo.sams.sam.gwb_redshift_decomposed(sam, fobs_edges, realize=nreals, loudest=loudest, nparts=3, seed=1)
+    for tt, aa in zip(test, again):
+        assert np.array_equal(tt, aa)
+
+    # the total GWB matches the distribution over the whole grid
+    hc2 = test[1]**2 + np.sum(test[0]**2, axis=-1)
+    stats = sam.gwb_poisson_stats(fobs_edges, quantiles=[0.5])
+    assert np.allclose(np.median(np.sqrt(hc2), axis=-1), stats['quantiles'][:, 0], rtol=0.05, atol=0.0)
+    return
+
+
+def test_gwb_redshift_decomposed_mpi():
+    mpi = pytest.importorskip("mpi4py.MPI")
+    sam = holo.sams.Semi_Analytic_Model(shape=10)
+    fobs_cents, fobs_edges = holo.utils.pta_freqs(num=4)
+    kw = dict(realize=20, loudest=2, nparts=3, seed=1)
+    true = holo.sams.sam.gwb_redshift_decomposed(sam, fobs_edges, **kw)
+    test = holo.sams.sam.gwb_redshift_decomposed(sam, fobs_edges, comm=mpi.COMM_WORLD, **kw)
+    for tt, vv in zip(true, test):
+        assert np.allclose(tt, vv, rtol=1e-12)
+    return
@@ -16,7 +16,7 @@ import kalepy as kale # noqa
 
 import holodeck as holo
 import holodeck.cyutils
-from holodeck import cosmo, utils, plot, gravwaves
+from holodeck import utils, plot, gravwaves
 from holodeck.constants import MSOL, PC, YR, MPC
 
 # Silence annoying numpy errors
@@ -37,10 +37,15 @@ par_units = np.array([1/MSOL, 1, 1, 1, 1/MPC,  1/PC, 1])
 ###################################################
 
 
-def ss_gws_redz(edges, redz, number, realize, loudest = 1, params = False):
+def ss_gws_redz(edges, redz, number, realize, loudest = 1, params = False, mem_budget=None, bitgen=None,
+                dtype=np.float64):
 
     """ Calculate strain from the loudest single sources and background.
 
+    Realizations are calculated in chunks that fit within `mem_budget` (see `holodeck.utils.mem_chunks`).
+    All chunks draw from the same bit generator, one realization after the other, so the results do not
+    depend on the chunk size.
+
 
     Parameters
     ----------
@@ -58,6 +63,16 @@ def ss_gws_redz(edges, redz, number, realize, loudest = 1, params = False):
         Specification of how many discrete realizations to construct.
     loudest : int
         Number of loudest single sources to separate from background.
+    params : bool
+        Whether or not to also return the binary parameters.
+    mem_budget : float or None
+        [bytes] Memory budget, see `holodeck.utils.mem_budget`.
+    bitgen : `numpy.random.BitGenerator` or None
+        Bit generator for the random draws.  If `None`, a new (unseeded) `numpy.random.PCG64` is used.
+    dtype : numpy dtype
+        Type of the returned strains, `hc_ss` and `hc_bg`.  Realizations are always calculated in double
+        precision, but e.g. `np.float32` halves the memory (and storage) of the strains.  Binary parameters
+        are always double precision, as masses in grams exceed the range of single precision.
 
 
     Returns
@@ -76,6 +91,9 @@ def ss_gws_redz(edges, redz, number, realize, loudest = 1, params = False):
         Returned only if params = True.
     """
 
+    if not utils.isinteger(realize):
+        raise ValueError(f"`realize` ({realize}) must be an integer!")
+
     # All other bin midpoints
     mt = kale.utils.midpoints(edges[0]) #: total mass
     mr = kale.utils.midpoints(edges[1]) #: mass ratio
@@ -97,80 +115,96 @@ def ss_gws_redz(edges, redz, number, realize, loudest = 1, params = False):
                 err = f"{err} redz < 0 and !=-1 found in redz, in ss_gws_redz()"
                 raise ValueError(err)
 
-    # For multiple realizations, using cython
-    if(utils.isinteger(realize)):
-        if(params == True):
-            # hc2ss = char strain squared of each loud single source
-            # hc2bg = char strain squared of the background
-            # lspar = avg parameters of loudest sources
-            # bgpar = avg parameters of background
-            # ssidx = indices of loud single sources
-
-            # redshifts are defined across 4D grid, shape (M, Q, Z, Fc)
-            #    where M, Q, Z are edges and Fc is frequency centers
-            # find midpoints of redshifts in M, Q, Z dimensions, to end up with (M-1, Q-1, Z-1, Fc)
-            for dd in range(3):
-                redz = np.moveaxis(redz, dd, 0)
-                redz = kale.utils.midpoints(redz, axis=0)
-                redz = np.moveaxis(redz, 0, dd)
-
-            # if np.any(np.logical_and(redz<0, redz!=-1)):
-            #     err = np.sum(np.logical_and(redz<0, redz!=-1))
-            #     err = f"{err} redz < 0 and !=-1 found in redz, in ss_gws_redz() after kale.utils.midpoints"
-            #     raise ValueError(err)
-
-            dcom_final = +np.inf*np.ones_like(redz)
-
-            sel = (redz > 0.0)
-            redz[~sel] = -1.0
-            redz[redz<0] = -1.0
-
-            dcom_final[sel] = cosmo.comoving_distance(redz[sel]).cgs.value
-            if np.any(dcom_final<0): print('dcom_final<0 found')
-            if np.any(np.isnan(dcom_final)): print('nan dcom_final found')
-            # redz[redz<0] = -1
-
-            fobs_orb_edges = edges[-1]
-            fobs_orb_cents = kale.utils.midpoints(fobs_orb_edges)
-            frst_orb_cents = utils.frst_from_fobs(fobs_orb_cents[np.newaxis,np.newaxis,np.newaxis,:], redz) # (M,Q,Z,F,), final
-
-
-            sepa = utils.kepler_sepa_from_freq(mt[:,np.newaxis,np.newaxis,np.newaxis], frst_orb_cents) # (M,Q,Z,F) in cm
-            angs = utils.angs_from_sepa(sepa, dcom_final, redz) # (M,Q,Z,F) use sepa and dcom in cm
-
-
-
-            hc2ss, hc2bg, sspar, bgpar = \
+    if(params == True):
+        # hc2ss = char strain squared of each loud single source
+        # hc2bg = char strain squared of the background
+        # lspar = avg parameters of loudest sources
+        # bgpar = avg parameters of background
+        # ssidx = indices of loud single sources
+
+        # redshifts are defined across 4D grid, shape (M, Q, Z, Fc)
+        #    where M, Q, Z are edges and Fc is frequency centers
+        # find midpoints of redshifts in M, Q, Z dimensions, to end up with (M-1, Q-1, Z-1, Fc)
+        for dd in range(3):
+            redz = np.moveaxis(redz, dd, 0)
+            redz = kale.utils.midpoints(redz, axis=0)
+            redz = np.moveaxis(redz, 0, dd)
+
+        # if np.any(np.logical_and(redz<0, redz!=-1)):
+        #     err = np.sum(np.logical_and(redz<0, redz!=-1))
+        #     err = f"{err} redz < 0 and !=-1 found in redz, in ss_gws_redz() after kale.utils.midpoints"
+        #     raise ValueError(err)
+
+        dcom_final = +np.inf*np.ones_like(redz)
+
+        sel = (redz > 0.0)
+        redz[~sel] = -1.0
+        redz[redz<0] = -1.0
+
+        dcom_final[sel] = holo.cosmo_interp.z_to_dcom(redz[sel])
+        if np.any(dcom_final<0): print('dcom_final<0 found')
+        if np.any(np.isnan(dcom_final)): print('nan dcom_final found')
+        # redz[redz<0] = -1
+
+        fobs_orb_edges = edges[-1]
+        fobs_orb_cents = kale.utils.midpoints(fobs_orb_edges)
+        frst_orb_cents = utils.frst_from_fobs(fobs_orb_cents[np.newaxis,np.newaxis,np.newaxis,:], redz) # (M,Q,Z,F,), final
+
+
+        sepa = utils.kepler_sepa_from_freq(mt[:,np.newaxis,np.newaxis,np.newaxis], frst_orb_cents) # (M,Q,Z,F) in cm
+        angs = utils.angs_from_sepa(sepa, dcom_final, redz) # (M,Q,Z,F) use sepa and dcom in cm
+
+    # ---- Calculate realizations in chunks, using the cython functions
+
+    nfreqs = number.shape[-1]
+    # values per realization: hc_ss (L), hc_bg (1), [sspar (4L), bgpar (7)]
+    nvals = (loudest + 1) + (4*loudest + 7) * bool(params)
+    # grid arrays: number, h2fdf, redz, [dcom_final, sepa, angs, frst_orb_cents]
+    ngrid = 3 + 4 * bool(params)
+    # grid-sized temporaries: the sorting indices of the (M, Q, Z) bins, [and the `sel` mask, and the copies made
+    # while taking redshift midpoints and filling `dcom_final`]
+    temp_bytes = 4 * 8 * (number.size // nfreqs) + (1 + 2 * 8) * number.size * bool(params)
+    # the cython functions return (double precision) chunks of each output, which are then square-rooted
+    itemsize = np.dtype(dtype).itemsize
+    nhc = loudest + 1
+    chunks = utils.mem_chunks(
+        realize, 2 * 8 * nfreqs * nvals, budget=mem_budget, name='ss_gws_redz',
+        fixed_bytes=8 * ngrid * number.size + temp_bytes + (itemsize * nhc + 8 * (nvals - nhc)) * nfreqs * realize,
+    )
+    if bitgen is None:
+        bitgen = np.random.PCG64()
+
+    hc_ss = np.zeros((nfreqs, realize, loudest), dtype=dtype)
+    hc_bg = np.zeros((nfreqs, realize), dtype=dtype)
+    if params:
+        sspar = np.zeros((4, nfreqs, realize, loudest))
+        bgpar = np.zeros((7, nfreqs, realize))
+
+    for sl in chunks:
+        nreals = sl.stop - sl.start
+        if params:
+            hc2ss, hc2bg, sspar[:, :, sl], bgpar[:, :, sl] = \
                 holo.cyutils.loudest_hc_and_par_from_sorted_redz(
-                    number, h2fdf, realize, loudest,
+                    number, h2fdf, nreals, loudest,
                     mt, mr, rz, redz, dcom_final, sepa, angs,
-                    msort, qsort, zsort)
-            hc_ss = np.sqrt(hc2ss) # calculate single source strain
-            hc_bg = np.sqrt(hc2bg) # calculate background strain
-
-
-
-            # check that all final redshifts are positive or -1
-            if np.any(np.logical_and(sspar[3]<0, sspar[3]!=-1)):
-                err = np.sum(np.logical_and(sspar[3]<0, sspar[3]!=-1))
-                err = f"check 1: {err} out of {sspar[3].size} sspar[3] are negative and not -1 in sings.ss_gws_redz()"
-                raise ValueError(err)
-
-
-            # return
-            return hc_ss, hc_bg, sspar, bgpar
-
+                    msort, qsort, zsort, bitgen=bitgen)
         else:
             # use cython to get h_c^2 for ss and bg
-            hc2ss, hc2bg = holo.cyutils.loudest_hc_from_sorted(number, h2fdf, realize, loudest,
-                                                               msort, qsort, zsort)
-            hc_ss = np.sqrt(hc2ss)
-            hc_bg = np.sqrt(hc2bg)
-            return hc_ss, hc_bg
+            hc2ss, hc2bg = holo.cyutils.loudest_hc_from_sorted(number, h2fdf, nreals, loudest,
+                                                               msort, qsort, zsort, bitgen=bitgen)
+        hc_ss[:, sl] = np.sqrt(hc2ss) # calculate single source strain
+        hc_bg[:, sl] = np.sqrt(hc2bg) # calculate background strain
 
-    # OTHERWISE
-    else:
-        raise Exception("`realize` ({}) must be an integer!")
+    if params:
+        # check that all final redshifts are positive or -1
+        if np.any(np.logical_and(sspar[3]<0, sspar[3]!=-1)):
+            err = np.sum(np.logical_and(sspar[3]<0, sspar[3]!=-1))
+            err = f"check 1: {err} out of {sspar[3].size} sspar[3] are negative and not -1 in sings.ss_gws_redz()"
+            raise ValueError(err)
+
+        return hc_ss, hc_bg, sspar, bgpar
+
+    return hc_ss, hc_bg
 
 
 # version for running libraries
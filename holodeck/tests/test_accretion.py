@@ -0,0 +1,49 @@
+"""Tests for the `holodeck.accretion` submodule.
+"""
+
+import os
+from types import SimpleNamespace
+
+import numpy as np
+
+from holodeck import accretion, _PATH_DATA
+
+NBINS = 100
+
+
+def _evol(eccen=True, seed=12345):
+    """Minimal stand-in for an `Evolution` instance at its first step."""
+    rng = np.random.default_rng(seed)
+    mass = 10.0 ** rng.uniform(6, 10, (NBINS, 2, 2))
+    eccen = rng.uniform(0.0, 0.8, (NBINS, 2)) if eccen else None
+    return SimpleNamespace(mass=mass, eccen=eccen)
+
+
+def test_siwek22_interp_matches_table():
+    interp = accretion._pref_acc_interp('Siwek22')
+    # interpolant is only constructed once
+    assert accretion._pref_acc_interp('Siwek22') is interp
+
+    for e in [0.0, 0.4, 0.8]:
+        fname = os.path.join(_PATH_DATA, f'preferential_accretion/siwek+22/lambda_e={e:.2f}.txt')
+        qs, lambdas = np.loadtxt(fname).T
+        assert np.allclose(interp.ev(qs, e * np.ones_like(qs)), lambdas)
+    return
+
+
+def test_pref_acc_siwek22():
+    acc = accretion.Accretion(accmod='Siwek22', eccen=0.3)
+    mdot = 10.0 ** np.random.uniform(-3, 1, NBINS)
+    for evol in [_evol(eccen=True), _evol(eccen=False)]:
+        mdot_arr = acc.pref_acc(mdot, evol, 1)
+        assert mdot_arr.shape == (NBINS, 2)
+        assert np.allclose(mdot_arr.sum(axis=-1), mdot)
+
+        # secondary accretion rate is placed correctly, whichever index the secondary is stored at
+        m1, m2 = evol.mass[:, 0, 0], evol.mass[:, 0, 1]
+        q_b = np.minimum(m1, m2) / np.maximum(m1, m2)
+        e_b = evol.eccen[:, 0] if evol.eccen is not None else acc.eccen * np.ones(NBINS)
+        lamb = accretion._pref_acc_interp('Siwek22').ev(q_b, e_b)
+        mdot_sec = np.where(m1 >= m2, mdot_arr[:, 1], mdot_arr[:, 0])
+        assert np.allclose(mdot_sec, mdot * lamb / (1.0 + lamb))
+    return
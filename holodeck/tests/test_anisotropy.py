@@ -0,0 +1,78 @@
+"""Tests for the `holodeck.anisotropy` submodule.
+"""
+
+import numpy as np
+import pytest
+
+import holodeck as holo
+from holodeck.sams import cyutils as sam_cyutils
+
+anisotropy = pytest.importorskip("holodeck.anisotropy")
+
+
+@pytest.fixture(scope='module')
+def grid():
+    sam = holo.sams.Semi_Analytic_Model(shape=(10, 11, 12))
+    hard = holo.hardening.Fixed_Time_2PL_SAM(sam, 1.0*holo.constants.GYR)
+    fobs_cents, fobs_edges = holo.utils.pta_freqs(num=5)
+    fobs_orb_edges = fobs_edges / 2.0
+    redz_final, dnum = sam_cyutils.dynamic_binary_number_at_fobs(fobs_cents/2.0, sam, hard, holo.cosmo)
+    edges = [sam.mtot, sam.mrat, sam.redz, fobs_orb_edges]
+    number = sam_cyutils.integrate_differential_number_3dx1d(edges, dnum)
+    return edges, dnum, redz_final, number
+
+
+def test_analytic_cl_matches_single(grid):
+    edges, dnum, redz_final, number = grid
+    hs = anisotropy.strain_amp_at_bin_centers_redz(edges, redz_final)
+    C0, Cl = anisotropy.Cl_analytic_from_num(edges[-1], number, hs)
+
+    engine = anisotropy.Analytic_Cl(edges, redz=redz_final)
+    test_C0, test_Cl = engine(number)
+    assert np.allclose(test_C0, C0, rtol=1e-12, atol=0.0)
+    assert np.allclose(test_Cl, Cl, rtol=1e-12, atol=0.0)
+
+    # batches of grids, as arrays or iterables, give the same result for each grid
+    scales = np.array([0.5, 1.0, 3.0])
+    numbers = scales[:, np.newaxis, np.newaxis, np.newaxis, np.newaxis] * number
+    batch_C0, batch_Cl = engine(numbers)
+    assert batch_C0.shape == batch_Cl.shape == (scales.size, C0.size)
+    assert np.allclose(batch_Cl, scales[:, np.newaxis] * Cl, rtol=1e-12, atol=0.0)
+    assert np.allclose(batch_C0[1], C0, rtol=1e-12, atol=0.0)
+    assert np.allclose(engine.ratio(list(numbers)), batch_Cl / batch_C0, rtol=1e-12)
+
+    # realizations add a trailing axis
+    real_C0, real_Cl = engine(number, realize=4)
+    assert real_C0.shape == real_Cl.shape == (C0.size, 4)
+
+    with pytest.raises(ValueError):
+        engine(number[1:])
+    return
+
+
+def test_analytic_cl_dnum(grid):
+    edges, dnum, redz_final, number = grid
+    engine = anisotropy.Analytic_Cl(edges, redz=redz_final, dnum=True)
+    C0, Cl = engine(dnum)
+    assert np.all(np.isfinite(C0)) and np.all(Cl <= C0)
+
+    # trapezoid integration of the differential number, as in `Cl_analytic_from_dnum`
+    hs = anisotropy.strain_amp_at_bin_edges_redz(edges, redz_final)
+    dlnf = np.diff(np.log(2.0 * edges[-1]))
+    sums = []
+    for power in [2, 4]:
+        yy = dnum * hs**power
+        yy = holo.utils.trapz(yy, np.log10(edges[0]), axis=0, cumsum=False)
+        yy = holo.utils.trapz(yy, edges[1], axis=1, cumsum=False)
+        yy = holo.utils.trapz(yy, edges[2], axis=2, cumsum=False)
+        sums.append(np.sum(yy * dlnf, axis=(0, 1, 2)))
+    true_C0, true_Cl = anisotropy._Cl_from_sums(
+        holo.utils.midpoints(edges[-1]), np.diff(edges[-1]), *sums
+    )
+    assert np.allclose(C0, true_C0, rtol=1e-10, atol=0.0)
+    assert np.allclose(Cl, true_Cl, rtol=1e-10, atol=0.0)
+    assert np.allclose(anisotropy.Cl_analytic_from_dnum(edges, dnum, redz_final)[1], Cl, rtol=1e-12, atol=0.0)
+
+    with pytest.raises(ValueError):
+        engine(dnum, realize=2)
+    return
@@ -0,0 +1,100 @@
+"""Tests for the `holodeck.cosmology` submodule.
+"""
+
+import pytest
+import numpy as np
+
+import holodeck as holo
+from holodeck import cosmology
+
+REDZ = np.concatenate([[0.0], 10.0 ** np.random.uniform(-4, 3.5, 1000)])
+
+
+def test_forward_vs_cosmo():
+    cosmo = holo.cosmo
+    interp = holo.cosmo_interp
+    sel = (REDZ > 0.0)
+
+    checks = [
+        [interp.z_to_dcom, lambda zz: cosmo.comoving_distance(zz).cgs.value],
+        [interp.z_to_dlum, lambda zz: cosmo.luminosity_distance(zz).cgs.value],
+        [interp.z_to_tlbk, lambda zz: cosmo.lookback_time(zz).cgs.value],
+        [interp.z_to_tage, lambda zz: cosmo.age(zz).cgs.value],
+        [interp.dtdz, cosmo.dtdz],
+        [interp.dVcdz, cosmo.dVcdz],
+    ]
+    for func, truth in checks:
+        test = func(REDZ)
+        true = truth(REDZ)
+        assert np.all(np.isfinite(test))
+        assert np.allclose(test[sel], true[sel], rtol=1e-7), f"{func} does not match!"
+
+    return
+
+
+def test_inverse_round_trip():
+    interp = holo.cosmo_interp
+    sel = (REDZ > 1.0e-3)
+    pairs = [
+        [interp.z_to_dcom, interp.dcom_to_z],
+        [interp.z_to_tlbk, interp.tlbk_to_z],
+        [interp.z_to_tage, interp.tage_to_z],
+    ]
+    for forward, inverse in pairs:
+        test = inverse(forward(REDZ))
+        assert np.allclose(test[sel], REDZ[sel], rtol=1e-7), f"{inverse} does not invert {forward}!"
+        assert np.allclose(test, REDZ, atol=1e-6)
+
+    return
+
+
+def test_monotonic():
+    interp = holo.cosmo_interp
+    redz = np.expm1(np.linspace(0.0, np.log1p(1e4), 100000))
+    for key, sign in [['dcom', +1], ['tlbk', +1], ['tage', -1]]:
+        vals = interp._interp(redz, 'redz', key)
+        assert np.all(sign * np.diff(vals) >= 0.0), f"'{key}' is not monotonic!"
+        # inverse is monotonic in the same sense
+        zz = interp._interp(np.sort(vals), key, 'redz')
+        assert np.all(np.diff(zz) * sign >= 0.0), f"inverse of '{key}' is not monotonic!"
+
+    return
+
+
+def test_out_of_bounds():
+    interp = holo.cosmo_interp
+    vals = interp.z_to_dcom([-1.0, np.nan, 2.0e4, 1.0])
+    assert np.all(np.isnan(vals[:3]))
+    assert np.isfinite(vals[3])
+
+    dcom_max = interp.table('dcom', 'redz')[0][-1]
+    vals = interp.dcom_to_z([-1.0, 2.0 * dcom_max])
+    assert np.all(np.isnan(vals))
+
+    # scalars in, scalars out
+    assert np.ndim(interp.z_to_dcom(1.0)) == 0
+    assert np.shape(interp.tlbk_to_z(np.ones((2, 3)) * 1e16)) == (2, 3)
+    return
+
+
+def test_bad_table():
+    interp = holo.cosmo_interp
+    with pytest.raises(ValueError):
+        interp.table('dcom', 'tlbk')
+    with pytest.raises(ValueError):
+        interp.table('redz', 'redz')
+    return
+
+
+def test_cython_interp_matches():
+    cyutils = pytest.importorskip("holodeck.cyutils")
+    interp = holo.cosmo_interp
+    for key in ['dcom', 'tlbk', 'tage']:
+        table = interp.table(key, 'redz')
+        xx = np.random.uniform(table[0][0], table[0][-1], 1000)
+        xx = np.concatenate([xx, table[0][[0, -1]], [table[0][0] - 1.0, np.nan]])
+        test = cyutils.interp_hermite(xx, *table)
+        true = cosmology.interp_hermite(xx, *table)
+        assert np.allclose(test, true, rtol=1e-12, equal_nan=True)
+
+    return
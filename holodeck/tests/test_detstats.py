@@ -0,0 +1,243 @@
+"""Tests for the `holodeck.detstats` submodule.
+"""
+
+import numpy as np
+import h5py
+import pytest
+
+import holodeck as holo
+from holodeck import detstats
+
+NFREQS = 10
+NLOUDEST = 3
+NREALS = 4
+NSKIES = 5
+NPSRS = 6
+NSAMPS = 3
+
+SKY_KEYS = ['theta_ss', 'phi_ss', 'Phi0_ss', 'iota_ss', 'psi_ss']
+
+
+def _strains(nsamps, seed=12345):
+    """Random single-source and background strains, with shapes (N,F,R,L) and (N,F,R)."""
+    rng = np.random.default_rng(seed)
+    fobs, _ = holo.utils.pta_freqs(num=NFREQS)
+    hc_bg = 1e-15 * (fobs[np.newaxis, :, np.newaxis] * holo.constants.YR) ** (-2.0/3.0)
+    hc_bg = hc_bg * rng.lognormal(0.0, 0.5, (nsamps, NFREQS, NREALS))
+    hc_ss = hc_bg[..., np.newaxis] * rng.uniform(0.05, 0.5, (nsamps, NFREQS, NREALS, NLOUDEST))
+    hc_ss = np.sort(hc_ss, axis=-1)[..., ::-1]
+    return fobs, hc_ss, hc_bg
+
+
+@pytest.mark.parametrize("snr_cython", [False, True])
+@pytest.mark.parametrize("distinct_noise", [False, True])
+def test_batched_detector_matches_loop(tmp_path, snr_cython, distinct_noise):
+    fobs, hc_ss, hc_bg = _strains(NSAMPS)
+    dur = 1.0/fobs[0]
+    cad = 1.0/(2*fobs[-1])
+
+    np.random.seed(2468)
+    sigma = np.random.uniform(1e-7, 3e-7, NPSRS) if distinct_noise else 1e-7
+    psrs = detstats._build_pta(NPSRS, sigma, dur, cad)
+    skies = detstats._build_skies(NFREQS, NSKIES, NLOUDEST)
+
+    detector = detstats.Batched_Detector(psrs, fobs, skies, snr_cython=snr_cython, grid_path=str(tmp_path))
+    dp_bg, snr_bg = detector.detect_bg(hc_bg)
+    dp_ss, snr_ss, gamma_ssi = detector.detect_ss(hc_ss, hc_bg)
+    assert dp_bg.shape == (NSAMPS, NREALS)
+    assert snr_bg.shape == (NSAMPS, NREALS)
+    assert dp_ss.shape == (NSAMPS, NREALS, NSKIES)
+    assert snr_ss.shape == gamma_ssi.shape == (NSAMPS, NFREQS, NREALS, NSKIES, NLOUDEST)
+
+    # the cython SNR calculation uses single-precision intermediates
+    rtol = 1e-5 if snr_cython else 1e-10
+    for nn in range(NSAMPS):
+        true_dp_bg, true_snr_bg = detstats.detect_bg_pta(psrs, fobs, hc_bg[nn], ret_snr=True)
+        assert np.allclose(dp_bg[nn], true_dp_bg, rtol=1e-10)
+        assert np.allclose(snr_bg[nn], true_snr_bg, rtol=1e-10)
+
+        true_dp_ss, true_snr_ss, true_gamma_ssi = detstats.detect_ss_pta(
+            psrs, fobs, hc_ss[nn], hc_bg[nn], ret_snr=True, snr_cython=snr_cython,
+            grid_path=str(tmp_path), **dict(zip(SKY_KEYS, skies))
+        )
+        assert np.allclose(snr_ss[nn], true_snr_ss, rtol=rtol)
+        assert np.allclose(gamma_ssi[nn], true_gamma_ssi, rtol=rtol, atol=1e-12)
+        assert np.allclose(dp_ss[nn], true_dp_ss, rtol=rtol, atol=1e-12)
+
+    # blocks respect the memory budget, but always include at least one sample
+    blocks = detector.blocks(NSAMPS, NREALS)
+    assert [bb.start for bb in blocks[1:]] == [bb.stop for bb in blocks[:-1]]
+    assert (blocks[0].start, blocks[-1].stop) == (0, NSAMPS)
+    tiny = detstats.Batched_Detector(psrs, fobs, skies, snr_cython=snr_cython,
+                                     grid_path=str(tmp_path), mem_budget=1)
+    assert [bb.stop - bb.start for bb in tiny.blocks(NSAMPS, NREALS)] == [1] * NSAMPS
+    return
+
+
+def test_detect_ss_pta_chunked(tmp_path):
+    fobs, hc_ss, hc_bg = _strains(1)
+    hc_ss, hc_bg = hc_ss[0], hc_bg[0]
+    np.random.seed(24680)
+    psrs = detstats._build_pta(NPSRS, 1e-7, 1.0/fobs[0], 1.0/(2*fobs[-1]))
+    skies = dict(zip(SKY_KEYS, detstats._build_skies(NFREQS, NSKIES, NLOUDEST)))
+
+    true = detstats.detect_ss_pta(psrs, fobs, hc_ss, hc_bg, ret_snr=True, grid_path=str(tmp_path), **skies)
+    # one realization per chunk
+    test = detstats.detect_ss_pta(psrs, fobs, hc_ss, hc_bg, ret_snr=True, grid_path=str(tmp_path),
+                                  mem_budget=1, **skies)
+    for tt, vv in zip(true, test):
+        assert np.array_equal(tt, vv)
+    return
+
+
+def test_detect_ss_pta_float32(tmp_path):
+    fobs, hc_ss, hc_bg = _strains(1)
+    hc_ss, hc_bg = hc_ss[0], hc_bg[0]
+    np.random.seed(13579)
+    psrs = detstats._build_pta(NPSRS, 1e-7, 1.0/fobs[0], 1.0/(2*fobs[-1]))
+    skies = dict(zip(SKY_KEYS, detstats._build_skies(NFREQS, NSKIES, NLOUDEST)))
+
+    true = detstats.detect_ss_pta(psrs, fobs, hc_ss, hc_bg, ret_snr=True, grid_path=str(tmp_path), **skies)
+    test = detstats.detect_ss_pta(psrs, fobs, hc_ss, hc_bg, ret_snr=True, grid_path=str(tmp_path),
+                                  dtype=np.float32, **skies)
+    for tt, vv in zip(true, test):
+        assert vv.dtype == np.float32
+        assert np.allclose(vv, tt, rtol=1e-6, atol=1e-30)
+    return
+
+
+def test_detect_lib(tmp_path):
+    fobs, hc_ss, hc_bg = _strains(NSAMPS)
+    fname = tmp_path.joinpath('sam_lib.hdf5')
+    with h5py.File(fname, 'w') as h5:
+        h5.create_dataset('fobs', data=fobs)
+        h5.create_dataset('sample_params', data=np.zeros((NSAMPS, 1)))
+        h5.create_dataset('hc_ss', data=hc_ss)
+        h5.create_dataset('hc_bg', data=hc_bg)
+
+    np.random.seed(1357)
+    vals = detstats.detect_lib(str(fname), str(tmp_path.joinpath('out')), NPSRS, 1e-7, NSKIES,
+                               plot=False, grid_path=str(tmp_path), save_ssi=True, ret_dict=True)
+    assert vals['dp_ss'].shape == (NSAMPS, NREALS, NSKIES)
+    assert vals['dp_bg'].shape == (NSAMPS, NREALS)
+    assert vals['snr_bg'].shape == (NSAMPS, NFREQS, NREALS)
+    assert vals['ev_ss'].shape == (NSAMPS, NREALS, NSKIES)
+    for key in ['dp_ss', 'dp_bg', 'df_ss', 'df_bg', 'ev_ss']:
+        assert np.all(np.isfinite(vals[key])), f"non-finite values in '{key}'!"
+    assert np.all((vals['dp_ss'] >= 0.0) & (vals['dp_ss'] <= 1.0))
+
+    # matches the single-sample functions, using the same random PTA and skies
+    np.random.seed(1357)
+    psrs = detstats._build_pta(NPSRS, 1e-7, 1.0/fobs[0], 1.0/(2*fobs[-1]))
+    skies = detstats._build_skies(NFREQS, NSKIES, NLOUDEST)
+    for nn in range(NSAMPS):
+        dp_bg = detstats.detect_bg_pta(psrs, fobs, hc_bg[nn])
+        dp_ss, snr_ss, gamma_ssi = detstats.detect_ss_pta(
+            psrs, fobs, hc_ss[nn], hc_bg[nn], ret_snr=True,
+            grid_path=str(tmp_path), **dict(zip(SKY_KEYS, skies))
+        )
+        assert np.allclose(vals['dp_bg'][nn], dp_bg, rtol=1e-10)
+        assert np.allclose(vals['dp_ss'][nn], dp_ss, rtol=1e-5, atol=1e-12)
+        assert np.allclose(vals['ev_ss'][nn], detstats.expval_of_ss(gamma_ssi), rtol=1e-5, atol=1e-12)
+    return
+
+
+def test_pta_calibrator_detprob():
+    fobs, hc_ss, hc_bg = _strains(1)
+    hc_ss, hc_bg = hc_ss[0], hc_bg[0]
+    cad = 1.0/(2*fobs[-1])
+    np.random.seed(97531)
+    psrs = detstats._build_pta(NPSRS, 1.0, 1.0/fobs[0], cad)
+    thetas = [psr.theta for psr in psrs]
+    phis = [psr.phi for psr in psrs]
+    red_amp, red_gamma = 1e-15, -1.5
+
+    calibrator = detstats.PTA_Calibrator(
+        fobs, hc_bg, thetas, phis,
+        noise_fixed=detstats._red_noise(red_amp, red_gamma, fobs)[:, np.newaxis],
+        noise_scaled=detstats._white_noise(cad, 1.0),
+    )
+    for sigma in [1e-8, 3e-7, 1e-5]:
+        pulsars = detstats._build_pta(NPSRS, sigma, 1.0/fobs[0], cad)
+        for psr, theta, phi in zip(pulsars, thetas, phis):
+            psr.theta, psr.phi = theta, phi
+        true = detstats.detect_bg_pta(pulsars, fobs, hc_bg, red_amp=red_amp, red_gamma=red_gamma)
+        test = calibrator.detprob(sigma)
+        assert np.allclose(test, true, rtol=1e-10)
+
+    # dp decreases with noise, and each realization reaches the target
+    sigma, lo, hi = calibrator.calibrate(None, 1e-8, 1e-7, target=0.5)
+    assert np.all(np.isfinite(sigma))
+    assert np.all(lo <= sigma) and np.all(sigma <= hi)
+    assert np.allclose(calibrator.detprob(sigma), 0.5, atol=1e-4)
+
+    # an impossible target fails without raising
+    sigma, _, _ = calibrator.calibrate(None, 1e-8, 1e-7, target=1.0, maxbads=3)
+    assert np.all(np.isnan(sigma))
+    return
+
+
+def test_calibrate_one_pta():
+    fobs, hc_ss, hc_bg = _strains(1)
+    hc_ss, hc_bg = hc_ss[0, :, 0], hc_bg[0, :, 0]
+    np.random.seed(86420)
+
+    for kw in [dict(), dict(ss_noise=True), dict(red2white=0.5, red_gamma=-1.5)]:
+        psrs, red_amp, sigma, sigmin, sigmax = detstats.calibrate_one_pta(
+            hc_bg, hc_ss, fobs, NPSRS, tol=0.01, ret_sig=True, **kw
+        )
+        assert sigmin <= sigma <= sigmax
+        assert np.allclose([np.mean(psr.toaerrs) for psr in psrs], sigma, atol=0.0)
+        dp_bg = detstats.detect_bg_pta(psrs, fobs, hc_bg[:, np.newaxis], hc_ss[:, np.newaxis, :],
+                                       red_amp=red_amp, red_gamma=kw.get('red_gamma'),
+                                       ss_noise=kw.get('ss_noise', False))
+        assert np.abs(dp_bg[0] - 0.5) < 0.01
+
+    # red noise amplitude, for the last PTA
+    ramp, rampmin, rampmax = detstats.calibrate_one_ramp(
+        hc_bg, hc_ss, fobs, psrs, rampstart=1e-15, rampmin=1e-18, rampmax=1e-12, rgam=-1.5
+    )
+    assert rampmin <= ramp <= rampmax
+    dp_bg = detstats.detect_bg_pta(psrs, fobs, hc_bg[:, np.newaxis], red_amp=ramp, red_gamma=-1.5)
+    assert np.abs(dp_bg[0] - 0.5) < 0.01
+    return
+
+
+def test_calibrate_one_pta_gsc():
+    fobs, _, hc_bg = _strains(1)
+    hc_bg = hc_bg[0, :, 0]
+    dur = 1.0/fobs[0]
+    cad = 1.0/(2.0*fobs[-1])
+    tol = 0.01
+    rng = np.random.default_rng(24680)
+    phis = rng.uniform(0.0, 2*np.pi, NPSRS)
+    thetas = rng.uniform(0.0, np.pi, NPSRS)
+
+    psrs, _, sigma, sigmin, sigmax, _, _ = detstats.calibrate_one_pta_gsc(
+        hc_bg, fobs, NPSRS, phis=phis, thetas=thetas, tol=tol, ret_sig=True
+    )
+    assert sigmin <= sigma <= sigmax
+    assert np.allclose([np.mean(psr.toaerrs) for psr in psrs], sigma, atol=0.0)
+
+    def detprob(sig):
+        pulsars = detstats.hsim.sim_pta(timespan=dur/holo.constants.YR, cad=holo.constants.YR/cad, sigma=sig,
+                                        phi=phis, theta=thetas)
+        _, noise_gsc = detstats.psrs_spectra_gwbnoise(pulsars, fobs, nreals=1, npsrs=NPSRS)
+        return detstats.detect_bg_pta(pulsars, fobs, hc_bg=hc_bg[:, np.newaxis], custom_noise=noise_gsc)[0]
+
+    # reference: the bisection used before root-finding, over the same default range
+    lo, hi = 1e-9, 1e-4
+    sig_ref, dp_ref = 1e-6, detprob(1e-6)
+    while np.abs(dp_ref - 0.5) > tol:
+        sig_ref = 0.5 * (lo + hi)
+        dp_ref = detprob(sig_ref)
+        if dp_ref < 0.5:
+            hi = sig_ref
+        else:
+            lo = sig_ref
+
+    # both meet the tolerance, and the root-finder's sigma lies within the final bisection bracket
+    assert np.abs(detprob(sigma) - 0.5) < tol
+    assert lo <= sigma <= hi
+    assert np.isclose(sigma, sig_ref, rtol=0.1, atol=0.0)
+    return
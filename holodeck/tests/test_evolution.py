@@ -272,6 +272,28 @@ class Test_Evolution_Advanced:
 
         return
 
+    def test_at_batched(self, evo_def):
+        evo = evo_def
+        # all frequencies times harmonics, interpolated at once
+        fobs = np.logspace(-2, 1, 5) / YR
+        harms = np.arange(1, 4)
+        targets = fobs[:, np.newaxis] / harms[np.newaxis, :]
+        data = evo.at('fobs', targets)
+        for ii, jj in np.ndindex(targets.shape):
+            single = evo.at('fobs', targets[ii, jj])
+            for par, vals in data.items():
+                assert vals.shape[:3] == (evo.size,) + targets.shape
+                assert np.allclose(vals[:, ii, jj], single[par], equal_nan=True, rtol=1e-12)
+
+        # index search matches the brute-force (N, T, M) comparison
+        sepa = np.logspace(-4, 4, 7) * PC
+        xnew = np.log10(sepa)
+        xold = np.log10(evo.sepa)[:, ::-1]
+        test = holo.evolution._first_index_at_or_above(xnew, np.ascontiguousarray(xold))
+        true = np.argmax(xnew[np.newaxis, :, np.newaxis] <= xold[:, np.newaxis, :], axis=-1)
+        assert np.array_equal(test, true)
+        return
+
     def test_at_fobs_all(self, evo_def):
         evo = evo_def
         xpar = 'fobs'
@@ -659,6 +681,48 @@ class Test_Dynamical_Friction_NFW:
 
         return
 
+    def test_host_quantities(self):
+        """Precomputed host quantities must reproduce the direct calculation exactly.
+        """
+        SIZE = 100
+        mass = (10.0 ** np.random.uniform(6, 9, (SIZE, 2))) * MSOL
+        sepa = (10.0 ** np.random.uniform(1, 3, SIZE)) * PC
+        redz = np.random.uniform(0.1, 2.0, SIZE)
+        dt = 1e5 * YR
+
+        for rbnd in [True, False]:
+            df = holo.hardening.Dynamical_Friction_NFW(rbound_from_density=rbnd)
+            direct, _ = df._dadt_dedt(mass, sepa, redz, dt, None, attenuate=True)
+            # host quantities without halo properties (halo is then calculated from `redz`)
+            host = df._host_quantities(mass)
+            assert 'rho_s' not in host
+            cached, _ = df._dadt_dedt(mass, sepa, redz, dt, None, attenuate=True, host=host)
+            assert np.all(cached == direct)
+            # host quantities including halo properties
+            host = df._host_quantities(mass, redz)
+            cached, _ = df._dadt_dedt(mass, sepa, redz, dt, None, attenuate=True, host=host)
+            assert np.allclose(cached, direct, rtol=1e-12)
+
+        return
+
+    def test_host_cache_evo(self, composite_circ):
+        evo = composite_circ
+        df = evo._hard[-1]
+        assert isinstance(df, holo.hardening.Dynamical_Friction_NFW), "BAD INSTANCE"
+        assert df._host_cache[0] is evo
+
+        # cached hardening rates should match those calculated directly (without cached host quantities)
+        for step in [1, evo.steps // 2, evo.steps - 1]:
+            dadt, _ = df.dadt_dedt(evo, step)
+            redz = np.zeros(evo.size)
+            val = (evo.scafa[:, step] > 0.0)
+            redz[val] = holo.cosmo.a_to_z(evo.scafa[val, step])
+            dt = evo.tlook[:, 0] - evo.tlook[:, step]
+            direct, _ = df._dadt_dedt(evo.mass[:, step, :], evo.sepa[:, step], redz, dt, None, df._attenuate)
+            assert np.all(dadt == direct)
+
+        return
+
 
 @pytest.fixture(scope='session')
 def composite_circ():
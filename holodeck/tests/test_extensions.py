@@ -0,0 +1,82 @@
+"""Tests for the :mod:`holodeck.extensions` submodule.
+"""
+
+import kalepy as kale
+import numpy as np
+import pytest
+
+import holodeck as holo
+from holodeck import extensions
+from holodeck.sams import cyutils as sam_cyutils
+
+NFREQS = 4
+NREALS = 200
+
+
+@pytest.fixture(scope='module')
+def sam_model():
+    sam = holo.sams.Semi_Analytic_Model(shape=10)
+    hard = holo.hardening.Hard_GW()
+    _, fobs_edges = holo.utils.pta_freqs(num=NFREQS)
+    fobs_orb_edges = fobs_edges / 2.0
+
+    # number of binaries in each bin, as calculated by `Realizer_SAM`
+    redz, diff_num = sam_cyutils.dynamic_binary_number_at_fobs(
+        kale.utils.midpoints(fobs_orb_edges), sam, hard, holo.cosmo
+    )
+    edges = [sam.mtot, sam.mrat, sam.redz, fobs_orb_edges]
+    number = sam_cyutils.integrate_differential_number_3dx1d(edges, diff_num)
+    return sam, hard, fobs_orb_edges, edges, redz, number
+
+
+def test_get_samples_from_edges(sam_model):
+    _, _, fobs_orb_edges, edges, redz, number = sam_model
+    samples = extensions.get_samples_from_edges(edges, redz, number.shape, flatten=False)
+    assert len(samples) == 4
+    assert all(ss.shape == number.shape for ss in samples)
+    mtot, mrat, rz, fobs = samples
+    assert np.all(mtot[:, 0, 0, 0] == kale.utils.midpoints(edges[0]))
+    assert np.all(mrat[0, :, 0, 0] == kale.utils.midpoints(edges[1]))
+    assert np.all(fobs[0, 0, 0, :] == 2.0 * kale.utils.midpoints(fobs_orb_edges))
+    # binaries that do not reach a frequency have redshifts of -1
+    assert np.all((rz > 0.0) | (rz == -1.0))
+
+    flat = extensions.get_samples_from_edges(edges, redz, number.shape, flatten=True)
+    assert all(np.array_equal(ff, ss.flatten()) for ff, ss in zip(flat, samples))
+
+    with pytest.raises(ValueError):
+        extensions.get_samples_from_edges(edges, redz, number.shape[:-1] + (NFREQS + 1,))
+    return
+
+
+def test_realizer_sam(sam_model):
+    sam, hard, fobs_orb_edges, edges, redz, number = sam_model
+    realizer = extensions.Realizer_SAM(fobs_orb_edges, sam=sam, hard=hard)
+    with pytest.raises(ValueError):
+        extensions.Realizer_SAM(fobs_orb_edges, sam=sam)
+
+    # realizations of every bin
+    names, samples, weights = realizer(nreals=3)
+    assert names == ['mtot', 'mrat', 'redz', 'fobs']
+    assert len(samples) == 4 and all(ss.shape == (number.size,) for ss in samples)
+    assert weights.shape == (number.size, 3)
+
+    # clean realizations only include occupied bins, and are reproducible
+    names, samples, weights = realizer(nreals=NREALS, clean=True, seed=12345)
+    assert len(samples) == len(weights) == NREALS
+    for ss, ww in zip(samples, weights):
+        assert len(ss) == 4 and all(vv.shape == ww.shape for vv in ss)
+        assert np.all(ww > 0)
+    _, test_samples, test_weights = realizer(nreals=2, clean=True, seed=12345)
+    for rr in range(2):
+        assert np.array_equal(test_weights[rr], weights[rr])
+        assert all(np.array_equal(tt, ss) for tt, ss in zip(test_samples[rr], samples[rr]))
+
+    # and reproduce the Poisson totals of the grid, at each frequency
+    fobs = 2.0 * kale.utils.midpoints(fobs_orb_edges)
+    total = np.zeros(NFREQS)
+    for ss, ww in zip(samples, weights):
+        total += np.array([np.sum(ww[ss[3] == ff]) for ff in fobs])
+    true = np.sum(number, axis=(0, 1, 2))
+    assert np.allclose(total / NREALS, true, rtol=0.0, atol=5.0 * np.sqrt(true / NREALS))
+    return
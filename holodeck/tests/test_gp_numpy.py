@@ -0,0 +1,96 @@
+"""Tests for the batched numpy GP backend in `holodeck.gps.gp_numpy`.
+"""
+
+import numpy as np
+import pytest
+
+from holodeck.gps import gp_numpy
+
+NFREQS = 3
+NPTS = 40
+PARS = ['alpha', 'beta']
+KERNEL = {'alpha': 'ExpSquaredKernel', 'beta': 'RationalQuadraticKernel'}
+
+
+@pytest.fixture(scope='module')
+def data():
+    rng = np.random.default_rng(12345)
+    xx = rng.uniform(0.0, 1.0, (NPTS, len(PARS)))
+    yy = np.sin(4.0 * xx[:, 0])[np.newaxis, :] * np.arange(1, NFREQS+1)[:, np.newaxis] + xx[:, 1]**2
+    yy += 0.02 * rng.normal(size=yy.shape)
+    yy -= np.mean(yy, axis=-1, keepdims=True)
+    yerr = 0.02 * np.ones_like(yy)
+    par_dict = {par: {'min': 0.0, 'max': 1.0} for par in PARS}
+    return xx, yy, yerr, par_dict
+
+
+def test_gradient(data):
+    gp = gp_numpy.Batched_GP(*data, kernel=KERNEL)
+    pars = np.random.default_rng(1).uniform(-1.0, 1.0, (NFREQS, gp.npars))
+    lnlike, dlnlike = gp.log_likelihood(pars, grad=True)
+    assert np.all(np.isfinite(lnlike))
+
+    eps = 1.0e-6
+    for jj in range(gp.npars):
+        dp = np.zeros_like(pars)
+        dp[:, jj] = eps
+        num = (gp.log_likelihood(pars + dp) - gp.log_likelihood(pars - dp)) / (2 * eps)
+        assert np.allclose(num, dlnlike[:, jj], rtol=1e-4, atol=1e-4), f"gradient of parameter {jj} does not match!"
+
+    return
+
+
+def test_fit_predict(data):
+    xx, yy, yerr, par_dict = data
+    gp = gp_numpy.Batched_GP(xx, yy, yerr, par_dict, kernel=KERNEL, mean_spectra=np.arange(NFREQS))
+    kmap = gp.fit(nrestarts=2, seed=0)
+    assert kmap.shape == (NFREQS, gp.npars)
+    assert np.all((gp.pmin <= kmap) & (kmap <= gp.pmax))
+
+    # predictions at the training points should reproduce the (low noise) training data
+    mean, var = gp.predict(xx)
+    assert mean.shape == var.shape == (NFREQS, NPTS)
+    assert np.allclose(mean, yy, atol=5*yerr.max())
+    assert np.all(var >= -1e-10)
+
+    # the fit is deterministic given the seed
+    gp2 = gp_numpy.Batched_GP(xx, yy, yerr, par_dict, kernel=KERNEL)
+    assert np.allclose(gp2.fit(nrestarts=2, seed=0), kmap)
+
+    hc, rho, rho_pred = gp_numpy.hc_from_gp(gp, gp, xx[0])
+    assert np.allclose(rho, np.arange(NFREQS) + mean[:, 0])
+    assert np.allclose(hc, np.sqrt(10**rho))
+    hc = gp_numpy.sample_hc_from_gp(gp, xx[0], nsamples=7, seed=1)
+    assert hc.shape == (7, NFREQS)
+    return
+
+
+def test_bad_kernel(data):
+    with pytest.raises(ValueError):
+        gp_numpy.Batched_GP(*data, kernel='Matern32Kernel')
+    return
+
+
+def test_matches_george(data):
+    pytest.importorskip("george")
+    from holodeck.gps import gp_utils
+
+    xx, yy, yerr, par_dict = data
+    gp = gp_numpy.Batched_GP(xx, yy, yerr, par_dict, kernel=KERNEL, mean_spectra=np.zeros(NFREQS))
+    gp.fit(nrestarts=1, seed=0)
+
+    gp_george = gp.to_gauss_procs()
+    gp_list = gp_utils.set_up_predictions(None, gp_george)
+    xnew = np.random.default_rng(2).uniform(0.0, 1.0, (5, len(PARS)))
+    mean, var = gp.predict(xnew)
+    lnlike = gp.log_likelihood()
+    for ii in range(NFREQS):
+        assert np.isclose(gp_george[ii].lnlike(gp.kernel_map[ii]), lnlike[ii])
+        mean_george, cov_george = gp_list[ii].predict(gp_george[ii].y, xnew)
+        assert np.allclose(mean_george, mean[ii])
+        assert np.allclose(np.diag(cov_george), var[ii])
+
+    # round trip
+    gp2 = gp_numpy.Batched_GP.from_gauss_procs(gp_george)
+    assert np.allclose(gp2.predict(xnew)[0], mean)
+    return
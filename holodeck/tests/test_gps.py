@@ -0,0 +1,98 @@
+"""Tests for GP training in `holodeck.gps.gp_utils`.
+"""
+
+import copy
+
+import numpy as np
+import pytest
+
+pytest.importorskip("george")
+pytest.importorskip("emcee")
+pytest.importorskip("schwimmbad")
+
+from holodeck.gps import gp_utils    # noqa
+
+NFREQS = 3
+NWALKERS = 8
+NSAMPLES = 20
+BURN_FRAC = 0.25
+SEED = 1234
+
+
+def _gps(kernel="ExpSquaredKernel"):
+    np.random.seed(12345)
+    pars = ['alpha', 'beta']
+    xobs = np.random.uniform(0.0, 1.0, (12, len(pars)))
+    yobs = np.sin(3.0 * xobs[:, :1]) + np.cos(2.0 * xobs[:, 1:]) * np.arange(1, NFREQS+1)[np.newaxis, :]
+    yerr = 0.1 * np.ones_like(yobs)
+    kernel = {par: kernel for par in pars}
+    gps, nkpars = gp_utils.create_gp_kernels(np.arange(NFREQS), pars, xobs, yerr, yobs, False, kernel)
+    return gps, nkpars
+
+
+def _fit(seed=SEED, kernel="ExpSquaredKernel", **kwargs):
+    gps, nkpars = _gps(kernel=kernel)
+    gp_utils.fit_kernel_params(
+        np.arange(NFREQS), np.zeros(NFREQS), gps, nkpars, NWALKERS, NSAMPLES, BURN_FRAC, False, seed=seed, **kwargs
+    )
+    return gps
+
+
+def test_parallel_freqs_match_serial():
+    serial = _fit()
+    parallel = _fit(parallel_freqs=True, processes=2)
+    for ss, pp in zip(serial, parallel):
+        assert ss.emcee_flatchain.shape == (NWALKERS * NSAMPLES, len(ss.pmax))
+        assert np.allclose(ss.emcee_flatchain, pp.emcee_flatchain)
+        assert np.allclose(ss.emcee_kernel_map, pp.emcee_kernel_map)
+    return
+
+
+def test_checkpoint_resume(tmp_path):
+    full = _fit(checkpoint_dir=tmp_path)
+    fnames = [gp_utils._get_checkpoint_fname(tmp_path, ii) for ii in range(NFREQS)]
+    assert all([fn.exists() for fn in fnames])
+
+    # remove one checkpoint to emulate an interrupted training, and resume with a different seed:
+    # the remaining frequencies must be loaded (unchanged), and the missing one re-fit
+    fnames[1].unlink()
+    resumed = _fit(checkpoint_dir=tmp_path, parallel_freqs=True, processes=2, seed=None)
+    assert fnames[1].exists()
+    assert np.allclose(full[0].emcee_flatchain, resumed[0].emcee_flatchain)
+    assert np.allclose(full[2].emcee_flatchain, resumed[2].emcee_flatchain)
+    assert not np.allclose(full[1].emcee_flatchain, resumed[1].emcee_flatchain)
+    return
+
+
+def test_checkpoint_mismatch(tmp_path):
+    _fit(checkpoint_dir=tmp_path)
+    gps, nkpars = _gps()
+    with pytest.raises(ValueError):
+        gp_utils.fit_kernel_params(
+            np.arange(NFREQS), np.zeros(NFREQS), gps, nkpars, NWALKERS, 2*NSAMPLES, BURN_FRAC, False,
+            checkpoint_dir=tmp_path,
+        )
+    return
+
+
+def test_checkpoint_kernel_mismatch(tmp_path):
+    _fit(checkpoint_dir=tmp_path)
+    # a different kernel changes the number of kernel parameters, so existing chains must not be reused
+    with pytest.raises(ValueError):
+        _fit(checkpoint_dir=tmp_path, kernel="RationalQuadraticKernel")
+    return
+
+
+def test_parallel_freqs_unseeded():
+    # without a seed, forked workers must still start each frequency from different walkers: use identical GPs at
+    # every frequency, so that any difference between the chains comes only from the random streams
+    gps, nkpars = _gps()
+    gps = [copy.deepcopy(gps[0]) for _ in range(NFREQS)]
+    gp_utils.fit_kernel_params(
+        np.arange(NFREQS), np.zeros(NFREQS), gps, nkpars, NWALKERS, NSAMPLES, BURN_FRAC, False,
+        parallel_freqs=True, processes=2, seed=None,
+    )
+    for ii in range(NFREQS):
+        for jj in range(ii):
+            assert not np.allclose(gps[ii].emcee_flatchain, gps[jj].emcee_flatchain)
+    return
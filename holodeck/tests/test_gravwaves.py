@@ -0,0 +1,219 @@
+"""Tests for the :mod:`holodeck.gravwaves` submodule.
+"""
+
+import tracemalloc
+
+import numpy as np
+import pytest
+import scipy as sp
+import scipy.stats  # noqa
+
+import holodeck as holo
+from holodeck import gravwaves
+from holodeck.constants import GYR, YR
+
+TIME = 2.0 * GYR
+FOBS = np.arange(1, 6) / (15.0 * YR)
+NHARMS = 10
+NREALS = 20
+
+
+@pytest.fixture(scope='module')
+def evo_eccen():
+    ecc = holo.population.PM_Eccentricity()
+    pop = holo.population.Pop_Illustris(mods=ecc)
+    fixed = holo.hardening.Fixed_Time_2PL.from_pop(pop, TIME)
+    evo = holo.evolution.Evolution(pop, fixed, nsteps=30)
+    evo.evolve()
+    return evo
+
+
+@pytest.mark.parametrize('chunk', [None, 2])
+def test_emit_matches_per_frequency(evo_eccen, chunk):
+    """The vectorized emission must reproduce the per-frequency calculation.
+    """
+    gws = gravwaves.GW_Discrete(evo_eccen, FOBS, nharms=NHARMS, nreals=NREALS)
+    gws.emit(progress=False, chunk=chunk)
+
+    nfreqs = FOBS.size
+    assert gws.both.shape == gws.fore.shape == gws.back.shape == (nfreqs, NREALS)
+    assert gws.loudest.shape == (nfreqs, 5, NREALS)
+    assert gws.harms.shape == (nfreqs, NHARMS)
+    assert np.all(np.diff(gws.loudest, axis=1) <= 0.0)
+    assert np.allclose(gws.fore**2, gws.loudest[:, 0], rtol=1e-12, atol=0.0)
+    assert np.all(gws.fore <= gws.both)
+
+    lnf = np.log(FOBS)
+    for ii, fogw in enumerate(FOBS):
+        dlnf = (lnf[1] - lnf[0]) if (ii == 0) else (lnf[ii] - lnf[ii-1])
+        both, fore, back, loud, harms = gravwaves._gws_harmonics_at_evo_fobs(
+            fogw, dlnf, evo_eccen, range(1, NHARMS+1), NREALS, gws._box_vol_cgs
+        )
+        # expectation values are deterministic
+        assert np.allclose(gws.harms[ii], harms, rtol=1e-6, atol=0.0)
+        # realizations are statistically consistent
+        assert np.isclose(np.mean(gws.both[ii]**2), np.sum(harms), rtol=0.2, atol=0.0)
+
+    return
+
+
+def test_realize_discrete_gws():
+    """Check the mean and variance of realizations in the sparse, dense, and aggregate regimes.
+    """
+    np.random.seed(12345)
+    nreals = 20000
+    dlnf = 0.5
+    for num in [0.01, 0.3, 20.0, 1e5]:
+        hs2 = np.array([1.0, 2.0, 0.0, 3.0])
+        num_exp = np.array([num, num, num, 0.0])
+        both, fore, loud = gravwaves._realize_discrete_gws(hs2, num_exp, dlnf, nreals, 3)
+        assert both.shape == fore.shape == (nreals,)
+        assert loud.shape == (3, nreals)
+        # only the first two binaries (hs2 = 1, 2) can ever contribute
+        assert np.all(loud[2] == 0.0)
+        assert np.all(np.isin(fore, [0.0, 1.0, 2.0]))
+        assert np.all(np.isin(loud[1], [0.0, 1.0]))
+
+        mean = 3.0 * num / dlnf
+        stdev = np.sqrt(5.0 * num) / dlnf
+        assert np.isclose(np.mean(both), mean, rtol=5*stdev/mean/np.sqrt(nreals))
+        assert np.isclose(np.std(both), stdev, rtol=0.05)
+        # probability that the loudest binary occurs
+        prob = 1.0 - np.exp(-num)
+        assert np.isclose(np.mean(fore == 2.0), prob, atol=5*np.sqrt(prob*(1-prob)/nreals) + 1e-12)
+
+    return
+
+
+def test_poisson_as_needed_nreals():
+    np.random.seed(12345)
+    vals = np.array([[0.0, 1.0], [10.0, 1e12]])
+    test = gravwaves.poisson_as_needed(vals, nreals=5000)
+    assert test.shape == (2, 2, 5000)
+    assert np.all(test[0, 0] == 0.0)
+    assert np.allclose(np.mean(test, axis=-1), vals, rtol=0.05)
+    return
+
+
+@pytest.fixture(scope='module')
+def number_grid():
+    np.random.seed(12345)
+    edges = [
+        np.logspace(8, 11, 7) * holo.constants.MSOL,
+        np.linspace(0.1, 1.0, 5),
+        np.linspace(0.1, 2.0, 6),
+        np.arange(1, 7) / (2.0 * 15.0 * YR),
+    ]
+    shape = [ee.size - 1 for ee in edges]
+    number = 10.0 ** np.random.uniform(-3, 1, shape)
+    return edges, number
+
+
+@pytest.mark.parametrize('mem_budget', [None, 1.0])
+def test_gws_from_number_grid_streamed(number_grid, mem_budget):
+    edges, number = number_grid
+    nreals = 2000
+    np.random.seed(12345)
+    data = gravwaves._gws_from_number_grid_streamed(
+        edges, number, nreals, loudest=3, quantiles=[0.25, 0.5, 0.75], mem_budget=mem_budget
+    )
+    nfreqs = number.shape[-1]
+    assert data['hc'].shape == data['hc_bg'].shape == (nfreqs, nreals)
+    assert data['hc_ss'].shape == (nfreqs, nreals, 3)
+    assert data['quantiles'].shape == (nfreqs, 3)
+    assert np.all(np.diff(data['hc_ss'], axis=-1) <= 0.0)
+    assert np.allclose(data['hc_bg']**2 + np.sum(data['hc_ss']**2, axis=-1), data['hc']**2, rtol=1e-10, atol=0.0)
+
+    # the mean of realizations matches the expectation value
+    hc2 = gravwaves.char_strain_sq_from_bin_edges(edges)
+    mean = np.sum(hc2 * number, axis=(0, 1, 2))
+    stdev = np.sqrt(np.sum(hc2**2 * number, axis=(0, 1, 2)))
+    assert np.allclose(np.mean(data['hc']**2, axis=-1), mean, atol=5*stdev/np.sqrt(nreals))
+    return
+
+
+def test_gws_from_number_grid_streamed_mem_budget(number_grid):
+    # the memory used by the blocks of realizations, beyond that of a single realization and the (F, R) and
+    # (F, R, L) output arrays, stays within budget
+    edges, number = number_grid
+    mem_budget = 2**22
+    nreals = 400
+    loudest = 3
+    output = number.shape[-1] * nreals * (1 + loudest) * np.dtype(float).itemsize
+
+    def peak(nreals):
+        tracemalloc.start()
+        gravwaves._gws_from_number_grid_streamed(edges, number, nreals, loudest=loudest, mem_budget=mem_budget)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return peak
+
+    base = peak(1)
+    assert peak(nreals) - base <= mem_budget + output
+    return
+
+
+def test_gws_from_number_grid_integrated_realize(number_grid):
+    # summed, multi-realization GWBs match the streamed implementation in distribution
+    edges, number = number_grid
+    nreals = 2000
+    test = gravwaves._gws_from_number_grid_integrated(edges, number, nreals)
+    np.random.seed(12345)
+    true = gravwaves._gws_from_number_grid_streamed(edges, number, nreals)['hc']
+    assert test.shape == (number.shape[-1], nreals)
+    assert np.allclose(np.mean(test**2, axis=-1), np.mean(true**2, axis=-1), rtol=0.05, atol=0.0)
+    assert np.allclose(np.median(test, axis=-1), np.median(true, axis=-1), rtol=0.05, atol=0.0)
+    return
+
+
+def test_gwb_poisson_stats(number_grid):
+    edges, number = number_grid
+    nreals = 20000
+    quantiles = [0.05, 0.25, 0.5, 0.75, 0.95]
+    test = gravwaves.gwb_poisson_stats(edges, number, quantiles=quantiles)
+
+    # mean and variance are exact
+    hc2 = gravwaves.char_strain_sq_from_bin_edges(edges)
+    assert np.allclose(test['mean'], np.sum(hc2 * number, axis=(0, 1, 2)), rtol=1e-12, atol=0.0)
+    assert np.allclose(test['var'], np.sum(hc2**2 * number, axis=(0, 1, 2)), rtol=1e-12, atol=0.0)
+    assert np.allclose(test['mean'], gravwaves._gws_from_number_grid_integrated(edges, number, False)**2, rtol=1e-12, atol=0.0)
+
+    # and match realizations, as do the quantiles
+    np.random.seed(12345)
+    hc = gravwaves._gws_from_number_grid_streamed(edges, number, nreals)['hc']
+    assert np.allclose(np.mean(hc**2, axis=-1), test['mean'], rtol=0.02, atol=0.0)
+    assert np.allclose(np.var(hc**2, axis=-1), test['var'], rtol=0.1, atol=0.0)
+    assert test['quantiles'].shape == (number.shape[-1], len(quantiles))
+    assert np.allclose(test['quantiles'], np.quantile(hc, quantiles, axis=-1).T, rtol=0.02, atol=0.0)
+    return
+
+
+def test_gwb_poisson_stats_quantiles():
+    quantiles = np.array([0.001, 0.1, 0.5, 0.9, 0.999])
+    # a single (Poisson) component, with a discrete distribution
+    for lam in [3.0, 100.0, 1e6]:
+        true = sp.stats.poisson.ppf(quantiles, lam)
+        test = gravwaves._compound_poisson_quantiles(np.array([lam]), np.array([1.0]), quantiles, 2**16, 0.0)
+        assert np.all(np.abs(test - true) <= 1.0 + 1e-3 * true)
+
+    # no binaries at all, or only a negligible number
+    assert np.all(gravwaves._compound_poisson_quantiles(np.zeros(0), np.zeros(0), quantiles, 2**16, 0.0) == 0.0)
+    test = gravwaves._compound_poisson_quantiles(np.array([1e-3]), np.array([1.0]), quantiles[:-1], 2**16, 0.0)
+    assert np.all(test == 0.0)
+    return
+
+
+def test_loudest_from_counts():
+    np.random.seed(12345)
+    nbins, nfreqs, nreals, loudest = 30, 4, 6, 5
+    hc2 = np.random.uniform(0.0, 1.0, (nbins, nfreqs))
+    counts = np.random.poisson(0.2, (nbins, nfreqs, nreals)).astype(float)
+    test = gravwaves._loudest_from_counts(hc2, counts, loudest)
+    assert test.shape == (nfreqs, nreals, loudest)
+    for ff in range(nfreqs):
+        for rr in range(nreals):
+            true = np.sort(np.repeat(hc2[:, ff], counts[:, ff, rr].astype(int)))[::-1][:loudest]
+            true = np.concatenate([true, np.zeros(loudest - true.size)])
+            assert np.allclose(test[ff, rr], true)
+
+    return
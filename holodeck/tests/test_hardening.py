@@ -0,0 +1,95 @@
+"""Tests for the `holodeck.hardening` submodule.
+"""
+
+import logging
+import os
+
+import numpy as np
+import pytest
+
+import holodeck as holo
+from holodeck.constants import GYR, MSOL, PC
+
+NBINS = 200
+RCHAR = 100.0 * PC
+
+
+def _binaries(seed=12345):
+    rng = np.random.default_rng(seed)
+    mtot = 10.0 ** rng.uniform(6, 10, NBINS) * MSOL
+    mrat = 10.0 ** rng.uniform(-3, 0, NBINS)
+    time = 10.0 ** rng.uniform(-2, 1, NBINS) * GYR
+    sepa = 10.0 ** rng.uniform(3.2, 4.8, NBINS) * PC
+    return time, mtot, mrat, sepa
+
+
+@pytest.fixture
+def coarse_tables(monkeypatch):
+    """Use small normalization tables, and an empty in-memory table cache."""
+    monkeypatch.setattr(holo.hardening.Fixed_Time_2PL, '_NORM_TABLE_SHAPE', (7, 6, 6, 5))
+    monkeypatch.setattr(holo.hardening.Fixed_Time_2PL, '_NORM_TABLE_CHECK_NUM', 50)
+    monkeypatch.setattr(holo.hardening.Fixed_Time_2PL, '_NORM_TABLE_MAX_ERR', 0.2)
+    monkeypatch.setattr(holo.hardening.Fixed_Time_2PL, '_norm_tables', {})
+    return
+
+
+def test_get_norm_exact():
+    time, mtot, mrat, sepa = _binaries()
+    ft = holo.hardening.Fixed_Time_2PL
+    norm = ft._get_norm(time, mtot, mrat, RCHAR, -1.0, 1.5, sepa)
+    assert np.all(np.isfinite(norm) & (norm > 0.0))
+    tt = ft._time_total(norm, mtot, mrat, RCHAR, -1.0, 1.5, sepa)
+    assert np.allclose(tt, time, rtol=1e-8)
+    return
+
+
+def test_norm_table_path():
+    # tables persist in the user cache, never inside the source tree or an installed package
+    path = os.path.abspath(holo.hardening.Fixed_Time_2PL._NORM_TABLE_PATH)
+    assert path.startswith(os.path.abspath(holo._PATH_CACHE))
+    assert not path.startswith(os.path.abspath(holo._PATH_ROOT) + os.sep)
+    return
+
+
+def test_norm_table(tmp_path, coarse_tables):
+    time, mtot, mrat, sepa = _binaries()
+    # put some binaries outside of the tabulated domain
+    time[:5] = 50.0 * GYR
+    sepa[5:10] = 10.0 * PC
+
+    ft = holo.hardening.Fixed_Time_2PL
+    kw = dict(rchar=RCHAR, gamma_inner=-1.0, gamma_outer=1.5)
+    exact = ft(time, mtot, mrat, 0.0, sepa, interpolate_norm=False, **kw)
+    table = ft(time, mtot, mrat, 0.0, sepa, interpolate_norm=True, norm_table_path=str(tmp_path), **kw)
+    assert np.allclose(table._norm[:10], exact._norm[:10], rtol=1e-8)
+    assert np.allclose(table._norm, exact._norm, rtol=0.2)
+
+    # table is saved to disk, and matches after reloading in a 'new process'
+    fnames = os.listdir(tmp_path)
+    assert len(fnames) == 1
+    axes, log_norm, max_err = ft._norm_table(RCHAR, -1.0, 1.5, path=str(tmp_path))
+    ft._norm_tables.clear()
+    axes_load, log_norm_load, max_err_load = ft._norm_table(RCHAR, -1.0, 1.5, path=str(tmp_path))
+    assert np.array_equal(log_norm, log_norm_load)
+    assert 0.0 < max_err == max_err_load < ft._NORM_TABLE_MAX_ERR
+    assert all(np.array_equal(aa, bb) for aa, bb in zip(axes, axes_load))
+
+    # different parameters produce a different table, and the legacy class its own table
+    ft._norm_table(RCHAR, -1.0, 2.0, path=str(tmp_path))
+    holo.hardening.Fixed_Time._norm_table(RCHAR, -1.0, 1.5, path=str(tmp_path))
+    assert len(os.listdir(tmp_path)) == 3
+    return
+
+
+def test_norm_table_max_err(tmp_path, coarse_tables, monkeypatch, caplog):
+    # tables with interpolation errors above the tolerance are not used, normalizations are calculated exactly
+    time, mtot, mrat, sepa = _binaries()
+    ft = holo.hardening.Fixed_Time_2PL
+    kw = dict(rchar=RCHAR, gamma_inner=-1.0, gamma_outer=1.5)
+    exact = ft(time, mtot, mrat, 0.0, sepa, interpolate_norm=False, **kw)
+    monkeypatch.setattr(ft, '_NORM_TABLE_MAX_ERR', 1.0e-6)
+    with caplog.at_level(logging.WARNING, logger=holo.log.name):
+        table = ft(time, mtot, mrat, 0.0, sepa, interpolate_norm=True, norm_table_path=str(tmp_path), **kw)
+    assert "exceeds" in caplog.text
+    assert np.array_equal(table._norm, exact._norm)
+    return
@@ -0,0 +1,367 @@
+"""Tests for the :mod:`holodeck.librarian` submodule.
+"""
+
+import argparse
+import logging
+import os
+import shutil
+import threading
+import time
+
+import h5py
+import numpy as np
+import pytest
+
+from holodeck import librarian, param_spaces, utils
+from holodeck.gps import gp_utils
+
+NSAMPS = 2
+NFREQS = 4
+NREALS = 400
+NLOUDEST = 3
+
+
+def _make_library(path, stats_only, float32=False):
+    log = logging.getLogger("holodeck.tests")
+    space = param_spaces.PS_Uniform_07A(log, NSAMPS, (10, 11, 12), 12345)
+    space.save(path)
+    sims = path / 'sims'
+    sims.mkdir()
+    args = argparse.Namespace(
+        log=log, output_sims=sims, output_plots=path, recreate=True, plot=False,
+        pta_dur=librarian.DEF_PTA_DUR, nfreqs=NFREQS, nreals=NREALS, nloudest=NLOUDEST,
+        gwb_flag=True, ss_flag=True, params_flag=True, stats_only=stats_only, anis_flag=stats_only,
+        float32=float32,
+    )
+    np.random.seed(12345)
+    for pnum in range(NSAMPS):
+        assert librarian.run_sam_at_pspace_num(args, space, pnum)
+    return librarian.sam_lib_combine(path, log)
+
+
+@pytest.fixture(scope='module')
+def libraries(tmp_path_factory):
+    full = _make_library(tmp_path_factory.mktemp("full"), False)
+    stats = _make_library(tmp_path_factory.mktemp("stats"), True)
+    return full, stats
+
+
+def test_stats_only_library(libraries):
+    full, stats = libraries
+    nquants = len(librarian.STATS_QUANTILES)
+    with h5py.File(full, 'r') as h5_full, h5py.File(stats, 'r') as h5:
+        assert h5.attrs['stats_only']
+        assert h5.attrs['nreals'] == NREALS
+        assert 'gwb' not in h5
+        assert np.allclose(h5['sample_params'][()], h5_full['sample_params'][()])
+        for name in ['gwb', 'hc_ss', 'hc_bg', 'sspar', 'bgpar']:
+            shape = list(h5_full[name].shape)
+            # the realization axis is removed
+            del shape[librarian._REALIZATION_AXES[name] + 1]
+            for stat in utils.Streaming_Stats.STATS:
+                key = f"{name}_{stat}"
+                test = shape + [nquants] if stat == 'quantiles' else shape
+                assert h5[key].shape == tuple(test), f"{key} has the wrong shape!"
+
+        # statistics agree with those of the (independent, unseeded) stored realizations, within the large
+        # scatter of these small test models
+        gwb = h5_full['gwb'][()]
+        assert np.allclose(h5['gwb_mean'][()], np.mean(gwb, axis=-1), rtol=0.5, atol=0.0)
+        idx = list(h5['stats_quantiles'][()]).index(0.5)
+        assert np.allclose(h5['gwb_quantiles'][..., idx], np.median(gwb, axis=-1), rtol=0.5, atol=0.0)
+
+    return
+
+
+def test_stats_only_gp_training_data(libraries):
+    full, stats = libraries
+    gp_utils.VERBOSE = False
+    for center in ['median', 'mean']:
+        with h5py.File(full, 'r') as h5_full, h5py.File(stats, 'r') as h5:
+            assert gp_utils.get_nreals(h5) == gp_utils.get_nreals(h5_full) == NREALS
+            freqs_full, xobs_full, yerr_full, yobs_full, ymean_full = gp_utils.get_gwb(h5_full, NFREQS, center_measure=center)
+            freqs, xobs, yerr, yobs, ymean = gp_utils.get_gwb(h5, NFREQS, center_measure=center)
+            if center == 'median':
+                idx = list(h5['stats_quantiles'][()]).index(0.5)
+                true = 2.0 * np.log10(h5['gwb_quantiles'][..., idx])
+            else:
+                true = np.log10(h5['gwb_mean'][()]**2 + h5['gwb_std'][()]**2)
+            true_err = 2.0 * h5['gwb_log_std'][()]
+
+        assert np.allclose(freqs, freqs_full)
+        assert np.allclose(xobs, xobs_full)
+        assert np.allclose(yobs + ymean, true)
+        assert np.allclose(yerr, true_err)
+        # log10(hc^2) scatter is consistent with the stored realizations, as is the median; the mean is
+        # dominated by rare, loud realizations, so only require that it is above the median
+        assert np.allclose(yerr, yerr_full, rtol=1.0)
+        if center == 'median':
+            assert np.allclose(yobs + ymean, yobs_full + ymean_full, atol=0.5)
+            median = yobs + ymean
+        else:
+            assert np.all(yobs + ymean >= median - 0.1)
+
+    return
+
+
+def test_library_chunks():
+    # small datasets are a single chunk
+    assert librarian._library_chunks((4, 5, 6), 8) == (4, 5, 6)
+    # whole samples are kept together when possible
+    chunks = librarian._library_chunks((1000, 40, 100), 8, target=2**16)
+    assert chunks[1:] == (40, 100) and np.prod(chunks) * 8 <= 2**16
+    # large samples are split along the following axes
+    assert librarian._library_chunks((10, 40, 100, 10), 8, target=2**16) == (1, 8, 100, 10)
+    chunks = librarian._library_chunks((10, 40, 1000, 10), 8, target=2**16)
+    assert chunks[:2] == (1, 1) and chunks[3] == 10 and np.prod(chunks) * 8 <= 2**16
+    return
+
+
+def test_library_view(tmp_path):
+    fname = tmp_path / "test.hdf5"
+    data = np.random.normal(size=(23, 6, 5))
+    with h5py.File(fname, 'w') as h5:
+        h5.create_dataset('fobs', data=np.arange(6.0))
+        h5.create_dataset('sample_params', data=np.zeros((23, 2)))
+        h5.create_dataset('gwb', data=data, chunks=(3, 6, 5))
+
+    # use a tiny read-ahead buffer so that multiple blocks are needed
+    with librarian.Library_Reader(fname, cache=4 * 6 * 5 * 8) as lib:
+        view = lib['gwb']
+        assert view.axes == ('samples', 'freqs', 'reals')
+        assert view.shape == data.shape and len(view) == 23
+        assert view._block_size() == 3
+        assert np.array_equal(np.asarray(view), data)
+
+        keys = [
+            5, -1, (2, 3), (slice(None), 1), (Ellipsis, 2), (slice(2, 20, 3), slice(None, 4)),
+            [0, 7, 3], (np.arange(23) % 2 == 0, 0, 1),
+        ]
+        for key in keys:
+            assert np.array_equal(view[key], data[key])
+
+        # arrays index each axis independently (like `np.ix_`)
+        assert np.array_equal(view[[0, 7, 3], :, [4, 0]], data[np.ix_([0, 7, 3], range(6), [4, 0])])
+
+        # sequential access reads ahead; every entry matches
+        for nn in range(len(view)):
+            assert np.array_equal(view[nn, :, 1:], data[nn, :, 1:])
+
+        # sub-views compose, and blocks cover everything
+        sub = view.select(freqs=slice(1, 5)).select(samples=[20, 2, 9], freqs=[0, 3])
+        true = data[[20, 2, 9]][:, [1, 4]]
+        assert sub.shape == true.shape
+        assert np.array_equal(sub[()], true)
+        # smaller entries give larger blocks: 10 entries fit in the buffer, i.e. 3 chunks
+        blocks = [vals for _, vals in view.select(reals=slice(None, 2)).iter_blocks()]
+        assert [len(bb) for bb in blocks] == [9, 9, 5]
+        assert np.array_equal(np.concatenate(blocks), data[:, :, :2])
+
+        with pytest.raises(ValueError):
+            view.select(loudest=slice(None))
+        with pytest.raises(ValueError):
+            view.select(freqs=2)
+        with pytest.raises(IndexError):
+            view[23]
+        with pytest.raises(IndexError):
+            view[0, 0, 0, 0]
+
+    return
+
+
+def test_library_reader(libraries):
+    for fname in libraries:
+        with h5py.File(fname, 'r') as h5, librarian.Library_Reader(fname) as lib:
+            assert lib.nsamps == NSAMPS and lib.nfreqs == NFREQS and lib.nreals == NREALS
+            assert lib.stats_only == bool(h5.attrs.get('stats_only', False))
+            assert np.array_equal(lib.fobs, h5['fobs'][()])
+            assert np.array_equal(lib.sample_params, h5['sample_params'][()])
+            for key in h5.keys():
+                if not isinstance(h5[key], h5py.Dataset):
+                    continue
+                view = lib[key]
+                assert 'axis0' not in view.axes, f"unknown axes for '{key}'"
+                # combined libraries are chunked
+                if key not in ['fobs', 'sample_params', 'sample_done', 'sample_failed', 'stats_quantiles']:
+                    assert view.chunks is not None
+                assert np.array_equal(view[()], h5[key][()], equal_nan=True)
+
+            # GP training data are the same from the lazy reader
+            for aa, bb in zip(gp_utils.get_gwb(lib, NFREQS - 1), gp_utils.get_gwb(h5, NFREQS - 1)):
+                assert np.allclose(aa, bb)
+
+    return
+
+
+def test_combine_append(libraries, tmp_path):
+    log = logging.getLogger("holodeck.tests")
+    for fname in libraries:
+        # copy the simulations of an existing library, without its combined file
+        path = tmp_path / fname.parent.name
+        shutil.copytree(fname.parent, path, ignore=shutil.ignore_patterns(fname.name))
+        sim = librarian._get_sim_fname(path / 'sims', 1)
+        sim.rename(sim.with_suffix('.tmp'))
+
+        # missing simulations are only allowed when appending
+        with pytest.raises(ValueError):
+            librarian.sam_lib_combine(path, log)
+        lib_path = librarian.sam_lib_combine(path, log, append=True, nworkers=3)
+        with h5py.File(lib_path, 'r') as h5:
+            assert np.array_equal(h5['sample_done'][()], [True, False])
+            assert np.all(np.isnan(h5['sample_params'][1]))
+            key = 'gwb_mean' if h5.attrs.get('stats_only', False) else 'gwb'
+            assert np.all(np.isnan(h5[key][1])) and np.all(np.isfinite(h5[key][0]))
+
+        # the new simulation is added, matching a library combined at once
+        sim.with_suffix('.tmp').rename(sim)
+        assert librarian.sam_lib_combine(path, log, append=True, nworkers=1) == lib_path
+        with h5py.File(lib_path, 'r') as h5, h5py.File(fname, 'r') as true:
+            assert np.all(h5['sample_done'][()])
+            assert sorted(h5.keys()) == sorted(true.keys())
+            for key in true.keys():
+                if isinstance(true[key], h5py.Dataset):
+                    assert np.array_equal(h5[key][()], true[key][()], equal_nan=True), key
+
+    return
+
+
+def test_combine_failures(libraries, tmp_path):
+    log = logging.getLogger("holodeck.tests")
+    full, _ = libraries
+    path = tmp_path / full.parent.name
+    shutil.copytree(full.parent, path, ignore=shutil.ignore_patterns(full.name))
+    sims = [librarian._get_sim_fname(path / 'sims', pnum) for pnum in range(NSAMPS)]
+
+    # a failure file before any successful one is skipped when loading shapes, and stored as NaN
+    shutil.copy(sims[0], sims[0].with_suffix('.tmp'))
+    np.savez(sims[0], fail="error")
+    lib_path = librarian.sam_lib_combine(path, log)
+    with h5py.File(lib_path, 'r') as h5:
+        assert np.all(np.isnan(h5['gwb'][0])) and np.all(np.isfinite(h5['gwb'][1]))
+        assert np.array_equal(h5['sample_done'][()], [False, True])
+        assert np.array_equal(h5['sample_failed'][()], [True, False])
+
+    # failures are retried when appending, e.g. once the simulation has been re-run
+    librarian.sam_lib_combine(path, log, append=True)
+    with h5py.File(lib_path, 'r') as h5:
+        assert np.array_equal(h5['sample_failed'][()], [True, False])
+    sims[0].with_suffix('.tmp').rename(sims[0])
+    librarian.sam_lib_combine(path, log, append=True)
+    with h5py.File(lib_path, 'r') as h5, h5py.File(full, 'r') as true:
+        assert np.all(h5['sample_done'][()]) and not np.any(h5['sample_failed'][()])
+        assert np.array_equal(h5['gwb'][()], true['gwb'][()])
+    lib_path.unlink()
+
+    np.savez(sims[0], fail="error")
+
+    # without any successful simulations there is nothing to combine, and no library is written
+    np.savez(sims[1], fail="error")
+    with pytest.raises(ValueError, match="No successful simulations"):
+        librarian.sam_lib_combine(path, log)
+    for sim in sims:
+        sim.unlink()
+    with pytest.raises(ValueError, match="No successful simulations"):
+        librarian.sam_lib_combine(path, log, append=True)
+    assert not lib_path.exists()
+    return
+
+
+def test_analytic_anisotropy_library(libraries):
+    anisotropy = pytest.importorskip("holodeck.anisotropy")
+    full, stats = libraries
+    with pytest.raises(KeyError):
+        anisotropy.lib_Cl_analytic(full)
+
+    fobs, C0, Cl = anisotropy.lib_Cl_analytic(stats)
+    assert C0.shape == Cl.shape == (NSAMPS, NFREQS)
+    assert np.all(np.isfinite(C0)) and np.all(Cl > 0.0)
+    assert np.all(Cl <= C0)
+    return
+
+
+def test_float32_library(libraries, tmp_path):
+    full, _ = libraries
+    lib = _make_library(tmp_path, False, float32=True)
+    with h5py.File(full, 'r') as h5_64, h5py.File(lib, 'r') as h5_32:
+        assert h5_32['sample_params'].dtype == np.float64
+        assert np.array_equal(h5_32['sample_params'][()], h5_64['sample_params'][()])
+        for key in ['hc_ss', 'hc_bg', 'gwb', 'sspar', 'bgpar']:
+            # binary parameters (masses in grams) are always double precision
+            dtype = np.float64 if key in ['sspar', 'bgpar'] else np.float32
+            assert h5_32[key].dtype == dtype, f"'{key}' has dtype {h5_32[key].dtype}!"
+            assert h5_32[key].shape == h5_64[key].shape
+            assert np.all(np.isfinite(h5_32[key][()]))
+    return
+
+
+def _draw_on_each_worker(params):
+    # the start-up barrier holds each task until the other worker has also taken one
+    librarian._MODEL_SERVICE_STATE['started'].wait()
+    return os.getpid(), np.random.normal(size=4), librarian._model_service_eval(params)
+
+
+def test_model_service(tmp_path):
+    log = logging.getLogger("holodeck.tests")
+    space = param_spaces.PS_Uniform_07A(log, NSAMPS, (10, 11, 12), 12345)
+    kw = dict(nreals=5, nfreqs=NFREQS, details_flag=True, singles_flag=True, nloudest=NLOUDEST)
+    true = []
+    for pnum in range(NSAMPS):
+        sam, hard = space.model_for_params(space.param_dict(pnum), sam_shape=space.sam_shape)
+        true.append(librarian.run_model(sam, hard, **kw))
+
+    # evaluated in this process
+    with librarian.Model_Service(space, nworkers=0, warmup=False, **kw) as service:
+        results = service.evaluate(space.param_samples)
+        single = service.evaluate(space.param_dict(1))
+        with pytest.raises(ValueError):
+            service.evaluate(np.zeros((1, space.npars + 1)))
+
+    assert len(results) == NSAMPS
+    assert np.array_equal(single['number'], true[1]['number'])
+    for test, tt in zip(results, true):
+        assert np.array_equal(test['number'], tt['number'])
+        assert test['gwb'].shape == tt['gwb'].shape == (NFREQS, 5)
+        assert test['hc_ss'].shape == tt['hc_ss'].shape == (NFREQS, 5, NLOUDEST)
+
+    # all workers are started (and initialized) with the service, and share the evaluations
+    with librarian.Model_Service(space, nworkers=2, warmup=False, **kw) as service:
+        assert len(service._worker_pids) == 2
+        results = service.evaluate(space.param_samples)
+    for test, tt in zip(results, true):
+        assert np.array_equal(test['number'], tt['number'])
+
+    # each worker has its own random state, so workers draw different realizations
+    with librarian.Model_Service(space, nworkers=2, warmup=False, seed=12345, **kw) as service:
+        draws = list(service._pool.map(_draw_on_each_worker, [space.param_dict(0)] * 2))
+    assert draws[0][0] != draws[1][0]
+    assert not np.array_equal(draws[0][1], draws[1][1])
+    assert not np.array_equal(draws[0][2]['gwb'], draws[1][2]['gwb'])
+    assert np.array_equal(draws[0][2]['number'], draws[1][2]['number'])
+
+    # evaluated by a warm worker process, through a local socket
+    address = str(tmp_path / 'service.sock')
+    service = librarian.Model_Service(space, nworkers=1, **kw)
+    server = threading.Thread(target=service.serve, args=(address,))
+    server.start()
+    try:
+        for _ in range(100):
+            try:
+                client = librarian.Model_Service_Client(address)
+                break
+            except (FileNotFoundError, ConnectionRefusedError):
+                time.sleep(0.1)
+
+        with client:
+            assert client.param_names() == space.param_names
+            results = client.evaluate([space.param_dict(pnum) for pnum in range(NSAMPS)])
+            with pytest.raises(RuntimeError):
+                client.evaluate({'not_a_parameter': 1.0})
+            client.shutdown()
+    finally:
+        server.join(timeout=60)
+        service.close()
+
+    assert not server.is_alive()
+    for test, tt in zip(results, true):
+        assert np.array_equal(test['number'], tt['number'])
+    return
@@ -49,6 +49,37 @@ def test_pop_illustris_basic():
     return
 
 
+def test_pop_illustris_selection():
+    """`Pop_Illustris` selections match the full population, and galaxy properties are loaded lazily.
+    """
+    full = holo.population.Pop_Illustris()
+    mtot_full = np.sum(full.mass, axis=-1)
+    bounds = dict(mtot=(1e8*MSOL, 1e10*MSOL), redz=(None, 2.0))
+    sel = (bounds['mtot'][0] <= mtot_full) & (mtot_full <= bounds['mtot'][1]) & (full.redz <= bounds['redz'][1])
+    assert 0 < np.count_nonzero(sel) < full.size
+
+    pop = holo.population.Pop_Illustris(**bounds)
+    assert pop.size == np.count_nonzero(sel)
+    assert pop._mbulge is None and pop._vdisp is None
+    for key in ['mass', 'sepa', 'scafa', 'mbulge', 'vdisp']:
+        assert np.all(getattr(pop, key) == getattr(full, key)[sel]), f"selected `{key}` does not match!"
+    assert pop._sample_volume == full._sample_volume
+
+    # an empty selection is still a valid population
+    empty = holo.population.Pop_Illustris(mtot=(1e20*MSOL, None))
+    assert empty.size == 0
+    assert np.shape(empty.mbulge) == (0, 2)
+
+    with pytest.raises(ValueError):
+        holo.population.Pop_Illustris(redz=1.0)
+
+    # galaxy properties that are not resampled are no longer available
+    pop = holo.population.Pop_Illustris(mods=holo.population.PM_Resample(2.0, additional_keys=False))
+    assert pop.size == 2 * full.size
+    assert pop.mbulge is None and pop.vdisp is None
+    return
+
+
 def test_valid_population_subclass():
     """Ensure that subclasses of `_Population_Discrete` succeed and fail in the correct places.
 
@@ -269,6 +300,26 @@ def test_resample_basic():
     return
 
 
+def test_resample_seed():
+    pop = holo.population.Pop_Illustris()
+    old_size = pop.size
+    mbulge = pop.mbulge
+    pops = []
+    for seed in [1, 1, 2]:
+        pop = holo.population.Pop_Illustris(mods=holo.population.PM_Resample(3, seed=seed))
+        assert pop.size == 3 * old_size
+        assert pop.mbulge.shape == (pop.size, 2)
+        assert np.all(pop.mbulge > 0.0)
+        pops.append(pop)
+
+    assert np.array_equal(pops[0].mass, pops[1].mass)
+    assert np.array_equal(pops[0].mbulge, pops[1].mbulge)
+    assert not np.array_equal(pops[0].mass, pops[2].mass)
+    # bulge masses are resampled as bulge masses (not velocity dispersions)
+    assert np.isclose(np.median(np.log10(pops[0].mbulge)), np.median(np.log10(mbulge)), atol=0.1)
+    return
+
+
 # ====    PM_Mass_Reset    ====
 
 def test_mass_reset():
@@ -17,6 +17,155 @@ def test_minmax():
     return
 
 
+def test_resample_kde():
+    kale = pytest.importorskip("kalepy")
+    rng = np.random.default_rng(12345)
+    num = 5000
+    data = np.array([rng.normal(8.0, 1.0, num), -np.fabs(rng.normal(0.0, 0.5, num)), rng.normal(0.0, 0.3, num)])
+    data[2] += 0.3 * data[0]
+    reflect = [None, [None, 0.0], None]
+    size = 100_000
+
+    samps = utils.resample_kde(data, size, reflect=reflect, bw_rescale=0.25, seed=5, chunk_size=2**14)
+    assert samps.shape == (3, size)
+    assert np.all(samps[1] < 0.0)
+
+    # output depends only on the seed (and chunk size), not on the number of threads
+    serial = utils.resample_kde(data, size, reflect=reflect, bw_rescale=0.25, seed=5, chunk_size=2**14, nthreads=1)
+    assert np.array_equal(samps, serial)
+    other = utils.resample_kde(data, size, reflect=reflect, bw_rescale=0.25, seed=6, chunk_size=2**14)
+    assert not np.array_equal(samps, other)
+
+    # distribution matches `kalepy` resampling
+    np.random.seed(5)
+    true = kale.KDE(data, reflect=reflect, bw_rescale=0.25).resample(size)
+    assert np.allclose(np.mean(samps, axis=1), np.mean(true, axis=1), atol=0.02)
+    assert np.allclose(np.cov(samps), np.cov(true), atol=0.02)
+    for ii in range(3):
+        assert np.allclose(np.percentile(samps[ii], [5, 50, 95]), np.percentile(true[ii], [5, 50, 95]), atol=0.03)
+
+    with pytest.raises(ValueError):
+        utils.resample_kde(data, size, reflect=reflect[:2])
+    return
+
+
+class Test_Stage_Profiler:
+
+    def test_records(self):
+        prof = utils.Stage_Profiler(enabled=True)
+        for ii in range(3):
+            with prof('alpha'):
+                np.sort(np.random.uniform(size=100_000))
+        with prof('beta'):
+            pass
+
+        recs = prof.records
+        assert list(recs.keys()) == ['alpha', 'beta']
+        assert recs['alpha']['calls'] == 3
+        assert recs['beta']['calls'] == 1
+        assert recs['alpha']['wall'] > recs['beta']['wall'] >= 0.0
+        for rec in recs.values():
+            assert rec['cpu'] >= 0.0
+            assert rec['rss'] > 0.0
+            assert rec['rss_peak'] >= rec['rss']
+            assert rec['rss_peak_delta'] >= 0.0
+
+        arr = prof.to_array()
+        assert arr.shape == (2,)
+        assert list(arr['stage']) == ['alpha', 'beta']
+        assert np.all(arr['calls'] == [3, 1])
+        for field in utils.Stage_Profiler.FIELDS:
+            assert np.allclose(arr[field], [recs[kk][field] for kk in ['alpha', 'beta']])
+
+        summary = prof.summary()
+        assert ('alpha' in summary) and ('beta' in summary)
+        return
+
+    def test_stage_exception(self):
+        prof = utils.Stage_Profiler(enabled=True)
+        with pytest.raises(RuntimeError):
+            with prof('fails'):
+                raise RuntimeError("failure within stage")
+        assert prof.records['fails']['calls'] == 1
+        return
+
+    def test_disabled(self):
+        prof = utils.Stage_Profiler(enabled=False)
+        with prof('alpha'):
+            pass
+        assert prof.records == {}
+        assert prof.to_array().size == 0
+        return
+
+
+class Test_Streaming_Stats:
+
+    def _values(self, size=1000):
+        rng = np.random.default_rng(12345)
+        vals = rng.lognormal(-45.0, 1.5, (4, 3, size))
+        vals[0, 0, :size//10] = 0.0
+        vals[1, 1, 0] = np.nan
+        return vals
+
+    def _update(self, stats, vals, block=97):
+        for lo in range(0, vals.shape[-1], block):
+            stats.update(vals[..., lo:lo+block], axis=-1)
+        return stats
+
+    def test_moments(self):
+        vals = self._values()
+        floor = 1e-22
+        stats = self._update(utils.Streaming_Stats(log_floor=floor), vals)
+        res = stats.results()
+        assert np.all(stats.count == np.count_nonzero(np.isfinite(vals), axis=-1))
+        assert np.allclose(res['mean'], np.nanmean(vals, axis=-1), rtol=1e-10, atol=0.0)
+        assert np.allclose(res['std'], np.nanstd(vals, axis=-1), rtol=1e-10, atol=0.0)
+        logs = np.log10(np.maximum(vals, floor))
+        assert np.allclose(res['log_mean'], np.nanmean(logs, axis=-1), rtol=1e-10)
+        assert np.allclose(res['log_std'], np.nanstd(logs, axis=-1), rtol=1e-10)
+        return
+
+    def test_quantiles(self):
+        vals = self._values()
+        rel_err = 1e-2
+        stats = self._update(utils.Streaming_Stats(quantiles=[0.0, 0.05, 0.5, 0.95, 1.0], rel_err=rel_err), vals)
+        test = stats.quantile()
+        assert test.shape == (4, 3, 5)
+        true = np.moveaxis(np.nanquantile(vals, stats.quantiles, axis=-1, method='lower'), 0, -1)
+        assert np.allclose(test, true, rtol=rel_err, atol=0.0)
+        # extrema are exact, zeros are handled
+        assert np.all(test[..., 0] == np.nanmin(vals, axis=-1))
+        assert np.all(test[..., -1] == np.nanmax(vals, axis=-1))
+        assert test[0, 0, 1] == 0.0
+        return
+
+    def test_merge(self):
+        vals = self._values()
+        full = self._update(utils.Streaming_Stats(), vals).results()
+        aa = self._update(utils.Streaming_Stats(), vals[..., :300])
+        bb = self._update(utils.Streaming_Stats(), 1.0 * vals[..., 300:])
+        test = aa.merge(bb).results()
+        for key in utils.Streaming_Stats.STATS:
+            assert np.allclose(test[key], full[key], rtol=1e-10, atol=0.0), f"merged '{key}' does not match!"
+        return
+
+    def test_errors(self):
+        with pytest.raises(ValueError):
+            utils.Streaming_Stats(quantiles=[0.5, 1.5])
+        stats = utils.Streaming_Stats()
+        stats.update(np.ones((2, 3)))
+        with pytest.raises(ValueError):
+            stats.update(np.ones((3, 3)))
+        # empty elements are NaN
+        stats = utils.Streaming_Stats()
+        stats.update(np.full((2, 4), np.nan))
+        stats.update(np.array([[1.0, 2.0], [np.nan, np.nan]]))
+        res = stats.results()
+        assert np.isclose(res['mean'][0], 1.5) and np.isnan(res['mean'][1])
+        assert np.all(np.isnan(res['quantiles'][1]))
+        return
+
+
 class Test__nyquist_freqs:
 
     def test_basic(self):
@@ -96,3 +245,15 @@ class Test_GW_Methods:
         return
 
     # def test_hardening_dadt(self):
+
+
+def test_mem_chunks():
+    # chunks cover all items, in order, and fit in the budget
+    chunks = utils.mem_chunks(10, 100, fixed_bytes=50, budget=350)
+    assert [(sl.start, sl.stop) for sl in chunks] == [(0, 3), (3, 6), (6, 9), (9, 10)]
+    assert utils.mem_chunks(10, 100, budget=1e6) == [slice(0, 10)]
+    # at least one item per chunk, even when over budget
+    assert len(utils.mem_chunks(4, 100, fixed_bytes=1000, budget=10)) == 4
+    assert utils.mem_chunks(0, 100, budget=10) == []
+    assert 0.0 < utils.mem_budget() <= utils.MEM_BUDGET
+    return
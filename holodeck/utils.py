@@ -10,12 +10,16 @@ References
 """
 
 import abc
+import contextlib
 import copy
 import functools
 import inspect
 import numbers
 import os
+import resource
 import subprocess
+import sys
+import time
 import warnings
 from pathlib import Path
 from typing import Optional, Tuple, Union, List  # , Sequence,
@@ -24,6 +28,7 @@ import h5py
 import numba
 import numpy as np
 import numpy.typing as npt
+import psutil
 import scipy as sp
 import scipy.stats    # noqa
 import scipy.special  # noqa
@@ -40,6 +45,9 @@ _GW_LUM_CONST = (32.0 / 5.0) * np.power(NWTG, 7.0/3.0) * np.power(SPLC, -5.0)
 
 _AGE_UNIVERSE_GYR = cosmo.age(0.0).to('Gyr').value  # [Gyr]  ~ 13.78
 
+MEM_BUDGET = 2**32              #: [bytes] default memory budget of chunked calculations, see `mem_chunks`
+MEM_BUDGET_AVAIL_FRAC = 0.5     #: maximum fraction of available memory used by the default budget
+
 
 class _Modifier(abc.ABC):
     """Base class for all types of post-processing modifiers.
@@ -351,11 +359,432 @@ def get_git_hash(short=True) -> str:
     return subprocess.check_output(args).decode('ascii').strip()
 
 
+def get_peak_rss():
+    """Peak resident-set-size (high-water mark) of the current process, in bytes.
+    """
+    # `ru_maxrss` is in KB on Linux, and B on macos
+    mem_max = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if not sys.platform.lower().startswith('darwin'):
+        mem_max = mem_max * 1024
+    return float(mem_max)
+
+
+class Stage_Profiler:
+    """Opt-in recorder of wall time, CPU time and memory usage for named stages of a calculation.
+
+    Each stage is timed by entering the context returned from calling the instance with the stage name.
+    Repeated entries of the same stage are accumulated.  When disabled, calling the instance returns a
+    no-op context, so that instrumented code has negligible overhead.
+
+    Memory is reported as the current RSS at the end of the stage, the process' peak RSS at the end of
+    the stage, and the increase in the peak RSS during the stage (i.e. non-zero only if the stage set a
+    new high-water mark).  All memory values are in bytes, and all times are in seconds.
+
+    Examples
+    --------
+    >>> prof = Stage_Profiler(enabled=True)
+    >>> with prof('sam_density'):
+    ...     dens = sam.static_binary_density
+    >>> data['profile'] = prof.to_array()
+
+    """
+
+    #: Fields recorded for each stage, and the columns of the array returned by `to_array`
+    FIELDS = ['calls', 'wall', 'cpu', 'rss', 'rss_peak', 'rss_peak_delta']
+    _NAME_LEN = 32
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self._records = {}
+        self._process = psutil.Process(os.getpid()) if enabled else None
+        return
+
+    def __call__(self, name):
+        if not self.enabled:
+            return contextlib.nullcontext()
+        return self._stage(name)
+
+    @contextlib.contextmanager
+    def _stage(self, name):
+        peak_beg = max(get_peak_rss(), float(self._process.memory_info().rss))
+        cpu_beg = time.process_time()
+        wall_beg = time.perf_counter()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - wall_beg
+            cpu = time.process_time() - cpu_beg
+            rss = float(self._process.memory_info().rss)
+            # the peak from `getrusage` can lag slightly behind the current RSS
+            peak = max(get_peak_rss(), rss)
+
+            rec = self._records.setdefault(name, {**dict.fromkeys(self.FIELDS, 0.0), 'calls': 0})
+            rec['calls'] += 1
+            rec['wall'] += wall
+            rec['cpu'] += cpu
+            rec['rss'] = rss
+            rec['rss_peak'] = peak
+            rec['rss_peak_delta'] = max(rec['rss_peak_delta'], peak - peak_beg)
+
+    @property
+    def records(self):
+        """Dictionary of stage-name to dictionary of recorded values (see `FIELDS`).
+        """
+        return self._records
+
+    def to_array(self):
+        """Convert the records to a numpy structured array, which can be stored directly in npz/hdf5 files.
+
+        Returns
+        -------
+        arr : (S,) structured ndarray
+            One entry per stage, in the order the stages were first entered, with a 'stage' name field
+            followed by each of the `FIELDS`.
+
+        """
+        dtype = [('stage', f'U{self._NAME_LEN}'), ('calls', int)] + [(ff, float) for ff in self.FIELDS[1:]]
+        arr = np.zeros(len(self._records), dtype=dtype)
+        for ii, (name, rec) in enumerate(self._records.items()):
+            arr[ii] = (name[:self._NAME_LEN], *[rec[ff] for ff in self.FIELDS])
+        return arr
+
+    def summary(self):
+        """Human-readable table of all recorded stages.
+        """
+        lines = [f"{'stage':<20s} {'calls':>6s} {'wall [s]':>10s} {'cpu [s]':>10s} {'rss [GB]':>9s} {'peak [GB]':>9s}"]
+        for name, rec in self._records.items():
+            lines.append(
+                f"{name:<20s} {rec['calls']:>6d} {rec['wall']:>10.3f} {rec['cpu']:>10.3f} "
+                f"{rec['rss']/1024**3:>9.2f} {rec['rss_peak']/1024**3:>9.2f}"
+            )
+        return "\n".join(lines)
+
+
+def mem_budget(budget=None):
+    """Memory budget for chunked calculations, in bytes.
+
+    Parameters
+    ----------
+    budget : float or None
+        [bytes] Memory budget.  If `None`, `MEM_BUDGET` is used, limited to `MEM_BUDGET_AVAIL_FRAC` of
+        the memory currently available.
+
+    Returns
+    -------
+    budget : float
+        [bytes] Memory budget.
+
+    """
+    if budget is None:
+        avail = psutil.virtual_memory().available
+        budget = min(MEM_BUDGET, MEM_BUDGET_AVAIL_FRAC * avail)
+    return float(budget)
+
+
+def mem_chunks(num, item_bytes, fixed_bytes=0, budget=None, name=None):
+    """Split `num` items (e.g. realizations) into contiguous chunks that fit within a memory budget.
+
+    The footprint of a chunk of `n` items is estimated as ``fixed_bytes + n * item_bytes``.  Every chunk
+    contains at least one item, even if this exceeds the budget (in which case a warning is logged).
+
+    Parameters
+    ----------
+    num : int
+        Number of items.
+    item_bytes : float
+        [bytes] Memory required for each item in a chunk.
+    fixed_bytes : float
+        [bytes] Memory required independent of the chunk size, including outputs.
+    budget : float or None
+        [bytes] Memory budget, see `mem_budget`.
+    name : str or None
+        Name of the calculation, used in log messages.
+
+    Returns
+    -------
+    chunks : list of slice
+        Slices of items in each chunk, covering ``range(num)`` in order.
+
+    """
+    budget = mem_budget(budget)
+    name = "calculation" if name is None else f"`{name}`"
+    if fixed_bytes + item_bytes > budget:
+        msg = (
+            f"{name} requires {(fixed_bytes + item_bytes)/1024**3:.2e} GB for a single item, "
+            f"exceeding the memory budget of {budget/1024**3:.2e} GB!"
+        )
+        log.warning(msg)
+
+    size = int((budget - fixed_bytes) // max(item_bytes, 1.0))
+    size = int(np.clip(size, 1, max(num, 1)))
+    if size < num:
+        log.debug(f"{name}: {num} items in chunks of {size}, budget {budget/1024**3:.2e} GB")
+
+    return [slice(lo, min(lo + size, num)) for lo in range(0, num, size)]
+
+
 # =================================================================================================
 # ====    Mathematical & Numerical    ====
 # =================================================================================================
 
 
+class Streaming_Stats:
+    """Single-pass, mergeable summary statistics of values accumulated over realizations.
+
+    Values are added in blocks with `update`, where one axis of each block is the realization axis; all
+    other dimensions are treated as independent elements.  After all blocks have been added, `results`
+    returns the statistics for each element, without the full set of realizations ever being stored.
+
+    * Moments of the values, and of their log10 (floored at `log_floor`), are exact, using the pairwise
+      update of Chan, Golub & LeVeque (1979).
+    * Quantiles are estimated from a sketch of logarithmically-spaced bins (as in DDSketch, Masson+2019),
+      which has a relative accuracy of `rel_err` for values within the `nbins` bins around the median of
+      the first block.  Values outside this window are accumulated in the edge bins, and quantiles are
+      always clipped to the exact minimum and maximum values.  Non-positive values are counted
+      separately, and quantiles falling among them are given as the largest non-positive value.
+
+    NaN values are ignored.
+
+    Examples
+    --------
+    >>> stats = Streaming_Stats(quantiles=[0.16, 0.5, 0.84])
+    >>> for _ in range(10):
+    ...     stats.update(np.random.lognormal(size=(3, 100)), axis=-1)
+    >>> stats.results()['quantiles'].shape
+    (3, 3)
+
+    """
+
+    #: Default quantiles to calculate
+    QUANTILES = [0.05, 0.16, 0.25, 0.50, 0.75, 0.84, 0.95]
+    #: Names of the statistics returned by `results`
+    STATS = ['mean', 'std', 'log_mean', 'log_std', 'quantiles']
+    _UNSET = np.iinfo(np.int64).min
+
+    def __init__(self, quantiles=None, rel_err=5e-3, nbins=2048, log_floor=None):
+        """Initialize an empty set of statistics.
+
+        Parameters
+        ----------
+        quantiles : None or array_like of float
+            Quantiles, in [0.0, 1.0], to estimate.  `None` uses the default `QUANTILES`.
+        rel_err : float
+            Relative accuracy of the quantile sketch.
+        nbins : int
+            Number of sketch bins stored for each element.
+        log_floor : None or float
+            Values are floored at this value before calculating log10 moments.  `None` uses the smallest
+            positive float.
+
+        """
+        self.quantiles = np.asarray(self.QUANTILES if quantiles is None else quantiles, dtype=float)
+        if np.any((self.quantiles < 0.0) | (self.quantiles > 1.0)):
+            err = f"`quantiles` ({self.quantiles}) must all be in [0.0, 1.0]!"
+            log.exception(err)
+            raise ValueError(err)
+
+        self.rel_err = rel_err
+        self.nbins = int(nbins)
+        self.log_floor = np.finfo(float).tiny if log_floor is None else log_floor
+        self._log_gamma = np.log((1.0 + rel_err) / (1.0 - rel_err))
+        self.shape = None
+        return
+
+    def _init_arrays(self, shape):
+        self.shape = tuple(shape)
+        self._count = np.zeros(shape, dtype=np.int64)
+        self._mean = np.zeros(shape)
+        self._m2 = np.zeros(shape)
+        self._log_mean = np.zeros(shape)
+        self._log_m2 = np.zeros(shape)
+        self._min = np.full(shape, np.inf)
+        self._max = np.full(shape, -np.inf)
+        self._nonpos = np.zeros(shape, dtype=np.int64)
+        self._nonpos_max = np.full(shape, -np.inf)
+        self._offset = np.full(shape, self._UNSET, dtype=np.int64)
+        self._bins = np.zeros(shape + (self.nbins,), dtype=np.int64)
+        return
+
+    def update(self, values, axis=-1):
+        """Add a block of realizations.
+
+        Parameters
+        ----------
+        values : ndarray
+            Values to add.  Must have the same shape in every call, except along `axis`.
+        axis : int
+            Realization axis of `values`.
+
+        """
+        values = np.moveaxis(np.asarray(values, dtype=float), axis, -1)
+        if self.shape is None:
+            self._init_arrays(values.shape[:-1])
+        elif values.shape[:-1] != self.shape:
+            err = f"Shape of `values` {values.shape[:-1]} (excluding realizations) does not match {self.shape}!"
+            log.exception(err)
+            raise ValueError(err)
+
+        finite = np.isfinite(values)
+        count = np.count_nonzero(finite, axis=-1)
+        if not np.any(count):
+            return
+
+        self._update_moments(np.where(finite, values, np.nan), count)
+        self._update_sketch(values, finite)
+        return
+
+    def _update_moments(self, values, count):
+        with np.errstate(invalid='ignore', divide='ignore'):
+            log_values = np.log10(np.maximum(values, self.log_floor))
+            tot = self._count + count
+            frac = np.where(tot > 0, count / tot, 0.0)
+            cross = np.where(tot > 0, self._count * frac, 0.0)
+            some = (count > 0)[..., np.newaxis]
+            for vals, mean_name, m2_name in [
+                [values, '_mean', '_m2'], [log_values, '_log_mean', '_log_m2']
+            ]:
+                vals = np.where(some, vals, 0.0)
+                mean_blk = np.where(count > 0, np.nanmean(vals, axis=-1), 0.0)
+                m2_blk = np.nansum((vals - mean_blk[..., np.newaxis])**2, axis=-1)
+                mean = getattr(self, mean_name)
+                delta = mean_blk - mean
+                setattr(self, mean_name, mean + delta * frac)
+                setattr(self, m2_name, getattr(self, m2_name) + m2_blk + delta**2 * cross)
+
+        self._count = tot
+        self._min = np.fmin(self._min, np.nanmin(np.where(some, values, np.inf), axis=-1))
+        self._max = np.fmax(self._max, np.nanmax(np.where(some, values, -np.inf), axis=-1))
+        return
+
+    def _update_sketch(self, values, finite):
+        pos = finite & (values > 0.0)
+        nonpos = finite & ~pos
+        self._nonpos += np.count_nonzero(nonpos, axis=-1)
+        self._nonpos_max = np.fmax(self._nonpos_max, np.max(np.where(nonpos, values, -np.inf), axis=-1))
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            index = np.ceil(np.log(np.where(pos, values, 1.0)) / self._log_gamma)
+
+        # center the window of bins for each element on the median of its first positive values
+        unset = (self._offset == self._UNSET) & np.any(pos, axis=-1)
+        if np.any(unset):
+            med = np.nanmedian(np.where(pos, index, np.nan)[unset], axis=-1)
+            self._offset[unset] = med.astype(np.int64) - self.nbins // 2
+
+        index = np.clip(index - self._offset[..., np.newaxis], 0, self.nbins - 1).astype(np.int64)
+        # flattened (element, bin) index of every positive value
+        elem = np.broadcast_to(np.arange(np.prod(self.shape, dtype=int)).reshape(self.shape + (1,)), index.shape)
+        flat = (elem * self.nbins + index)[pos]
+        self._bins += np.bincount(flat, minlength=self._bins.size).reshape(self._bins.shape)
+        return
+
+    def merge(self, other):
+        """Combine the statistics of another instance (with the same configuration) into this one.
+        """
+        if other.shape is None:
+            return self
+        if self.shape is None:
+            self._init_arrays(other.shape)
+        if (other.shape != self.shape) or (other.nbins != self.nbins) or (other.rel_err != self.rel_err):
+            err = "Cannot merge `Streaming_Stats` instances with different shapes or sketch configurations!"
+            log.exception(err)
+            raise ValueError(err)
+
+        tot = self._count + other._count
+        with np.errstate(invalid='ignore', divide='ignore'):
+            frac = np.where(tot > 0, other._count / tot, 0.0)
+        cross = self._count * frac
+        for mean_name, m2_name in [['_mean', '_m2'], ['_log_mean', '_log_m2']]:
+            mean = getattr(self, mean_name)
+            delta = getattr(other, mean_name) - mean
+            setattr(self, mean_name, mean + delta * frac)
+            setattr(self, m2_name, getattr(self, m2_name) + getattr(other, m2_name) + delta**2 * cross)
+
+        self._count = tot
+        self._min = np.fmin(self._min, other._min)
+        self._max = np.fmax(self._max, other._max)
+        self._nonpos += other._nonpos
+        self._nonpos_max = np.fmax(self._nonpos_max, other._nonpos_max)
+
+        # re-bin the other sketch to this instance's offsets
+        unset = (self._offset == self._UNSET)
+        self._offset[unset] = other._offset[unset]
+        shift = np.where(other._offset == self._UNSET, 0, other._offset - self._offset)
+        index = np.clip(np.arange(self.nbins) + shift[..., np.newaxis], 0, self.nbins - 1)
+        elem = np.arange(np.prod(self.shape, dtype=int)).reshape(self.shape + (1,))
+        flat = (elem * self.nbins + index).ravel()
+        self._bins += np.bincount(flat, weights=other._bins.ravel(), minlength=self._bins.size).reshape(
+            self._bins.shape
+        ).astype(np.int64)
+        return self
+
+    @property
+    def count(self):
+        return self._count
+
+    @property
+    def mean(self):
+        return np.where(self._count > 0, self._mean, np.nan)
+
+    @property
+    def std(self):
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.sqrt(self._m2 / self._count)
+
+    @property
+    def log_mean(self):
+        return np.where(self._count > 0, self._log_mean, np.nan)
+
+    @property
+    def log_std(self):
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.sqrt(self._log_m2 / self._count)
+
+    def quantile(self, quantiles=None):
+        """Estimate quantiles from the sketch.
+
+        Parameters
+        ----------
+        quantiles : None or array_like of float
+            Quantiles to estimate.  `None` uses the quantiles given at initialization.
+
+        Returns
+        -------
+        vals : (..., Q) ndarray
+            Estimated values at each quantile, for each element.  NaN for elements without values.
+
+        """
+        quantiles = self.quantiles if quantiles is None else np.atleast_1d(quantiles)
+        shape = self.shape + (quantiles.size,)
+        # (..., 1, 1) rank of each quantile, for each element
+        rank = (quantiles * (self._count[..., np.newaxis] - 1))[..., np.newaxis]
+        # (..., Q) whether the quantile falls among the non-positive values
+        in_nonpos = (rank[..., 0] < self._nonpos[..., np.newaxis])
+        # (..., 1, B) cumulative counts including the non-positive values
+        cum = np.cumsum(self._bins, axis=-1)[..., np.newaxis, :] + self._nonpos[..., np.newaxis, np.newaxis]
+        # (..., Q) bin containing each quantile
+        idx = np.minimum(np.argmax(cum > rank, axis=-1), self.nbins - 1)
+        # representative value of each bin (geometric center, relative error `rel_err`)
+        gamma = np.exp(self._log_gamma)
+        vals = 2.0 * np.exp((idx + self._offset[..., np.newaxis]) * self._log_gamma) / (1.0 + gamma)
+        vals = np.where(in_nonpos, np.broadcast_to(self._nonpos_max[..., np.newaxis], shape), vals)
+        vals = np.clip(vals, self._min[..., np.newaxis], self._max[..., np.newaxis])
+        # the extrema are known exactly
+        vals = np.where(rank[..., 0] <= 0.0, self._min[..., np.newaxis], vals)
+        vals = np.where(rank[..., 0] >= self._count[..., np.newaxis] - 1, self._max[..., np.newaxis], vals)
+        return np.where(self._count[..., np.newaxis] > 0, vals, np.nan)
+
+    def results(self):
+        """Dictionary of all statistics (see `STATS`) for each element.
+
+        Quantiles are stored along a new, trailing axis.
+        """
+        return dict(
+            mean=self.mean, std=self.std, log_mean=self.log_mean, log_std=self.log_std,
+            quantiles=self.quantile(),
+        )
+
+
 def roll_rows(arr, roll_num):
     """Roll each row (axis=0) of the given array by an amount specified.
 
@@ -936,6 +1365,163 @@ def quantiles(
     return percs
 
 
+def resample_kde(data, size, reflect=None, bw_rescale=None, seed=None, chunk_size=2**18, nthreads=None,
+                 max_iter=100):
+    """Draw new samples from a Gaussian kernel density estimate (KDE) of the given data.
+
+    This reproduces the resampling of `kalepy.KDE(data, reflect=reflect, bw_rescale=bw_rescale)`,
+    i.e. ``kalepy.KDE.resample(size)``, but is built for throughput on large numbers of samples:
+
+    *   The kernel covariance is the data covariance, scaled by the square of Scott's factor
+        ``N^(-1/(D+4))`` (times `bw_rescale`).
+    *   Each new sample is a uniformly selected data point (kernel), shifted by a draw from the kernel.
+    *   Samples outside of the `reflect` boundaries are rejected and redrawn (as in `kalepy`, data
+        points outside of the boundaries are not used as kernels).
+
+    Samples are generated in chunks of `chunk_size`, each using its own random generator spawned
+    from `seed`, so that the output depends only on `seed` and `chunk_size` and not on the number
+    of threads used.  Chunks are processed concurrently with `nthreads` threads (`numpy` releases
+    the GIL while drawing random numbers and during array operations).
+
+    Parameters
+    ----------
+    data : (D, N) array_like
+        Input data, with `D` parameters (dimensions) and `N` data points.
+    size : int
+        Number of samples to draw.
+    reflect : (D,) list of (None or (2,) of (None or float)), or None
+        Boundaries for each parameter, as lower and upper values.  `None` means unbounded.
+    bw_rescale : float or None
+        Factor by which to rescale the (Scott's rule) bandwidth.
+    seed : int, `np.random.SeedSequence` or None
+        Seed used to construct random generators.  If `None`, a seed is drawn from the global
+        `numpy.random` state, so that results can be reproduced with `np.random.seed`.
+    chunk_size : int
+        Number of samples drawn in each chunk.
+    nthreads : int or None
+        Number of threads to use.  If `None`, the number of available processors.
+    max_iter : int
+        Maximum number of rejection iterations for each chunk.
+
+    Returns
+    -------
+    samples : (D, size) ndarray
+        New samples.
+
+    """
+    import concurrent.futures
+
+    data = np.atleast_2d(np.asarray(data, dtype=float))
+    ndim, nvals = data.shape
+    size = int(size)
+    chunk_size = int(chunk_size)
+
+    # ---- Construct kernel covariance (lower-triangular cholesky decomposition)
+
+    bw = np.power(nvals, -1.0/(ndim + 4))
+    if bw_rescale is not None:
+        bw = bw * bw_rescale
+    matrix = np.atleast_2d(np.cov(data, rowvar=True, bias=False)) * bw**2
+    try:
+        chol = np.linalg.cholesky(matrix)
+    except np.linalg.LinAlgError as exc:
+        err = f"Cholesky decomposition of the kernel covariance failed!  {exc}"
+        log.exception(err)
+        raise ValueError(err)
+
+    # ---- Determine boundaries and select valid kernels
+
+    bounds = _kde_bounds(reflect, ndim)
+    data = np.ascontiguousarray(data[:, _kde_inside(data, bounds)])
+    nvals = data.shape[1]
+    if nvals == 0:
+        err = "No data points within `reflect` boundaries!"
+        log.exception(err)
+        raise ValueError(err)
+
+    # ---- Draw samples in chunks
+
+    samples = np.zeros((ndim, size))
+    num_chunks = int(np.ceil(size / chunk_size))
+    if seed is None:
+        seed = np.random.randint(0, 2**32, dtype=np.int64)
+    if not isinstance(seed, np.random.SeedSequence):
+        seed = np.random.SeedSequence(seed)
+    seeds = seed.spawn(num_chunks)
+
+    def fill_chunk(ii):
+        lo = ii * chunk_size
+        hi = min(lo + chunk_size, size)
+        _resample_kde_chunk(samples[:, lo:hi], data, chol, bounds, seeds[ii], max_iter)
+        return
+
+    if nthreads is None:
+        nthreads = os.cpu_count()
+    nthreads = min(nthreads, num_chunks)
+    if nthreads <= 1:
+        for ii in range(num_chunks):
+            fill_chunk(ii)
+    else:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=nthreads) as executor:
+            # iterate over results to raise any errors from the threads
+            list(executor.map(fill_chunk, range(num_chunks)))
+
+    return samples
+
+
+def _kde_bounds(reflect, ndim):
+    """Convert the `reflect` argument of `resample_kde` into a (D, 2) array of [lower, upper] bounds.
+
+    Unbounded sides (`None`) are set to -/+ infinity.
+    """
+    bounds = np.zeros((ndim, 2))
+    bounds[:, 0] = -np.inf
+    bounds[:, 1] = +np.inf
+    if reflect is None:
+        return bounds
+
+    if len(reflect) != ndim:
+        err = f"`reflect` ({len(reflect)},) must match the number of data parameters ({ndim})!"
+        log.exception(err)
+        raise ValueError(err)
+
+    for ii, ref in enumerate(reflect):
+        if ref is None:
+            continue
+        for jj, loc in enumerate(ref):
+            if loc is not None:
+                bounds[ii, jj] = loc
+
+    return bounds
+
+
+def _kde_inside(vals, bounds):
+    """Select the (D, N) points `vals` strictly within the (D, 2) `bounds`, see `_kde_bounds`.
+    """
+    return np.all((bounds[:, 0, np.newaxis] < vals) & (vals < bounds[:, 1, np.newaxis]), axis=0)
+
+
+def _resample_kde_chunk(out, data, chol, bounds, seed, max_iter):
+    """Fill the (D, C) array `out` with KDE samples within `bounds`, by rejection, see `resample_kde`.
+    """
+    rng = np.random.default_rng(seed)
+    ndim, size = out.shape
+    nvals = data.shape[1]
+    num_good = 0
+    for _ in range(max_iter):
+        num = size - num_good
+        trial = np.take(data, rng.integers(0, nvals, num), axis=1) + chol @ rng.standard_normal((ndim, num))
+        trial = trial[:, _kde_inside(trial, bounds)]
+        out[:, num_good:num_good+trial.shape[1]] = trial
+        num_good += trial.shape[1]
+        if num_good == size:
+            return
+
+    err = f"Failed to draw {size} samples in {max_iter} iterations!  (obtained {num_good})"
+    log.exception(err)
+    raise RuntimeError(err)
+
+
 def rk4_step(func, x0, y0, dx, args=None, check_nan=0, check_nan_max=5):
     """Perform a single 4th-order Runge-Kutta integration step.
     """
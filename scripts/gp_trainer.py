@@ -9,6 +9,7 @@ import shutil
 from datetime import datetime
 from pathlib import Path
 
+import holodeck.gps.gp_numpy as gnp
 import holodeck.gps.gp_utils as gu
 
 # Emcee doesn't like multithreading
@@ -58,17 +59,44 @@ def main(config):
         raise FileNotFoundError(
             f"The library at {spectra_file} does not exist!")
 
-    trained_gps = gu.train_gp(spectra_file=spectra_file,
-                              nfreqs=train_opts.getint('nfreqs', None),
-                              nwalkers=train_opts.getint('nwalkers', 36),
-                              nsamples=train_opts.getint('nsamples', 1500),
-                              burn_frac=train_opts.getfloat('burn_frac', 0.25),
-                              test_frac=train_opts.getfloat('test_frac', 0.0),
-                              center_measure=train_opts.get(
-                                  'center_measure', 'median'),
-                              y_is_variance=train_opts.getboolean('train_on_variance', False),
-                              mpi=train_opts.getboolean('mpi', True),
-                              kernel=kern)
+    seed = train_opts.get('seed', None)
+    seed = None if seed is None else int(seed)
+
+    backend = train_opts.get('backend', 'george').lower()
+    if backend == 'numpy':
+        trained_gps = gnp.train_gp(spectra_file=spectra_file,
+                                   nfreqs=train_opts.getint('nfreqs', None),
+                                   test_frac=train_opts.getfloat('test_frac', 0.0),
+                                   center_measure=train_opts.get('center_measure', 'median'),
+                                   y_is_variance=train_opts.getboolean('train_on_variance', False),
+                                   nrestarts=train_opts.getint('nrestarts', 4),
+                                   seed=seed,
+                                   kernel=kern)
+        if train_opts.getboolean('save_as_george', False):
+            trained_gps = trained_gps.to_gauss_procs()
+    elif backend == 'george':
+        # Each trained frequency is checkpointed here, so that an interrupted training can be resumed
+        checkpoint_dir = train_opts.get('checkpoint_dir', None)
+        if checkpoint_dir is None:
+            checkpoint_dir = spectra_file.parent / ("gp_checkpoints_" + spectra_file.stem)
+        print(f"Checkpointing GPs in {checkpoint_dir}")
+        trained_gps = gu.train_gp(spectra_file=spectra_file,
+                                  nfreqs=train_opts.getint('nfreqs', None),
+                                  nwalkers=train_opts.getint('nwalkers', 36),
+                                  nsamples=train_opts.getint('nsamples', 1500),
+                                  burn_frac=train_opts.getfloat('burn_frac', 0.25),
+                                  test_frac=train_opts.getfloat('test_frac', 0.0),
+                                  center_measure=train_opts.get(
+                                      'center_measure', 'median'),
+                                  y_is_variance=train_opts.getboolean('train_on_variance', False),
+                                  mpi=train_opts.getboolean('mpi', True),
+                                  parallel_freqs=train_opts.getboolean('parallel_freqs', False),
+                                  processes=train_opts.getint('processes', 1),
+                                  checkpoint_dir=checkpoint_dir,
+                                  seed=seed,
+                                  kernel=kern)
+    else:
+        raise ValueError(f"Unknown GP `backend` '{backend}', must be 'george' or 'numpy'!")
 
     # Add datestring to ensure unique name
     datestr = datetime.now().strftime('%Y%m%d_%H%M%S')